@@ -74,6 +74,37 @@ def start_pending_order_worker():
         logger.error(f"Failed to start pending order worker: {e}")
 
 
+def start_symbol_meta_preloader():
+    """Load persisted exchange symbol metadata and keep it refreshed in the background.
+
+    To disable it, set LIVE_SYMBOL_META_ENABLED=false (clients fall back to per-symbol lookups).
+    """
+    try:
+        from app.services.live_trading.symbol_meta import get_symbol_meta_cache, symbol_meta_enabled
+        if not symbol_meta_enabled():
+            logger.info("Symbol metadata preloader is disabled.")
+            return
+        get_symbol_meta_cache().start()
+    except Exception as e:
+        logger.error(f"Failed to start symbol metadata preloader: {e}")
+
+
+def start_notification_dispatcher():
+    """Start the background notification workers and replay notifications queued before a restart.
+
+    To deliver notifications synchronously instead, set NOTIFY_ASYNC_ENABLED=false.
+    """
+    try:
+        from app.services.signal_notifier import notify_async_enabled
+        if not notify_async_enabled():
+            logger.info("Notification dispatcher is disabled (synchronous delivery).")
+            return
+        from app.services.notification_dispatcher import get_notification_dispatcher
+        get_notification_dispatcher().start()
+    except Exception as e:
+        logger.error(f"Failed to start notification dispatcher: {e}")
+
+
 def restore_running_strategies():
     """
     Restore running strategies on startup.
@@ -248,6 +279,8 @@ def create_app(config_name='default'):
 
     # Startup hooks.
     with app.app_context():
+        start_symbol_meta_preloader()
+        start_notification_dispatcher()
         start_pending_order_worker()
         start_portfolio_monitor()
         restore_running_strategies()
@@ -60,6 +60,15 @@ class BaseDataSource(ABC):
         Implementations may return a dict compatible with CCXT `fetch_ticker` shape (e.g. {'last': ...}).
         """
         raise NotImplementedError("get_ticker is not implemented for this data source")
+
+    def get_tickers(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取报价（可选接口，仅在数据源有批量行情接口时实现）
+
+        Returns:
+            {symbol: ticker}，symbol 与入参一致；缺失的 symbol 由调用方逐个回落到 get_ticker
+        """
+        raise NotImplementedError("get_tickers is not implemented for this data source")
     
     def format_kline(
         self,
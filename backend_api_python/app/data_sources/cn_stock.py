@@ -164,6 +164,55 @@ class TencentDataMixin:
         # logger.info(f"聚合生成 {len(aggregated)} 条 4H 数据")
         return aggregated[-limit:] if len(aggregated) > limit else aggregated
 
+    def _fetch_tencent_quotes(self, codes: List[str], chunk_size: int = 60) -> Dict[str, Dict[str, Any]]:
+        """
+        腾讯实时报价批量接口：qt.gtimg.cn/q=sh600000,hk00700,...（一次请求多只股票）
+
+        Returns:
+            {腾讯代码: ticker}
+        """
+        quotes: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(codes), chunk_size):
+            chunk = codes[i:i + chunk_size]
+            try:
+                response = requests.get(f"http://qt.gtimg.cn/q={','.join(chunk)}", timeout=10)
+                content = response.content.decode('gbk', errors='ignore')
+            except Exception as e:
+                logger.debug(f"Tencent batch quote failed for {len(chunk)} symbols: {e}")
+                continue
+            # 每行格式: v_sh600000="1~浦发银行~600000~10.50~...";
+            for line in content.split(';'):
+                line = line.strip()
+                if not line.startswith('v_') or '="' not in line:
+                    continue
+                code, data_str = line[2:].split('="', 1)
+                parts = data_str.strip('"').split('~')
+                if len(parts) <= 32:
+                    continue
+                try:
+                    quotes[code] = {
+                        'last': float(parts[3]) if parts[3] else 0,
+                        'change': float(parts[31]) if parts[31] else 0,
+                        'changePercent': float(parts[32]) if parts[32] else 0,
+                        'high': float(parts[33]) if len(parts) > 33 and parts[33] else 0,
+                        'low': float(parts[34]) if len(parts) > 34 and parts[34] else 0,
+                        'open': float(parts[5]) if len(parts) > 5 and parts[5] else 0,
+                        'previousClose': float(parts[4]) if parts[4] else 0
+                    }
+                except (ValueError, IndexError):
+                    continue
+        return quotes
+
+    def _fetch_tencent_tickers(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量实时报价（腾讯批量接口），返回 {symbol: ticker}"""
+        code_map: Dict[str, str] = {}
+        for symbol in symbols:
+            code = self._to_tencent_symbol((symbol or '').strip())
+            if code:
+                code_map[code] = symbol
+        quotes = self._fetch_tencent_quotes(list(code_map))
+        return {code_map[code]: q for code, q in quotes.items() if code in code_map and q.get('last', 0) > 0}
+
 
 class AShareDataSource(BaseDataSource, TencentDataMixin):
     """A-Share data source."""
@@ -387,6 +436,10 @@ class AShareDataSource(BaseDataSource, TencentDataMixin):
         
         return klines
     
+    def get_tickers(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量实时报价（腾讯批量行情接口）"""
+        return self._fetch_tencent_tickers(symbols)
+
     def get_ticker(self, symbol: str) -> Dict[str, Any]:
         """
         获取A股实时报价
@@ -724,6 +777,10 @@ class HShareDataSource(BaseDataSource, TencentDataMixin):
         
         return klines
     
+    def get_tickers(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量实时报价（腾讯批量行情接口）"""
+        return self._fetch_tencent_tickers(symbols)
+
     def get_ticker(self, symbol: str) -> Dict[str, Any]:
         """
         获取港股实时报价
@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 import ccxt
 
 from app.data_sources.base import BaseDataSource, TIMEFRAME_SECONDS
+from app.data_sources.crypto_stream import get_crypto_stream
 from app.utils.logger import get_logger
 from app.config import CCXTConfig, APIKeys
 
@@ -44,15 +45,9 @@ class CryptoDataSource(BaseDataSource):
         exchange_class = getattr(ccxt, exchange_id)
         self.exchange = exchange_class(config)
 
-    def get_ticker(self, symbol: str) -> Dict[str, Any]:
-        """
-        Get latest ticker for a crypto symbol via CCXT.
-
-        Accepts common formats:
-        - BTC/USDT
-        - BTCUSDT
-        - BTC/USDT:USDT (swap-style suffix, will be normalized)
-        """
+    @staticmethod
+    def _normalize_symbol(symbol: str) -> str:
+        """BTC/USDT / BTCUSDT / BTC/USDT:USDT -> BTC/USDT"""
         sym = (symbol or "").strip()
         if ":" in sym:
             sym = sym.split(":", 1)[0]
@@ -63,7 +58,49 @@ class CryptoDataSource(BaseDataSource):
                 sym = f"{sym[:-4]}/USDT"
             elif sym.endswith("USD") and len(sym) > 3:
                 sym = f"{sym[:-3]}/USD"
+        return sym
+
+    def get_ticker(self, symbol: str) -> Dict[str, Any]:
+        """
+        Get latest ticker for a crypto symbol via CCXT.
+
+        Accepts common formats:
+        - BTC/USDT
+        - BTCUSDT
+        - BTC/USDT:USDT (swap-style suffix, will be normalized)
+        """
+        sym = self._normalize_symbol(symbol)
+        # 优先使用 WebSocket 行情流的内存快照，过期/未订阅时回落 REST
+        stream = get_crypto_stream()
+        if stream is not None:
+            live = stream.get_ticker(sym)
+            if live:
+                return live
         return self.exchange.fetch_ticker(sym)
+
+    def get_tickers(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Batch tickers: WebSocket snapshots first, then one CCXT `fetch_tickers` call for the rest
+        (when the exchange supports it). Returns {input symbol: ticker}.
+        """
+        result: Dict[str, Dict[str, Any]] = {}
+        pending: Dict[str, List[str]] = {}
+        stream = get_crypto_stream()
+        for symbol in symbols:
+            sym = self._normalize_symbol(symbol)
+            live = stream.get_ticker(sym) if stream is not None else None
+            if live:
+                result[symbol] = live
+            else:
+                pending.setdefault(sym, []).append(symbol)
+        if not pending or not self.exchange.has.get('fetchTickers'):
+            # 交易所无批量接口时只返回行情流命中部分，其余由调用方逐个获取
+            return result
+        tickers = self.exchange.fetch_tickers(list(pending))
+        for sym, ticker in (tickers or {}).items():
+            for symbol in pending.get(sym, []):
+                result[symbol] = ticker
+        return result
     
     def get_kline(
         self,
@@ -0,0 +1,314 @@
+"""
+加密货币实时行情流（WebSocket）
+
+行情接口、自选价格、组合预警与策略循环都在轮询同一批交易对的 ccxt REST 接口。
+本模块为"最近被访问过的"交易对订阅 Binance 公共行情流（aggTrade / 24h ticker / 1m kline），
+在内存里维护最新价与当前未收盘的 1 分钟 K 线：
+
+- `get_ticker()` / `get_partial_bar()` 只读内存，不做网络 I/O；数据超过 CRYPTO_WS_STALE_SEC
+  未更新则返回 None，调用方回落到 REST；
+- 交易对在首次访问时自动订阅，CRYPTO_WS_IDLE_SEC 内未再访问则退订；
+- 仅在 CCXT 默认交易所为 binance 时启用（行情与 REST 数据源保持同源）。
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import inspect
+import time
+from typing import Any, Dict, List, Optional
+
+from app.utils.logger import get_logger
+
+try:
+    from websockets.sync.client import connect as ws_connect
+except Exception:
+    ws_connect = None
+
+# `proxy=` 仅 websockets>=15 支持；更早的版本传入会 TypeError
+try:
+    _WS_PROXY_SUPPORTED = ws_connect is not None and 'proxy' in inspect.signature(ws_connect).parameters
+except (TypeError, ValueError):
+    _WS_PROXY_SUPPORTED = False
+
+logger = get_logger(__name__)
+
+STREAM_SUFFIXES = ('@aggTrade', '@ticker', '@kline_1m')
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def crypto_stream_enabled() -> bool:
+    if os.getenv('CRYPTO_WS_ENABLED', 'false').strip().lower() not in ('1', 'true', 'yes', 'on'):
+        return False
+    if ws_connect is None:
+        return False
+    from app.config import CCXTConfig
+    return str(CCXTConfig.DEFAULT_EXCHANGE or '').lower() == 'binance'
+
+
+def stream_symbol(symbol_pair: str) -> str:
+    """'BTC/USDT' / 'BTC/USDT:USDT' / 'BTCUSDT' -> 'btcusdt'"""
+    sym = (symbol_pair or '').strip()
+    if ':' in sym:
+        sym = sym.split(':', 1)[0]
+    return sym.replace('/', '').replace('-', '').lower()
+
+
+def _f(value: Any) -> float:
+    try:
+        return float(value)
+    except Exception:
+        return 0.0
+
+
+class CryptoMarketStream:
+    """Binance 公共行情流 + 内存最新价 / 未收盘 K 线缓存（线程安全）"""
+
+    def __init__(self, ws_url: Optional[str] = None):
+        self.ws_url = ws_url or os.getenv('CRYPTO_WS_URL', 'wss://stream.binance.com:9443/stream')
+        self.stale_sec = _env_float('CRYPTO_WS_STALE_SEC', 5.0)
+        self.idle_sec = _env_float('CRYPTO_WS_IDLE_SEC', 600.0)
+        self.max_symbols = int(_env_float('CRYPTO_WS_MAX_SYMBOLS', 200))
+        self._lock = threading.Lock()
+        self._proxy_warned = False
+        self._tickers: Dict[str, Dict[str, Any]] = {}
+        self._bars: Dict[str, Dict[str, Any]] = {}
+        self._updated: Dict[str, float] = {}
+        self._active: Dict[str, float] = {}
+        self._subscribed: set = set()
+        self._msg_id = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.connected = threading.Event()
+        self.hits = 0
+        self.misses = 0
+        self.messages = 0
+        self.reconnects = 0
+        self.last_error = ''
+
+    # ---------- 读取（无网络 I/O） ----------
+
+    def touch(self, symbol_pair: str) -> str:
+        """登记活跃交易对（后台线程负责订阅），返回流名称中的 symbol。"""
+        sym = stream_symbol(symbol_pair)
+        if not sym:
+            return sym
+        with self._lock:
+            if sym not in self._active and len(self._active) >= self.max_symbols:
+                oldest = min(self._active, key=self._active.get)
+                self._active.pop(oldest, None)
+            self._active[sym] = time.time()
+        self._ensure_thread()
+        return sym
+
+    def _fresh(self, sym: str) -> bool:
+        return self.connected.is_set() and (time.time() - self._updated.get(sym, 0.0)) <= self.stale_sec
+
+    def get_ticker(self, symbol_pair: str) -> Optional[Dict[str, Any]]:
+        """ccxt fetch_ticker 格式的最新行情；未订阅/过期返回 None。"""
+        sym = self.touch(symbol_pair)
+        with self._lock:
+            ticker = self._tickers.get(sym)
+            if ticker and ticker.get('open') and self._fresh(sym):
+                self.hits += 1
+                return dict(ticker)
+            self.misses += 1
+        return None
+
+    def get_partial_bar(self, symbol_pair: str) -> Optional[Dict[str, Any]]:
+        """当前未收盘的 1 分钟 K 线（time 为秒）；未订阅/过期返回 None。"""
+        sym = self.touch(symbol_pair)
+        with self._lock:
+            bar = self._bars.get(sym)
+            if bar and self._fresh(sym):
+                return dict(bar)
+        return None
+
+    def merge_partial_bar(self, symbol_pair: str, klines: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """用实时 1m K 线替换/追加到 1m K 线列表末尾（返回新列表，不修改入参）。"""
+        bar = self.get_partial_bar(symbol_pair)
+        if not bar or not klines:
+            return klines
+        last_time = int(klines[-1].get('time') or 0)
+        if bar['time'] == last_time:
+            return klines[:-1] + [bar]
+        if bar['time'] > last_time:
+            return klines + [bar]
+        return klines
+
+    # ---------- 后台连接 ----------
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run_loop, name='crypto-ws', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.connected.clear()
+
+    def _connect(self):
+        from app.config import CCXTConfig
+        kwargs: Dict[str, Any] = {'open_timeout': 10, 'close_timeout': 2}
+        proxy = CCXTConfig.PROXY
+        if proxy:
+            if _WS_PROXY_SUPPORTED:
+                kwargs['proxy'] = proxy
+            elif not self._proxy_warned:
+                self._proxy_warned = True
+                logger.warning("PROXY is set but the installed websockets (<15) cannot use it; connecting directly")
+        return ws_connect(self.ws_url, **kwargs)
+
+    def _send(self, ws, method: str, streams: List[str]) -> None:
+        # Binance 单条消息的订阅数量有上限，分批发送
+        for i in range(0, len(streams), 100):
+            self._msg_id += 1
+            ws.send(json.dumps({'method': method, 'params': streams[i:i + 100], 'id': self._msg_id}))
+
+    def _sync_subscriptions(self, ws) -> None:
+        now = time.time()
+        with self._lock:
+            for sym in [s for s, ts in self._active.items() if now - ts > self.idle_sec]:
+                self._active.pop(sym, None)
+            wanted = set(self._active)
+            add = sorted(wanted - self._subscribed)
+            remove = sorted(self._subscribed - wanted)
+            for sym in remove:
+                self._tickers.pop(sym, None)
+                self._bars.pop(sym, None)
+                self._updated.pop(sym, None)
+        if add:
+            self._send(ws, 'SUBSCRIBE', [s + suf for s in add for suf in STREAM_SUFFIXES])
+        if remove:
+            self._send(ws, 'UNSUBSCRIBE', [s + suf for s in remove for suf in STREAM_SUFFIXES])
+        with self._lock:
+            self._subscribed = wanted
+
+    def _run_loop(self) -> None:
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            with self._lock:
+                if not self._active:
+                    # 没有活跃交易对：不保持连接（下次 touch 时重新拉起线程）
+                    self._thread = None
+                    return
+            idle_close = False
+            try:
+                with self._connect() as ws:
+                    self._subscribed = set()
+                    self.connected.set()
+                    backoff = 1.0
+                    next_sync = 0.0
+                    while not self._stop_event.is_set():
+                        if time.time() >= next_sync:
+                            self._sync_subscriptions(ws)
+                            next_sync = time.time() + 1.0
+                            if not self._subscribed:
+                                idle_close = True
+                                break
+                        try:
+                            msg = ws.recv(timeout=1.0)
+                        except TimeoutError:
+                            continue
+                        self._handle(msg)
+            except Exception as e:
+                self.last_error = str(e)[:200]
+                logger.warning(f"Crypto WebSocket stream error: {e}")
+            finally:
+                self.connected.clear()
+            if self._stop_event.is_set():
+                break
+            if idle_close:
+                continue
+            self.reconnects += 1
+            self._stop_event.wait(backoff)
+            backoff = min(30.0, backoff * 2)
+
+    def _handle(self, msg: Any) -> None:
+        try:
+            payload = json.loads(msg)
+        except Exception:
+            return
+        stream = str(payload.get('stream') or '') if isinstance(payload, dict) else ''
+        data = payload.get('data') if isinstance(payload, dict) else None
+        if not stream or not isinstance(data, dict):
+            return
+        sym, _, kind = stream.partition('@')
+        now = time.time()
+        with self._lock:
+            if sym not in self._subscribed:
+                return
+            self.messages += 1
+            ticker = self._tickers.setdefault(sym, {'symbol': sym.upper()})
+            if kind == 'aggTrade':
+                ticker['last'] = ticker['close'] = _f(data.get('p'))
+                ticker['timestamp'] = int(data.get('T') or now * 1000)
+            elif kind == 'ticker':
+                ticker.update({
+                    'last': _f(data.get('c')),
+                    'close': _f(data.get('c')),
+                    'open': _f(data.get('o')),
+                    'high': _f(data.get('h')),
+                    'low': _f(data.get('l')),
+                    'bid': _f(data.get('b')),
+                    'ask': _f(data.get('a')),
+                    'change': _f(data.get('p')),
+                    'percentage': _f(data.get('P')),
+                    'changePercent': _f(data.get('P')),
+                    'previousClose': _f(data.get('x')),
+                    'baseVolume': _f(data.get('v')),
+                    'quoteVolume': _f(data.get('q')),
+                    'timestamp': int(data.get('E') or now * 1000),
+                })
+            elif kind.startswith('kline') and isinstance(data.get('k'), dict):
+                k = data['k']
+                self._bars[sym] = {
+                    'time': int(int(k.get('t') or 0) / 1000),
+                    'open': _f(k.get('o')),
+                    'high': _f(k.get('h')),
+                    'low': _f(k.get('l')),
+                    'close': _f(k.get('c')),
+                    'volume': _f(k.get('v')),
+                }
+            self._updated[sym] = now
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'enabled': crypto_stream_enabled(),
+                'connected': self.connected.is_set(),
+                'symbols': sorted(self._subscribed),
+                'messages': self.messages,
+                'reconnects': self.reconnects,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'last_error': self.last_error,
+            }
+
+
+_stream: Optional[CryptoMarketStream] = None
+_stream_lock = threading.Lock()
+
+
+def get_crypto_stream() -> Optional[CryptoMarketStream]:
+    """行情流单例；未启用（CRYPTO_WS_ENABLED / 非 binance / 缺少 websockets）时返回 None。"""
+    global _stream
+    if not crypto_stream_enabled():
+        return None
+    if _stream is None:
+        with _stream_lock:
+            if _stream is None:
+                _stream = CryptoMarketStream()
+    return _stream
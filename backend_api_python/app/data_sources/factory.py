@@ -6,6 +6,7 @@ from typing import Dict, List, Any, Optional
 
 from app.data_sources.base import BaseDataSource
 from app.utils.logger import get_logger
+from app.utils.single_flight import SingleFlight
 
 logger = get_logger(__name__)
 
@@ -14,6 +15,8 @@ class DataSourceFactory:
     """数据源工厂"""
     
     _sources: Dict[str, BaseDataSource] = {}
+    _kline_flight = SingleFlight()
+    _ticker_flight = SingleFlight()
     
     @classmethod
     def get_source(cls, market: str) -> BaseDataSource:
@@ -92,17 +95,22 @@ class DataSourceFactory:
         Returns:
             K线数据列表
         """
-        try:
-            source = cls.get_source(market)
-            klines = source.get_kline(symbol, timeframe, limit, before_time)
-            
-            # 确保数据按时间排序
-            klines.sort(key=lambda x: x['time'])
-            
-            return klines
-        except Exception as e:
-            logger.error(f"Failed to fetch K-lines {market}:{symbol} - {str(e)}")
-            return []
+        def fetch() -> List[Dict[str, Any]]:
+            try:
+                source = cls.get_source(market)
+                klines = source.get_kline(symbol, timeframe, limit, before_time)
+                
+                # 确保数据按时间排序
+                klines.sort(key=lambda x: x['time'])
+                
+                return klines
+            except Exception as e:
+                logger.error(f"Failed to fetch K-lines {market}:{symbol} - {str(e)}")
+                return []
+
+        # 并发的相同请求共享一次上游调用；每个调用方拿到独立的列表
+        key = (market, symbol, timeframe, limit, before_time)
+        return list(cls._kline_flight.do(key, fetch))
     
     @classmethod
     def get_ticker(cls, market: str, symbol: str) -> Dict[str, Any]:
@@ -121,13 +129,45 @@ class DataSourceFactory:
                 ...
             }
         """
+        def fetch() -> Dict[str, Any]:
+            try:
+                source = cls.get_source(market)
+                return source.get_ticker(symbol)
+            except NotImplementedError:
+                logger.warning(f"get_ticker not implemented for market: {market}")
+                return {'last': 0, 'symbol': symbol}
+            except Exception as e:
+                logger.error(f"Failed to fetch ticker {market}:{symbol} - {str(e)}")
+                return {'last': 0, 'symbol': symbol}
+
+        ticker = cls._ticker_flight.do((market, symbol), fetch)
+        return dict(ticker) if isinstance(ticker, dict) else ticker
+
+    @classmethod
+    def get_tickers(cls, market: str, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取实时报价（数据源有批量接口时一次请求多个 symbol）
+
+        Returns:
+            {symbol: ticker}；不支持批量或失败时返回空 dict / 部分结果，调用方对缺失的 symbol 回落到 get_ticker
+        """
+        symbols = [s for s in dict.fromkeys(symbols or []) if s]
+        if not symbols:
+            return {}
         try:
             source = cls.get_source(market)
-            return source.get_ticker(symbol)
+            return source.get_tickers(symbols) or {}
         except NotImplementedError:
-            logger.warning(f"get_ticker not implemented for market: {market}")
-            return {'last': 0, 'symbol': symbol}
+            return {}
         except Exception as e:
-            logger.error(f"Failed to fetch ticker {market}:{symbol} - {str(e)}")
-            return {'last': 0, 'symbol': symbol}
+            logger.warning(f"Failed to fetch batch tickers {market} ({len(symbols)} symbols) - {str(e)}")
+            return {}
+
+    @classmethod
+    def get_flight_stats(cls) -> Dict[str, Any]:
+        """single-flight 合并统计（collapsed 即节省的上游请求数）"""
+        return {
+            'kline': cls._kline_flight.stats(),
+            'ticker': cls._ticker_flight.stats(),
+        }
 
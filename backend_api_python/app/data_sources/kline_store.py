@@ -0,0 +1,383 @@
+"""
+本地K线存储（按 market/symbol/timeframe 分区的列式 OHLCV 文件）
+
+- 每个序列一个定长记录文件 `<root>/<market>/<symbol>/<timeframe>.bin`（time int64 + OHLCV float64），
+  读取时通过 `np.memmap` 映射，区间查询用 searchsorted 定位后只拷贝命中的片段。
+- 只持久化已收盘的K线，新数据以追加方式写入；向前补历史（早于已存第一根）时原子重写文件。
+- `get_range` 只从网络拉取缺失的头部/尾部，内部缺口（交易所停机、休市）只做检测不自动回补。
+"""
+import json
+import math
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl  # Linux/Unix only: cross-process lock between API workers
+except Exception:
+    fcntl = None
+
+from app.data_sources.base import TIMEFRAME_SECONDS
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+RECORD_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+OHLCV_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# fetch(limit, before_time) -> kline dict list, same contract as DataSourceFactory.get_kline
+Fetcher = Callable[[int, int], List[Dict[str, Any]]]
+
+
+def kline_store_enabled() -> bool:
+    return str(os.getenv('KLINE_STORE_ENABLED', 'true')).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _default_root() -> str:
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.getenv('KLINE_STORE_DIR') or os.path.join(base_dir, 'data', 'kline_store')
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r'[^A-Za-z0-9._-]', '_', str(value or '').strip()) or '_'
+
+
+def klines_to_records(klines: List[Dict[str, Any]]) -> np.ndarray:
+    """kline dict list -> sorted, de-duplicated record array (last write wins)."""
+    if not klines:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    arr = np.empty(len(klines), dtype=RECORD_DTYPE)
+    arr['time'] = [int(k['time']) for k in klines]
+    for field in OHLCV_FIELDS:
+        arr[field] = [float(k.get(field) or 0) for k in klines]
+    return _dedup(arr)
+
+
+def records_to_klines(arr: np.ndarray) -> List[Dict[str, Any]]:
+    """Record array -> kline dict list (the format returned by data sources)."""
+    columns = [arr['time'].tolist()] + [arr[f].tolist() for f in OHLCV_FIELDS]
+    keys = ('time',) + OHLCV_FIELDS
+    return [dict(zip(keys, row)) for row in zip(*columns)]
+
+
+def _dedup(arr: np.ndarray) -> np.ndarray:
+    if len(arr) < 2:
+        return arr
+    order = np.argsort(arr['time'], kind='stable')
+    arr = arr[order]
+    # keep the last occurrence of every timestamp
+    keep = np.ones(len(arr), dtype=bool)
+    keep[:-1] = arr['time'][1:] != arr['time'][:-1]
+    return arr[keep]
+
+
+class _Series:
+    """One market/symbol/timeframe partition on disk."""
+
+    def __init__(self, root: str, market: str, symbol: str, timeframe: str):
+        folder = os.path.join(root, _safe_name(market), _safe_name(symbol))
+        self.folder = folder
+        self.data_path = os.path.join(folder, f"{_safe_name(timeframe)}.bin")
+        self.meta_path = os.path.join(folder, f"{_safe_name(timeframe)}.json")
+        self.lock_path = os.path.join(folder, f"{_safe_name(timeframe)}.lock")
+        self.lock = threading.RLock()
+
+    def count(self) -> int:
+        try:
+            return os.path.getsize(self.data_path) // RECORD_DTYPE.itemsize
+        except OSError:
+            return 0
+
+    def view(self) -> np.ndarray:
+        """Read-only memory map of all complete records (empty array if nothing stored)."""
+        n = self.count()
+        if n <= 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.data_path, dtype=RECORD_DTYPE, mode='r', shape=(n,))
+
+    def read_meta(self) -> Dict[str, Any]:
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f) or {}
+        except (OSError, ValueError):
+            return {}
+
+    def write_meta(self, meta: Dict[str, Any]) -> None:
+        tmp = f"{self.meta_path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def append(self, records: np.ndarray) -> None:
+        n = self.count()
+        with open(self.data_path, 'ab') as f:
+            # drop a partially written trailing record (interrupted append)
+            if f.tell() != n * RECORD_DTYPE.itemsize:
+                f.truncate(n * RECORD_DTYPE.itemsize)
+                f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(records, dtype=RECORD_DTYPE).tobytes())
+
+    def rewrite(self, records: np.ndarray) -> None:
+        tmp = f"{self.data_path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(np.ascontiguousarray(records, dtype=RECORD_DTYPE).tobytes())
+        os.replace(tmp, self.data_path)
+
+
+class _FileLock:
+    """Thread lock + (when available) flock, so several API workers can share one store."""
+
+    def __init__(self, series: _Series):
+        self.series = series
+        self._fh = None
+
+    def __enter__(self):
+        self.series.lock.acquire()
+        try:
+            os.makedirs(self.series.folder, exist_ok=True)
+            if fcntl is not None:
+                self._fh = open(self.series.lock_path, 'a')
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        except Exception:
+            self.series.lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._fh is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+                self._fh.close()
+                self._fh = None
+        finally:
+            self.series.lock.release()
+        return False
+
+
+class KlineStore:
+    """
+    持久化K线存储
+
+    用法：
+        store = get_kline_store()
+        bars = store.get_range('Crypto', 'BTC/USDT', '1H', start_ts, end_ts, fetch=fetcher)
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or _default_root()
+        self._series_map: Dict[Tuple[str, str, str], _Series] = {}
+        self._series_lock = threading.Lock()
+
+    def _series(self, market: str, symbol: str, timeframe: str) -> _Series:
+        key = (market, symbol, timeframe)
+        with self._series_lock:
+            series = self._series_map.get(key)
+            if series is None:
+                series = _Series(self.root, market, symbol, timeframe)
+                self._series_map[key] = series
+            return series
+
+    # ------------------------------------------------------------------
+    # Queries (no network)
+    # ------------------------------------------------------------------
+
+    def bounds(self, market: str, symbol: str, timeframe: str) -> Optional[Tuple[int, int, int]]:
+        """(first_time, last_time, count) of the stored series, or None when empty."""
+        data = self._series(market, symbol, timeframe).view()
+        if len(data) == 0:
+            return None
+        return int(data['time'][0]), int(data['time'][-1]), len(data)
+
+    def read(
+        self,
+        market: str,
+        symbol: str,
+        timeframe: str,
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None
+    ) -> np.ndarray:
+        """Stored bars with start_ts <= time <= end_ts (a private copy, safe to keep)."""
+        return self._slice(self._series(market, symbol, timeframe).view(), start_ts, end_ts)
+
+    @staticmethod
+    def _slice(data: np.ndarray, start_ts: Optional[int], end_ts: Optional[int]) -> np.ndarray:
+        if len(data) == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        times = data['time']
+        lo = 0 if start_ts is None else int(np.searchsorted(times, int(start_ts), side='left'))
+        hi = len(data) if end_ts is None else int(np.searchsorted(times, int(end_ts), side='right'))
+        return np.array(data[lo:hi], dtype=RECORD_DTYPE)
+
+    def find_gaps(
+        self,
+        market: str,
+        symbol: str,
+        timeframe: str,
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        Missing spans inside the stored range.
+
+        Returns:
+            [(last_time_before_gap, first_time_after_gap), ...] for every step larger than one timeframe.
+            Non-24/7 markets naturally report nights/weekends as gaps.
+        """
+        tf_sec = TIMEFRAME_SECONDS.get(timeframe)
+        arr = self.read(market, symbol, timeframe, start_ts, end_ts)
+        if not tf_sec or len(arr) < 2:
+            return []
+        times = arr['time']
+        idx = np.flatnonzero(np.diff(times) > tf_sec)
+        return [(int(times[i]), int(times[i + 1])) for i in idx]
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def write(self, market: str, symbol: str, timeframe: str, klines: List[Dict[str, Any]]) -> int:
+        """Merge closed bars into the store. Returns the number of new bars."""
+        series = self._series(market, symbol, timeframe)
+        with _FileLock(series):
+            return self._merge(series, klines_to_records(klines))
+
+    @staticmethod
+    def _merge(series: _Series, records: np.ndarray) -> int:
+        if len(records) == 0:
+            return 0
+        current = series.view()
+        if len(current) == 0:
+            series.rewrite(records)
+            return len(records)
+        last = int(current['time'][-1])
+        first = int(current['time'][0])
+        newer = records[records['time'] > last]
+        older = records[records['time'] < first]
+        if len(older):
+            # Back-filling history: rare, rewrite the whole partition atomically.
+            merged = np.concatenate([older, np.array(current), newer])
+            del current
+            series.rewrite(merged)
+        elif len(newer):
+            del current
+            series.append(newer)
+        return len(older) + len(newer)
+
+    # ------------------------------------------------------------------
+    # Incremental sync
+    # ------------------------------------------------------------------
+
+    def get_range(
+        self,
+        market: str,
+        symbol: str,
+        timeframe: str,
+        start_ts: int,
+        end_ts: int,
+        fetch: Fetcher,
+        now: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return bars with start_ts <= time <= end_ts, fetching only what the store lacks.
+
+        - head: bars before the first stored one. A successful head fetch records its start as the
+          floor even when it returns nothing (e.g. before listing), so it never runs twice.
+          A range ending before the first stored bar is fetched as-is and not persisted, keeping
+          the stored partition contiguous.
+        - tail: bars after the last stored one up to min(end_ts, now)
+        Closed bars are persisted; the still-forming bar (if any) is returned but not stored.
+        """
+        tf_sec = TIMEFRAME_SECONDS.get(timeframe)
+        if not tf_sec:
+            raise ValueError(f"Unsupported timeframe for kline store: {timeframe}")
+        now = int(now if now is not None else time.time())
+        start_ts = int(start_ts)
+        end_ts = int(end_ts)
+        series = self._series(market, symbol, timeframe)
+        live = np.empty(0, dtype=RECORD_DTYPE)
+        detached = None
+
+        with _FileLock(series):
+            meta = series.read_meta()
+            stored = self.bounds(market, symbol, timeframe)
+
+            if stored is None:
+                fetched, _ = self._fetch_span(fetch, start_ts, end_ts, tf_sec, now)
+                closed, live = self._split_closed(fetched, tf_sec, now)
+                self._merge(series, closed)
+                if len(fetched):
+                    meta['floor'] = start_ts
+            else:
+                first, last, _ = stored
+                floor = int(meta.get('floor', first))
+                if start_ts < min(first, floor):
+                    if end_ts < first:
+                        # None of the head span up to the first stored bar is needed.
+                        detached, _ = self._fetch_span(fetch, start_ts, end_ts, tf_sec, now)
+                    else:
+                        head, ok = self._fetch_span(fetch, start_ts, first, tf_sec, now)
+                        self._merge(series, head[head['time'] < first])
+                        if ok:
+                            meta['floor'] = start_ts
+                if last + tf_sec <= min(end_ts, now):
+                    tail, _ = self._fetch_span(fetch, last, end_ts, tf_sec, now)
+                    closed, live = self._split_closed(tail[tail['time'] > last], tf_sec, now)
+                    self._merge(series, closed)
+
+            meta['synced_at'] = now
+            series.write_meta(meta)
+            result = self._slice(series.view(), start_ts, end_ts)
+
+        if detached is not None and len(detached):
+            result = _dedup(np.concatenate([result, detached]))
+
+        live = live[(live['time'] >= start_ts) & (live['time'] <= end_ts)]
+        if len(live):
+            result = _dedup(np.concatenate([result, live]))
+        return records_to_klines(result)
+
+    @staticmethod
+    def _fetch_span(fetch: Fetcher, from_ts: int, to_ts: int, tf_sec: int, now: int) -> Tuple[np.ndarray, bool]:
+        """Fetch bars covering [from_ts, to_ts] (to_ts capped at the forming bar). Returns (bars, succeeded)."""
+        upper = min(to_ts, now)
+        if upper < from_ts:
+            return np.empty(0, dtype=RECORD_DTYPE), True
+        limit = int(math.ceil((upper - from_ts) / tf_sec)) + 2
+        before_time = upper + tf_sec
+        try:
+            klines = fetch(limit, before_time) or []
+        except Exception as e:
+            logger.warning(f"Kline store fetch failed ({from_ts}-{to_ts}): {e}")
+            return np.empty(0, dtype=RECORD_DTYPE), False
+        arr = klines_to_records(klines)
+        return arr[(arr['time'] >= from_ts) & (arr['time'] <= upper)], True
+
+    @staticmethod
+    def _split_closed(arr: np.ndarray, tf_sec: int, now: int) -> Tuple[np.ndarray, np.ndarray]:
+        closed_mask = arr['time'] + tf_sec <= now
+        return arr[closed_mask], arr[~closed_mask]
+
+
+_store: Optional[KlineStore] = None
+_store_lock = threading.Lock()
+
+
+def get_kline_store() -> KlineStore:
+    """Process-wide KlineStore singleton."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = KlineStore()
+        return _store
@@ -1,7 +1,7 @@
 """
 Backtest API routes
 """
-from flask import Blueprint, request, jsonify, g
+from flask import Blueprint, Response, request, jsonify, g
 from datetime import datetime
 import traceback
 import json
@@ -85,6 +85,17 @@ def _normalize_lang(lang: str | None) -> str:
     return l2 if l2 in supported else "zh-CN"
 
 
+def _max_backtest_days(timeframe: str) -> tuple[int, str]:
+    """Max backtest range per timeframe: (days, human readable text)."""
+    if timeframe == '1m':
+        return 30, '1 month'  # 1分钟K线最多1个月
+    if timeframe == '5m':
+        return 180, '6 months'  # 5分钟K线最多6个月
+    if timeframe in ['15m', '30m']:
+        return 365, '1 year'  # 15分钟和30分钟K线最多1年
+    return 1095, '3 years'  # 1H, 4H, 1D, 1W: 1小时及以上最多3年
+
+
 @backtest_bp.route('/backtest/precision-info', methods=['GET'])
 def get_precision_info():
     """
@@ -139,6 +150,8 @@ def run_backtest():
         initialCapital: Initial capital (default 10000)
         commission: Commission rate (default 0.001)
         enableMtf: Enable multi-timeframe backtest (default true, only for crypto)
+        engine: Simulation engine for standard candle backtests: 'legacy' | 'vectorized'
+            (optional, default from BACKTEST_ENGINE env; both produce identical results)
     """
     try:
         data = request.get_json()
@@ -168,6 +181,7 @@ def run_backtest():
         enable_mtf = data.get('enableMtf', True)
         if isinstance(enable_mtf, str):
             enable_mtf = enable_mtf.lower() in ['true', '1', 'yes']
+        engine = data.get('engine')
         
         # (Debug) log received params if needed
         
@@ -203,18 +217,7 @@ def run_backtest():
         days_diff = (end_date - start_date).days
         
         # 根据周期设置不同的时间限制
-        if timeframe == '1m':
-            max_days = 30  # 1分钟K线最多1个月
-            max_range_text = '1 month'
-        elif timeframe == '5m':
-            max_days = 180  # 5分钟K线最多6个月
-            max_range_text = '6 months'
-        elif timeframe in ['15m', '30m']:
-            max_days = 365  # 15分钟和30分钟K线最多1年
-            max_range_text = '1 year'
-        else:  # 1H, 4H, 1D, 1W
-            max_days = 1095  # 1小时及以上最多3年
-            max_range_text = '3 years'
+        max_days, max_range_text = _max_backtest_days(timeframe)
         
         if days_diff > max_days:
             return jsonify({
@@ -240,7 +243,8 @@ def run_backtest():
                 leverage=leverage,
                 trade_direction=trade_direction,
                 strategy_config=strategy_config,
-                enable_mtf=True
+                enable_mtf=True,
+                engine=engine
             )
         else:
             result = backtest_service.run(
@@ -255,7 +259,8 @@ def run_backtest():
                 slippage=slippage,
                 leverage=leverage,
                 trade_direction=trade_direction,
-                strategy_config=strategy_config
+                strategy_config=strategy_config,
+                engine=engine
             )
             # 添加标准回测的精度信息
             result['precision_info'] = {
@@ -368,6 +373,117 @@ def run_backtest():
         }), 500
 
 
+@backtest_bp.route('/backtest/optimize', methods=['POST'])
+@login_required
+def optimize_backtest():
+    """
+    Parameter sweep (grid optimization) over the indicator's `# @param` declarations.
+    
+    Candles are fetched once; combinations run in a process pool and results are
+    streamed back as they finish ('text/event-stream', one JSON event per `data:` line,
+    terminated by `data: [DONE]`).
+    
+    Params (same as /backtest, plus):
+        paramGrid: {name: [values] | {"start", "stop", "step"}} (required)
+        sortBy: sharpeRatio | totalReturn | maxDrawdown (default sharpeRatio)
+        topN: leaderboard size in each result event (default 10)
+        maxWorkers: worker processes (optional, default BACKTEST_SWEEP_WORKERS)
+        engine: simulation engine (default 'vectorized')
+    
+    Events:
+        {"event": "start", "total", "workers", "candles", "sortBy", "params"}
+        {"event": "result", "completed", "total", "rank", "result", "top"}
+        {"event": "done", "succeeded", "failed", "elapsedSec", "ranking"}
+        {"event": "error", "msg"}
+    """
+    data = request.get_json() or {}
+    user_id = g.user_id
+    indicator_code = data.get('indicatorCode', '')
+    indicator_id = data.get('indicatorId')
+    symbol = data.get('symbol', '')
+    market = data.get('market', '')
+    timeframe = data.get('timeframe', '1D')
+    start_date_str = data.get('startDate', '')
+    end_date_str = data.get('endDate', '')
+    param_grid = data.get('paramGrid') or {}
+
+    if (not indicator_code or not str(indicator_code).strip()) and indicator_id:
+        try:
+            with get_db_connection() as db:
+                cur = db.cursor()
+                cur.execute("SELECT code FROM qd_indicator_codes WHERE id = ?", (int(indicator_id),))
+                row = cur.fetchone()
+                cur.close()
+            if row and row.get('code'):
+                indicator_code = row.get('code')
+        except Exception:
+            pass
+
+    if not all([indicator_code, symbol, market, timeframe, start_date_str, end_date_str, param_grid]):
+        return jsonify({'code': 0, 'msg': 'Missing required parameters', 'data': None}), 400
+
+    try:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
+        max_days, max_range_text = _max_backtest_days(timeframe)
+        days_diff = (end_date - start_date).days
+        if days_diff > max_days:
+            raise ValueError(
+                f'Backtest range exceeds limit: timeframe {timeframe} supports up to {max_range_text} '
+                f'({max_days} days), but you selected {days_diff} days'
+            )
+        sweep = backtest_service.run_param_sweep(
+            indicator_code=indicator_code,
+            market=market,
+            symbol=symbol,
+            timeframe=timeframe,
+            start_date=start_date,
+            end_date=end_date,
+            param_grid=param_grid,
+            initial_capital=float(data.get('initialCapital', 10000)),
+            commission=float(data.get('commission', 0.001)),
+            slippage=float(data.get('slippage', 0.0)),
+            leverage=int(data.get('leverage', 1)),
+            trade_direction=data.get('tradeDirection', 'long'),
+            strategy_config=data.get('strategyConfig') or {},
+            sort_by=data.get('sortBy') or 'sharpeRatio',
+            top_n=int(data.get('topN') or 10),
+            max_workers=int(data['maxWorkers']) if data.get('maxWorkers') else None,
+            engine=data.get('engine') or 'vectorized',
+            user_id=user_id,
+            indicator_id=int(indicator_id) if indicator_id is not None else None
+        )
+        # Validate grid / fetch candles before switching to the stream, so bad input is a 400.
+        first_event = next(sweep)
+    except ValueError as e:
+        logger.warning(f"Invalid optimize parameters: {str(e)}")
+        return jsonify({'code': 0, 'msg': str(e), 'data': None}), 400
+    except Exception as e:
+        logger.error(f"Backtest optimize failed: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'code': 0, 'msg': f'Backtest optimize failed: {str(e)}', 'data': None}), 500
+
+    def stream():
+        try:
+            yield "data: " + json.dumps(first_event, ensure_ascii=False) + "\n\n"
+            for event in sweep:
+                yield "data: " + json.dumps(event, ensure_ascii=False) + "\n\n"
+        except Exception as e:
+            logger.error(f"Backtest optimize stream failed: {str(e)}")
+            logger.error(traceback.format_exc())
+            yield "data: " + json.dumps({'event': 'error', 'msg': str(e)}, ensure_ascii=False) + "\n\n"
+        finally:
+            # Client disconnects close the generator; make sure the pool and shared memory are released.
+            sweep.close()
+        yield "data: [DONE]\n\n"
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @backtest_bp.route('/backtest/history', methods=['GET'])
 @login_required
 def get_backtest_history():
@@ -87,6 +87,84 @@ def analyze():
         }), 500
 
 
+@fast_analysis_bp.route('/analyze-batch', methods=['POST'])
+@login_required
+def analyze_batch():
+    """
+    Fast AI analysis for a watchlist (several symbols of one market).
+    
+    POST /api/fast-analysis/analyze-batch
+    Body: {
+        "market": "Crypto" | "USStock" | ...,
+        "symbols": ["BTC/USDT", "ETH/USDT"] (or comma-separated string),
+        "language": "zh-CN" | "en-US" (optional),
+        "model": "openai/gpt-4o" (optional),
+        "timeframe": "1D" (optional)
+    }
+    
+    Returns:
+        {"results": [per-symbol analysis, same shape as /analyze], "failed": n, "timing": per-phase ms}
+        400 when there are more than FAST_ANALYSIS_BATCH_MAX_SYMBOLS distinct symbols.
+    """
+    try:
+        data = request.get_json() or {}
+        
+        market = (data.get('market') or '').strip()
+        symbols = data.get('symbols') or []
+        if isinstance(symbols, str):
+            symbols = [s.strip() for s in symbols.split(',')]
+        symbols = [str(s).strip() for s in symbols if str(s or '').strip()]
+        language = data.get('language', 'en-US')
+        model = data.get('model')
+        timeframe = data.get('timeframe', '1D')
+        
+        if not market or not symbols:
+            return jsonify({
+                'code': 0,
+                'msg': 'market and symbols are required',
+                'data': None
+            }), 400
+        
+        user_id = getattr(g, 'user_id', None)
+        
+        service = get_fast_analysis_service()
+        result = service.analyze_batch(
+            market=market,
+            symbols=symbols,
+            language=language,
+            model=model,
+            timeframe=timeframe,
+            user_id=user_id
+        )
+        
+        if result['results'] and result['failed'] == len(result['results']):
+            return jsonify({
+                'code': 0,
+                'msg': result['results'][0].get('error') or 'analysis failed',
+                'data': result
+            }), 500
+        
+        return jsonify({
+            'code': 1,
+            'msg': 'success',
+            'data': result
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'code': 0,
+            'msg': str(e),
+            'data': None
+        }), 400
+    except Exception as e:
+        logger.error(f"Fast batch analysis API failed: {e}", exc_info=True)
+        return jsonify({
+            'code': 0,
+            'msg': str(e),
+            'data': None
+        }), 500
+
+
 @fast_analysis_bp.route('/analyze-legacy', methods=['POST'])
 @login_required
 def analyze_legacy():
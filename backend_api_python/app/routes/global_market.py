@@ -21,26 +21,31 @@ Endpoints:
 
 from __future__ import annotations
 
+import os
+import threading
 import time
 import requests
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
 
 from flask import Blueprint, jsonify, request, g
 
 from app.utils.logger import get_logger
 from app.utils.auth import login_required
+from app.utils.cache import MemoryCache
+from app.utils.single_flight import SingleFlight
 from app.utils.config_loader import load_addon_config
 
 logger = get_logger(__name__)
 
 global_market_bp = Blueprint("global_market", __name__)
 
-# Cache for market data (simple in-memory cache)
+# Cache for market data (bounded in-memory LRU cache)
 # 多用户场景下，合理的缓存可以大幅减少 API 请求
-_cache: Dict[str, Dict[str, Any]] = {}
+_cache = MemoryCache(max_entries=512, shards=4, name='global_market')
 _cache_ttl = 60  # Default 60 seconds cache
+_MAX_STALE_SEC = int(os.getenv("GLOBAL_MARKET_MAX_STALE_SEC", "86400"))  # 过期数据最长保留时间
 
 # 缓存时间配置（秒）
 CACHE_TTL = {
@@ -59,8 +64,8 @@ CACHE_TTL = {
 
 def _get_cached(key: str, ttl: int = None) -> Optional[Any]:
     """Get cached data if not expired."""
-    if key in _cache:
-        entry = _cache[key]
+    entry = _cache.get(key)
+    if entry:
         # 优先使用传入的 ttl，然后是 CACHE_TTL 配置，最后是默认值
         cache_ttl = ttl or CACHE_TTL.get(key, entry.get("ttl", _cache_ttl))
         if time.time() - entry.get("ts", 0) < cache_ttl:
@@ -70,11 +75,14 @@ def _get_cached(key: str, ttl: int = None) -> Optional[Any]:
 
 def _set_cached(key: str, data: Any, ttl: int = None):
     """Set cache entry."""
-    _cache[key] = {
+    entry_ttl = ttl or CACHE_TTL.get(key, _cache_ttl)
+    entry = {
         "ts": time.time(),
         "data": data,
-        "ttl": ttl or CACHE_TTL.get(key, _cache_ttl)
+        "ttl": entry_ttl
     }
+    # 读取方按 TTL 判断新鲜度；条目额外保留 _MAX_STALE_SEC，供 stale-while-revalidate 与数据源回落使用
+    _cache.setex(key, max(entry_ttl, CACHE_TTL.get(key, 0)) + _MAX_STALE_SEC, entry)
 
 
 def _safe_float(v: Any, default: float = 0.0) -> float:
@@ -995,41 +1003,27 @@ def _fetch_financial_news(lang: str = "all") -> Dict[str, List[Dict[str, Any]]]:
             "S&P 500 market update",
         ]
         
-        # Fetch Chinese news
-        if lang in ("all", "cn"):
-            for query in cn_queries:
-                try:
-                    results = search.search(query, num_results=5, date_restrict="d1")
-                    for r in results:
-                        result["cn"].append({
-                            "title": r.get("title", ""),
-                            "link": r.get("link", ""),
-                            "snippet": r.get("snippet", ""),
-                            "source": r.get("source", ""),
-                            "published": r.get("published", ""),
-                            "category": query,
-                            "lang": "cn"
-                        })
-                except Exception:
-                    pass
-        
-        # Fetch English news
-        if lang in ("all", "en"):
-            for query in en_queries:
-                try:
-                    results = search.search(query, num_results=5, date_restrict="d1")
-                    for r in results:
-                        result["en"].append({
-                            "title": r.get("title", ""),
-                            "link": r.get("link", ""),
-                            "snippet": r.get("snippet", ""),
-                            "source": r.get("source", ""),
-                            "published": r.get("published", ""),
-                            "category": query,
-                            "lang": "en"
-                        })
-                except Exception:
-                    pass
+        def _search(query: str, lang_key: str) -> List[Dict[str, Any]]:
+            return [{
+                "title": r.get("title", ""),
+                "link": r.get("link", ""),
+                "snippet": r.get("snippet", ""),
+                "source": r.get("source", ""),
+                "published": r.get("published", ""),
+                "category": query,
+                "lang": lang_key
+            } for r in (search.search(query, num_results=5, date_restrict="d1") or [])]
+        
+        # One source per query: each gets the shared deadline and its own last-good fallback
+        tasks: Dict[str, Callable[[], Any]] = {}
+        for lang_key, queries in (("cn", cn_queries), ("en", en_queries)):
+            if lang in ("all", lang_key):
+                for query in queries:
+                    tasks[f"{lang_key}:{query}"] = (lambda q=query, k=lang_key: _search(q, k))
+        fetched = _gather_sources(tasks, fallback_prefix="news_src_")
+        for name in tasks:
+            lang_key = name.split(":", 1)[0]
+            result[lang_key].extend(fetched.get(name) or [])
         
         # Remove duplicates
         for lang_key in ["cn", "en"]:
@@ -1280,53 +1274,118 @@ def _get_economic_calendar() -> List[Dict[str, Any]]:
     return events
 
 
-def _generate_heatmap_data() -> Dict[str, Any]:
-    """Generate heatmap data for crypto, stock sectors, and forex."""
-    
-    # Get crypto data (prefer market-cap ranked data for heatmap)
+def _fetch_crypto_heatmap() -> List[Dict[str, Any]]:
+    """Crypto heatmap rows ranked by market cap (CoinGecko, falls back to the multi-source fetcher)."""
     # NOTE: CCXT/yfinance often lack market_cap -> heatmap should use CoinGecko when possible.
     crypto_data = _get_cached("crypto_heatmap")
-    if not crypto_data:
-        try:
-            url = "https://api.coingecko.com/api/v3/coins/markets"
-            params = {
-                "vs_currency": "usd",
-                "order": "market_cap_desc",
-                "per_page": 30,
-                "page": 1,
-                "sparkline": False,
-                "price_change_percentage": "24h"
-            }
-            resp = requests.get(url, params=params, timeout=10)
-            resp.raise_for_status()
-            data = resp.json() or []
-            crypto_data = []
-            for coin in data:
-                crypto_data.append({
-                    "symbol": (coin.get("symbol") or "").upper(),
-                    "name": coin.get("name", ""),
-                    "price": _safe_float(coin.get("current_price")),
-                    "change_24h": _safe_float(coin.get("price_change_percentage_24h")),
-                    "market_cap": _safe_float(coin.get("market_cap")),
-                    "volume_24h": _safe_float(coin.get("total_volume")),
-                    "image": coin.get("image", ""),
-                    "category": "crypto"
-                })
-            logger.info(f"Fetched crypto heatmap data via CoinGecko: {len(crypto_data)} items")
-            # Heatmap data doesn't need ultra-frequent refresh
-            _set_cached("crypto_heatmap", crypto_data, 300)
-        except Exception as e:
-            logger.error(f"Failed to fetch crypto heatmap via CoinGecko: {e}")
-            # Fallback to existing multi-source crypto fetcher
-            crypto_data = _get_cached("crypto_prices") or _fetch_crypto_prices()
-            _set_cached("crypto_prices", crypto_data, 30)
-            _set_cached("crypto_heatmap", crypto_data, 30)
-    
-    # Get forex data
+    if crypto_data:
+        return crypto_data
+    try:
+        url = "https://api.coingecko.com/api/v3/coins/markets"
+        params = {
+            "vs_currency": "usd",
+            "order": "market_cap_desc",
+            "per_page": 30,
+            "page": 1,
+            "sparkline": False,
+            "price_change_percentage": "24h"
+        }
+        resp = requests.get(url, params=params, timeout=10)
+        resp.raise_for_status()
+        data = resp.json() or []
+        crypto_data = []
+        for coin in data:
+            crypto_data.append({
+                "symbol": (coin.get("symbol") or "").upper(),
+                "name": coin.get("name", ""),
+                "price": _safe_float(coin.get("current_price")),
+                "change_24h": _safe_float(coin.get("price_change_percentage_24h")),
+                "market_cap": _safe_float(coin.get("market_cap")),
+                "volume_24h": _safe_float(coin.get("total_volume")),
+                "image": coin.get("image", ""),
+                "category": "crypto"
+            })
+        logger.info(f"Fetched crypto heatmap data via CoinGecko: {len(crypto_data)} items")
+        # Heatmap data doesn't need ultra-frequent refresh
+        _set_cached("crypto_heatmap", crypto_data, 300)
+    except Exception as e:
+        logger.error(f"Failed to fetch crypto heatmap via CoinGecko: {e}")
+        # Fallback to existing multi-source crypto fetcher
+        crypto_data = _get_cached("crypto_prices") or _fetch_crypto_prices()
+        _set_cached("crypto_prices", crypto_data, 30)
+        _set_cached("crypto_heatmap", crypto_data, 30)
+    return crypto_data
+
+
+def _fetch_sector_changes(etf_symbols: List[str]) -> Dict[str, float]:
+    """Daily % change of sector ETFs, keyed by ETF symbol."""
+    changes: Dict[str, float] = {}
+    try:
+        import yfinance as yf
+        tickers = yf.Tickers(" ".join(etf_symbols))
+        
+        for etf in etf_symbols:
+            try:
+                ticker = tickers.tickers.get(etf)
+                if ticker:
+                    hist = ticker.history(period="2d")
+                    if len(hist) >= 2:
+                        prev = hist["Close"].iloc[-2]
+                        curr = hist["Close"].iloc[-1]
+                        changes[etf] = round(((curr - prev) / prev) * 100, 2)
+                    elif len(hist) == 1:
+                        changes[etf] = 0
+            except Exception:
+                pass
+    except Exception as e:
+        logger.debug(f"Failed to fetch sector ETFs: {e}")
+    return changes
+
+
+def _fetch_cached_forex_pairs() -> List[Dict[str, Any]]:
     forex_data = _get_cached("forex_pairs")
     if not forex_data:
         forex_data = _fetch_forex_pairs()
         _set_cached("forex_pairs", forex_data, 30)
+    return forex_data
+
+
+def _fetch_cached_commodities() -> List[Dict[str, Any]]:
+    commodities_data = _get_cached("commodities")
+    if not commodities_data:
+        commodities_data = _fetch_commodities()
+        _set_cached("commodities", commodities_data)
+    return commodities_data
+
+
+def _generate_heatmap_data() -> Dict[str, Any]:
+    """Generate heatmap data for crypto, stock sectors, and forex."""
+    
+    # Stock sectors (using ETFs as proxy for real-time data)
+    sectors = [
+        {"name": "科技", "name_en": "Technology", "etf": "XLK", "value": 0, "stocks": ["AAPL", "MSFT", "GOOGL", "NVDA", "META"]},
+        {"name": "金融", "name_en": "Financials", "etf": "XLF", "value": 0, "stocks": ["JPM", "BAC", "WFC", "GS", "MS"]},
+        {"name": "医疗", "name_en": "Healthcare", "etf": "XLV", "value": 0, "stocks": ["JNJ", "PFE", "UNH", "MRK", "ABBV"]},
+        {"name": "消费", "name_en": "Consumer", "etf": "XLY", "value": 0, "stocks": ["AMZN", "TSLA", "HD", "NKE", "MCD"]},
+        {"name": "能源", "name_en": "Energy", "etf": "XLE", "value": 0, "stocks": ["XOM", "CVX", "COP", "SLB", "EOG"]},
+        {"name": "工业", "name_en": "Industrials", "etf": "XLI", "value": 0, "stocks": ["CAT", "BA", "GE", "HON", "UPS"]},
+        {"name": "材料", "name_en": "Materials", "etf": "XLB", "value": 0, "stocks": ["LIN", "APD", "DD", "NEM", "FCX"]},
+        {"name": "公用事业", "name_en": "Utilities", "etf": "XLU", "value": 0, "stocks": ["NEE", "DUK", "SO", "D", "AEP"]},
+        {"name": "房地产", "name_en": "Real Estate", "etf": "XLRE", "value": 0, "stocks": ["AMT", "PLD", "CCI", "EQIX", "SPG"]},
+        {"name": "通信", "name_en": "Communication", "etf": "XLC", "value": 0, "stocks": ["GOOGL", "META", "DIS", "NFLX", "VZ"]},
+    ]
+    etf_symbols = [s["etf"] for s in sectors]
+    
+    fetched = _gather_sources({
+        "crypto": _fetch_crypto_heatmap,
+        "forex": _fetch_cached_forex_pairs,
+        "commodities": _fetch_cached_commodities,
+        "sectors": lambda: _fetch_sector_changes(etf_symbols),
+    }, fallback_prefix="heatmap_src_")
+    crypto_data = fetched.get("crypto") or []
+    forex_data = fetched.get("forex") or []
+    commodities_data = fetched.get("commodities") or []
+    sector_changes = fetched.get("sectors") or {}
     
     heatmap = {
         "crypto": [],
@@ -1337,12 +1396,7 @@ def _generate_heatmap_data() -> Dict[str, Any]:
     }
     
     # Commodities heatmap (黄金、白银、原油等)
-    commodities_data = _get_cached("commodities")
-    if not commodities_data:
-        commodities_data = _fetch_commodities()
-        _set_cached("commodities", commodities_data)
-    
-    for comm in (commodities_data or []):
+    for comm in commodities_data:
         heatmap["commodities"].append({
             "name": comm.get("name_cn", comm.get("name_en", "")),
             "name_cn": comm.get("name_cn", ""),
@@ -1379,41 +1433,8 @@ def _generate_heatmap_data() -> Dict[str, Any]:
             "price": pair.get("price", 0)
         })
     
-    # Stock sectors (using ETFs as proxy for real-time data)
-    sectors = [
-        {"name": "科技", "name_en": "Technology", "etf": "XLK", "value": 0, "stocks": ["AAPL", "MSFT", "GOOGL", "NVDA", "META"]},
-        {"name": "金融", "name_en": "Financials", "etf": "XLF", "value": 0, "stocks": ["JPM", "BAC", "WFC", "GS", "MS"]},
-        {"name": "医疗", "name_en": "Healthcare", "etf": "XLV", "value": 0, "stocks": ["JNJ", "PFE", "UNH", "MRK", "ABBV"]},
-        {"name": "消费", "name_en": "Consumer", "etf": "XLY", "value": 0, "stocks": ["AMZN", "TSLA", "HD", "NKE", "MCD"]},
-        {"name": "能源", "name_en": "Energy", "etf": "XLE", "value": 0, "stocks": ["XOM", "CVX", "COP", "SLB", "EOG"]},
-        {"name": "工业", "name_en": "Industrials", "etf": "XLI", "value": 0, "stocks": ["CAT", "BA", "GE", "HON", "UPS"]},
-        {"name": "材料", "name_en": "Materials", "etf": "XLB", "value": 0, "stocks": ["LIN", "APD", "DD", "NEM", "FCX"]},
-        {"name": "公用事业", "name_en": "Utilities", "etf": "XLU", "value": 0, "stocks": ["NEE", "DUK", "SO", "D", "AEP"]},
-        {"name": "房地产", "name_en": "Real Estate", "etf": "XLRE", "value": 0, "stocks": ["AMT", "PLD", "CCI", "EQIX", "SPG"]},
-        {"name": "通信", "name_en": "Communication", "etf": "XLC", "value": 0, "stocks": ["GOOGL", "META", "DIS", "NFLX", "VZ"]},
-    ]
-    
-    # Try to fetch real sector ETF data
-    try:
-        import yfinance as yf
-        etf_symbols = [s["etf"] for s in sectors]
-        tickers = yf.Tickers(" ".join(etf_symbols))
-        
-        for sector in sectors:
-            try:
-                ticker = tickers.tickers.get(sector["etf"])
-                if ticker:
-                    hist = ticker.history(period="2d")
-                    if len(hist) >= 2:
-                        prev = hist["Close"].iloc[-2]
-                        curr = hist["Close"].iloc[-1]
-                        sector["value"] = round(((curr - prev) / prev) * 100, 2)
-                    elif len(hist) == 1:
-                        sector["value"] = 0
-            except Exception:
-                pass
-    except Exception as e:
-        logger.debug(f"Failed to fetch sector ETFs: {e}")
+    for sector in sectors:
+        sector["value"] = sector_changes.get(sector["etf"], 0)
     
     heatmap["sectors"] = sectors
     
@@ -1435,6 +1456,223 @@ def _generate_heatmap_data() -> Dict[str, Any]:
     return heatmap
 
 
+# ============ Stale-while-revalidate ============
+#
+# 仪表盘聚合数据（overview / heatmap / news / calendar / sentiment）不在请求内计算：
+# - 命中新鲜缓存：直接返回；
+# - 已过期但仍保留（GLOBAL_MARKET_MAX_STALE_SEC 内）：立即返回旧数据，同时后台刷新；
+# - 冷启动：同步计算一次（并发请求通过 single-flight 共享）。
+# 被访问过的 key 由后台线程按 TTL 提前刷新，GLOBAL_MARKET_IDLE_SEC 内无人访问则停止刷新。
+# 各数据源有独立超时（GLOBAL_MARKET_SOURCE_TIMEOUT_SEC），超时/失败时回落到该源最近一次成功的数据。
+# 若某个源既无新数据也无历史数据（如冷启动超时），该次结果只缓存 GLOBAL_MARKET_DEGRADED_TTL_SEC 并尽快重建，
+# 避免占位数据被按完整 TTL 固定下来。
+
+_SOURCE_TIMEOUT_SEC = float(os.getenv("GLOBAL_MARKET_SOURCE_TIMEOUT_SEC", "8"))
+_IDLE_SEC = float(os.getenv("GLOBAL_MARKET_IDLE_SEC", "1800"))
+_DEGRADED_TTL_SEC = int(os.getenv("GLOBAL_MARKET_DEGRADED_TTL_SEC", "30"))
+# Sized for a cold start where every dashboard builder fans out at once (~30 sources).
+_source_pool = ThreadPoolExecutor(
+    max_workers=max(1, int(os.getenv("GLOBAL_MARKET_SOURCE_WORKERS", "48"))),
+    thread_name_prefix="global-market-src",
+)
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="global-market-refresh")
+_build_flight = SingleFlight()
+_warm_keys: Dict[str, Dict[str, Any]] = {}
+_refreshing: set = set()
+_warm_lock = threading.Lock()
+_refresher: Optional[threading.Thread] = None
+# Per-thread flag set by _gather_sources when a build had a source with no data at all.
+_build_state = threading.local()
+
+
+def _get_entry(key: str) -> Optional[Dict[str, Any]]:
+    """Raw cache entry (fresh or stale)."""
+    entry = _cache.get(key)
+    return entry if isinstance(entry, dict) else None
+
+
+def _get_stale(key: str) -> Optional[Any]:
+    """Last stored data for key regardless of freshness (source fallbacks)."""
+    entry = _get_entry(key)
+    return entry.get("data") if entry else None
+
+
+def _refresh(key: str) -> Any:
+    with _warm_lock:
+        spec = _warm_keys.get(key)
+    if not spec:
+        return None
+
+    def build():
+        _build_state.degraded = False
+        data = spec["builder"]()
+        if _build_state.degraded:
+            # Placeholder data: serve it, but rebuild soon instead of pinning it for the full TTL.
+            logger.info(f"global market {key} built with missing sources, caching for {_DEGRADED_TTL_SEC}s")
+            _set_cached(key, data, min(_DEGRADED_TTL_SEC, spec["ttl"]))
+        else:
+            _set_cached(key, data, spec["ttl"])
+        return data
+
+    try:
+        return _build_flight.do(key, build)
+    finally:
+        with _warm_lock:
+            _refreshing.discard(key)
+
+
+def _refresh_async(key: str) -> None:
+    with _warm_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    future = _refresh_pool.submit(_refresh, key)
+    future.add_done_callback(lambda f: f.exception() and logger.warning(f"global market refresh failed: {key}: {f.exception()}"))
+
+
+def _refresher_loop() -> None:
+    """Refresh warm keys shortly before they expire; drop keys nobody asked for recently."""
+    while True:
+        time.sleep(5)
+        now = time.time()
+        with _warm_lock:
+            for k in [k for k, spec in _warm_keys.items() if now - spec["last_access"] > _IDLE_SEC]:
+                _warm_keys.pop(k, None)
+            specs = list(_warm_keys.items())
+        for key, spec in specs:
+            entry = _get_entry(key)
+            if not entry or now - entry.get("ts", 0) >= entry.get("ttl", spec["ttl"]) * 0.8:
+                _refresh_async(key)
+
+
+def _ensure_refresher() -> None:
+    global _refresher
+    with _warm_lock:
+        if _refresher is not None and _refresher.is_alive():
+            return
+        _refresher = threading.Thread(target=_refresher_loop, name="global-market-refresher", daemon=True)
+        _refresher.start()
+
+
+def _serve_swr(key: str, ttl: int, builder: Callable[[], Any]) -> Any:
+    """Return cached data for key, revalidating in the background when stale."""
+    with _warm_lock:
+        spec = _warm_keys.setdefault(key, {"ttl": ttl, "builder": builder, "last_access": 0.0})
+        spec["last_access"] = time.time()
+    _ensure_refresher()
+
+    entry = _get_entry(key)
+    if entry is not None:
+        if time.time() - entry.get("ts", 0) >= entry.get("ttl", ttl):
+            _refresh_async(key)
+        return entry.get("data")
+    # Cold start: compute once, concurrent callers share the result.
+    with _warm_lock:
+        _refreshing.add(key)
+    return _refresh(key)
+
+
+def _gather_sources(tasks: Dict[str, Callable[[], Any]], fallback_prefix: str) -> Dict[str, Any]:
+    """
+    Run source fetchers in parallel with a shared deadline.
+
+    Sources that time out, fail or return nothing fall back to their last good value
+    (cached under f"{fallback_prefix}{name}"); successes refresh that fallback. Sources still
+    queued at the deadline are cancelled; if any source ends up with no value at all, the
+    current build is marked degraded (see _refresh).
+    """
+    futures = {_source_pool.submit(fn): name for name, fn in tasks.items()}
+    results: Dict[str, Any] = {}
+    try:
+        for future in as_completed(futures, timeout=_SOURCE_TIMEOUT_SEC):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"Failed to fetch {name}: {e}")
+    except FuturesTimeout:
+        pending = [futures[f] for f in futures if not f.done()]
+        for f in futures:
+            # Frees the pool slot of sources that never started; running ones finish on their own.
+            f.cancel()
+        logger.warning(f"Global market sources timed out after {_SOURCE_TIMEOUT_SEC}s: {pending}")
+    for name in tasks:
+        value = results.get(name)
+        if value:
+            _set_cached(f"{fallback_prefix}{name}", value, _MAX_STALE_SEC)
+        else:
+            results[name] = _get_stale(f"{fallback_prefix}{name}")
+            if not results[name]:
+                _build_state.degraded = True
+    return results
+
+
+# ============ Aggregate builders ============
+
+def _build_market_overview() -> Dict[str, Any]:
+    logger.info("Fetching fresh market overview data...")
+    fetched = _gather_sources({
+        "indices": _fetch_stock_indices,
+        "forex": _fetch_forex_pairs,
+        "crypto": _fetch_crypto_prices,
+        "commodities": _fetch_commodities,
+    }, fallback_prefix="overview_src_")
+    result = {
+        "indices": fetched.get("indices") or [],
+        "forex": fetched.get("forex") or [],
+        "crypto": fetched.get("crypto") or [],
+        "commodities": fetched.get("commodities") or [],
+        "timestamp": int(time.time())
+    }
+    for key in ("indices", "forex", "crypto", "commodities"):
+        # Cache individual results
+        _set_cached(f"{key}_data", result[key], 30)
+
+    # Log summary
+    logger.info(f"Market overview complete: indices={len(result['indices'])}, "
+               f"forex={len(result['forex'])}, crypto={len(result['crypto'])}, "
+               f"commodities={len(result['commodities'])}")
+
+    # Also cache indices for heatmap
+    _set_cached("stock_indices", result["indices"], 30)
+    _set_cached("forex_pairs", result["forex"], 30)
+    _set_cached("crypto_prices", result["crypto"], 30)
+    return result
+
+
+def _build_market_sentiment() -> Dict[str, Any]:
+    logger.info("Fetching fresh sentiment data (comprehensive)")
+    results = _gather_sources({
+        "fear_greed": _fetch_fear_greed_index,
+        "vix": _fetch_vix,
+        "dxy": _fetch_dollar_index,
+        "yield_curve": _fetch_yield_curve,
+        "vxn": _fetch_vxn,
+        "gvz": _fetch_gvz,
+        "vix_term": _fetch_put_call_ratio,
+    }, fallback_prefix="sentiment_src_")
+
+    # Log summary
+    logger.info(f"Sentiment data fetched: Fear&Greed={(results.get('fear_greed') or {}).get('value')}, "
+               f"VIX={(results.get('vix') or {}).get('value')}, DXY={(results.get('dxy') or {}).get('value')}")
+
+    return {
+        "fear_greed": results.get("fear_greed") or {"value": 50, "classification": "Neutral"},
+        "vix": results.get("vix") or {"value": 0, "level": "unknown"},
+        "dxy": results.get("dxy") or {"value": 0, "level": "unknown"},
+        "yield_curve": results.get("yield_curve") or {"spread": 0, "level": "unknown"},
+        "vxn": results.get("vxn") or {"value": 0, "level": "unknown"},
+        "gvz": results.get("gvz") or {"value": 0, "level": "unknown"},
+        "vix_term": results.get("vix_term") or {"value": 1.0, "level": "unknown"},
+        "timestamp": int(time.time())
+    }
+
+
+def _build_economic_calendar() -> List[Dict[str, Any]]:
+    fetched = _gather_sources({"events": _get_economic_calendar}, fallback_prefix="calendar_src_")
+    return fetched.get("events") or []
+
+
 # ============ API Endpoints ============
 
 @global_market_bp.route("/overview", methods=["GET"])
@@ -1445,59 +1683,8 @@ def market_overview():
     Includes geo coordinates for world map display.
     """
     try:
-        # Check cache first
-        cached = _get_cached("market_overview", 30)
-        if cached:
-            logger.debug(f"Returning cached overview: indices={len(cached.get('indices', []))}, "
-                        f"forex={len(cached.get('forex', []))}, crypto={len(cached.get('crypto', []))}, "
-                        f"commodities={len(cached.get('commodities', []))}")
-            return jsonify({"code": 1, "msg": "success", "data": cached})
-        
-        logger.info("Fetching fresh market overview data...")
-        
-        # Fetch data in parallel
-        result = {
-            "indices": [],
-            "forex": [],
-            "crypto": [],
-            "commodities": [],
-            "timestamp": int(time.time())
-        }
-        
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = {
-                executor.submit(_fetch_stock_indices): "indices",
-                executor.submit(_fetch_forex_pairs): "forex",
-                executor.submit(_fetch_crypto_prices): "crypto",
-                executor.submit(_fetch_commodities): "commodities"
-            }
-            
-            for future in as_completed(futures):
-                key = futures[future]
-                try:
-                    data = future.result()
-                    result[key] = data if data else []
-                    logger.info(f"Fetched {key}: {len(result[key])} items")
-                    # Cache individual results
-                    _set_cached(f"{key}_data", result[key], 30)
-                except Exception as e:
-                    logger.error(f"Failed to fetch {key}: {e}", exc_info=True)
-                    result[key] = []
-        
-        # Log summary
-        logger.info(f"Market overview complete: indices={len(result['indices'])}, "
-                   f"forex={len(result['forex'])}, crypto={len(result['crypto'])}, "
-                   f"commodities={len(result['commodities'])}")
-        
-        # Also cache indices for heatmap
-        _set_cached("stock_indices", result["indices"], 30)
-        _set_cached("forex_pairs", result["forex"], 30)
-        _set_cached("crypto_prices", result["crypto"], 30)
-        
-        # Cache the full result
-        _set_cached("market_overview", result, 30)
-        
-        return jsonify({"code": 1, "msg": "success", "data": result})
+        data = _serve_swr("market_overview", 30, _build_market_overview)
+        return jsonify({"code": 1, "msg": "success", "data": data})
         
     except Exception as e:
         logger.error(f"market_overview failed: {e}", exc_info=True)
@@ -1511,13 +1698,7 @@ def market_heatmap():
     Get market heatmap data for crypto, stock sectors, forex, and indices.
     """
     try:
-        cached = _get_cached("market_heatmap", 30)
-        if cached:
-            return jsonify({"code": 1, "msg": "success", "data": cached})
-        
-        data = _generate_heatmap_data()
-        _set_cached("market_heatmap", data, 30)
-        
+        data = _serve_swr("market_heatmap", 30, _generate_heatmap_data)
         return jsonify({"code": 1, "msg": "success", "data": data})
         
     except Exception as e:
@@ -1535,15 +1716,10 @@ def market_news():
     """
     try:
         lang = request.args.get("lang", "all")
-        cache_key = f"market_news_{lang}"
-        
-        cached = _get_cached(cache_key, 180)  # 3 minutes cache for news
-        if cached:
-            return jsonify({"code": 1, "msg": "success", "data": cached})
-        
-        news = _fetch_financial_news(lang)
-        _set_cached(cache_key, news, 180)
-        
+        if lang not in ("cn", "en", "all"):
+            lang = "all"
+        # 3 minutes cache for news
+        news = _serve_swr(f"market_news_{lang}", 180, lambda: _fetch_financial_news(lang))
         return jsonify({"code": 1, "msg": "success", "data": news})
         
     except Exception as e:
@@ -1558,13 +1734,7 @@ def economic_calendar():
     Get economic calendar events with impact indicators.
     """
     try:
-        cached = _get_cached("economic_calendar", 3600)  # 1 hour cache
-        if cached:
-            return jsonify({"code": 1, "msg": "success", "data": cached})
-        
-        events = _get_economic_calendar()
-        _set_cached("economic_calendar", events, 3600)
-        
+        events = _serve_swr("economic_calendar", 3600, _build_economic_calendar)  # 1 hour cache
         return jsonify({"code": 1, "msg": "success", "data": events})
         
     except Exception as e:
@@ -1581,52 +1751,7 @@ def market_sentiment():
     """
     try:
         # 缓存6小时 (21600秒)，宏观数据变化缓慢，减少 API 调用
-        MACRO_CACHE_TTL = 21600  # 6 hours
-        cached = _get_cached("market_sentiment", MACRO_CACHE_TTL)
-        if cached:
-            logger.debug("Returning cached sentiment data (6h cache)")
-            return jsonify({"code": 1, "msg": "success", "data": cached})
-        
-        logger.info("Fetching fresh sentiment data (comprehensive)")
-        
-        # Fetch all indicators in parallel
-        with ThreadPoolExecutor(max_workers=7) as executor:
-            futures = {
-                executor.submit(_fetch_fear_greed_index): "fear_greed",
-                executor.submit(_fetch_vix): "vix",
-                executor.submit(_fetch_dollar_index): "dxy",
-                executor.submit(_fetch_yield_curve): "yield_curve",
-                executor.submit(_fetch_vxn): "vxn",
-                executor.submit(_fetch_gvz): "gvz",
-                executor.submit(_fetch_put_call_ratio): "vix_term",
-            }
-            
-            results = {}
-            for future in as_completed(futures):
-                key = futures[future]
-                try:
-                    results[key] = future.result()
-                except Exception as e:
-                    logger.error(f"Failed to fetch {key}: {e}")
-                    results[key] = None
-        
-        # Log summary
-        logger.info(f"Sentiment data fetched: Fear&Greed={results.get('fear_greed', {}).get('value')}, "
-                   f"VIX={results.get('vix', {}).get('value')}, DXY={results.get('dxy', {}).get('value')}")
-        
-        data = {
-            "fear_greed": results.get("fear_greed") or {"value": 50, "classification": "Neutral"},
-            "vix": results.get("vix") or {"value": 0, "level": "unknown"},
-            "dxy": results.get("dxy") or {"value": 0, "level": "unknown"},
-            "yield_curve": results.get("yield_curve") or {"spread": 0, "level": "unknown"},
-            "vxn": results.get("vxn") or {"value": 0, "level": "unknown"},
-            "gvz": results.get("gvz") or {"value": 0, "level": "unknown"},
-            "vix_term": results.get("vix_term") or {"value": 1.0, "level": "unknown"},
-            "timestamp": int(time.time())
-        }
-        
-        _set_cached("market_sentiment", data, 21600)  # 6 hours cache
-        
+        data = _serve_swr("market_sentiment", 21600, _build_market_sentiment)
         return jsonify({"code": 1, "msg": "success", "data": data})
         
     except Exception as e:
@@ -1720,8 +1845,7 @@ def refresh_data():
     Force refresh all market data (clears cache).
     """
     try:
-        global _cache
-        _cache = {}
+        _cache.clear()
         return jsonify({"code": 1, "msg": "Cache cleared successfully", "data": None})
     except Exception as e:
         logger.error(f"refresh_data failed: {e}", exc_info=True)
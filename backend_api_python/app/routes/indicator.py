@@ -24,6 +24,7 @@ import numpy as np
 from app.utils.db import get_db_connection
 from app.utils.logger import get_logger
 from app.utils.auth import login_required
+from app.services.indicator_code_cache import get_indicator_code_cache
 import requests
 
 logger = get_logger(__name__)
@@ -274,6 +275,9 @@ def save_indicator():
             db.commit()
             cur.close()
 
+        # Drop the compiled copy of the previous source (running strategies recompile on next bar).
+        get_indicator_code_cache().invalidate(indicator_id)
+
         return jsonify({"code": 1, "msg": "success", "data": {"id": indicator_id, "userid": user_id}})
     except Exception as e:
         logger.error(f"save_indicator failed: {str(e)}", exc_info=True)
@@ -300,12 +304,21 @@ def delete_indicator():
             db.commit()
             cur.close()
 
+        get_indicator_code_cache().invalidate(indicator_id)
+
         return jsonify({"code": 1, "msg": "success", "data": None})
     except Exception as e:
         logger.error(f"delete_indicator failed: {str(e)}", exc_info=True)
         return jsonify({"code": 0, "msg": str(e), "data": None}), 500
 
 
+@indicator_bp.route("/codeCacheStats", methods=["GET"])
+@login_required
+def code_cache_stats():
+    """Compiled indicator code cache counters (size, hits, misses, invalidations)."""
+    return jsonify({"code": 1, "msg": "success", "data": get_indicator_code_cache().stats()})
+
+
 @indicator_bp.route("/getIndicatorParams", methods=["GET"])
 @login_required
 def get_indicator_params():
@@ -121,3 +121,29 @@ def get_price():
             'data': None
         }), 500
 
+
+
+@kline_bp.route('/dataSourceStats', methods=['GET'])
+def get_data_source_stats():
+    """行情数据源统计：并发请求合并（single-flight）、加密货币 WebSocket 行情流与缓存命中"""
+    try:
+        from app.data_sources import DataSourceFactory
+        from app.data_sources.crypto_stream import get_crypto_stream
+        from app.utils.cache import CacheManager
+        stream = get_crypto_stream()
+        return jsonify({
+            'code': 1,
+            'msg': 'success',
+            'data': {
+                'single_flight': DataSourceFactory.get_flight_stats(),
+                'crypto_stream': stream.stats() if stream is not None else {'enabled': False},
+                'cache': CacheManager().stats(),
+            }
+        })
+    except Exception as e:
+        logger.error(f"Failed to fetch data source stats: {str(e)}")
+        return jsonify({
+            'code': 0,
+            'msg': f'Failed to fetch data source stats: {str(e)}',
+            'data': None
+        }), 500
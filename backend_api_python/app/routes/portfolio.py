@@ -105,6 +105,12 @@ def _get_single_price(market: str, symbol: str, force_refresh: bool = False) ->
         }
 
 
+def _refresh_alert_index(**kwargs):
+    """Push alert / position changes into the monitor's in-memory alert index."""
+    from app.services.portfolio_monitor import refresh_alert_index
+    refresh_alert_index(**kwargs)
+
+
 # ==================== Position CRUD ====================
 
 @portfolio_bp.route('/positions', methods=['GET'])
@@ -340,6 +346,7 @@ def update_position(position_id):
             db.commit()
             cur.close()
 
+        _refresh_alert_index(position_id=position_id)
         return jsonify({'code': 1, 'msg': 'success', 'data': None})
     except Exception as e:
         logger.error(f"update_position failed: {str(e)}")
@@ -362,6 +369,7 @@ def delete_position(position_id):
             db.commit()
             cur.close()
 
+        _refresh_alert_index(position_id=position_id)
         return jsonify({'code': 1, 'msg': 'success', 'data': None})
     except Exception as e:
         logger.error(f"delete_position failed: {str(e)}")
@@ -677,6 +685,19 @@ def delete_monitor(monitor_id):
         return jsonify({'code': 0, 'msg': str(e), 'data': None}), 500
 
 
+@portfolio_bp.route('/monitors/stats', methods=['GET'])
+@login_required
+def get_monitor_stats():
+    """AI monitor scheduler metrics: worker pool usage, runs completed/failed, lag behind next_run_at."""
+    try:
+        from app.services.portfolio_monitor import get_monitor_scheduler_stats
+        return jsonify({'code': 1, 'msg': 'success', 'data': get_monitor_scheduler_stats()})
+    except Exception as e:
+        logger.error(f"get_monitor_stats failed: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'code': 0, 'msg': str(e), 'data': None}), 500
+
+
 @portfolio_bp.route('/monitors/<int:monitor_id>/run', methods=['POST'])
 @login_required
 def run_monitor_now(monitor_id):
@@ -795,6 +816,19 @@ def get_alerts():
         return jsonify({'code': 0, 'msg': str(e), 'data': []}), 500
 
 
+@portfolio_bp.route('/alerts/stats', methods=['GET'])
+@login_required
+def get_alert_stats():
+    """Alert engine metrics: last sweep duration, distinct symbols priced, alerts evaluated per second."""
+    try:
+        from app.services.portfolio_monitor import get_alert_sweep_stats
+        return jsonify({'code': 1, 'msg': 'success', 'data': get_alert_sweep_stats()})
+    except Exception as e:
+        logger.error(f"get_alert_stats failed: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'code': 0, 'msg': str(e), 'data': None}), 500
+
+
 @portfolio_bp.route('/alerts', methods=['POST'])
 @login_required
 def add_alert():
@@ -883,6 +917,7 @@ def add_alert():
             db.commit()
             cur.close()
 
+        _refresh_alert_index(alert_id=alert_id)
         return jsonify({'code': 1, 'msg': 'success', 'data': {'id': alert_id}})
     except Exception as e:
         logger.error(f"add_alert failed: {str(e)}")
@@ -946,6 +981,7 @@ def update_alert(alert_id):
             db.commit()
             cur.close()
 
+        _refresh_alert_index(alert_id=alert_id)
         return jsonify({'code': 1, 'msg': 'success', 'data': None})
     except Exception as e:
         logger.error(f"update_alert failed: {str(e)}")
@@ -968,6 +1004,7 @@ def delete_alert(alert_id):
             db.commit()
             cur.close()
 
+        _refresh_alert_index(alert_id=alert_id)
         return jsonify({'code': 1, 'msg': 'success', 'data': None})
     except Exception as e:
         logger.error(f"delete_alert failed: {str(e)}")
@@ -789,6 +789,59 @@ def preview_compile():
         return jsonify({'code': 0, 'msg': str(e)}), 500
 
 
+@strategy_bp.route('/strategies/market-data/stats', methods=['GET'])
+@login_required
+def get_market_data_stats():
+    """
+    Market data hub metrics: shared upstream feeds and per-subscription latency
+    (only subscriptions owned by the current user's strategies are listed).
+    """
+    try:
+        user_id = g.user_id
+        own_ids = {int(s.get('id')) for s in (get_strategy_service().list_strategies(user_id=user_id) or []) if s.get('id')}
+        stats = get_trading_executor().market_data_hub.stats()
+        stats['subscriptions'] = [s for s in stats.get('subscriptions', []) if s.get('owner') in own_ids]
+        return jsonify({'code': 1, 'msg': 'success', 'data': stats})
+    except Exception as e:
+        logger.error(f"get_market_data_stats failed: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'code': 0, 'msg': str(e), 'data': None}), 500
+
+
+@strategy_bp.route('/strategies/execution/stats', methods=['GET'])
+@login_required
+def get_execution_stats():
+    """
+    Live order execution plumbing metrics (process-wide):
+    pooled exchange HTTP sessions (requests, connections opened, reuse rate)
+    the warm exchange client registry (hit rate, evictions; no credentials)
+    the shared symbol metadata cache (per exchange namespace)
+    the user-data fill streams (stream vs REST-fallback fill waits)
+    the DB layer (SQL translation cache, prepared statements)
+    and the notification queues (depth, retries, batching, delivery latency).
+    """
+    try:
+        from app.services.live_trading.http_pool import get_http_pool
+        from app.services.live_trading.client_registry import get_client_registry
+        from app.services.live_trading.symbol_meta import get_symbol_meta_cache
+        from app.services.live_trading.fill_stream import get_fill_stream_manager
+        from app.services.notification_dispatcher import get_notification_dispatcher
+        from app.utils.db import get_sql_stats
+        data = {
+            'http': get_http_pool().stats(),
+            'clients': get_client_registry().stats(),
+            'symbol_meta': get_symbol_meta_cache().stats(),
+            'fill_streams': get_fill_stream_manager().stats(),
+            'db': get_sql_stats(),
+            'notifications': get_notification_dispatcher().stats(),
+        }
+        return jsonify({'code': 1, 'msg': 'success', 'data': data})
+    except Exception as e:
+        logger.error(f"get_execution_stats failed: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'code': 0, 'msg': str(e), 'data': None}), 500
+
+
 @strategy_bp.route('/strategies/notifications', methods=['GET'])
 @login_required
 def get_strategy_notifications():
@@ -0,0 +1,283 @@
+"""
+Price-indexed position alerts.
+
+Every alert type reduces to a price trigger on its symbol:
+
+- price_above: price >= threshold
+- price_below: price <= threshold
+- pnl_above / pnl_below: price >= / <= entry * (1 +- threshold / 100), direction depends on position side
+
+Armed alerts are kept per (market, symbol) in two sorted arrays ("fires at or above" / "fires at or
+below"). For a new price only the alerts whose trigger lies between the last observed price and the
+new one are returned (two bisects + a slice), plus alerts that must be checked once regardless:
+newly added/updated ones and repeating alerts whose cooldown just ended.
+
+Alerts leave the arrays when they fire (one-shot) or while cooling down (repeat_interval).
+"""
+from __future__ import annotations
+
+import bisect
+import heapq
+import json
+import os
+import threading
+import time
+from datetime import timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ABOVE = 'above'
+BELOW = 'below'
+
+SymbolKey = Tuple[str, str]
+
+
+def trigger_price(alert: Dict[str, Any]) -> Optional[Tuple[str, float]]:
+    """(direction, price) at which the alert condition starts to hold; None if it can never fire."""
+    alert_type = alert.get('alert_type')
+    threshold = float(alert.get('threshold') or 0)
+    if alert_type == 'price_above':
+        return ABOVE, threshold
+    if alert_type == 'price_below':
+        return BELOW, threshold
+    if alert_type in ('pnl_above', 'pnl_below'):
+        entry = float(alert.get('entry_price') or 0)
+        quantity = float(alert.get('quantity') or 0)
+        if entry <= 0 or quantity <= 0:
+            return None
+        long = (alert.get('side') or 'long') == 'long'
+        # long: pnl% = (p - e) / e * 100   short: pnl% = (e - p) / e * 100
+        price = entry * (1 + threshold / 100) if long else entry * (1 - threshold / 100)
+        rising = (alert_type == 'pnl_above') == long
+        return (ABOVE if rising else BELOW), price
+    return None
+
+
+def _to_ts(value: Any) -> float:
+    """DB timestamp (naive = UTC) -> epoch seconds."""
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class _SymbolAlerts:
+    __slots__ = ('above', 'below', 'pending', 'last_price')
+
+    def __init__(self):
+        self.above: List[Tuple[float, int]] = []   # fires when price >= trigger
+        self.below: List[Tuple[float, int]] = []   # fires when price <= trigger
+        self.pending: set = set()                  # check once on next price
+        self.last_price: Optional[float] = None
+
+
+class AlertIndex:
+    """Thread-safe per-symbol index of armed alerts."""
+
+    def __init__(self, resync_sec: float = 300.0):
+        self.resync_sec = resync_sec
+        self._lock = threading.Lock()
+        self._symbols: Dict[SymbolKey, _SymbolAlerts] = {}
+        self._alerts: Dict[int, Dict[str, Any]] = {}                     # id -> row
+        self._armed: Dict[int, Tuple[SymbolKey, str, float]] = {}        # id -> (key, direction, trigger)
+        self._cooldown: List[Tuple[float, int]] = []                     # heap (ready_at, id)
+        self._cooldown_until: Dict[int, float] = {}                      # id -> current ready_at
+        self._loaded_at = 0.0
+        self.candidates = 0
+        self.evaluations = 0
+
+    # ---------- maintenance ----------
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at > 0
+
+    def needs_resync(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) - self._loaded_at >= self.resync_sec
+
+    def rebuild(self, rows: List[Dict[str, Any]], now: Optional[float] = None) -> None:
+        """Replace the index with the active alerts in `rows` (keeps last observed prices)."""
+        now = now or time.time()
+        with self._lock:
+            last_prices = {k: s.last_price for k, s in self._symbols.items()}
+            self._symbols.clear()
+            self._alerts.clear()
+            self._armed.clear()
+            self._cooldown = []
+            self._cooldown_until.clear()
+            for row in rows:
+                self._add(row, now)
+            for key, price in last_prices.items():
+                if key in self._symbols:
+                    self._symbols[key].last_price = price
+            self._loaded_at = now
+
+    def upsert(self, row: Dict[str, Any], now: Optional[float] = None) -> None:
+        with self._lock:
+            self._remove(int(row['id']))
+            self._add(row, now or time.time())
+
+    def remove(self, alert_id: int) -> None:
+        with self._lock:
+            self._remove(int(alert_id))
+
+    def alert_ids_for_position(self, position_id: int) -> List[int]:
+        with self._lock:
+            return [aid for aid, row in self._alerts.items() if row.get('position_id') == position_id]
+
+    def _add(self, row: Dict[str, Any], now: float) -> None:
+        if not row.get('is_active'):
+            return
+        alert_id = int(row['id'])
+        repeat_interval = int(row.get('repeat_interval') or 0)
+        if row.get('is_triggered') and repeat_interval <= 0:
+            return  # one-shot alert already fired
+        if '_notification_config' not in row:
+            config = row.get('notification_config')
+            try:
+                config = json.loads(config) if isinstance(config, str) else (config or {})
+            except Exception:
+                config = {}
+            row['_notification_config'] = config if isinstance(config, dict) else {}
+        self._alerts[alert_id] = row
+        ready_at = _to_ts(row.get('last_triggered_at')) + repeat_interval if row.get('is_triggered') else 0.0
+        if ready_at > now:
+            self._cool_down(alert_id, ready_at)
+        else:
+            self._arm(alert_id)
+
+    def _cool_down(self, alert_id: int, ready_at: float) -> None:
+        self._cooldown_until[alert_id] = ready_at
+        heapq.heappush(self._cooldown, (ready_at, alert_id))
+
+    def _arm(self, alert_id: int) -> None:
+        row = self._alerts.get(alert_id)
+        trigger = trigger_price(row) if row else None
+        if trigger is None:
+            return
+        key = (row.get('market'), row.get('symbol'))
+        direction, price = trigger
+        bucket = self._symbols.setdefault(key, _SymbolAlerts())
+        bisect.insort(bucket.above if direction == ABOVE else bucket.below, (price, alert_id))
+        bucket.pending.add(alert_id)
+        self._armed[alert_id] = (key, direction, price)
+
+    def _disarm(self, alert_id: int) -> None:
+        armed = self._armed.pop(alert_id, None)
+        if armed is None:
+            return
+        key, direction, price = armed
+        bucket = self._symbols.get(key)
+        if bucket is None:
+            return
+        arr = bucket.above if direction == ABOVE else bucket.below
+        i = bisect.bisect_left(arr, (price, alert_id))
+        if i < len(arr) and arr[i] == (price, alert_id):
+            del arr[i]
+        bucket.pending.discard(alert_id)
+        if not bucket.above and not bucket.below:
+            self._symbols.pop(key, None)
+
+    def _remove(self, alert_id: int) -> None:
+        self._disarm(alert_id)
+        self._alerts.pop(alert_id, None)
+        # heap entries of removed / re-added alerts are skipped lazily
+        self._cooldown_until.pop(alert_id, None)
+
+    def _release_cooldowns(self, now: float) -> None:
+        while self._cooldown and self._cooldown[0][0] <= now:
+            ready_at, alert_id = heapq.heappop(self._cooldown)
+            if self._cooldown_until.get(alert_id) == ready_at:
+                del self._cooldown_until[alert_id]
+                self._arm(alert_id)
+
+    # ---------- evaluation ----------
+
+    def keys(self, now: Optional[float] = None) -> List[SymbolKey]:
+        """Symbols with armed alerts (prices to fetch)."""
+        with self._lock:
+            self._release_cooldowns(now or time.time())
+            return list(self._symbols)
+
+    def on_price(self, key: SymbolKey, price: float) -> List[Dict[str, Any]]:
+        """
+        Alerts to evaluate for a new price: triggers crossed since the last observed price
+        plus pending ones. Condition checks are left to the caller.
+        """
+        with self._lock:
+            bucket = self._symbols.get(key)
+            if bucket is None or price <= 0:
+                return []
+            ids = set(bucket.pending)
+            bucket.pending.clear()
+            last = bucket.last_price
+            if last is None:
+                # first observation: everything already satisfied
+                ids.update(aid for _, aid in bucket.above[:bisect.bisect_right(bucket.above, (price, float('inf')))])
+                ids.update(aid for _, aid in bucket.below[bisect.bisect_left(bucket.below, (price, -1)):])
+            elif price > last:
+                lo = bisect.bisect_right(bucket.above, (last, float('inf')))
+                hi = bisect.bisect_right(bucket.above, (price, float('inf')))
+                ids.update(aid for _, aid in bucket.above[lo:hi])
+            elif price < last:
+                lo = bisect.bisect_left(bucket.below, (price, -1))
+                hi = bisect.bisect_left(bucket.below, (last, -1))
+                ids.update(aid for _, aid in bucket.below[lo:hi])
+            bucket.last_price = price
+            self.evaluations += 1
+            self.candidates += len(ids)
+            return [self._alerts[aid] for aid in ids if aid in self._alerts]
+
+    def mark_fired(self, alert_id: int, now: Optional[float] = None) -> None:
+        """Take a fired alert out of the arrays: one-shot alerts are dropped, repeating ones cool down."""
+        now = now or time.time()
+        with self._lock:
+            row = self._alerts.get(alert_id)
+            if row is None:
+                return
+            self._disarm(alert_id)
+            repeat_interval = int(row.get('repeat_interval') or 0)
+            if repeat_interval <= 0:
+                self._alerts.pop(alert_id, None)
+                return
+            row['is_triggered'] = 1
+            row['last_triggered_at'] = now
+            self._cool_down(alert_id, now + repeat_interval)
+
+    def retry(self, alert_id: int) -> None:
+        """Re-check an alert on the next price (e.g. its notification failed)."""
+        with self._lock:
+            armed = self._armed.get(alert_id)
+            if armed is not None and armed[0] in self._symbols:
+                self._symbols[armed[0]].pending.add(alert_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'loaded_at': int(self._loaded_at),
+                'alerts': len(self._alerts),
+                'armed': len(self._armed),
+                'cooling_down': len(self._cooldown_until),
+                'symbols': len(self._symbols),
+                'evaluations': self.evaluations,
+                'candidates': self.candidates,
+            }
+
+
+_index: Optional[AlertIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_alert_index() -> AlertIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = AlertIndex(resync_sec=float(os.getenv('ALERT_INDEX_RESYNC_SEC', '300')))
+    return _index
@@ -2,16 +2,24 @@
 Backtest Service
 """
 import math
+import multiprocessing
+import time
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Iterator, Optional
 
 import pandas as pd
 import numpy as np
 
 from app.data_sources import DataSourceFactory
+from app.data_sources.kline_store import get_kline_store, kline_store_enabled
 from app.utils.logger import get_logger
 from app.services.indicator_params import IndicatorParamsParser, IndicatorCaller
+from app.services.backtest_engine import BarArrays, ENGINE_VECTORIZED, normalize_engine
+from app.services.incremental_indicator import STREAMING_HELPERS
+from app.services.indicator_code_cache import get_indicator_code_cache
+from app.utils.sandbox_pool import get_sandbox_pool, sandbox_pool_enabled, picklable_env, frame_with_columns
 
 logger = get_logger(__name__)
 
@@ -124,7 +132,8 @@ class BacktestService:
         leverage: int = 1,
         trade_direction: str = 'long',
         strategy_config: Optional[Dict[str, Any]] = None,
-        enable_mtf: bool = True
+        enable_mtf: bool = True,
+        engine: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Multi-timeframe backtest.
@@ -146,6 +155,7 @@ class BacktestService:
             trade_direction: Trade direction
             strategy_config: Strategy configuration
             enable_mtf: Whether to enable multi-timeframe backtest
+            engine: Simulation engine for the standard candle fallback ('legacy' or 'vectorized')
             
         Returns:
             Backtest result with precision info
@@ -167,7 +177,8 @@ class BacktestService:
                 slippage=slippage,
                 leverage=leverage,
                 trade_direction=trade_direction,
-                strategy_config=strategy_config
+                strategy_config=strategy_config,
+                engine=engine
             )
             result['precision_info'] = precision_info or {
                 'enabled': False,
@@ -209,7 +220,8 @@ class BacktestService:
                 slippage=slippage,
                 leverage=leverage,
                 trade_direction=trade_direction,
-                strategy_config=strategy_config
+                strategy_config=strategy_config,
+                engine=engine
             )
             result['precision_info'] = {
                 'enabled': False,
@@ -983,7 +995,8 @@ class BacktestService:
         slippage: float = 0.0,  # Ideal backtest environment, no slippage
         leverage: int = 1,
         trade_direction: str = 'long',
-        strategy_config: Optional[Dict[str, Any]] = None
+        strategy_config: Optional[Dict[str, Any]] = None,
+        engine: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Run backtest.
@@ -998,6 +1011,7 @@ class BacktestService:
             initial_capital: Initial capital
             commission: Commission rate
             slippage: Slippage
+            engine: Simulation engine ('legacy' or 'vectorized', default from BACKTEST_ENGINE env)
             
         Returns:
             Backtest result
@@ -1020,7 +1034,8 @@ class BacktestService:
         
         # 3. Simulate trading
         equity_curve, trades, total_commission = self._simulate_trading(
-            df, signals, initial_capital, commission, slippage, leverage, trade_direction, strategy_config
+            df, signals, initial_capital, commission, slippage, leverage, trade_direction, strategy_config,
+            engine=engine
         )
         
         # 4. Calculate metrics
@@ -1029,6 +1044,135 @@ class BacktestService:
         # 5. Format result
         return self._format_result(metrics, equity_curve, trades)
     
+    def run_param_sweep(
+        self,
+        indicator_code: str,
+        market: str,
+        symbol: str,
+        timeframe: str,
+        start_date: datetime,
+        end_date: datetime,
+        param_grid: Dict[str, Any],
+        initial_capital: float = 10000.0,
+        commission: float = 0.001,
+        slippage: float = 0.0,
+        leverage: int = 1,
+        trade_direction: str = 'long',
+        strategy_config: Optional[Dict[str, Any]] = None,
+        sort_by: str = 'sharpeRatio',
+        top_n: int = 10,
+        max_workers: Optional[int] = None,
+        engine: Optional[str] = ENGINE_VECTORIZED,
+        user_id: int = 1,
+        indicator_id: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Grid-optimize indicator params (`# @param` declarations) over one candle dataset.
+        
+        Candles are fetched once and published to worker processes via shared memory;
+        combinations run on a ProcessPoolExecutor and are yielded as they finish.
+        
+        Args:
+            param_grid: {param_name: [values] | {"start", "stop", "step"} | value}
+            sort_by: Ranking metric ('sharpeRatio', 'totalReturn', 'maxDrawdown'; higher is better)
+            top_n: Size of the running leaderboard included in each result event
+            max_workers: Worker processes, capped at BACKTEST_SWEEP_WORKERS or min(4, cpu) (also the default)
+            engine: Simulation engine used by workers
+            
+        Yields:
+            {'event': 'start', ...}, then {'event': 'result', ...} per combination,
+            then {'event': 'done', 'ranking': [...]} with all results ranked.
+        """
+        from app.services import backtest_sweep
+
+        sort_by = backtest_sweep.sort_key_or_default(sort_by)
+        top_n = max(1, int(top_n or 10))
+        declared_params = IndicatorParamsParser.parse_params(indicator_code)
+        combinations = backtest_sweep.expand_param_grid(declared_params, param_grid)
+
+        df = self._fetch_kline_data(market, symbol, timeframe, start_date, end_date)
+        if df.empty:
+            raise ValueError("No candle data available in the backtest date range")
+
+        # Client-requested workers may lower, never raise, the server-side process cap.
+        worker_cap = backtest_sweep.default_workers()
+        workers = max(1, min(int(max_workers or worker_cap), worker_cap, len(combinations)))
+        job = {
+            'indicator_code': indicator_code,
+            'timeframe': timeframe,
+            'start_date': start_date,
+            'end_date': end_date,
+            'initial_capital': initial_capital,
+            'commission': commission,
+            'slippage': slippage,
+            'leverage': leverage,
+            'trade_direction': trade_direction,
+            'strategy_config': strategy_config,
+            'engine': engine,
+            'user_id': user_id,
+            'indicator_id': indicator_id,
+        }
+
+        started = time.time()
+        yield {
+            'event': 'start',
+            'total': len(combinations),
+            'workers': workers,
+            'candles': len(df),
+            'sortBy': sort_by,
+            'params': declared_params,
+        }
+
+        shm, shape = backtest_sweep.share_ohlcv(df)
+        executor = None
+        results = []
+        try:
+            # spawn: never fork the API process (it runs strategy/worker threads).
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=backtest_sweep.init_sweep_worker,
+                initargs=(shm.name, shape, job),
+            )
+            futures = [
+                executor.submit(backtest_sweep.run_sweep_combination, combo_id, params)
+                for combo_id, params in enumerate(combinations)
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                ranking = backtest_sweep.rank_results(results, sort_by)
+                rank = next((k + 1 for k, r in enumerate(ranking) if r['id'] == result['id']), None)
+                yield {
+                    'event': 'result',
+                    'completed': len(results),
+                    'total': len(combinations),
+                    'rank': rank if result['success'] else None,
+                    'result': result,
+                    'top': ranking[:top_n],
+                }
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            shm.close()
+            shm.unlink()
+
+        ranking = backtest_sweep.rank_results(results, sort_by)
+        succeeded = sum(1 for r in results if r['success'])
+        logger.info(
+            f"Param sweep done: symbol={symbol}, tf={timeframe}, combinations={len(combinations)}, "
+            f"succeeded={succeeded}, workers={workers}, elapsed={time.time() - started:.2f}s"
+        )
+        yield {
+            'event': 'done',
+            'total': len(combinations),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'elapsedSec': round(time.time() - started, 3),
+            'sortBy': sort_by,
+            'ranking': ranking,
+        }
+
     def _fetch_kline_data(
         self,
         market: str,
@@ -1046,15 +1190,31 @@ class BacktestService:
         # Calculate before_time (end date + 1 day)
         before_time = int((end_date + timedelta(days=1)).timestamp())
         
+        kline_data = None
+        if kline_store_enabled() and timeframe in self.TIMEFRAME_SECONDS:
+            # Local store: only the missing head/tail is fetched from the network
+            try:
+                kline_data = get_kline_store().get_range(
+                    market, symbol, timeframe,
+                    start_ts=int(start_date.timestamp()) - 86400,
+                    end_ts=before_time,
+                    fetch=lambda n, bt: DataSourceFactory.get_kline(
+                        market=market, symbol=symbol, timeframe=timeframe, limit=n, before_time=bt
+                    )
+                )
+            except Exception as e:
+                logger.warning(f"Kline store unavailable, falling back to remote fetch: {e}")
+                kline_data = None
         
         # Fetch data
-        kline_data = DataSourceFactory.get_kline(
-            market=market,
-            symbol=symbol,
-            timeframe=timeframe,
-            limit=limit,
-            before_time=before_time
-        )
+        if kline_data is None:
+            kline_data = DataSourceFactory.get_kline(
+                market=market,
+                symbol=symbol,
+                timeframe=timeframe,
+                limit=limit,
+                before_time=before_time
+            )
         
         if not kline_data:
             logger.warning("No candle data retrieved")
@@ -1118,87 +1278,72 @@ class BacktestService:
             # === 指标参数支持 ===
             # 从 backtest_params 获取用户设置的指标参数
             user_indicator_params = (backtest_params or {}).get('indicator_params', {})
-            # 解析指标代码中声明的参数
-            declared_params = IndicatorParamsParser.parse_params(code)
+            # 编译结果/参数声明/安全校验按源码哈希缓存（参数扫描每个组合不再重复）
+            indicator_id = (backtest_params or {}).get('indicator_id')
+            code_cache = get_indicator_code_cache()
+            compiled = code_cache.get(code, indicator_id)
             # 合并参数（用户值优先，否则使用默认值）
-            merged_params = IndicatorParamsParser.merge_params(declared_params, user_indicator_params)
-            local_vars['params'] = merged_params
+            local_vars['params'] = code_cache.merged_params(compiled, user_indicator_params)
             
             # === 指标调用器支持 ===
             user_id = (backtest_params or {}).get('user_id', 1)
-            indicator_id = (backtest_params or {}).get('indicator_id')
             indicator_caller = IndicatorCaller(user_id, indicator_id)
             local_vars['call_indicator'] = indicator_caller.call_indicator
             
             # Add technical indicator functions
             local_vars.update(self._get_indicator_functions())
+            # Streaming variants (used by live strategies' optional `on_bar` hook)
+            local_vars.update(STREAMING_HELPERS)
             
-            # Add safe builtins (keep full builtins to support lambda etc.)
-            # but remove dangerous functions like eval, exec, open etc.
-            import builtins
-            
-            # Create restricted __import__ that only allows safe modules
-            def safe_import(name, *args, **kwargs):
-                """Only allow importing numpy, pandas, math, json etc."""
-                allowed_modules = ['numpy', 'pandas', 'math', 'json', 'datetime', 'time']
-                if name in allowed_modules or name.split('.')[0] in allowed_modules:
-                    return builtins.__import__(name, *args, **kwargs)
-                raise ImportError(f"Import not allowed: {name}")
-            
-            safe_builtins = {k: getattr(builtins, k) for k in dir(builtins) 
-                           if not k.startswith('_') and k not in [
-                               'eval', 'exec', 'compile', 'open', 'input',
-                               'help', 'exit', 'quit',
-                               'copyright', 'credits', 'license'
-                           ]}
-            
-            # Add restricted __import__
-            safe_builtins['__import__'] = safe_import
-            
-            # Create unified execution environment (globals and locals use same dict)
-            # This allows functions to access np, pd etc.
-            exec_env = local_vars.copy()
-            exec_env['__builtins__'] = safe_builtins
-            
-            # Pre-execute import statements to ensure np and pd are available
-            pre_import_code = """
-import numpy as np
-import pandas as pd
-"""
-            exec(pre_import_code, exec_env)
+            # Unified execution environment (globals and locals use same dict) with safe builtins
+            # (eval/exec/open etc. removed, __import__ restricted to safe modules) and np/pd pre-imported.
+            exec_env = code_cache.prepare_env(
+                local_vars, allowed_modules=('numpy', 'pandas', 'math', 'json', 'datetime', 'time')
+            )
             
-            # Security check: validate code doesn't contain dangerous operations
-            from app.utils.safe_exec import validate_code_safety
-            is_safe, error_msg = validate_code_safety(code)
+            # Security check: validate code doesn't contain dangerous operations (cached per source)
+            is_safe, error_msg = compiled.safety()
             if not is_safe:
                 logger.error(f"Backtest code security check failed: {error_msg}")
                 raise ValueError(f"Code contains unsafe operations: {error_msg}")
             
-            # Execute user code safely (with timeout)
-            from app.utils.safe_exec import safe_exec_code
-            exec_result = safe_exec_code(
-                code=code,
-                exec_globals=exec_env,
-                exec_locals=exec_env,
-                timeout=60  # Backtest allows longer time (60 seconds)
-            )
-            
-            if not exec_result['success']:
-                raise RuntimeError(f"Code execution failed: {exec_result['error']}")
-            
-            # Get the executed df
-            executed_df = exec_env.get('df', df)
-
-            # Validation: if chart signals are provided, df['buy']/df['sell'] must exist for backtest normalization.
-            # This keeps indicator scripts simple and consistent (chart=buy/sell, execution=normalized in backend).
-            output_obj = exec_env.get('output')
-            has_output_signals = isinstance(output_obj, dict) and isinstance(output_obj.get('signals'), list) and len(output_obj.get('signals')) > 0
-            if has_output_signals and not all(col in executed_df.columns for col in ['buy', 'sell']):
-                raise ValueError(
-                    "Invalid indicator script: output['signals'] is provided, but df['buy'] and df['sell'] are missing. "
-                    "Please set df['buy'] and df['sell'] as boolean columns (len == len(df))."
+            if sandbox_pool_enabled():
+                # Isolated worker process: wall/CPU/memory limits also apply off the main thread
+                columns, _ = get_sandbox_pool().run_indicator(
+                    code, df,
+                    env=picklable_env(local_vars),
+                    timeout=60,
+                    helpers=True,
+                    caller=(user_id, indicator_id),
+                    allowed_modules=['numpy', 'pandas', 'math', 'json', 'datetime', 'time']
                 )
-            
+                executed_df = frame_with_columns(df, columns)
+            else:
+                # Execute user code safely (with timeout)
+                from app.utils.safe_exec import safe_exec_code
+                exec_result = safe_exec_code(
+                    code=compiled.code_obj,
+                    exec_globals=exec_env,
+                    exec_locals=exec_env,
+                    timeout=60  # Backtest allows longer time (60 seconds)
+                )
+                
+                if not exec_result['success']:
+                    raise RuntimeError(f"Code execution failed: {exec_result['error']}")
+                
+                # Get the executed df
+                executed_df = exec_env.get('df', df)
+
+                # Validation: if chart signals are provided, df['buy']/df['sell'] must exist for backtest normalization.
+                # This keeps indicator scripts simple and consistent (chart=buy/sell, execution=normalized in backend).
+                output_obj = exec_env.get('output')
+                has_output_signals = isinstance(output_obj, dict) and isinstance(output_obj.get('signals'), list) and len(output_obj.get('signals')) > 0
+                if has_output_signals and not all(col in executed_df.columns for col in ['buy', 'sell']):
+                    raise ValueError(
+                        "Invalid indicator script: output['signals'] is provided, but df['buy'] and df['sell'] are missing. "
+                        "Please set df['buy'] and df['sell'] as boolean columns (len == len(df))."
+                    )
+
             # Extract signals from executed df
             if all(col in executed_df.columns for col in ['open_long', 'close_long', 'open_short', 'close_short']):
                 
@@ -1294,7 +1439,8 @@ import pandas as pd
         slippage: float,
         leverage: int = 1,
         trade_direction: str = 'long',
-        strategy_config: Optional[Dict[str, Any]] = None
+        strategy_config: Optional[Dict[str, Any]] = None,
+        engine: Optional[str] = None
     ) -> tuple:
         """
         Simulate trading.
@@ -1305,6 +1451,7 @@ import pandas as pd
                 - 'long': Long only (buy->sell)
                 - 'short': Short only (sell->buy, reversed PnL)
                 - 'both': Both directions (buy->sell long + sell->buy short)
+            engine: Simulation engine ('legacy' or 'vectorized')
         """
         # Normalize supported signal formats into 4-way signals.
         if not isinstance(signals, dict):
@@ -1353,7 +1500,9 @@ import pandas as pd
         else:
             raise ValueError("signals dict must contain either 4-way keys or buy/sell keys.")
 
-        return self._simulate_trading_new_format(df, norm, initial_capital, commission, slippage, leverage, trade_direction, strategy_config)
+        return self._simulate_trading_new_format(
+            df, norm, initial_capital, commission, slippage, leverage, trade_direction, strategy_config, engine=engine
+        )
     
     def _simulate_trading_new_format(
         self,
@@ -1364,13 +1513,16 @@ import pandas as pd
         slippage: float,
         leverage: int = 1,
         trade_direction: str = 'both',
-        strategy_config: Optional[Dict[str, Any]] = None
+        strategy_config: Optional[Dict[str, Any]] = None,
+        engine: Optional[str] = None
     ) -> tuple:
         """
         Simulate trading with 4-way signal format (supports position management and scaling).
         
         Args:
             trade_direction: Trade direction ('long', 'short', 'both')
+            engine: Simulation engine ('legacy' or 'vectorized', default from BACKTEST_ENGINE env).
+                Both engines produce identical results; 'vectorized' skips quiet candles with array passes.
         """
         equity_curve = []
         trades = []
@@ -1533,32 +1685,139 @@ import pandas as pd
         add_long_price_arr = signals.get('add_long_price', pd.Series([0.0] * len(df))).values
         add_short_price_arr = signals.get('add_short_price', pd.Series([0.0] * len(df))).values
         
-        for i, (timestamp, row) in enumerate(df.iterrows()):
+        # Engine selection:
+        # - legacy: iterate df rows
+        # - vectorized: contiguous arrays + skip quiet candles with array passes (see backtest_engine)
+        use_arrays = normalize_engine(engine) == ENGINE_VECTORIZED
+        bars = None
+        bar_iter = None
+        resume_at = 0
+        if use_arrays:
+            entry_mask = np.asarray(open_long_arr, dtype=bool) | np.asarray(open_short_arr, dtype=bool)
+            event_mask = entry_mask | np.asarray(close_long_arr, dtype=bool) | np.asarray(close_short_arr, dtype=bool)
+            if has_position_management:
+                event_mask = event_mask | np.asarray(add_long_arr, dtype=bool) | np.asarray(add_short_arr, dtype=bool)
+            bars = BarArrays(df, entry_mask, event_mask)
+        else:
+            bar_iter = df.iterrows()
+
+        for i in range(len(df)):
+            if use_arrays and i < resume_at:
+                continue
+
             # 爆仓后直接停止回测，输出结果
             if is_liquidated:
                 break
 
+            # Use OHLC to evaluate triggers.
+            if use_arrays:
+                timestamp = df.index[i]
+                bar_time = bars.labels[i]
+                high = bars.high[i]
+                low = bars.low[i]
+                close = bars.close[i]
+                open_ = bars.open[i]
+            else:
+                timestamp, row = next(bar_iter)
+                bar_time = timestamp.strftime('%Y-%m-%d %H:%M')
+                high = row['high']
+                low = row['low']
+                close = row['close']
+                open_ = row.get('open', close)
+
             # If no position and balance low, stop trading
             if position == 0 and capital < min_capital_to_trade:
                 is_liquidated = True
                 capital = 0
                 trades.append({
-                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                    'time': bar_time,
                     'type': 'liquidation',
-                    'price': round(float(row.get('close', 0) or 0), 4),
+                    'price': round(float(close or 0), 4),
                     'amount': 0,
                     'profit': round(-initial_capital, 2),
                     'balance': 0
                 })
-                equity_curve.append({'time': timestamp.strftime('%Y-%m-%d %H:%M'), 'value': 0})
+                equity_curve.append({'time': bar_time, 'value': 0})
                 break  # 直接停止
-            
-            # Use OHLC to evaluate triggers.
-            high = row['high']
-            low = row['low']
-            close = row['close']
-            open_ = row.get('open', close)
-            
+
+            # Vectorized engine: fast-forward over candles where no signal / trigger can fire.
+            # The first candle that may change state is replayed through the full logic below.
+            if use_arrays:
+                if position == 0:
+                    # Flat: only an entry signal can change state; equity stays at capital.
+                    quiet_end = bars.next_entry(i)
+                    if quiet_end > i:
+                        flat_value = round(capital, 2)
+                        equity_curve.extend({'time': bars.labels[k], 'value': flat_value} for k in range(i, quiet_end))
+                        resume_at = quiet_end
+                        continue
+                elif (position_type == 'long' and position > 0) or (position_type == 'short' and position < 0):
+                    if highest_since_entry is None:
+                        highest_since_entry = entry_price
+                    if lowest_since_entry is None:
+                        lowest_since_entry = entry_price
+                    is_long = position_type == 'long'
+                    # Price levels use the exact expressions of the per-candle checks below.
+                    down_levels = []  # triggers when low <= level
+                    up_levels = []  # triggers when high >= level
+                    stop_levels = down_levels if is_long else up_levels
+                    profit_levels = up_levels if is_long else down_levels
+                    if stop_loss_pct_eff > 0:
+                        stop_levels.append(entry_price * (1 - stop_loss_pct_eff) if is_long else entry_price * (1 + stop_loss_pct_eff))
+                    if (not trailing_enabled) and take_profit_pct_eff > 0:
+                        profit_levels.append(entry_price * (1 + take_profit_pct_eff) if is_long else entry_price * (1 - take_profit_pct_eff))
+                    trail_pct = None
+                    trail_activation = None
+                    if trailing_enabled and trailing_pct_eff > 0:
+                        trail_pct = trailing_pct_eff
+                        if trailing_activation_pct_eff > 0:
+                            trail_activation = (entry_price * (1 + trailing_activation_pct_eff) if is_long
+                                                else entry_price * (1 - trailing_activation_pct_eff))
+                    if capital >= min_capital_to_trade:
+                        scale_rules = [
+                            (trend_add_enabled, trend_add_step_pct_eff, trend_add_size_pct, trend_add_max_times, trend_add_times, last_trend_add_anchor, True),
+                            (dca_add_enabled, dca_add_step_pct_eff, dca_add_size_pct, dca_add_max_times, dca_add_times, last_dca_add_anchor, False),
+                            (trend_reduce_enabled, trend_reduce_step_pct_eff, trend_reduce_size_pct, trend_reduce_max_times, trend_reduce_times, last_trend_reduce_anchor, True),
+                            (adverse_reduce_enabled, adverse_reduce_step_pct_eff, adverse_reduce_size_pct, adverse_reduce_max_times, adverse_reduce_times, last_adverse_reduce_anchor, False),
+                        ]
+                        for enabled, step_pct_eff, size_pct, max_times, times, last_anchor, with_trend in scale_rules:
+                            if enabled and step_pct_eff > 0 and size_pct > 0 and (max_times == 0 or times < max_times):
+                                anchor = last_anchor if last_anchor is not None else entry_price
+                                # Trend rules fire on favorable moves, DCA/adverse rules on adverse moves.
+                                if with_trend == is_long:
+                                    up_levels.append(anchor * (1 + step_pct_eff))
+                                else:
+                                    down_levels.append(anchor * (1 - step_pct_eff))
+                    if is_long:
+                        down_levels.append(liquidation_price)
+                    else:
+                        up_levels.append(liquidation_price)
+
+                    quiet_end = bars.scan_quiet(
+                        i,
+                        position_type,
+                        low_level=max(down_levels) if down_levels else None,
+                        high_level=min(up_levels) if up_levels else None,
+                        trail_pct=trail_pct,
+                        trail_activation=trail_activation,
+                        extreme=highest_since_entry if is_long else lowest_since_entry,
+                    )
+                    if quiet_end > i:
+                        span_high = np.fmax.reduce(bars.high[i:quiet_end])
+                        span_low = np.fmin.reduce(bars.low[i:quiet_end])
+                        if span_high > highest_since_entry:
+                            highest_since_entry = span_high
+                        if span_low < lowest_since_entry:
+                            lowest_since_entry = span_low
+                        closes = bars.close[i:quiet_end]
+                        if is_long:
+                            values = (closes - entry_price) * position + capital
+                        else:
+                            values = (entry_price - closes) * abs(position) + capital
+                        equity_curve.extend(bars.equity_points(i, quiet_end, values))
+                        resume_at = quiet_end
+                        continue
+
             # Default execution price depends on timing mode
             # - bar_close: close
             # - next_bar_open: open (this bar is the next bar for a prior signal)
@@ -1617,7 +1876,7 @@ import pandas as pd
                         total_commission_paid += commission_fee_close
 
                         trades.append({
-                            'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                            'time': bar_time,
                             'type': trade_type,
                             'price': round(exec_price_close, 4),
                             'amount': round(position, 4),
@@ -1633,7 +1892,7 @@ import pandas as pd
                         trend_add_times = dca_add_times = trend_reduce_times = adverse_reduce_times = 0
                         last_trend_add_anchor = last_dca_add_anchor = last_trend_reduce_anchor = last_adverse_reduce_anchor = None
 
-                        equity_curve.append({'time': timestamp.strftime('%Y-%m-%d %H:%M'), 'value': round(capital, 2)})
+                        equity_curve.append({'time': bar_time, 'value': round(capital, 2)})
                         continue
 
                 if position_type == 'short' and position < 0:
@@ -1669,7 +1928,7 @@ import pandas as pd
                             capital = 0
                             is_liquidated = True
                             trades.append({
-                                'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                                'time': bar_time,
                                 'type': 'liquidation',
                                 'price': round(exec_price_close, 4),
                                 'amount': round(shares, 4),
@@ -1679,14 +1938,14 @@ import pandas as pd
                             position = 0
                             position_type = None
                             liquidation_price = 0
-                            equity_curve.append({'time': timestamp.strftime('%Y-%m-%d %H:%M'), 'value': 0})
+                            equity_curve.append({'time': bar_time, 'value': 0})
                             continue
 
                         capital += profit
                         total_commission_paid += commission_fee_close
 
                         trades.append({
-                            'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                            'time': bar_time,
                             'type': trade_type,
                             'price': round(exec_price_close, 4),
                             'amount': round(shares, 4),
@@ -1702,7 +1961,7 @@ import pandas as pd
                         trend_add_times = dca_add_times = trend_reduce_times = adverse_reduce_times = 0
                         last_trend_add_anchor = last_dca_add_anchor = last_trend_reduce_anchor = last_adverse_reduce_anchor = None
 
-                        equity_curve.append({'time': timestamp.strftime('%Y-%m-%d %H:%M'), 'value': round(capital, 2)})
+                        equity_curve.append({'time': bar_time, 'value': round(capital, 2)})
                         continue
             
             # Handle exit signals (priority, SL/TP)
@@ -1725,7 +1984,7 @@ import pandas as pd
                 trade_type = 'close_long'
 
                 trades.append({
-                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                    'time': bar_time,
                     'type': trade_type,
                     'price': round(exec_price, 4),
                     'amount': round(position, 4),
@@ -1746,7 +2005,7 @@ import pandas as pd
                     is_liquidated = True
                     capital = 0
                     trades.append({
-                        'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                        'time': bar_time,
                         'type': 'liquidation',
                         'price': round(exec_price, 4),
                         'amount': 0,
@@ -1770,7 +2029,7 @@ import pandas as pd
                     capital = 0
                     is_liquidated = True
                     trades.append({
-                        'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                        'time': bar_time,
                         'type': 'liquidation',
                         'price': round(exec_price, 4),
                         'amount': round(shares, 4),
@@ -1779,7 +2038,7 @@ import pandas as pd
                     })
                     position = 0
                     position_type = None
-                    equity_curve.append({'time': timestamp.strftime('%Y-%m-%d %H:%M'), 'value': 0})
+                    equity_curve.append({'time': bar_time, 'value': 0})
                     continue
                 
                 capital += profit
@@ -1789,7 +2048,7 @@ import pandas as pd
                 trade_type = 'close_short'
 
                 trades.append({
-                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                    'time': bar_time,
                     'type': trade_type,
                     'price': round(exec_price, 4),
                     'amount': round(shares, 4),
@@ -1809,7 +2068,7 @@ import pandas as pd
                     is_liquidated = True
                     capital = 0
                     trades.append({
-                        'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                        'time': bar_time,
                         'type': 'liquidation',
                         'price': round(exec_price, 4),
                         'amount': 0,
@@ -1856,7 +2115,7 @@ import pandas as pd
                                 last_trend_add_anchor = trigger
 
                                 trades.append({
-                                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                                    'time': bar_time,
                                     'type': 'add_long',
                                     'price': round(exec_price_add, 4),
                                     'amount': round(shares_add, 4),
@@ -1889,7 +2148,7 @@ import pandas as pd
                                 last_dca_add_anchor = trigger
 
                                 trades.append({
-                                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                                    'time': bar_time,
                                     'type': 'add_long',
                                     'price': round(exec_price_add, 4),
                                     'amount': round(shares_add, 4),
@@ -1922,7 +2181,7 @@ import pandas as pd
                                 last_trend_reduce_anchor = trigger
 
                                 trades.append({
-                                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                                    'time': bar_time,
                                     'type': 'reduce_long',
                                     'price': round(exec_price_reduce, 4),
                                     'amount': round(reduce_shares, 4),
@@ -1955,7 +2214,7 @@ import pandas as pd
                                 last_adverse_reduce_anchor = trigger
 
                                 trades.append({
-                                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                                    'time': bar_time,
                                     'type': 'reduce_long',
                                     'price': round(exec_price_reduce, 4),
                                     'amount': round(reduce_shares, 4),
@@ -1993,7 +2252,7 @@ import pandas as pd
                                 last_trend_add_anchor = trigger
 
                                 trades.append({
-                                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                                    'time': bar_time,
                                     'type': 'add_short',
                                     'price': round(exec_price_add, 4),
                                     'amount': round(shares_add, 4),
@@ -2027,7 +2286,7 @@ import pandas as pd
                                 last_dca_add_anchor = trigger
 
                                 trades.append({
-                                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                                    'time': bar_time,
                                     'type': 'add_short',
                                     'price': round(exec_price_add, 4),
                                     'amount': round(shares_add, 4),
@@ -2061,7 +2320,7 @@ import pandas as pd
                                 last_trend_reduce_anchor = trigger
 
                                 trades.append({
-                                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                                    'time': bar_time,
                                     'type': 'reduce_short',
                                     'price': round(exec_price_reduce, 4),
                                     'amount': round(reduce_shares, 4),
@@ -2095,7 +2354,7 @@ import pandas as pd
                                 last_adverse_reduce_anchor = trigger
 
                                 trades.append({
-                                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                                    'time': bar_time,
                                     'type': 'reduce_short',
                                     'price': round(exec_price_reduce, 4),
                                     'amount': round(reduce_shares, 4),
@@ -2129,7 +2388,7 @@ import pandas as pd
                     liquidation_price = entry_price * (1 - 1.0 / leverage)
                     
                     trades.append({
-                        'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                        'time': bar_time,
                         'type': 'add_long',
                         'price': round(exec_price, 4),
                         'amount': round(shares, 4),
@@ -2163,7 +2422,7 @@ import pandas as pd
                     liquidation_price = entry_price * (1 + 1.0 / leverage)
                     
                     trades.append({
-                        'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                        'time': bar_time,
                         'type': 'add_short',
                         'price': round(exec_price, 4),
                         'amount': round(shares, 4),
@@ -2188,7 +2447,7 @@ import pandas as pd
                             capital = 0
                         total_commission_paid += close_commission
                         trades.append({
-                            'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                            'time': bar_time,
                             'type': 'close_short',
                             'price': round(close_price, 4),
                             'amount': round(shares_to_close, 4),
@@ -2206,7 +2465,7 @@ import pandas as pd
                         if capital < min_capital_to_trade:
                             is_liquidated = True
                             capital = 0
-                            equity_curve.append({'time': timestamp.strftime('%Y-%m-%d %H:%M'), 'value': 0})
+                            equity_curve.append({'time': bar_time, 'value': 0})
                             continue
                     
                     # Now open long (position is guaranteed to be 0 here)
@@ -2245,7 +2504,7 @@ import pandas as pd
                     last_adverse_reduce_anchor = entry_price
                     
                     trades.append({
-                        'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                        'time': bar_time,
                         'type': 'open_long',
                         'price': round(exec_price, 4),
                         'amount': round(shares, 4),
@@ -2266,7 +2525,7 @@ import pandas as pd
                                 is_liquidated = True
                                 capital = 0
                                 trades.append({
-                                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                                    'time': bar_time,
                                     'type': 'liquidation',
                                     'price': round(liquidation_price, 4),
                                     'amount': round(position, 4),
@@ -2284,7 +2543,7 @@ import pandas as pd
                                     is_liquidated = True
                                     capital = 0
                                 trades.append({
-                                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                                    'time': bar_time,
                                     'type': 'close_long_stop',
                                     'price': round(exec_price_close, 4),
                                     'amount': round(position, 4),
@@ -2297,7 +2556,7 @@ import pandas as pd
                             liquidation_price = 0
                             highest_since_entry = None
                             lowest_since_entry = None
-                            equity_curve.append({'time': timestamp.strftime('%Y-%m-%d %H:%M'), 'value': round(capital, 2)})
+                            equity_curve.append({'time': bar_time, 'value': round(capital, 2)})
                             continue
             
             # open_short: can execute when position==0, OR when both_mode and position>0 (auto-close long first)
@@ -2312,7 +2571,7 @@ import pandas as pd
                             capital = 0
                         total_commission_paid += close_commission
                         trades.append({
-                            'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                            'time': bar_time,
                             'type': 'close_long',
                             'price': round(close_price, 4),
                             'amount': round(position, 4),
@@ -2330,7 +2589,7 @@ import pandas as pd
                         if capital < min_capital_to_trade:
                             is_liquidated = True
                             capital = 0
-                            equity_curve.append({'time': timestamp.strftime('%Y-%m-%d %H:%M'), 'value': 0})
+                            equity_curve.append({'time': bar_time, 'value': 0})
                             continue
                     
                     # Now open short (position is guaranteed to be 0 here)
@@ -2369,7 +2628,7 @@ import pandas as pd
                     last_adverse_reduce_anchor = entry_price
                     
                     trades.append({
-                        'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                        'time': bar_time,
                         'type': 'open_short',
                         'price': round(exec_price, 4),
                         'amount': round(shares, 4),
@@ -2388,7 +2647,7 @@ import pandas as pd
                                 is_liquidated = True
                                 capital = 0
                                 trades.append({
-                                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                                    'time': bar_time,
                                     'type': 'liquidation',
                                     'price': round(liquidation_price, 4),
                                     'amount': round(abs(position), 4),
@@ -2407,7 +2666,7 @@ import pandas as pd
                                     is_liquidated = True
                                     capital = 0
                                 trades.append({
-                                    'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                                    'time': bar_time,
                                     'type': 'close_short_stop',
                                     'price': round(exec_price_close, 4),
                                     'amount': round(shares_close, 4),
@@ -2420,7 +2679,7 @@ import pandas as pd
                             liquidation_price = 0
                             highest_since_entry = None
                             lowest_since_entry = None
-                            equity_curve.append({'time': timestamp.strftime('%Y-%m-%d %H:%M'), 'value': round(capital, 2)})
+                            equity_curve.append({'time': bar_time, 'value': round(capital, 2)})
                             continue
             
             # Check if liquidation hit (safety net)
@@ -2442,7 +2701,7 @@ import pandas as pd
                         total_commission_paid += commission_fee_close
                         
                         trades.append({
-                            'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                            'time': bar_time,
                             'type': 'close_long_stop',
                             'price': round(exec_price_close, 4),
                             'amount': round(position, 4),
@@ -2456,7 +2715,7 @@ import pandas as pd
                         is_liquidated = True
                         capital = 0
                         trades.append({
-                            'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                            'time': bar_time,
                             'type': 'liquidation',
                             'price': round(liquidation_price, 4),
                             'amount': round(abs(position), 4),
@@ -2466,7 +2725,7 @@ import pandas as pd
                     
                     position = 0
                     position_type = None
-                    equity_curve.append({'time': timestamp.strftime('%Y-%m-%d %H:%M'), 'value': capital})
+                    equity_curve.append({'time': bar_time, 'value': capital})
                     continue
                     
                 elif position_type == 'short' and high >= liquidation_price:
@@ -2488,7 +2747,7 @@ import pandas as pd
                         total_commission_paid += commission_fee_close
                         
                         trades.append({
-                            'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                            'time': bar_time,
                             'type': 'close_short_stop',
                             'price': round(exec_price_close, 4),
                             'amount': round(shares_close, 4),
@@ -2502,7 +2761,7 @@ import pandas as pd
                         is_liquidated = True
                         capital = 0
                         trades.append({
-                            'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                            'time': bar_time,
                             'type': 'liquidation',
                             'price': round(liquidation_price, 4),
                             'amount': round(abs(position), 4),
@@ -2512,7 +2771,7 @@ import pandas as pd
                     
                     position = 0
                     position_type = None
-                    equity_curve.append({'time': timestamp.strftime('%Y-%m-%d %H:%M'), 'value': capital})
+                    equity_curve.append({'time': bar_time, 'value': capital})
                     continue
             
             # Record equity (unrealized PnL from close)
@@ -2530,7 +2789,7 @@ import pandas as pd
                 total_value = 0
             
             equity_curve.append({
-                'time': timestamp.strftime('%Y-%m-%d %H:%M'),
+                'time': bar_time,
                 'value': round(total_value, 2)
             })
         
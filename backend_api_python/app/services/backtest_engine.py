@@ -0,0 +1,146 @@
+"""
+Array-based bar access for the backtest simulation loop.
+
+`BacktestService._simulate_trading_new_format` supports two engines:
+- legacy: walks `df.iterrows()` and evaluates every candle.
+- vectorized: reads OHLC from contiguous NumPy arrays and jumps over "quiet" spans
+  (no signal, no SL/TP/trailing/scale/liquidation trigger) with array passes. Only the
+  candles where something can happen go through the full per-candle state machine,
+  so results are identical to the legacy engine.
+"""
+import os
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+ENGINE_LEGACY = 'legacy'
+ENGINE_VECTORIZED = 'vectorized'
+BACKTEST_ENGINES = (ENGINE_LEGACY, ENGINE_VECTORIZED)
+
+# Quiet-span scans start small (signals are usually dense around entries) and grow.
+_SCAN_CHUNK_MIN = 64
+_SCAN_CHUNK_MAX = 8192
+
+
+def normalize_engine(engine: Optional[str]) -> str:
+    """
+    Resolve the simulation engine name.
+    Falls back to BACKTEST_ENGINE env (default: legacy) when not provided or unknown.
+    """
+    e = str(engine or '').strip().lower()
+    if e in ('fast', 'numpy', 'vector'):
+        e = ENGINE_VECTORIZED
+    if e not in BACKTEST_ENGINES:
+        e = str(os.getenv('BACKTEST_ENGINE', ENGINE_LEGACY) or '').strip().lower()
+    return e if e in BACKTEST_ENGINES else ENGINE_LEGACY
+
+
+class BarArrays:
+    """Contiguous OHLC arrays, precomputed time labels and signal event indexes."""
+
+    def __init__(self, df: pd.DataFrame, entry_mask: np.ndarray, event_mask: np.ndarray):
+        self.n = len(df)
+        self.close = np.ascontiguousarray(df['close'].to_numpy(dtype=np.float64))
+        self.high = np.ascontiguousarray(df['high'].to_numpy(dtype=np.float64))
+        self.low = np.ascontiguousarray(df['low'].to_numpy(dtype=np.float64))
+        if 'open' in df.columns:
+            self.open = np.ascontiguousarray(df['open'].to_numpy(dtype=np.float64))
+        else:
+            self.open = self.close
+        self.labels: List[str] = self._time_labels(df.index)
+        # Bars where a flat account may open a position.
+        self._entry_idx = np.flatnonzero(np.asarray(entry_mask, dtype=bool))
+        # Bars with any main/add signal (these always go through the full state machine).
+        self._event_idx = np.flatnonzero(np.asarray(event_mask, dtype=bool))
+
+    @staticmethod
+    def _time_labels(index) -> List[str]:
+        """Equivalent of `ts.strftime('%Y-%m-%d %H:%M')` per candle, without per-element formatting."""
+        if isinstance(index, pd.DatetimeIndex) and index.tz is None:
+            minutes = index.values.astype('datetime64[m]').astype(str)
+            return [label.replace('T', ' ') for label in minutes.tolist()]
+        return index.strftime('%Y-%m-%d %H:%M').tolist()
+
+    @staticmethod
+    def _next_in(idx: np.ndarray, i: int, n: int) -> int:
+        k = int(np.searchsorted(idx, i, side='left'))
+        return int(idx[k]) if k < len(idx) else n
+
+    def next_entry(self, i: int) -> int:
+        """First bar >= i with an open signal (n if none)."""
+        return self._next_in(self._entry_idx, i, self.n)
+
+    def next_event(self, i: int) -> int:
+        """First bar >= i with any signal (n if none)."""
+        return self._next_in(self._event_idx, i, self.n)
+
+    def scan_quiet(
+        self,
+        start: int,
+        side: str,
+        low_level: Optional[float],
+        high_level: Optional[float],
+        trail_pct: Optional[float] = None,
+        trail_activation: Optional[float] = None,
+        extreme: Optional[float] = None,
+    ) -> int:
+        """
+        Find the first bar >= start where an open position may change state.
+
+        A bar is an event when it has a signal, `low <= low_level`, `high >= high_level`,
+        or (when trailing is configured) the running extreme since entry activates and
+        hits the trailing stop. Levels must be computed with the same expressions the
+        simulator uses, so the detection is exact; false positives are harmless because
+        the returned bar is always replayed through the full per-candle logic.
+
+        Returns:
+            Index of the first event bar (n if the rest of the data is quiet).
+        """
+        end = self.next_event(start)
+        pos = start
+        chunk = _SCAN_CHUNK_MIN
+        while pos < end:
+            stop = min(end, pos + chunk)
+            hi = self.high[pos:stop]
+            lo = self.low[pos:stop]
+            hit = np.zeros(stop - pos, dtype=bool)
+            if low_level is not None:
+                hit |= lo <= low_level
+            if high_level is not None:
+                hit |= hi >= high_level
+            if trail_pct is not None and extreme is not None:
+                # Running extreme since entry (NaN candles are ignored, like the per-candle max/min).
+                if side == 'long':
+                    run = np.fmax(np.fmax.accumulate(hi), extreme)
+                    trig = lo <= run * (1 - trail_pct)
+                    if trail_activation is not None:
+                        trig &= run >= trail_activation
+                    extreme = max(extreme, float(run[-1]))
+                else:
+                    run = np.fmin(np.fmin.accumulate(lo), extreme)
+                    trig = hi >= run * (1 + trail_pct)
+                    if trail_activation is not None:
+                        trig &= run <= trail_activation
+                    extreme = min(extreme, float(run[-1]))
+                hit |= trig
+            found = np.flatnonzero(hit)
+            if found.size:
+                return pos + int(found[0])
+            pos = stop
+            chunk = min(chunk * 2, _SCAN_CHUNK_MAX)
+        return end
+
+    def equity_points(self, start: int, stop: int, values: np.ndarray) -> List[dict]:
+        """
+        Build equity-curve points for bars [start, stop) from unrounded values.
+        Mirrors the per-candle rule: negative equity is recorded as 0, otherwise round(v, 2).
+        """
+        negative = values < 0
+        rounded = np.round(np.where(negative, 0.0, values), 2)
+        labels = self.labels
+        return [
+            {'time': labels[start + k], 'value': 0 if negative[k] else rounded[k]}
+            for k in range(stop - start)
+        ]
@@ -0,0 +1,207 @@
+"""
+Parameter sweep (grid optimization) helpers for BacktestService.
+
+- Expands a parameter grid against the `# @param` declarations of an indicator.
+- Publishes the OHLCV matrix once through `multiprocessing.shared_memory`, so worker
+  processes attach to it instead of receiving a pickled DataFrame per combination.
+- Worker functions are module-level so they can be used with a spawn-based ProcessPoolExecutor.
+"""
+import itertools
+import os
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.indicator_params import IndicatorParamsParser
+
+
+# Row layout of the shared OHLCV matrix (float64, shape = (len(ROWS), n)).
+# Timestamps are stored as epoch seconds (exact in float64).
+SHARED_ROWS = ('time', 'open', 'high', 'low', 'close', 'volume')
+
+# Metrics that can be used for ranking. Higher is better for all of them
+# (maxDrawdown is reported as a negative percentage).
+SORT_KEYS = ('sharpeRatio', 'totalReturn', 'maxDrawdown')
+
+
+def max_combinations() -> int:
+    return max(1, int(os.getenv('BACKTEST_SWEEP_MAX_COMBINATIONS', '500') or 500))
+
+
+def default_workers() -> int:
+    env = int(os.getenv('BACKTEST_SWEEP_WORKERS', '0') or 0)
+    if env > 0:
+        return env
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def _expand_values(spec: Any, param_type: str) -> List[Any]:
+    """
+    Expand one grid entry into a value list.
+
+    Supported specs:
+    - list: [5, 10, 20]
+    - range dict: {"start": 5, "stop": 30, "step": 5} (stop is inclusive)
+    - scalar: 14 (fixed value)
+    """
+    if isinstance(spec, dict):
+        start = float(spec.get('start'))
+        stop = float(spec.get('stop', start))
+        step = float(spec.get('step') or 1)
+        if step <= 0:
+            raise ValueError("paramGrid step must be > 0")
+        count = int(np.floor((stop - start) / step + 1e-9)) + 1
+        if count <= 0:
+            raise ValueError("paramGrid range is empty (start > stop)")
+        raw = [start + k * step for k in range(count)]
+        if param_type == 'float':
+            raw = [round(v, 10) for v in raw]
+    elif isinstance(spec, (list, tuple)):
+        raw = list(spec)
+    else:
+        raw = [spec]
+
+    values = []
+    for v in raw:
+        if param_type == 'int' and isinstance(v, float) and v.is_integer():
+            v = int(v)
+        converted = IndicatorParamsParser._convert_value(str(v), param_type)
+        if converted not in values:
+            values.append(converted)
+    if not values:
+        raise ValueError("paramGrid entry has no values")
+    return values
+
+
+def expand_param_grid(declared_params: List[Dict[str, Any]], grid: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Build the cartesian product of a parameter grid.
+
+    Only parameters declared with `# @param` in the indicator code may be swept;
+    undeclared params keep their default values (merged later by IndicatorParamsParser.merge_params).
+
+    Raises:
+        ValueError: unknown parameter names, empty grid or too many combinations.
+    """
+    if not isinstance(grid, dict) or not grid:
+        raise ValueError("paramGrid must be a non-empty object")
+
+    declared = {p['name']: p for p in declared_params}
+    unknown = [name for name in grid if name not in declared]
+    if unknown:
+        raise ValueError(f"paramGrid contains undeclared params: {', '.join(unknown)} (declare them with # @param)")
+
+    names = list(grid.keys())
+    axes = [_expand_values(grid[name], declared[name]['type']) for name in names]
+    total = 1
+    for axis in axes:
+        total *= len(axis)
+    limit = max_combinations()
+    if total > limit:
+        raise ValueError(f"paramGrid expands to {total} combinations, exceeding the limit of {limit}")
+
+    return [dict(zip(names, combo)) for combo in itertools.product(*axes)]
+
+
+def share_ohlcv(df: pd.DataFrame) -> Tuple[shared_memory.SharedMemory, Tuple[int, int]]:
+    """
+    Copy the candle DataFrame into a shared-memory float64 matrix.
+    The caller owns the segment and must close() + unlink() it.
+    """
+    n = len(df)
+    shape = (len(SHARED_ROWS), n)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+    matrix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    matrix[0] = df.index.values.astype('datetime64[s]').astype(np.int64)
+    for row, col in enumerate(SHARED_ROWS[1:], start=1):
+        matrix[row] = df[col].to_numpy(dtype=np.float64) if col in df.columns else 0.0
+    del matrix
+    return shm, shape
+
+
+# ---------------------------------------------------------------------------
+# Worker process side
+# ---------------------------------------------------------------------------
+
+_worker_state: Dict[str, Any] = {}
+
+
+def init_sweep_worker(shm_name: str, shape: Tuple[int, int], job: Dict[str, Any]) -> None:
+    """ProcessPoolExecutor initializer: attach shared OHLCV once and rebuild the DataFrame."""
+    import logging
+    # Workers are short-lived; keep per-combination logs out of the API log.
+    logging.disable(logging.WARNING)
+    # Already an isolated process; don't nest indicator sandbox processes inside sweep workers.
+    os.environ['SANDBOX_POOL_ENABLED'] = 'false'
+
+    # Spawned workers share the parent's resource tracker; the parent unlinks the segment.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        index = pd.to_datetime(matrix[0].astype(np.int64), unit='s')
+        # One private copy per worker process (instead of one pickled DataFrame per combination).
+        df = pd.DataFrame(
+            {col: matrix[row].copy() for row, col in enumerate(SHARED_ROWS) if row > 0},
+            index=index
+        )
+        df.index.name = 'time'
+        del matrix
+    finally:
+        shm.close()
+
+    from app.services.backtest import BacktestService
+    _worker_state.update({
+        'df': df,
+        'job': job,
+        'service': BacktestService(),
+    })
+
+
+def run_sweep_combination(combo_id: int, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one parameter combination inside a worker and return its metrics."""
+    service = _worker_state['service']
+    df = _worker_state['df']
+    job = _worker_state['job']
+    try:
+        backtest_params = {
+            'leverage': job['leverage'],
+            'initial_capital': job['initial_capital'],
+            'commission': job['commission'],
+            'trade_direction': job['trade_direction'],
+            'indicator_params': params,
+            'user_id': job.get('user_id', 1),
+            'indicator_id': job.get('indicator_id'),
+        }
+        signals = service._execute_indicator(job['indicator_code'], df, backtest_params)
+        if not isinstance(signals, dict):
+            raise ValueError("Indicator execution failed for this parameter set")
+        equity_curve, trades, total_commission = service._simulate_trading(
+            df, signals, job['initial_capital'], job['commission'], job['slippage'], job['leverage'],
+            job['trade_direction'], job['strategy_config'], engine=job.get('engine')
+        )
+        metrics = service._calculate_metrics(
+            equity_curve, trades, job['initial_capital'], job['timeframe'],
+            job['start_date'], job['end_date'], total_commission
+        )
+        metrics = service._format_result(metrics, [], [])
+        metrics.pop('equityCurve', None)
+        metrics.pop('trades', None)
+        return {'id': combo_id, 'params': params, 'success': True, 'metrics': metrics, 'error': None}
+    except Exception as e:
+        return {'id': combo_id, 'params': params, 'success': False, 'metrics': {}, 'error': str(e)}
+
+
+def rank_results(results: List[Dict[str, Any]], sort_by: str) -> List[Dict[str, Any]]:
+    """Sort successful results by a metric (descending); failed runs go last."""
+    def key(item):
+        if not item.get('success'):
+            return (1, 0.0)
+        value = item.get('metrics', {}).get(sort_by, 0) or 0
+        return (0, -float(value))
+    return sorted(results, key=key)
+
+
+def sort_key_or_default(sort_by: Optional[str]) -> str:
+    return sort_by if sort_by in SORT_KEYS else 'sharpeRatio'
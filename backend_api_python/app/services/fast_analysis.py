@@ -9,7 +9,9 @@ Fast Analysis Service 3.0
 4. 单次LLM调用 - 强约束prompt，输出结构化分析
 """
 import json
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 from decimal import Decimal, ROUND_HALF_UP
 
@@ -472,141 +474,233 @@ Provide your analysis now. Remember: all prices must be within 10% of ${current_
             # Phase 1: Data collection (parallel)
             logger.info(f"Fast analysis starting: {market}:{symbol}")
             data = self._collect_market_data(market, symbol, timeframe)
-            
-            # Validate we have essential data - with fallback to indicators
-            current_price = None
-            
-            # 优先从 price 数据获取
-            if data.get("price") and data["price"].get("price"):
-                current_price = data["price"]["price"]
-            
-            # Fallback: 从 indicators 获取 (如果 K 线成功计算了)
-            if not current_price and data.get("indicators"):
-                current_price = data["indicators"].get("current_price")
-                if current_price:
-                    logger.info(f"Using price from indicators: ${current_price}")
-                    # 构建简化的 price 数据
-                    data["price"] = {
-                        "price": current_price,
-                        "change": 0,
-                        "changePercent": 0,
-                        "source": "indicators_fallback"
-                    }
-            
-            # Fallback: 从 kline 最后一根获取
-            if not current_price and data.get("kline"):
-                klines = data["kline"]
-                if klines and len(klines) > 0:
-                    current_price = float(klines[-1].get("close", 0))
-                    if current_price > 0:
-                        logger.info(f"Using price from kline: ${current_price}")
-                        prev_close = float(klines[-2].get("close", current_price)) if len(klines) > 1 else current_price
-                        change = current_price - prev_close
-                        change_pct = (change / prev_close * 100) if prev_close > 0 else 0
-                        data["price"] = {
-                            "price": current_price,
-                            "change": round(change, 6),
-                            "changePercent": round(change_pct, 2),
-                            "source": "kline_fallback"
-                        }
-            
-            if not current_price or current_price <= 0:
-                result["error"] = "Failed to fetch current price from all sources"
-                logger.error(f"Price fetch failed for {market}:{symbol}, all sources exhausted")
-                return result
-            
-            # Phase 2: Build prompt
-            system_prompt, user_prompt = self._build_analysis_prompt(data, language)
-            
-            # Phase 3: Single LLM call
-            logger.info(f"Calling LLM for analysis...")
-            llm_start = time.time()
-            
-            analysis = self.llm_service.safe_call_llm(
-                system_prompt,
-                user_prompt,
-                default_structure={
-                    "decision": "HOLD",
-                    "confidence": 50,
-                    "summary": "Analysis failed",
-                    "entry_price": current_price,
-                    "stop_loss": current_price * 0.95,
-                    "take_profit": current_price * 1.05,
-                    "position_size_pct": 10,
-                    "timeframe": "medium",
-                    "key_reasons": ["Unable to analyze"],
-                    "risks": ["Analysis error"],
-                    "technical_score": 50,
-                    "fundamental_score": 50,
-                    "sentiment_score": 50,
-                },
-                model=model
-            )
-            
-            llm_time = int((time.time() - llm_start) * 1000)
-            logger.info(f"LLM call completed in {llm_time}ms")
-            
-            # Phase 4: Validate and constrain output
-            analysis = self._validate_and_constrain(analysis, current_price)
-            
-            # Build final result
-            total_time = int((time.time() - start_time) * 1000)
-            
-            # Extract detailed analysis sections
-            detailed_analysis = analysis.get("analysis", {})
-            if isinstance(detailed_analysis, str):
-                # If AI returned a string instead of dict, use it as technical analysis
-                detailed_analysis = {"technical": detailed_analysis, "fundamental": "", "sentiment": ""}
-            
-            result.update({
-                "decision": analysis.get("decision", "HOLD"),
-                "confidence": analysis.get("confidence", 50),
-                "summary": analysis.get("summary", ""),
-                "detailed_analysis": {
-                    "technical": detailed_analysis.get("technical", ""),
-                    "fundamental": detailed_analysis.get("fundamental", ""),
-                    "sentiment": detailed_analysis.get("sentiment", ""),
-                },
-                "trading_plan": {
-                    "entry_price": analysis.get("entry_price"),
-                    "stop_loss": analysis.get("stop_loss"),
-                    "take_profit": analysis.get("take_profit"),
-                    "position_size_pct": analysis.get("position_size_pct", 10),
-                    "timeframe": analysis.get("timeframe", "medium"),
-                },
-                "reasons": analysis.get("key_reasons", []),
-                "risks": analysis.get("risks", []),
-                "scores": {
-                    "technical": analysis.get("technical_score", 50),
-                    "fundamental": analysis.get("fundamental_score", 50),
-                    "sentiment": analysis.get("sentiment_score", 50),
-                    "overall": self._calculate_overall_score(analysis),
-                },
-                "market_data": {
-                    "current_price": current_price,
-                    "change_24h": data["price"].get("changePercent", 0),
-                    "support": data["indicators"].get("levels", {}).get("support"),
-                    "resistance": data["indicators"].get("levels", {}).get("resistance"),
-                },
-                "indicators": data.get("indicators", {}),
-                "analysis_time_ms": total_time,
-                "llm_time_ms": llm_time,
-                "data_collection_time_ms": data.get("collection_time_ms", 0),
-            })
-            
-            # Store in memory for future retrieval and get memory_id for feedback
-            memory_id = self._store_analysis_memory(result, user_id=user_id)
-            if memory_id:
-                result["memory_id"] = memory_id
-            
-            logger.info(f"Fast analysis completed in {total_time}ms: {market}:{symbol} -> {result['decision']} (memory_id={memory_id}, user_id={user_id})")
-            
+            self._analyze_data(result, data, language, model, user_id, start_time)
         except Exception as e:
             logger.error(f"Fast analysis failed: {e}", exc_info=True)
             result["error"] = str(e)
         
         return result
     
+    def _analyze_data(self, result: Dict[str, Any], data: Dict[str, Any], language: str,
+                      model: Optional[str], user_id: Optional[int], start_time: float) -> None:
+        """Phases 2-4 of analyze() on already collected market data; fills `result` in place."""
+        market, symbol = result["market"], result["symbol"]
+        # Validate we have essential data - with fallback to indicators
+        current_price = None
+        
+        # 优先从 price 数据获取
+        if data.get("price") and data["price"].get("price"):
+            current_price = data["price"]["price"]
+        
+        # Fallback: 从 indicators 获取 (如果 K 线成功计算了)
+        if not current_price and data.get("indicators"):
+            current_price = data["indicators"].get("current_price")
+            if current_price:
+                logger.info(f"Using price from indicators: ${current_price}")
+                # 构建简化的 price 数据
+                data["price"] = {
+                    "price": current_price,
+                    "change": 0,
+                    "changePercent": 0,
+                    "source": "indicators_fallback"
+                }
+        
+        # Fallback: 从 kline 最后一根获取
+        if not current_price and data.get("kline"):
+            klines = data["kline"]
+            if klines and len(klines) > 0:
+                current_price = float(klines[-1].get("close", 0))
+                if current_price > 0:
+                    logger.info(f"Using price from kline: ${current_price}")
+                    prev_close = float(klines[-2].get("close", current_price)) if len(klines) > 1 else current_price
+                    change = current_price - prev_close
+                    change_pct = (change / prev_close * 100) if prev_close > 0 else 0
+                    data["price"] = {
+                        "price": current_price,
+                        "change": round(change, 6),
+                        "changePercent": round(change_pct, 2),
+                        "source": "kline_fallback"
+                    }
+        
+        if not current_price or current_price <= 0:
+            result["error"] = "Failed to fetch current price from all sources"
+            logger.error(f"Price fetch failed for {market}:{symbol}, all sources exhausted")
+            return
+        
+        # Phase 2: Build prompt
+        system_prompt, user_prompt = self._build_analysis_prompt(data, language)
+        
+        # Phase 3: Single LLM call
+        logger.info(f"Calling LLM for analysis...")
+        llm_start = time.time()
+        
+        analysis = self.llm_service.safe_call_llm(
+            system_prompt,
+            user_prompt,
+            default_structure={
+                "decision": "HOLD",
+                "confidence": 50,
+                "summary": "Analysis failed",
+                "entry_price": current_price,
+                "stop_loss": current_price * 0.95,
+                "take_profit": current_price * 1.05,
+                "position_size_pct": 10,
+                "timeframe": "medium",
+                "key_reasons": ["Unable to analyze"],
+                "risks": ["Analysis error"],
+                "technical_score": 50,
+                "fundamental_score": 50,
+                "sentiment_score": 50,
+            },
+            model=model
+        )
+        
+        llm_time = int((time.time() - llm_start) * 1000)
+        logger.info(f"LLM call completed in {llm_time}ms")
+        
+        # Phase 4: Validate and constrain output
+        analysis = self._validate_and_constrain(analysis, current_price)
+        
+        # Build final result
+        total_time = int((time.time() - start_time) * 1000)
+        
+        # Extract detailed analysis sections
+        detailed_analysis = analysis.get("analysis", {})
+        if isinstance(detailed_analysis, str):
+            # If AI returned a string instead of dict, use it as technical analysis
+            detailed_analysis = {"technical": detailed_analysis, "fundamental": "", "sentiment": ""}
+        
+        result.update({
+            "decision": analysis.get("decision", "HOLD"),
+            "confidence": analysis.get("confidence", 50),
+            "summary": analysis.get("summary", ""),
+            "detailed_analysis": {
+                "technical": detailed_analysis.get("technical", ""),
+                "fundamental": detailed_analysis.get("fundamental", ""),
+                "sentiment": detailed_analysis.get("sentiment", ""),
+            },
+            "trading_plan": {
+                "entry_price": analysis.get("entry_price"),
+                "stop_loss": analysis.get("stop_loss"),
+                "take_profit": analysis.get("take_profit"),
+                "position_size_pct": analysis.get("position_size_pct", 10),
+                "timeframe": analysis.get("timeframe", "medium"),
+            },
+            "reasons": analysis.get("key_reasons", []),
+            "risks": analysis.get("risks", []),
+            "scores": {
+                "technical": analysis.get("technical_score", 50),
+                "fundamental": analysis.get("fundamental_score", 50),
+                "sentiment": analysis.get("sentiment_score", 50),
+                "overall": self._calculate_overall_score(analysis),
+            },
+            "market_data": {
+                "current_price": current_price,
+                "change_24h": data["price"].get("changePercent", 0),
+                "support": data["indicators"].get("levels", {}).get("support"),
+                "resistance": data["indicators"].get("levels", {}).get("resistance"),
+            },
+            "indicators": data.get("indicators", {}),
+            "analysis_time_ms": total_time,
+            "llm_time_ms": llm_time,
+            "data_collection_time_ms": data.get("collection_time_ms") or (data.get("_meta") or {}).get("duration_ms", 0),
+        })
+        
+        # Store in memory for future retrieval and get memory_id for feedback
+        memory_id = self._store_analysis_memory(result, user_id=user_id)
+        if memory_id:
+            result["memory_id"] = memory_id
+        
+        logger.info(f"Fast analysis completed in {total_time}ms: {market}:{symbol} -> {result['decision']} (memory_id={memory_id}, user_id={user_id})")
+    
+    def analyze_batch(self, market: str, symbols: List[str], language: str = 'en-US',
+                      model: str = None, timeframe: str = "1D", user_id: int = None) -> Dict[str, Any]:
+        """
+        Analyze a watchlist of symbols in one market.
+        
+        Market-wide data (macro indicators, general news) is collected once and shared; per-symbol
+        data is fetched concurrently (MarketDataCollector.collect_batch). Each symbol's LLM call starts
+        as soon as its data is ready, at most FAST_ANALYSIS_LLM_CONCURRENCY at a time.
+        
+        Returns:
+            {"market", "timeframe", "results": [analyze() results in input order], "timing": per-phase ms}
+        
+        Raises:
+            ValueError: more than FAST_ANALYSIS_BATCH_MAX_SYMBOLS distinct symbols
+        """
+        start_time = time.time()
+        max_symbols = max(1, int(os.getenv('FAST_ANALYSIS_BATCH_MAX_SYMBOLS', '20')))
+        llm_workers = max(1, int(os.getenv('FAST_ANALYSIS_LLM_CONCURRENCY', '4')))
+        
+        unique: List[str] = []
+        for sym in symbols or []:
+            sym = str(sym or '').strip()
+            if sym and sym not in unique:
+                unique.append(sym)
+        if len(unique) > max_symbols:
+            raise ValueError(f"Too many symbols: {len(unique)} (max {max_symbols} per batch)")
+        
+        results: Dict[str, Dict[str, Any]] = {
+            sym: {
+                "market": market,
+                "symbol": sym,
+                "language": language,
+                "timeframe": timeframe,
+                "analysis_time_ms": 0,
+                "error": None,
+            }
+            for sym in unique
+        }
+        llm_ms: List[int] = []
+        
+        def run(sym: str, data: Dict[str, Any]) -> None:
+            try:
+                self._analyze_data(results[sym], data, language, model, user_id, start_time)
+                if results[sym].get("llm_time_ms"):
+                    llm_ms.append(results[sym]["llm_time_ms"])
+            except Exception as e:
+                logger.error(f"Batch analysis failed for {market}:{sym}: {e}", exc_info=True)
+                results[sym]["error"] = str(e)
+        
+        logger.info(f"Fast batch analysis starting: {market} x{len(unique)}")
+        with ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="fast-analysis-llm") as pool:
+            futures = []
+            collected = self.data_collector.collect_batch(
+                market=market,
+                symbols=unique,
+                timeframe=timeframe,
+                include_macro=True,
+                include_news=True,
+                on_ready=lambda sym, data: futures.append(pool.submit(run, sym, data)),
+            )
+            data_done = time.time()
+            for future in futures:
+                future.result()
+        
+        for sym in unique:
+            if sym not in collected["symbols"] and not results[sym].get("decision"):
+                results[sym]["error"] = results[sym]["error"] or "Market data collection failed"
+        
+        total_ms = int((time.time() - start_time) * 1000)
+        timing = {
+            "data": collected.get("timing", {}),
+            "data_ms": int((data_done - start_time) * 1000),
+            "llm_wait_ms": int((time.time() - data_done) * 1000),
+            "llm_calls": len(llm_ms),
+            "llm_avg_ms": int(sum(llm_ms) / len(llm_ms)) if llm_ms else 0,
+            "llm_concurrency": llm_workers,
+            "total_ms": total_ms,
+        }
+        failed = sum(1 for r in results.values() if r.get("error"))
+        logger.info(f"Fast batch analysis completed in {total_ms}ms: {market} x{len(unique)} ({failed} failed)")
+        return {
+            "market": market,
+            "timeframe": timeframe,
+            "results": [results[sym] for sym in unique],
+            "failed": failed,
+            "timing": timing,
+        }
+    
     def _validate_and_constrain(self, analysis: Dict, current_price: float) -> Dict:
         """
         Validate LLM output and constrain prices to reasonable ranges.
@@ -0,0 +1,353 @@
+"""
+Incremental indicator evaluation for live strategies.
+
+- Streaming versions of the built-in helpers (SMA/EMA/RSI/MACD/BOLL/ATR, see
+  `BacktestService._get_indicator_functions`) with O(1) updates. Their outputs match the
+  pandas versions bar by bar (NaN until the window is warm).
+- `BarRingBuffer`: fixed-capacity OHLCV buffer per strategy; new klines only append / replace
+  the forming bar instead of rebuilding the whole DataFrame.
+- `IncrementalIndicator`: drives an indicator's optional `on_bar(bar, state)` hook. Closed bars
+  are committed once; the forming bar is evaluated on a copy of the state on every tick.
+
+Indicator scripts opt in by defining `on_bar`; scripts without it keep the full-recompute path:
+
+    def on_bar(bar, state):
+        fast = state.setdefault('fast', SMAStream(params['fast']))
+        slow = state.setdefault('slow', SMAStream(params['slow']))
+        cross = state.setdefault('cross', CrossStream())
+        up, down = cross.update(fast.update(bar['close']), slow.update(bar['close']))
+        return {'buy': up, 'sell': down}
+
+Before every call the executor sets `state['position']` (1/-1/0), `state['avg_entry_price']`
+and `state['highest_price']`; the script may update `state['highest_price']`.
+"""
+import copy
+import math
+import os
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+NAN = float('nan')
+
+
+def incremental_indicator_enabled() -> bool:
+    return os.getenv('INCREMENTAL_INDICATOR_ENABLED', 'true').lower() == 'true'
+
+
+# ---------------------------------------------------------------------------
+# Streaming helpers
+# ---------------------------------------------------------------------------
+
+class SMAStream:
+    """Streaming `series.rolling(window=period).mean()`."""
+
+    def __init__(self, period: int):
+        self.period = int(period)
+        self._window = deque()
+        self._sum = 0.0
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        x = float(x)
+        self._window.append(x)
+        self._sum += x
+        if len(self._window) > self.period:
+            self._sum -= self._window.popleft()
+        self.value = self._sum / self.period if len(self._window) == self.period else NAN
+        return self.value
+
+
+class EMAStream:
+    """Streaming `series.ewm(span=period, adjust=False).mean()`."""
+
+    def __init__(self, period: int):
+        self.alpha = 2.0 / (float(period) + 1.0)
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        x = float(x)
+        self.value = x if math.isnan(self.value) else self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+class RSIStream:
+    """Streaming RSI with simple-moving-average gains/losses (same formula as the backtest helper)."""
+
+    def __init__(self, period: int = 14):
+        self._gain = SMAStream(period)
+        self._loss = SMAStream(period)
+        self._prev = None
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        x = float(x)
+        delta = 0.0 if self._prev is None else x - self._prev
+        self._prev = x
+        gain = self._gain.update(delta if delta > 0 else 0.0)
+        loss = self._loss.update(-delta if delta < 0 else 0.0)
+        if math.isnan(gain) or math.isnan(loss) or (gain == 0 and loss == 0):
+            self.value = NAN
+        elif loss == 0:
+            self.value = 100.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + gain / loss)
+        return self.value
+
+
+class MACDStream:
+    """Streaming MACD. `update` returns (macd, signal, hist)."""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self._fast = EMAStream(fast)
+        self._slow = EMAStream(slow)
+        self._signal = EMAStream(signal)
+        self.value = (NAN, NAN, NAN)
+
+    def update(self, x: float) -> Tuple[float, float, float]:
+        macd = self._fast.update(x) - self._slow.update(x)
+        signal = self._signal.update(macd)
+        self.value = (macd, signal, macd - signal)
+        return self.value
+
+
+class BOLLStream:
+    """Streaming Bollinger bands (sample std, ddof=1). `update` returns (upper, middle, lower)."""
+
+    def __init__(self, period: int = 20, std_dev: float = 2):
+        self.period = int(period)
+        self.std_dev = float(std_dev)
+        self._window = deque()
+        self._ref = None  # shift values to keep the running sum of squares well conditioned
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self.value = (NAN, NAN, NAN)
+
+    def update(self, x: float) -> Tuple[float, float, float]:
+        x = float(x)
+        if self._ref is None:
+            self._ref = x
+        d = x - self._ref
+        self._window.append(d)
+        self._sum += d
+        self._sumsq += d * d
+        if len(self._window) > self.period:
+            old = self._window.popleft()
+            self._sum -= old
+            self._sumsq -= old * old
+        n = len(self._window)
+        if n < self.period or n < 2:
+            self.value = (NAN, NAN, NAN)
+            return self.value
+        mean = self._sum / n
+        var = max(0.0, (self._sumsq - n * mean * mean) / (n - 1))
+        std = math.sqrt(var)
+        middle = mean + self._ref
+        self.value = (middle + self.std_dev * std, middle, middle - self.std_dev * std)
+        return self.value
+
+
+class ATRStream:
+    """Streaming ATR (simple moving average of true range). `update(high, low, close)`."""
+
+    def __init__(self, period: int = 14):
+        self._tr = SMAStream(period)
+        self._prev_close = None
+        self.value = NAN
+
+    def update(self, high: float, low: float, close: float) -> float:
+        high, low, close = float(high), float(low), float(close)
+        tr = high - low
+        if self._prev_close is not None:
+            tr = max(tr, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self.value = self._tr.update(tr)
+        return self.value
+
+
+class CrossStream:
+    """Streaming CROSSOVER / CROSSUNDER. `update(a, b)` returns (crossed_over, crossed_under)."""
+
+    def __init__(self):
+        self._prev = None
+
+    def update(self, a: float, b: float) -> Tuple[bool, bool]:
+        a, b = float(a), float(b)
+        prev = self._prev
+        self._prev = (a, b)
+        if prev is None:
+            return False, False
+        pa, pb = prev
+        return bool(a > b and pa <= pb), bool(a < b and pa >= pb)
+
+
+STREAMING_HELPERS = {
+    'SMAStream': SMAStream,
+    'EMAStream': EMAStream,
+    'RSIStream': RSIStream,
+    'MACDStream': MACDStream,
+    'BOLLStream': BOLLStream,
+    'ATRStream': ATRStream,
+    'CrossStream': CrossStream,
+}
+
+
+# ---------------------------------------------------------------------------
+# Rolling bar buffer
+# ---------------------------------------------------------------------------
+
+class BarRingBuffer:
+    """
+    Fixed-capacity OHLCV buffer.
+
+    Each bar is written twice (at i and i + capacity) so the latest `capacity` bars are always a
+    contiguous slice; appends are O(1) and `frame()` needs no re-sorting or concatenation.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(2, int(capacity))
+        self._time = np.zeros(self.capacity * 2, dtype=np.int64)
+        self._data = np.zeros((len(OHLCV_COLUMNS), self.capacity * 2), dtype=np.float64)
+        self._count = 0
+        self._next = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def last_time(self) -> Optional[int]:
+        if self._count == 0:
+            return None
+        return int(self._time[(self._next - 1) % self.capacity])
+
+    def _write(self, slot: int, ts: int, values: List[float]) -> None:
+        for s in (slot, slot + self.capacity):
+            self._time[s] = ts
+            self._data[:, s] = values
+
+    def extend(self, klines: List[Dict[str, Any]]) -> int:
+        """
+        Merge klines (ascending). Newer bars are appended, a bar with the current last time
+        replaces it (forming bar update), older bars are ignored. Returns the number of appended bars.
+        """
+        appended = 0
+        for k in klines or []:
+            ts = k.get('time', k.get('timestamp'))
+            if ts is None:
+                continue
+            try:
+                ts = int(ts)
+                values = [float(k.get(col)) for col in OHLCV_COLUMNS]
+            except (TypeError, ValueError):
+                continue
+            if any(math.isnan(v) for v in values):
+                continue
+            last = self.last_time
+            if last is not None and ts < last:
+                continue
+            if last is not None and ts == last:
+                self._write((self._next - 1) % self.capacity, ts, values)
+                continue
+            self._write(self._next, ts, values)
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            appended += 1
+        return appended
+
+    def frame(self) -> pd.DataFrame:
+        """The buffered bars as a DataFrame in `_klines_to_dataframe` format (UTC index, float64)."""
+        if self._count == 0:
+            return pd.DataFrame(columns=list(OHLCV_COLUMNS))
+        if self._count < self.capacity:
+            start, end = 0, self._count
+        else:
+            start, end = self._next, self._next + self.capacity
+        index = pd.to_datetime(self._time[start:end], unit='s', utc=True)
+        index.name = 'time'
+        return pd.DataFrame(
+            {col: self._data[row, start:end].copy() for row, col in enumerate(OHLCV_COLUMNS)},
+            index=index
+        )
+
+
+# ---------------------------------------------------------------------------
+# on_bar driver
+# ---------------------------------------------------------------------------
+
+def epoch_seconds(index: pd.DatetimeIndex) -> np.ndarray:
+    """Epoch seconds of a DatetimeIndex regardless of its resolution (ns in pandas 2, s/us in pandas 3)."""
+    if hasattr(index, 'as_unit'):
+        return index.as_unit('s').asi8
+    return index.asi8 // 10 ** 9
+
+
+def bars_from_frame(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """DataFrame rows -> bar dicts passed to `on_bar` (time in epoch seconds)."""
+    times = epoch_seconds(df.index).tolist() if isinstance(df.index, pd.DatetimeIndex) else list(range(len(df)))
+    cols = [df[c].tolist() if c in df.columns else [0.0] * len(df) for c in OHLCV_COLUMNS]
+    return [dict(zip(('time',) + OHLCV_COLUMNS, row)) for row in zip(times, *cols)]
+
+
+class IncrementalIndicator:
+    """State holder for an indicator's `on_bar(bar, state)` hook."""
+
+    def __init__(self, on_bar: Callable[[Dict[str, Any], Dict[str, Any]], Any]):
+        self.on_bar = on_bar
+        self.state: Dict[str, Any] = {}
+        self.committed_time: Optional[int] = None
+        self.last_bar: Optional[Dict[str, Any]] = None
+        self.last_output: Dict[str, Any] = {}
+
+    def set_context(self, position: int = 0, avg_entry_price: float = 0.0, highest_price: float = 0.0) -> None:
+        self.state['position'] = int(position)
+        self.state['avg_entry_price'] = float(avg_entry_price)
+        self.state['highest_price'] = float(highest_price)
+
+    @staticmethod
+    def _call(on_bar, bar: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+        out = on_bar(dict(bar), state)
+        if out is None:
+            return {}
+        if not isinstance(out, dict):
+            raise ValueError("on_bar must return a dict of signal flags (or None)")
+        return out
+
+    def commit(self, bars: List[Dict[str, Any]]) -> int:
+        """Feed closed bars newer than the last committed one. Returns how many were applied."""
+        applied = 0
+        for bar in bars:
+            if self.committed_time is not None and int(bar['time']) <= self.committed_time:
+                continue
+            self.last_output = self._call(self.on_bar, bar, self.state)
+            self.last_bar = bar
+            self.committed_time = int(bar['time'])
+            applied += 1
+        return applied
+
+    def peek(self, bars: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Evaluate uncommitted (forming) bars on a copy of the state."""
+        state = copy.deepcopy(self.state)
+        return [self._call(self.on_bar, bar, state) for bar in bars], state
+
+    def signal_frame(self, pending_bars: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Build the last-two-rows frame (last committed bar + forming bars) with the signal columns
+        returned by `on_bar`, in the same shape the full-recompute path produces.
+        """
+        outputs, state = self.peek(pending_bars)
+        rows = ([self.last_bar] if self.last_bar else []) + list(pending_bars)
+        outs = ([self.last_output] if self.last_bar else []) + outputs
+        rows, outs = rows[-2:], outs[-2:]
+        index = pd.to_datetime([int(b['time']) for b in rows], unit='s', utc=True)
+        data = {col: [float(b.get(col, 0.0)) for b in rows] for col in OHLCV_COLUMNS}
+        keys = []
+        for out in outs:
+            keys.extend(k for k in out if k not in keys and k not in data)
+        for key in keys:
+            default = 0.0 if key in ('position_size', 'reduce_size') else False
+            data[key] = [out.get(key, default) for out in outs]
+        return pd.DataFrame(data, index=index), state
@@ -0,0 +1,231 @@
+"""
+编译后指标代码缓存（进程级 LRU）
+
+回测、实盘策略和 call_indicator 每次执行都会重复：安全校验(validate_code_safety) →
+解析 @param 声明 → 构建 safe builtins → exec 原始源码。实盘每根K线、参数扫描每个组合
+都要付一次这个成本。这里按源码 SHA-256 缓存：
+
+- compile() 后的 code object、参数声明、安全校验结果；
+- 合并后的参数（键为 源码哈希 + 参数JSON 的 SHA-256）；
+- 按允许模块列表缓存的 safe builtins 模板（每次执行浅拷贝，脚本改不到共享字典）。
+
+saveIndicator / deleteIndicator 会按指标ID失效对应条目。
+"""
+import builtins
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.services.indicator_params import IndicatorParamsParser
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+BLOCKED_BUILTINS = (
+    'eval', 'exec', 'compile', 'open', 'input',
+    'help', 'exit', 'quit', '__import__',
+    'copyright', 'credits', 'license'
+)
+DEFAULT_ALLOWED_MODULES = ('numpy', 'pandas', 'math', 'json', 'time')
+PRE_IMPORT_CODE = "import numpy as np\nimport pandas as pd\n"
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256((code or '').encode('utf-8')).hexdigest()
+
+
+class CompiledIndicator:
+    """One cache entry: compiled code plus everything derived from the source alone."""
+
+    __slots__ = ('code_hash', 'source', 'code_obj', 'declared_params', '_safety')
+
+    def __init__(self, code_hash: str, source: str, code_obj: Any, declared_params: List[Dict[str, Any]]):
+        self.code_hash = code_hash
+        self.source = source
+        self.code_obj = code_obj
+        self.declared_params = declared_params
+        self._safety: Optional[Tuple[bool, Optional[str]]] = None
+
+    def safety(self) -> Tuple[bool, Optional[str]]:
+        """validate_code_safety() result, computed once per source."""
+        if self._safety is None:
+            from app.utils.safe_exec import validate_code_safety
+            self._safety = validate_code_safety(self.source)
+        return self._safety
+
+
+class IndicatorCodeCache:
+    """线程安全的编译代码 LRU 缓存"""
+
+    def __init__(self, maxsize: Optional[int] = None):
+        if maxsize is None:
+            try:
+                maxsize = int(os.getenv('INDICATOR_CODE_CACHE_SIZE', '256'))
+            except Exception:
+                maxsize = 256
+        self.maxsize = max(1, int(maxsize))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CompiledIndicator]" = OrderedDict()
+        self._params: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._builtins: Dict[Tuple[Tuple[str, ...], str], Dict[str, Any]] = {}
+        self._indicator_hashes: Dict[int, str] = {}
+        self._pre_import = compile(PRE_IMPORT_CODE, '<pre_import>', 'exec')
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, code: str, indicator_id: Any = None) -> CompiledIndicator:
+        """
+        Return the compiled entry for `code`, compiling it on a miss.
+
+        Args:
+            code: indicator source
+            indicator_id: saved indicator this source belongs to (enables invalidate(indicator_id))
+
+        Raises:
+            SyntaxError: the source does not compile (not cached)
+        """
+        key = code_hash(code)
+        if indicator_id:
+            self.bind_indicator(indicator_id, code)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        # Compile outside the lock; a concurrent miss on the same source just compiles twice.
+        entry = CompiledIndicator(
+            key, code,
+            compile(code, '<indicator>', 'exec'),
+            IndicatorParamsParser.parse_params(code)
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                old_key, _ = self._entries.popitem(last=False)
+                self._drop_params(old_key)
+        return entry
+
+    def merged_params(self, entry: CompiledIndicator, user_params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """IndicatorParamsParser.merge_params() memoized by SHA-256 of source hash + params."""
+        try:
+            params_json = json.dumps(user_params or {}, sort_keys=True, default=str)
+        except Exception:
+            return IndicatorParamsParser.merge_params(entry.declared_params, user_params or {})
+        key = entry.code_hash + ':' + hashlib.sha256(params_json.encode('utf-8')).hexdigest()
+        with self._lock:
+            merged = self._params.get(key)
+            if merged is not None:
+                self._params.move_to_end(key)
+        if merged is None:
+            merged = IndicatorParamsParser.merge_params(entry.declared_params, user_params or {})
+            with self._lock:
+                self._params[key] = merged
+                while len(self._params) > self.maxsize * 4:
+                    self._params.popitem(last=False)
+        # Scripts may mutate params; never hand out the cached dict itself.
+        return copy.deepcopy(merged)
+
+    def _drop_params(self, key: str) -> None:
+        prefix = key + ':'
+        for k in [k for k in self._params if k.startswith(prefix)]:
+            del self._params[k]
+
+    def safe_builtins(
+        self,
+        allowed_modules: Iterable[str] = DEFAULT_ALLOWED_MODULES,
+        import_error: str = "Import not allowed: {name}"
+    ) -> Dict[str, Any]:
+        """Fresh copy of the restricted builtins dict (template built once per module allowlist)."""
+        allowed = tuple(allowed_modules)
+        tpl_key = (allowed, import_error)
+        template = self._builtins.get(tpl_key)
+        if template is None:
+            def safe_import(name, *args, **kwargs):
+                if name in allowed or name.split('.')[0] in allowed:
+                    return builtins.__import__(name, *args, **kwargs)
+                raise ImportError(import_error.format(name=name))
+
+            template = {k: getattr(builtins, k) for k in dir(builtins)
+                        if not k.startswith('_') and k not in BLOCKED_BUILTINS}
+            template['__import__'] = safe_import
+            self._builtins[tpl_key] = template
+        return dict(template)
+
+    def prepare_env(
+        self,
+        local_vars: Dict[str, Any],
+        allowed_modules: Iterable[str] = DEFAULT_ALLOWED_MODULES,
+        import_error: str = "Import not allowed: {name}"
+    ) -> Dict[str, Any]:
+        """Execution namespace: local_vars + restricted builtins + np/pd pre-imported."""
+        exec_env = dict(local_vars)
+        exec_env['__builtins__'] = self.safe_builtins(allowed_modules, import_error)
+        exec(self._pre_import, exec_env)
+        return exec_env
+
+    def bind_indicator(self, indicator_id: Any, code: str) -> None:
+        """Remember which source belongs to a saved indicator so saveIndicator can invalidate it."""
+        try:
+            indicator_id = int(indicator_id)
+        except Exception:
+            return
+        with self._lock:
+            self._indicator_hashes[indicator_id] = code_hash(code)
+
+    def invalidate(self, indicator_id: Any = None, code: Optional[str] = None) -> None:
+        """Drop cached entries for an indicator ID and/or a specific source."""
+        keys = set()
+        with self._lock:
+            if indicator_id is not None:
+                try:
+                    key = self._indicator_hashes.pop(int(indicator_id), None)
+                except Exception:
+                    key = None
+                if key:
+                    keys.add(key)
+            if code is not None:
+                keys.add(code_hash(code))
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+                self._drop_params(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._params.clear()
+            self._indicator_hashes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'invalidations': self.invalidations,
+                'params_cached': len(self._params),
+            }
+
+
+_cache: Optional[IndicatorCodeCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_indicator_code_cache() -> IndicatorCodeCache:
+    """Process-wide IndicatorCodeCache singleton."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = IndicatorCodeCache()
+        return _cache
@@ -183,9 +183,12 @@ class IndicatorCaller:
         self._call_stack.append(indicator_id)
         
         try:
+            # 编译结果按源码哈希缓存；记录 指标ID -> 源码，saveIndicator 时失效
+            from app.services.indicator_code_cache import get_indicator_code_cache
+            code_cache = get_indicator_code_cache()
+            compiled = code_cache.get(indicator_code, indicator_id)
             # 解析并合并参数
-            declared_params = IndicatorParamsParser.parse_params(indicator_code)
-            merged_params = IndicatorParamsParser.merge_params(declared_params, params or {})
+            merged_params = code_cache.merged_params(compiled, params or {})
             
             # 准备执行环境
             df_copy = df.copy()
@@ -205,27 +208,8 @@ class IndicatorCaller:
             }
             
             # 安全执行
-            import builtins
-            def safe_import(name, *args, **kwargs):
-                allowed_modules = ['numpy', 'pandas', 'math', 'json', 'time']
-                if name in allowed_modules or name.split('.')[0] in allowed_modules:
-                    return builtins.__import__(name, *args, **kwargs)
-                raise ImportError(f"Module not allowed: {name}")
-            
-            safe_builtins = {k: getattr(builtins, k) for k in dir(builtins) 
-                           if not k.startswith('_') and k not in [
-                               'eval', 'exec', 'compile', 'open', 'input',
-                               'help', 'exit', 'quit', '__import__',
-                               'copyright', 'credits', 'license'
-                           ]}
-            safe_builtins['__import__'] = safe_import
-            
-            exec_env = local_vars.copy()
-            exec_env['__builtins__'] = safe_builtins
-            
-            pre_import = "import numpy as np\nimport pandas as pd\n"
-            exec(pre_import, exec_env)
-            exec(indicator_code, exec_env)
+            exec_env = code_cache.prepare_env(local_vars, import_error="Module not allowed: {name}")
+            exec(compiled.code_obj, exec_env)
             
             return exec_env.get('df', df_copy)
             
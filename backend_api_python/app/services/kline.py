@@ -1,9 +1,11 @@
 """
 K线数据服务
 """
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 
 from app.data_sources import DataSourceFactory
+from app.data_sources.crypto_stream import get_crypto_stream
 from app.utils.cache import CacheManager
 from app.utils.logger import get_logger
 from app.config import CacheConfig
@@ -45,7 +47,7 @@ class KlineService:
             cached = self.cache.get(cache_key)
             if cached:
                 # logger.info(f"命中缓存: {cache_key}")
-                return cached
+                return self._with_live_bar(market, symbol, timeframe, cached, before_time)
         
         # 获取数据
         klines = DataSourceFactory.get_kline(
@@ -62,7 +64,17 @@ class KlineService:
             self.cache.set(cache_key, klines, ttl)
             # logger.info(f"缓存设置: {cache_key}, TTL: {ttl}s")
         
-        return klines
+        return self._with_live_bar(market, symbol, timeframe, klines, before_time)
+
+    @staticmethod
+    def _with_live_bar(market: str, symbol: str, timeframe: str, klines: List[Dict[str, Any]], before_time: Optional[int]) -> List[Dict[str, Any]]:
+        """加密货币最新 1m K 线：用 WebSocket 实时未收盘 K 线覆盖缓存中的最后一根"""
+        if market != 'Crypto' or timeframe != '1m' or before_time or not klines:
+            return klines
+        stream = get_crypto_stream()
+        if stream is None:
+            return klines
+        return stream.merge_partial_bar(symbol, klines)
     
     def get_latest_price(self, market: str, symbol: str) -> Optional[Dict[str, Any]]:
         """获取最新价格（使用1分钟K线，已弃用，建议使用 get_realtime_price）"""
@@ -95,6 +107,22 @@ class KlineService:
         # 构建缓存键（短时间缓存，避免频繁请求）
         cache_key = f"realtime_price:{market}:{symbol}"
         
+        # 加密货币：WebSocket 行情流的内存快照比 30 秒缓存更新，优先使用
+        if market == 'Crypto':
+            stream = get_crypto_stream()
+            live = stream.get_ticker(symbol) if stream is not None else None
+            if live and live.get('last', 0) > 0:
+                return {
+                    'price': live.get('last', 0),
+                    'change': live.get('change', 0),
+                    'changePercent': live.get('changePercent', 0),
+                    'high': live.get('high', 0),
+                    'low': live.get('low', 0),
+                    'open': live.get('open', 0),
+                    'previousClose': live.get('previousClose', 0),
+                    'source': 'stream'
+                }
+
         # 如果不是强制刷新，尝试使用缓存
         if not force_refresh:
             cached = self.cache.get(cache_key)
@@ -188,3 +216,55 @@ class KlineService:
         
         return result
 
+    def get_realtime_prices(self, market: str, symbols: List[str], max_workers: int = 8) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取实时价格（同一市场多个 symbol）
+
+        先读 30 秒缓存，未命中的 symbol 通过数据源批量报价接口一次获取（Crypto: fetch_tickers，
+        A股/港股: 腾讯批量行情），仍缺失的再并发调用 get_realtime_price 逐个降级。
+
+        Returns:
+            {symbol: 与 get_realtime_price 相同格式的价格数据}
+        """
+        symbols = [s for s in dict.fromkeys(symbols or []) if s]
+        results: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for symbol in symbols:
+            cached = self.cache.get(f"realtime_price:{market}:{symbol}")
+            if cached:
+                results[symbol] = cached
+            else:
+                missing.append(symbol)
+
+        if len(missing) > 1:
+            for symbol, ticker in DataSourceFactory.get_tickers(market, missing).items():
+                if not ticker or not ticker.get('last', 0) > 0:
+                    continue
+                result = {
+                    'price': ticker.get('last', 0),
+                    'change': ticker.get('change', 0),
+                    'changePercent': ticker.get('changePercent', ticker.get('percentage', 0)),
+                    'high': ticker.get('high', 0),
+                    'low': ticker.get('low', 0),
+                    'open': ticker.get('open', 0),
+                    'previousClose': ticker.get('previousClose', 0),
+                    'source': 'ticker'
+                }
+                self.cache.set(f"realtime_price:{market}:{symbol}", result, 30)
+                results[symbol] = result
+            missing = [s for s in missing if s not in results]
+
+        def fetch_one(symbol: str) -> Optional[Dict[str, Any]]:
+            try:
+                return self.get_realtime_price(market, symbol)
+            except Exception as e:
+                logger.debug(f"Realtime price failed for {market}:{symbol}: {e}")
+                return None
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as executor:
+                for symbol, result in zip(missing, executor.map(fetch_one, missing)):
+                    if result:
+                        results[symbol] = result
+        return results
+
@@ -4,6 +4,7 @@ Base REST client helpers for direct exchange connections.
 Notes:
 - Keep this minimal and dependency-light (requests only).
 - All secrets must be excluded from logs.
+- HTTP goes through pooled keep-alive sessions (see http_pool.py), not one-off `requests.request` calls.
 """
 
 from __future__ import annotations
@@ -13,7 +14,7 @@ import time
 from dataclasses import dataclass
 from typing import Any, Dict, Optional, Tuple
 
-import requests
+from app.services.live_trading.http_pool import get_http_pool
 
 
 @dataclass
@@ -51,14 +52,13 @@ class BaseRestClient:
         data: Optional[Any] = None,
     ) -> Tuple[int, Dict[str, Any], str]:
         url = self._url(path)
-        resp = requests.request(
-            method=str(method or "GET").upper(),
-            url=url,
+        resp = self._http_request(
+            str(method or "GET").upper(),
+            url,
             params=params or None,
             json=json_body if json_body is not None else None,
             data=data,
             headers=headers or None,
-            timeout=self.timeout_sec,
         )
         text = resp.text or ""
         parsed: Dict[str, Any] = {}
@@ -68,6 +68,11 @@ class BaseRestClient:
             parsed = {"raw_text": text[:2000]}
         return int(resp.status_code), parsed, text
 
+    def _http_request(self, method: str, url: str, **kwargs: Any) -> Any:
+        """Raw request on the pooled keep-alive session for url's host."""
+        kwargs.setdefault("timeout", self.timeout_sec)
+        return get_http_pool().request(method, url, **kwargs)
+
     @staticmethod
     def _now_ms() -> int:
         return int(time.time() * 1000)
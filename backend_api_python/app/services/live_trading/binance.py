@@ -15,6 +15,7 @@ from typing import Any, Dict, Optional, Tuple
 from urllib.parse import urlencode
 
 from app.services.live_trading.base import BaseRestClient, LiveOrderResult, LiveTradingError
+from app.services.live_trading.symbol_meta import binance_filters, get_symbol_meta_cache, namespace
 from app.services.live_trading.symbols import to_binance_futures_symbol
 
 
@@ -126,6 +127,10 @@ class BinanceFuturesClient(BaseRestClient):
         sym = to_binance_futures_symbol(symbol)
         if not sym:
             return {}
+        ns = namespace("binance_futures", self.base_url)
+        shared = get_symbol_meta_cache().get(ns, sym)
+        if shared:
+            return shared
         now = time.time()
         cached = self._sym_filter_cache.get(sym)
         if cached:
@@ -133,6 +138,7 @@ class BinanceFuturesClient(BaseRestClient):
             if obj and (now - float(ts or 0.0)) <= float(self._sym_filter_cache_ttl_sec or 300.0):
                 return obj
 
+        # Not in the shared (bulk-preloaded) cache yet: single-symbol fallback.
         raw = self._public_request("GET", "/fapi/v1/exchangeInfo", params={"symbol": sym})
         symbols = raw.get("symbols") if isinstance(raw, dict) else None
         # Important: Binance may still return the full symbols list even when `symbol=...` is provided.
@@ -145,27 +151,11 @@ class BinanceFuturesClient(BaseRestClient):
             except Exception:
                 picked = None
             first = picked if isinstance(picked, dict) else (symbols[0] if isinstance(symbols[0], dict) else {})
-        filters = first.get("filters") if isinstance(first, dict) else None
-        fdict: Dict[str, Any] = {}
-        if isinstance(filters, list):
-            for f in filters:
-                if isinstance(f, dict) and f.get("filterType"):
-                    fdict[str(f.get("filterType"))] = f
-        # Also keep precision metadata when available (used to avoid -1111).
-        try:
-            qty_prec = first.get("quantityPrecision") if isinstance(first, dict) else None
-            price_prec = first.get("pricePrecision") if isinstance(first, dict) else None
-            meta = {
-                "symbol": str(first.get("symbol") or "") if isinstance(first, dict) else "",
-                "contractType": str(first.get("contractType") or "") if isinstance(first, dict) else "",
-                "quantityPrecision": int(qty_prec) if qty_prec is not None else None,
-                "pricePrecision": int(price_prec) if price_prec is not None else None,
-            }
-            fdict["_meta"] = meta
-        except Exception:
-            pass
+        fdict = binance_filters(first, spot=False)
         if fdict:
             self._sym_filter_cache[sym] = (now, fdict)
+            if first:
+                get_symbol_meta_cache().put(ns, sym, fdict)
         return fdict
 
     @staticmethod
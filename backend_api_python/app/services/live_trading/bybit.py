@@ -18,6 +18,7 @@ from typing import Any, Dict, Optional, Tuple
 from urllib.parse import urlencode
 
 from app.services.live_trading.base import BaseRestClient, LiveOrderResult, LiveTradingError
+from app.services.live_trading.symbol_meta import get_symbol_meta_cache, namespace
 from app.services.live_trading.symbols import to_bybit_symbol
 
 
@@ -159,6 +160,10 @@ class BybitClient(BaseRestClient):
         sym = to_bybit_symbol(symbol)
         if not sym:
             return {}
+        ns = namespace("bybit", self.base_url, cat)
+        shared = get_symbol_meta_cache().get(ns, sym)
+        if shared:
+            return shared
         key = f"{cat}:{sym}"
         now = time.time()
         cached = self._inst_cache.get(key)
@@ -171,6 +176,7 @@ class BybitClient(BaseRestClient):
         first: Dict[str, Any] = lst[0] if isinstance(lst, list) and lst else {}
         if isinstance(first, dict) and first:
             self._inst_cache[key] = (now, first)
+            get_symbol_meta_cache().put(ns, sym, first)
         return first if isinstance(first, dict) else {}
 
     def _normalize_qty(self, *, symbol: str, qty: float) -> Decimal:
@@ -0,0 +1,176 @@
+"""
+Registry of warm exchange clients.
+
+`create_client` builds a new client per call, throwing away per-instance caches (e.g. Binance
+symbol filters and dual-side position mode) on every order dispatch / position sync. The registry
+keeps clients keyed by (exchange_id, credential fingerprint, market_type):
+
+- thread-safe, LRU-bounded (LIVE_CLIENT_CACHE_SIZE);
+- clients idle longer than LIVE_CLIENT_IDLE_SEC are evicted;
+- the fingerprint is a SHA-256 of the resolved exchange config, so rotated keys / changed
+  base URLs get a fresh client automatically (secrets are never kept in the key);
+- IBKR / MT5 hold terminal connections with their own lifecycle and are always created fresh.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.live_trading.factory import create_client
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Connection-oriented brokers: not cached here.
+_UNCACHED_EXCHANGES = ("ibkr", "mt5")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _normalize_market_type(exchange_config: Dict[str, Any], market_type: str) -> str:
+    mt = (market_type or exchange_config.get("market_type") or exchange_config.get("defaultType") or "swap")
+    mt = str(mt).strip().lower()
+    if mt in ("futures", "future", "perp", "perpetual"):
+        mt = "swap"
+    return mt
+
+
+def credential_fingerprint(exchange_config: Dict[str, Any]) -> str:
+    """Stable SHA-256 over the whole config (credentials, base URLs, demo flags)."""
+    try:
+        canonical = json.dumps(exchange_config, sort_keys=True, default=str, separators=(",", ":"))
+    except Exception:
+        canonical = repr(sorted((str(k), str(v)) for k, v in exchange_config.items()))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("client", "created_at", "last_used", "uses")
+
+    def __init__(self, client: Any):
+        now = time.time()
+        self.client = client
+        self.created_at = now
+        self.last_used = now
+        self.uses = 0
+
+
+class ExchangeClientRegistry:
+    def __init__(self, max_size: Optional[int] = None, idle_ttl_sec: Optional[float] = None):
+        self.max_size = max(1, int(max_size if max_size is not None else _env_float("LIVE_CLIENT_CACHE_SIZE", 64)))
+        self.idle_ttl_sec = float(idle_ttl_sec if idle_ttl_sec is not None else _env_float("LIVE_CLIENT_IDLE_SEC", 1800))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str, str], _Entry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, exchange_config: Dict[str, Any], *, market_type: str = "swap") -> Any:
+        """Return a warm client for this account/market, creating it via create_client on a miss."""
+        if not isinstance(exchange_config, dict):
+            return create_client(exchange_config, market_type=market_type)
+        exchange_id = str(exchange_config.get("exchange_id") or exchange_config.get("exchangeId") or "").strip().lower()
+        if exchange_id in _UNCACHED_EXCHANGES:
+            return create_client(exchange_config, market_type=market_type)
+
+        mt = _normalize_market_type(exchange_config, market_type)
+        key = (exchange_id, credential_fingerprint(exchange_config), mt)
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.last_used = now
+                entry.uses += 1
+                self.hits += 1
+                return entry.client
+            self.misses += 1
+
+        # Build outside the lock (constructors may do network I/O); first writer wins.
+        client = create_client(exchange_config, market_type=market_type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _Entry(client)
+                self._entries[key] = entry
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            entry.uses += 1
+            entry.last_used = time.time()
+            return entry.client
+
+    def _evict_idle(self, now: float) -> None:
+        if self.idle_ttl_sec <= 0:
+            return
+        stale = [k for k, e in self._entries.items() if now - e.last_used > self.idle_ttl_sec]
+        for k in stale:
+            del self._entries[k]
+            self.evictions += 1
+
+    def invalidate(self, exchange_config: Optional[Dict[str, Any]] = None) -> None:
+        """Drop cached clients for one exchange config (all market types), or everything."""
+        with self._lock:
+            if exchange_config is None:
+                self._entries.clear()
+                return
+            fp = credential_fingerprint(exchange_config)
+            for k in [k for k in self._entries if k[1] == fp]:
+                del self._entries[k]
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            total = self.hits + self.misses
+            clients = [
+                {
+                    "exchange_id": k[0],
+                    "market_type": k[2],
+                    "client": type(e.client).__name__,
+                    "uses": e.uses,
+                    "age_sec": int(now - e.created_at),
+                    "idle_sec": int(now - e.last_used),
+                }
+                for k, e in self._entries.items()
+            ]
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "idle_ttl_sec": self.idle_ttl_sec,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "clients": clients,
+            }
+
+
+_registry: Optional[ExchangeClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> ExchangeClientRegistry:
+    """Process-wide ExchangeClientRegistry singleton."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ExchangeClientRegistry()
+    return _registry
+
+
+def get_client(exchange_config: Dict[str, Any], *, market_type: str = "swap") -> Any:
+    """Drop-in replacement for create_client() that reuses warm clients."""
+    return get_client_registry().get(exchange_config, market_type=market_type)
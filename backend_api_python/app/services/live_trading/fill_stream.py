@@ -0,0 +1,360 @@
+"""
+Private user-data streams that push order executions into an in-process fill bus.
+
+`wait_for_fill` on the REST clients polls `get_order` every 0.5s, which adds up to half a second
+of latency per order and burns rate-limit weight. When LIVE_FILL_STREAM_ENABLED=true the worker
+keeps one private WebSocket per exchange account open; execution reports are published to a
+`FillBus` and `FillStreamManager.wait_for_fill()` waits on it by client order id / order id.
+
+REST polling stays the fallback: accounts without a stream implementation, streams that are not
+connected yet, and waits that time out on the bus all end in the client's own `wait_for_fill`.
+
+Currently implemented: Binance USDT-M futures and Binance spot (listenKey user data streams).
+Stream endpoints can be pointed at a local mock server with BINANCE_FUTURES_WS_BASE /
+BINANCE_SPOT_WS_BASE.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.services.live_trading.base import LiveTradingError
+from app.services.live_trading.binance import BinanceFuturesClient
+from app.services.live_trading.binance_spot import BinanceSpotClient
+from app.utils.logger import get_logger
+
+try:
+    from websockets.sync.client import connect as ws_connect
+except Exception:
+    ws_connect = None
+
+logger = get_logger(__name__)
+
+TERMINAL_STATUSES = ("FILLED", "CANCELED", "EXPIRED", "REJECTED", "EXPIRED_IN_MATCH")
+
+
+def fill_stream_enabled() -> bool:
+    return os.getenv("LIVE_FILL_STREAM_ENABLED", "false").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _fill_done(event: Optional[Dict[str, Any]]) -> bool:
+    """Same completion rule as the REST wait_for_fill: any fill with a price, or a terminal status."""
+    if not event:
+        return False
+    if float(event.get("filled") or 0.0) > 0 and float(event.get("avg_price") or 0.0) > 0:
+        return True
+    return str(event.get("status") or "").upper() in TERMINAL_STATUSES
+
+
+class FillBus:
+    """Latest execution report per (account, order), with blocking waits. Thread-safe."""
+
+    def __init__(self, retain_sec: float = 600.0):
+        self.retain_sec = float(retain_sec)
+        self._cond = threading.Condition()
+        self._events: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.published = 0
+
+    @staticmethod
+    def _keys(order_id: str = "", client_order_id: str = ""):
+        keys = []
+        if client_order_id:
+            keys.append(f"c:{client_order_id}")
+        if order_id:
+            keys.append(f"o:{order_id}")
+        return keys
+
+    def publish(self, account: str, event: Dict[str, Any]) -> None:
+        now = time.time()
+        event.setdefault("ts", now)
+        with self._cond:
+            events = self._events.setdefault(account, {})
+            for k in self._keys(str(event.get("order_id") or ""), str(event.get("client_order_id") or "")):
+                events[k] = event
+            self.published += 1
+            if self.published % 256 == 0:
+                cutoff = now - self.retain_sec
+                for acc in list(self._events):
+                    kept = {k: e for k, e in self._events[acc].items() if float(e.get("ts") or 0) >= cutoff}
+                    if kept:
+                        self._events[acc] = kept
+                    else:
+                        del self._events[acc]
+            self._cond.notify_all()
+
+    def latest(self, account: str, *, order_id: str = "", client_order_id: str = "") -> Optional[Dict[str, Any]]:
+        with self._cond:
+            return self._lookup(account, order_id, client_order_id)
+
+    def _lookup(self, account: str, order_id: str, client_order_id: str) -> Optional[Dict[str, Any]]:
+        events = self._events.get(account) or {}
+        for k in self._keys(order_id, client_order_id):
+            ev = events.get(k)
+            if ev is not None:
+                return ev
+        return None
+
+    def wait(self, account: str, *, order_id: str = "", client_order_id: str = "", timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        """Block until the order has a fill / terminal status or timeout; returns the latest event seen."""
+        end_ts = time.time() + max(0.0, float(timeout or 0.0))
+        with self._cond:
+            while True:
+                ev = self._lookup(account, order_id, client_order_id)
+                remaining = end_ts - time.time()
+                if _fill_done(ev) or remaining <= 0:
+                    return ev
+                self._cond.wait(remaining)
+
+
+class BinanceUserStream:
+    """One Binance listenKey user data stream (futures or spot) running in a daemon thread."""
+
+    KEEPALIVE_SEC = 30 * 60
+
+    def __init__(self, client: Any, account: str, bus: FillBus):
+        self.client = client
+        self.account = account
+        self.bus = bus
+        self.futures = isinstance(client, BinanceFuturesClient)
+        demo = "demo" in client.base_url or "testnet" in client.base_url
+        if self.futures:
+            self.listen_key_path = "/fapi/v1/listenKey"
+            default_ws = "wss://fstream.binancefuture.com/ws" if demo else "wss://fstream.binance.com/ws"
+            self.ws_base = os.getenv("BINANCE_FUTURES_WS_BASE") or default_ws
+        else:
+            self.listen_key_path = "/api/v3/userDataStream"
+            default_ws = "wss://demo-stream.binance.com/ws" if demo else "wss://stream.binance.com:9443/ws"
+            self.ws_base = os.getenv("BINANCE_SPOT_WS_BASE") or default_ws
+        self.connected = threading.Event()
+        self.last_used = time.time()
+        self.events = 0
+        self.reconnects = 0
+        self.last_error = ""
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -------- lifecycle --------
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, name=f"fill-stream-{self.account[:12]}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.connected.clear()
+
+    def is_alive(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    # -------- listenKey --------
+
+    def _listen_key(self, method: str, listen_key: str = "") -> str:
+        params = {"listenKey": listen_key} if listen_key else None
+        code, data, text = self.client._request(method, self.listen_key_path, params=params, headers=self.client._signed_headers())
+        if code >= 400:
+            raise LiveTradingError(f"Binance listenKey HTTP {code}: {text[:200]}")
+        return str((data or {}).get("listenKey") or listen_key)
+
+    # -------- stream --------
+
+    def _run_loop(self) -> None:
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            try:
+                listen_key = self._listen_key("POST")
+                if not listen_key:
+                    raise LiveTradingError("Binance listenKey missing")
+                with ws_connect(f"{self.ws_base}/{listen_key}", open_timeout=10, close_timeout=2) as ws:
+                    self.connected.set()
+                    backoff = 1.0
+                    keepalive_at = time.time() + self.KEEPALIVE_SEC
+                    while not self._stop_event.is_set():
+                        if time.time() >= keepalive_at:
+                            self._listen_key("PUT", listen_key)
+                            keepalive_at = time.time() + self.KEEPALIVE_SEC
+                        try:
+                            msg = ws.recv(timeout=1.0)
+                        except TimeoutError:
+                            continue
+                        if not self._handle(msg):
+                            break
+            except Exception as e:
+                self.last_error = str(e)[:200]
+                logger.warning(f"fill stream error ({self.account[:12]}): {e}")
+            finally:
+                self.connected.clear()
+            if self._stop_event.is_set():
+                break
+            self.reconnects += 1
+            self._stop_event.wait(backoff)
+            backoff = min(30.0, backoff * 2)
+
+    def _handle(self, msg: Any) -> bool:
+        """Publish execution reports. Returns False when the stream must be re-created."""
+        try:
+            data = json.loads(msg)
+        except Exception:
+            return True
+        if not isinstance(data, dict):
+            return True
+        etype = str(data.get("e") or "")
+        if etype == "listenKeyExpired":
+            return False
+        event: Optional[Dict[str, Any]] = None
+        if etype == "ORDER_TRADE_UPDATE" and isinstance(data.get("o"), dict):
+            o = data["o"]
+            filled = float(o.get("z") or 0.0)
+            avg_price = float(o.get("ap") or 0.0) or (float(o.get("L") or 0.0) if filled > 0 else 0.0)
+            event = {
+                "client_order_id": str(o.get("c") or ""),
+                "order_id": str(o.get("i") or ""),
+                "symbol": str(o.get("s") or ""),
+                "status": str(o.get("X") or ""),
+                "filled": filled,
+                "avg_price": avg_price,
+                "raw": data,
+            }
+        elif etype == "executionReport":
+            status = str(data.get("X") or "")
+            filled = float(data.get("z") or 0.0)
+            cum_quote = float(data.get("Z") or 0.0)
+            # Cancels carry the cancel request id in "c" and the original client order id in "C".
+            cid = str((data.get("C") if status == "CANCELED" else None) or data.get("c") or "")
+            event = {
+                "client_order_id": cid,
+                "order_id": str(data.get("i") or ""),
+                "symbol": str(data.get("s") or ""),
+                "status": status,
+                "filled": filled,
+                "avg_price": (cum_quote / filled) if filled > 0 else 0.0,
+                "raw": data,
+            }
+        if event is not None:
+            self.events += 1
+            self.bus.publish(self.account, event)
+        return True
+
+
+class FillStreamManager:
+    """Starts / reuses one user data stream per account and serves stream-first fill waits."""
+
+    def __init__(self, bus: Optional[FillBus] = None, idle_sec: Optional[float] = None):
+        self.bus = bus or FillBus()
+        self.idle_sec = float(idle_sec if idle_sec is not None else _env_float("LIVE_FILL_STREAM_IDLE_SEC", 1800))
+        self._lock = threading.Lock()
+        self._streams: Dict[str, BinanceUserStream] = {}
+        self.stream_fills = 0
+        self.rest_fallbacks = 0
+
+    @staticmethod
+    def account_key(client: Any) -> str:
+        raw = f"{type(client).__name__}|{getattr(client, 'base_url', '')}|{getattr(client, 'api_key', '')}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def supports(client: Any) -> bool:
+        return isinstance(client, (BinanceFuturesClient, BinanceSpotClient))
+
+    def ensure(self, client: Any) -> Optional[BinanceUserStream]:
+        """Start (non-blocking) the stream for client's account if enabled and supported."""
+        if not fill_stream_enabled() or ws_connect is None or not self.supports(client):
+            return None
+        key = self.account_key(client)
+        now = time.time()
+        with self._lock:
+            for k in [k for k, s in self._streams.items() if k != key and now - s.last_used > self.idle_sec]:
+                self._streams.pop(k).stop()
+            stream = self._streams.get(key)
+            if stream is None or not stream.is_alive():
+                stream = BinanceUserStream(client, key, self.bus)
+                self._streams[key] = stream
+                stream.start()
+            stream.last_used = now
+        return stream
+
+    def wait_for_fill(
+        self,
+        client: Any,
+        *,
+        symbol: str,
+        order_id: str = "",
+        client_order_id: str = "",
+        max_wait_sec: float = 3.0,
+    ) -> Dict[str, Any]:
+        """
+        Stream-first replacement for `client.wait_for_fill(...)` (same return shape).
+
+        Falls back to REST polling when no stream is connected, and to one final REST query when
+        the bus wait times out (e.g. events lost during a reconnect).
+        """
+        stream = self.ensure(client)
+        if stream is None or not stream.connected.is_set():
+            return client.wait_for_fill(symbol=symbol, order_id=order_id, client_order_id=client_order_id, max_wait_sec=max_wait_sec)
+        ev = self.bus.wait(stream.account, order_id=str(order_id or ""), client_order_id=str(client_order_id or ""), timeout=max_wait_sec)
+        if _fill_done(ev):
+            with self._lock:
+                self.stream_fills += 1
+            return {
+                "filled": float(ev.get("filled") or 0.0),
+                "avg_price": float(ev.get("avg_price") or 0.0),
+                "status": str(ev.get("status") or ""),
+                "order": ev.get("raw") or {},
+                "source": "stream",
+            }
+        with self._lock:
+            self.rest_fallbacks += 1
+        return client.wait_for_fill(symbol=symbol, order_id=order_id, client_order_id=client_order_id, max_wait_sec=0.0)
+
+    def stop_all(self) -> None:
+        with self._lock:
+            for s in self._streams.values():
+                s.stop()
+            self._streams.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            streams = [
+                {
+                    "client": type(s.client).__name__,
+                    "connected": s.connected.is_set(),
+                    "events": s.events,
+                    "reconnects": s.reconnects,
+                    "idle_sec": int(now - s.last_used),
+                    "last_error": s.last_error,
+                }
+                for s in self._streams.values()
+            ]
+            return {
+                "enabled": fill_stream_enabled() and ws_connect is not None,
+                "stream_fills": self.stream_fills,
+                "rest_fallbacks": self.rest_fallbacks,
+                "streams": streams,
+            }
+
+
+_manager: Optional[FillStreamManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_fill_stream_manager() -> FillStreamManager:
+    """Process-wide FillStreamManager singleton."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = FillStreamManager()
+    return _manager
@@ -0,0 +1,205 @@
+"""
+Pooled keep-alive HTTP sessions for live-trading REST clients.
+
+Every exchange client used to call the module-level `requests.request`, i.e. a new TCP+TLS handshake
+per signed order / position query / fill poll. Requests now go through one pooled session per host:
+
+- keep-alive connection pool per host (LIVE_HTTP_POOL_MAXSIZE connections);
+- no automatic retries of sent requests (orders must never be replayed); only connect failures
+  (nothing sent yet) are retried once;
+- cookies are never stored, so clients of different accounts can share a host session safely;
+- optional HTTP/2 (LIVE_HTTP2=true) when `httpx` with the `h2` extra is installed;
+- per-host metrics: requests, new connections, connection reuse rate, errors.
+"""
+
+from __future__ import annotations
+
+import http.cookiejar
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.utils.logger import get_logger
+
+try:
+    import httpx
+    import h2  # noqa: F401  (httpx needs it for http2=True)
+except Exception:
+    httpx = None
+
+logger = get_logger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class _HostStats:
+    __slots__ = ("requests", "errors", "total_ms", "http2")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.http2 = 0
+
+
+class HttpSessionPool:
+    """Thread-safe registry of pooled sessions, one per scheme://host."""
+
+    def __init__(self, pool_maxsize: Optional[int] = None, http2: Optional[bool] = None):
+        self.pool_maxsize = max(1, pool_maxsize if pool_maxsize is not None else _env_int("LIVE_HTTP_POOL_MAXSIZE", 10))
+        if http2 is None:
+            http2 = os.getenv("LIVE_HTTP2", "false").lower() == "true"
+        if http2 and httpx is None:
+            logger.warning("LIVE_HTTP2=true but httpx[http2] is not installed; using HTTP/1.1 keep-alive")
+        self.http2 = bool(http2 and httpx is not None)
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Any] = {}
+        self._stats: Dict[str, _HostStats] = {}
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def _new_session(self) -> Any:
+        if self.http2:
+            return httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.pool_maxsize),
+            )
+        session = requests.Session()
+        # Never keep cookies: a host session is shared by clients of different accounts.
+        session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        retry = Retry(total=1, connect=1, read=0, status=0, other=0, redirect=0, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=retry, pool_block=False)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _session(self, host: str) -> Any:
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = self._new_session()
+                    # stats first: readers look both up without the lock once the session is visible
+                    self._stats[host] = _HostStats()
+                    self._sessions[host] = session
+        return session
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+        data: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        auth: Any = None,
+    ) -> Any:
+        """
+        Send a request on the pooled session for url's host.
+
+        Returns a response with `status_code`, `text` and `json()` (requests or httpx).
+        Transport errors are raised as `requests.RequestException` in both modes.
+        """
+        host = self._host_key(url)
+        session = self._session(host)
+        stats = self._stats[host]
+        t0 = time.time()
+        try:
+            if self.http2:
+                try:
+                    resp = session.request(
+                        method, url,
+                        params=params, json=json,
+                        content=data if isinstance(data, (str, bytes)) else None,
+                        data=data if isinstance(data, dict) else None,
+                        headers=headers, timeout=timeout, auth=auth,
+                    )
+                except httpx.HTTPError as e:
+                    raise requests.RequestException(str(e))
+            else:
+                resp = session.request(
+                    method, url,
+                    params=params, json=json, data=data,
+                    headers=headers, timeout=timeout, auth=auth,
+                )
+        except Exception:
+            with self._lock:
+                stats.requests += 1
+                stats.errors += 1
+            raise
+        with self._lock:
+            stats.requests += 1
+            stats.total_ms += (time.time() - t0) * 1000.0
+            if getattr(resp, "http_version", "") == "HTTP/2":
+                stats.http2 += 1
+        return resp
+
+    def _connections_opened(self, host: str, session: Any) -> Optional[int]:
+        """New TCP connections opened so far (urllib3 pool counter; unknown for httpx)."""
+        if self.http2:
+            return None
+        try:
+            adapter = session.get_adapter(host)
+            total = 0
+            for pool_key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(pool_key)
+                if pool is not None:
+                    total += int(getattr(pool, "num_connections", 0) or 0)
+            return total
+        except Exception:
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            items = list(self._sessions.items())
+        hosts = []
+        for host, session in items:
+            st = self._stats.get(host) or _HostStats()
+            opened = self._connections_opened(host, session)
+            row = {
+                "host": host,
+                "requests": st.requests,
+                "errors": st.errors,
+                "avg_ms": round(st.total_ms / max(1, st.requests - st.errors), 1),
+                "connections_opened": opened,
+                "reuse_rate": round(max(0.0, 1.0 - opened / st.requests), 4) if opened is not None and st.requests else None,
+            }
+            if self.http2:
+                row["http2_requests"] = st.http2
+            hosts.append(row)
+        return {
+            "http2": self.http2,
+            "pool_maxsize": self.pool_maxsize,
+            "hosts": sorted(hosts, key=lambda r: -r["requests"]),
+        }
+
+
+_pool: Optional[HttpSessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_http_pool() -> HttpSessionPool:
+    """Process-wide HttpSessionPool singleton."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HttpSessionPool()
+    return _pool
@@ -16,6 +16,7 @@ from typing import Any, Dict, Optional, Tuple
 from urllib.parse import urlencode
 
 from app.services.live_trading.base import BaseRestClient, LiveOrderResult, LiveTradingError
+from app.services.live_trading.symbol_meta import get_symbol_meta_cache, namespace
 from app.services.live_trading.symbols import to_okx_swap_inst_id, to_okx_spot_inst_id
 
 
@@ -104,6 +105,10 @@ class OkxClient(BaseRestClient):
         if not it or not iid:
             return {}
 
+        ns = namespace("okx", self.base_url, it)
+        shared = get_symbol_meta_cache().get(ns, iid)
+        if shared:
+            return shared
         key = f"{it}:{iid}"
         now = time.time()
         cached = self._inst_cache.get(key)
@@ -117,6 +122,7 @@ class OkxClient(BaseRestClient):
         first: Dict[str, Any] = data[0] if isinstance(data, list) and data else {}
         if isinstance(first, dict) and first:
             self._inst_cache[key] = (now, first)
+            get_symbol_meta_cache().put(ns, iid, first)
         return first if isinstance(first, dict) else {}
 
     def _normalize_order_size(self, *, inst_id: str, market_type: str, size: float) -> Decimal:
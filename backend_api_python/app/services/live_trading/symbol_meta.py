@@ -0,0 +1,391 @@
+"""
+Process-wide symbol metadata (filters / instrument specs) shared by all live-trading clients.
+
+Clients used to fetch tick size / step size / min notional lazily per symbol on the order path
+(e.g. Binance `/fapi/v1/exchangeInfo?symbol=...`), so the first order of every symbol paid an
+extra round trip. This module keeps one cache per "namespace" (`<kind>@<base_url>`):
+
+- the full instrument list of a namespace is bulk-loaded in a background thread, the first time
+  a client touches it and then every LIVE_SYMBOL_META_REFRESH_SEC; a failed load is retried after
+  LIVE_SYMBOL_META_RETRY_SEC instead of waiting out the full refresh interval;
+- snapshots are persisted to disk (LIVE_SYMBOL_META_DIR) and loaded at startup for warm restarts;
+- `get()` never does network I/O. On a miss the client falls back to its old single-symbol
+  lookup and writes the result back via `put()`.
+
+Supported bulk loaders: Binance futures/spot, OKX (SWAP/SPOT), Bybit (linear/spot).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# loader(base_url, arg) -> {symbol: entry}
+Loader = Callable[[str, str], Dict[str, Dict[str, Any]]]
+
+# Namespaces preloaded at startup when LIVE_SYMBOL_META_PRELOAD lists their kind.
+DEFAULT_BASE_URLS = {
+    "binance_futures": "https://fapi.binance.com",
+    "binance_spot": "https://api.binance.com",
+    "okx": "https://www.okx.com",
+    "bybit": "https://api.bybit.com",
+}
+
+
+def symbol_meta_enabled() -> bool:
+    return os.getenv("LIVE_SYMBOL_META_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _default_root() -> str:
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    return os.getenv("LIVE_SYMBOL_META_DIR") or os.path.join(base_dir, "data", "symbol_meta")
+
+
+def namespace(kind: str, base_url: str, arg: str = "") -> str:
+    """e.g. namespace("okx", "https://www.okx.com", "SWAP") -> "okx:SWAP@https://www.okx.com"."""
+    k = f"{kind}:{arg}" if arg else kind
+    return f"{k}@{(base_url or DEFAULT_BASE_URLS.get(kind, '')).rstrip('/')}"
+
+
+def _split_namespace(ns: str) -> Tuple[str, str, str]:
+    head, _, base_url = ns.partition("@")
+    kind, _, arg = head.partition(":")
+    return kind, arg, base_url
+
+
+# ---------------------------------------------------------------------------
+# Normalizers (shared with the per-symbol fallback paths of the clients)
+# ---------------------------------------------------------------------------
+
+def binance_filters(info: Dict[str, Any], *, spot: bool = False) -> Dict[str, Any]:
+    """Binance exchangeInfo symbol object -> {filterType: filter, "_meta": {...precision}}."""
+    if not isinstance(info, dict):
+        return {}
+    fdict: Dict[str, Any] = {}
+    filters = info.get("filters")
+    if isinstance(filters, list):
+        for f in filters:
+            if isinstance(f, dict) and f.get("filterType"):
+                fdict[str(f.get("filterType"))] = f
+    # Also keep precision metadata when available (used to avoid -1111).
+    try:
+        if spot:
+            qty_prec = info.get("baseAssetPrecision")
+            # For spot, price precision is typically quotePrecision/quoteAssetPrecision.
+            price_prec = info.get("quotePrecision")
+            if price_prec is None:
+                price_prec = info.get("quoteAssetPrecision")
+        else:
+            qty_prec = info.get("quantityPrecision")
+            price_prec = info.get("pricePrecision")
+        meta = {
+            "symbol": str(info.get("symbol") or ""),
+            "quantityPrecision": int(qty_prec) if qty_prec is not None else None,
+            "pricePrecision": int(price_prec) if price_prec is not None else None,
+        }
+        if not spot:
+            meta["contractType"] = str(info.get("contractType") or "")
+        fdict["_meta"] = meta
+    except Exception:
+        pass
+    return fdict
+
+
+def _http_get(base_url: str, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    from app.services.live_trading.http_pool import get_http_pool
+
+    resp = get_http_pool().request(
+        "GET", f"{base_url}{path}", params=params, timeout=_env_float("LIVE_SYMBOL_META_TIMEOUT_SEC", 20.0)
+    )
+    if resp.status_code != 200:
+        raise RuntimeError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+    return resp.json()
+
+
+def _load_binance(path: str, spot: bool) -> Loader:
+    def _load(base_url: str, arg: str) -> Dict[str, Dict[str, Any]]:
+        raw = _http_get(base_url, path)
+        out: Dict[str, Dict[str, Any]] = {}
+        for s in (raw.get("symbols") if isinstance(raw, dict) else None) or []:
+            if isinstance(s, dict) and s.get("symbol"):
+                out[str(s["symbol"])] = binance_filters(s, spot=spot)
+        return out
+    return _load
+
+
+def _load_okx(base_url: str, arg: str) -> Dict[str, Dict[str, Any]]:
+    raw = _http_get(base_url, "/api/v5/public/instruments", {"instType": (arg or "SWAP").upper()})
+    data = (raw.get("data") or []) if isinstance(raw, dict) else []
+    return {str(d["instId"]): d for d in data if isinstance(d, dict) and d.get("instId")}
+
+
+def _load_bybit(base_url: str, arg: str) -> Dict[str, Dict[str, Any]]:
+    out: Dict[str, Dict[str, Any]] = {}
+    cursor = ""
+    for _ in range(50):
+        params = {"category": arg or "linear", "limit": 1000}
+        if cursor:
+            params["cursor"] = cursor
+        raw = _http_get(base_url, "/v5/market/instruments-info", params)
+        result = (raw.get("result") or {}) if isinstance(raw, dict) else {}
+        for d in result.get("list") or []:
+            if isinstance(d, dict) and d.get("symbol"):
+                out[str(d["symbol"])] = d
+        cursor = str(result.get("nextPageCursor") or "")
+        if not cursor:
+            break
+    return out
+
+
+LOADERS: Dict[str, Loader] = {
+    "binance_futures": _load_binance("/fapi/v1/exchangeInfo", spot=False),
+    "binance_spot": _load_binance("/api/v3/exchangeInfo", spot=True),
+    "okx": _load_okx,
+    "bybit": _load_bybit,
+}
+
+
+class _Namespace:
+    __slots__ = ("symbols", "loaded_at", "retry_at", "loads", "errors", "last_error", "hits", "misses")
+
+    def __init__(self):
+        self.symbols: Dict[str, Dict[str, Any]] = {}
+        self.loaded_at = 0.0
+        self.retry_at = 0.0
+        self.loads = 0
+        self.errors = 0
+        self.last_error = ""
+        self.hits = 0
+        self.misses = 0
+
+
+class SymbolMetaCache:
+    """Thread-safe namespace -> symbol -> metadata cache with background bulk refresh."""
+
+    def __init__(self, root: Optional[str] = None, refresh_sec: Optional[float] = None):
+        self.root = root or _default_root()
+        self.refresh_sec = float(refresh_sec if refresh_sec is not None else _env_float("LIVE_SYMBOL_META_REFRESH_SEC", 3600))
+        self.retry_sec = _env_float("LIVE_SYMBOL_META_RETRY_SEC", 30)
+        self._lock = threading.Lock()
+        self._spaces: Dict[str, _Namespace] = {}
+        self._loading: set = set()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -------- lookups (order path, never blocking on network) --------
+
+    def get(self, ns: str, symbol: str) -> Optional[Dict[str, Any]]:
+        if not symbol_meta_enabled():
+            return None
+        with self._lock:
+            space = self._spaces.get(ns)
+            if space is None:
+                space = self._spaces[ns] = _Namespace()
+            entry = space.symbols.get(symbol)
+            if entry is not None:
+                space.hits += 1
+            else:
+                space.misses += 1
+        self.ensure(ns)
+        return entry
+
+    def ensure(self, ns: str) -> None:
+        """Register ns and schedule a background bulk load when it was never loaded or is stale."""
+        with self._lock:
+            space = self._spaces.get(ns)
+            if space is None:
+                space = self._spaces[ns] = _Namespace()
+            due = self._due(space, time.time())
+        if due:
+            self.refresh_async(ns)
+
+    def put(self, ns: str, symbol: str, entry: Dict[str, Any]) -> None:
+        """Write back a result of a client's single-symbol fallback lookup."""
+        if not entry or not symbol_meta_enabled():
+            return
+        with self._lock:
+            space = self._spaces.get(ns)
+            if space is None:
+                space = self._spaces[ns] = _Namespace()
+            space.symbols[symbol] = entry
+
+    def _due(self, space: _Namespace, now: float) -> bool:
+        """Never loaded or stale, and not inside the retry backoff of a failed load. Caller holds the lock."""
+        stale = not space.loaded_at or (now - space.loaded_at) > self.refresh_sec
+        return stale and now >= space.retry_at
+
+    # -------- bulk loading --------
+
+    def refresh_async(self, ns: str) -> bool:
+        """Schedule a background bulk load of ns (single-flight). Returns False if already running/unsupported."""
+        kind, _, _ = _split_namespace(ns)
+        if kind not in LOADERS:
+            return False
+        with self._lock:
+            if ns in self._loading:
+                return False
+            self._loading.add(ns)
+        threading.Thread(target=self._refresh, args=(ns,), name=f"symbol-meta-{kind}", daemon=True).start()
+        return True
+
+    def refresh(self, ns: str) -> int:
+        """Synchronous bulk load (used by the background thread and scripts). Returns symbol count."""
+        kind, arg, base_url = _split_namespace(ns)
+        loader = LOADERS.get(kind)
+        if loader is None:
+            return 0
+        t0 = time.time()
+        try:
+            symbols = loader(base_url, arg)
+            if not symbols:
+                raise ValueError("empty instrument list")
+        except Exception as e:
+            with self._lock:
+                space = self._spaces.setdefault(ns, _Namespace())
+                space.errors += 1
+                space.last_error = str(e)[:200]
+                # loaded_at stays put so the namespace remains due; only back off briefly.
+                # Entries already cached keep being served meanwhile.
+                space.retry_at = time.time() + self.retry_sec
+            logger.warning(f"symbol meta load failed: {ns}: {e}")
+            return 0
+        with self._lock:
+            space = self._spaces.setdefault(ns, _Namespace())
+            # Keep fallback-fetched symbols the bulk list does not know about (new listings).
+            merged = dict(space.symbols)
+            merged.update(symbols)
+            space.symbols = merged
+            space.loaded_at = time.time()
+            space.retry_at = 0.0
+            space.loads += 1
+        self._save(ns, symbols)
+        logger.info(f"symbol meta loaded: {ns} symbols={len(symbols)} cost={time.time() - t0:.2f}s")
+        return len(symbols)
+
+    def _refresh(self, ns: str) -> None:
+        try:
+            self.refresh(ns)
+        finally:
+            with self._lock:
+                self._loading.discard(ns)
+
+    # -------- persistence --------
+
+    def _path(self, ns: str) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9._-]", "_", ns) + ".json")
+
+    def _save(self, ns: str, symbols: Dict[str, Dict[str, Any]]) -> None:
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            path = self._path(ns)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"namespace": ns, "saved_at": time.time(), "symbols": symbols}, f, separators=(",", ":"))
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning(f"symbol meta save failed: {ns}: {e}")
+
+    def load_from_disk(self) -> int:
+        """Load persisted snapshots (warm restart). Stale snapshots are served until the refresh lands."""
+        if not os.path.isdir(self.root):
+            return 0
+        count = 0
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.root, name), "r", encoding="utf-8") as f:
+                    snap = json.load(f)
+                ns = str(snap.get("namespace") or "")
+                symbols = snap.get("symbols") or {}
+                if not ns or not isinstance(symbols, dict):
+                    continue
+                with self._lock:
+                    space = self._spaces.setdefault(ns, _Namespace())
+                    if not space.symbols:
+                        space.symbols = symbols
+                        space.loaded_at = float(snap.get("saved_at") or 0.0)
+                count += 1
+            except Exception as e:
+                logger.warning(f"symbol meta snapshot unreadable: {name}: {e}")
+        return count
+
+    # -------- scheduler --------
+
+    def start(self) -> None:
+        """Load snapshots, preload configured namespaces and keep all known namespaces fresh."""
+        if self._thread and self._thread.is_alive():
+            return
+        self.load_from_disk()
+        for item in os.getenv("LIVE_SYMBOL_META_PRELOAD", "binance_futures,okx:SWAP,bybit:linear").split(","):
+            kind, _, arg = item.strip().partition(":")
+            if kind in LOADERS:
+                self.ensure(namespace(kind, DEFAULT_BASE_URLS[kind], arg))
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="symbol-meta-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _run_loop(self) -> None:
+        interval = max(60.0, min(self.refresh_sec, 600.0))
+        while not self._stop_event.wait(interval):
+            now = time.time()
+            with self._lock:
+                due = [ns for ns, s in self._spaces.items() if self._due(s, now)]
+            for ns in due:
+                self.refresh_async(ns)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            spaces = [
+                {
+                    "namespace": ns,
+                    "symbols": len(s.symbols),
+                    "age_sec": int(now - s.loaded_at) if s.loaded_at else None,
+                    "loads": s.loads,
+                    "errors": s.errors,
+                    "last_error": s.last_error,
+                    "hits": s.hits,
+                    "misses": s.misses,
+                    "loading": ns in self._loading,
+                }
+                for ns, s in self._spaces.items()
+            ]
+        return {
+            "enabled": symbol_meta_enabled(),
+            "refresh_sec": self.refresh_sec,
+            "retry_sec": self.retry_sec,
+            "namespaces": spaces,
+        }
+
+
+_cache: Optional[SymbolMetaCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_symbol_meta_cache() -> SymbolMetaCache:
+    """Process-wide SymbolMetaCache singleton."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SymbolMetaCache()
+    return _cache
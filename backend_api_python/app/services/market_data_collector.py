@@ -14,8 +14,10 @@
 - 基本面: Finnhub (美股) / akshare (A股) / 固定描述 (加密)
 """
 
+import copy
+import os
 import time
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
 
@@ -23,7 +25,9 @@ import yfinance as yf
 
 from app.data_sources import DataSourceFactory
 from app.services.kline import KlineService
+from app.utils.cache import MemoryCache
 from app.utils.logger import get_logger
+from app.utils.single_flight import SingleFlight
 from app.config import APIKeys
 
 logger = get_logger(__name__)
@@ -44,6 +48,9 @@ class MarketDataCollector:
     
     def __init__(self):
         self.kline_service = KlineService()
+        self._share_ttl = int(os.getenv('MARKET_DATA_SHARE_TTL_SEC', '120'))
+        self._snapshots = MemoryCache(max_entries=256, shards=4, name='market_data_snapshots')
+        self._snapshot_flight = SingleFlight()
         self._finnhub_client = None
         self._ak = None
         self._init_clients()
@@ -74,6 +81,35 @@ class MarketDataCollector:
         include_macro: bool = True,
         include_news: bool = True,
         timeout: int = 30
+    ) -> Dict[str, Any]:
+        """
+        采集所有市场数据（共享快照）
+
+        多个组合监控 / 分析同时覆盖同一标的时，并发请求只采集一次（single-flight），
+        结果在 MARKET_DATA_SHARE_TTL_SEC 内复用；每个调用方拿到独立副本。参数同 _collect_all。
+        """
+        if self._share_ttl <= 0:
+            return self._collect_all(market, symbol, timeframe, include_macro, include_news, timeout)
+        key = f"{market}:{symbol}:{timeframe}:{int(include_macro)}:{int(include_news)}"
+        cached = self._snapshots.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        def collect() -> Dict[str, Any]:
+            data = self._collect_all(market, symbol, timeframe, include_macro, include_news, timeout)
+            self._snapshots.setex(key, self._share_ttl, data)
+            return data
+
+        return copy.deepcopy(self._snapshot_flight.do(key, collect))
+
+    def _collect_all(
+        self,
+        market: str,
+        symbol: str,
+        timeframe: str = "1D",
+        include_macro: bool = True,
+        include_news: bool = True,
+        timeout: int = 30
     ) -> Dict[str, Any]:
         """
         采集所有市场数据
@@ -90,8 +126,147 @@ class MarketDataCollector:
             完整的市场数据字典
         """
         start_time = time.time()
+        data = self._new_data(market, symbol, timeframe)
+        
+        # === 阶段1: 核心数据 (并行获取) + 技术指标 ===
+        self._collect_core(data, market, symbol, timeframe)
+        
+        # === 阶段2: 宏观数据 (如果需要) ===
+        if include_macro:
+            try:
+                data["macro"] = self._get_macro_data(market, timeout=10)
+                if data["macro"]:
+                    data["_meta"]["success_items"].append("macro")
+            except Exception as e:
+                logger.warning(f"Macro data fetch failed: {e}")
+                data["_meta"]["failed_items"].append("macro")
+        
+        # === 阶段3: 新闻/情绪 (如果需要) ===
+        if include_news:
+            self._collect_news(data, market, symbol)
         
-        data = {
+        # 记录总耗时
+        data["_meta"]["duration_ms"] = int((time.time() - start_time) * 1000)
+        logger.info(f"Market data collection completed for {market}:{symbol} in {data['_meta']['duration_ms']}ms")
+        logger.info(f"  Success: {data['_meta']['success_items']}")
+        logger.info(f"  Failed: {data['_meta']['failed_items']}")
+        
+        return data
+    
+    def collect_batch(
+        self,
+        market: str,
+        symbols: List[str],
+        timeframe: str = "1D",
+        include_macro: bool = True,
+        include_news: bool = True,
+        on_ready: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        批量采集同一市场多个标的的数据（自选列表批量分析）
+        
+        - 宏观数据、通用新闻对同一市场的所有标的相同：只采集一次，与各标的数据并行获取
+        - 各标的的价格/K线/基本面/个股新闻并发采集（MARKET_DATA_BATCH_WORKERS 个标的同时进行）
+        - 已有共享快照（见 collect_all）的标的直接复用；新采集的结果也写入快照
+        
+        Args:
+            market: 市场类型
+            symbols: 标的代码列表（已去重）
+            timeframe: K线周期
+            include_macro: 是否包含宏观数据
+            include_news: 是否包含新闻
+            on_ready: 某个标的数据就绪（含共享数据）时立即回调 on_ready(symbol, data)，便于调用方流水线处理
+            
+        Returns:
+            {"symbols": {symbol: data}, "timing": {...}}；data 结构同 collect_all，每个调用方拿到独立副本
+        """
+        start_time = time.time()
+        workers = max(1, int(os.getenv('MARKET_DATA_BATCH_WORKERS', '8')))
+        results: Dict[str, Dict[str, Any]] = {}
+        timing: Dict[str, Any] = {"symbols": len(symbols), "workers": workers, "cached": 0}
+        
+        def key_of(sym: str) -> str:
+            return f"{market}:{sym}:{timeframe}:{int(include_macro)}:{int(include_news)}"
+        
+        def emit(sym: str, data: Dict[str, Any]) -> None:
+            results[sym] = data
+            if on_ready:
+                try:
+                    on_ready(sym, copy.deepcopy(data))
+                except Exception as e:
+                    logger.warning(f"Batch on_ready callback failed for {market}:{sym}: {e}")
+        
+        pending = []
+        for sym in symbols:
+            cached = self._snapshots.get(key_of(sym)) if self._share_ttl > 0 else None
+            if cached is not None:
+                timing["cached"] += 1
+                emit(sym, cached)
+            else:
+                pending.append(sym)
+        
+        def collect_symbol(sym: str) -> Dict[str, Any]:
+            t0 = time.time()
+            data = self._new_data(market, sym, timeframe)
+            self._collect_core(data, market, sym, timeframe)
+            if include_news:
+                # 只取个股相关部分，通用新闻在合并阶段加入
+                self._collect_news(data, market, sym, general_news=[])
+            data["_meta"]["duration_ms"] = int((time.time() - t0) * 1000)
+            return data
+        
+        shared: Dict[str, Any] = {"macro": {}, "news": []}
+        if pending:
+            shared_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="md-shared")
+            symbol_pool = ThreadPoolExecutor(max_workers=min(workers, len(pending)), thread_name_prefix="md-symbol")
+            try:
+                # === 共享阶段: 宏观 + 通用新闻 (每个市场只采集一次) ===
+                shared_start = time.time()
+                shared_futures = {}
+                if include_macro:
+                    shared_futures[shared_pool.submit(self._get_macro_data, market, 10)] = "macro"
+                if include_news and market != 'USStock':
+                    shared_futures[shared_pool.submit(self._get_general_news)] = "news"
+                
+                # === 个股阶段: 核心数据 + 个股新闻 (并发) ===
+                symbol_futures = {symbol_pool.submit(collect_symbol, sym): sym for sym in pending}
+                
+                for future, key in shared_futures.items():
+                    try:
+                        shared[key] = future.result(timeout=15) or shared[key]
+                    except Exception as e:
+                        logger.warning(f"Shared {key} fetch failed for {market} batch: {e}")
+                timing["shared_ms"] = int((time.time() - shared_start) * 1000)
+                
+                for future in as_completed(symbol_futures):
+                    sym = symbol_futures[future]
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        logger.warning(f"Batch data collection failed for {market}:{sym}: {e}")
+                        data = self._new_data(market, sym, timeframe)
+                        data["_meta"]["failed_items"].append("core")
+                    self._apply_shared(data, shared, include_macro, include_news)
+                    if self._share_ttl > 0 and data.get("price"):
+                        self._snapshots.setex(key_of(sym), self._share_ttl, data)
+                    emit(sym, data)
+                timing["symbols_ms"] = int((time.time() - shared_start) * 1000)
+            finally:
+                shared_pool.shutdown(wait=False)
+                symbol_pool.shutdown(wait=False)
+        
+        timing["total_ms"] = int((time.time() - start_time) * 1000)
+        logger.info(
+            f"Batch market data collection for {market}: {len(symbols)} symbols "
+            f"({timing['cached']} cached) in {timing['total_ms']}ms"
+        )
+        return {
+            "symbols": {sym: copy.deepcopy(results[sym]) for sym in symbols if sym in results},
+            "timing": timing,
+        }
+    
+    def _new_data(self, market: str, symbol: str, timeframe: str) -> Dict[str, Any]:
+        return {
             "market": market,
             "symbol": symbol,
             "timeframe": timeframe,
@@ -115,8 +290,9 @@ class MarketDataCollector:
                 "duration_ms": 0
             }
         }
-        
-        # === 阶段1: 核心数据 (并行获取) ===
+    
+    def _collect_core(self, data: Dict[str, Any], market: str, symbol: str, timeframe: str) -> None:
+        """核心数据 (价格、K线、基本面并行获取) + 本地计算技术指标"""
         with ThreadPoolExecutor(max_workers=4) as executor:
             core_futures = {
                 executor.submit(self._get_price, market, symbol): "price",
@@ -151,42 +327,39 @@ class MarketDataCollector:
         if data.get("kline"):
             data["indicators"] = self._calculate_indicators(data["kline"])
             data["_meta"]["success_items"].append("indicators")
-        
-        # === 阶段2: 宏观数据 (如果需要) ===
+    
+    def _collect_news(
+        self, data: Dict[str, Any], market: str, symbol: str, general_news: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        try:
+            # 获取公司名称以改善搜索
+            company_name = None
+            if data.get("company"):
+                company_name = data["company"].get("name")
+            
+            news_result = self._get_news(market, symbol, company_name, timeout=8, general_news=general_news)
+            data["news"] = news_result.get("news", [])
+            data["sentiment"] = news_result.get("sentiment", {})
+            
+            if data["news"]:
+                data["_meta"]["success_items"].append("news")
+        except Exception as e:
+            logger.warning(f"News fetch failed: {e}")
+            data["_meta"]["failed_items"].append("news")
+    
+    def _apply_shared(
+        self, data: Dict[str, Any], shared: Dict[str, Any], include_macro: bool, include_news: bool
+    ) -> None:
+        """把批量共享的宏观数据 / 通用新闻合并进单个标的的数据"""
+        meta = data["_meta"]
         if include_macro:
-            try:
-                data["macro"] = self._get_macro_data(market, timeout=10)
-                if data["macro"]:
-                    data["_meta"]["success_items"].append("macro")
-            except Exception as e:
-                logger.warning(f"Macro data fetch failed: {e}")
-                data["_meta"]["failed_items"].append("macro")
-        
-        # === 阶段3: 新闻/情绪 (如果需要) ===
-        if include_news:
-            try:
-                # 获取公司名称以改善搜索
-                company_name = None
-                if data.get("company"):
-                    company_name = data["company"].get("name")
-                
-                news_result = self._get_news(market, symbol, company_name, timeout=8)
-                data["news"] = news_result.get("news", [])
-                data["sentiment"] = news_result.get("sentiment", {})
-                
-                if data["news"]:
-                    data["_meta"]["success_items"].append("news")
-            except Exception as e:
-                logger.warning(f"News fetch failed: {e}")
-                data["_meta"]["failed_items"].append("news")
-        
-        # 记录总耗时
-        data["_meta"]["duration_ms"] = int((time.time() - start_time) * 1000)
-        logger.info(f"Market data collection completed for {market}:{symbol} in {data['_meta']['duration_ms']}ms")
-        logger.info(f"  Success: {data['_meta']['success_items']}")
-        logger.info(f"  Failed: {data['_meta']['failed_items']}")
-        
-        return data
+            data["macro"] = copy.deepcopy(shared.get("macro") or {})
+            meta["success_items" if data["macro"] else "failed_items"].append("macro")
+        if include_news and shared.get("news"):
+            had_news = bool(data.get("news"))
+            data["news"] = self._merge_news(data.get("news") or [], copy.deepcopy(shared["news"]))
+            if data["news"] and not had_news:
+                meta["success_items"].append("news")
     
     # ==================== 核心数据获取 ====================
     
@@ -885,7 +1058,8 @@ class MarketDataCollector:
     # ==================== 新闻/情绪数据 ====================
     
     def _get_news(
-        self, market: str, symbol: str, company_name: str = None, timeout: int = 8
+        self, market: str, symbol: str, company_name: str = None, timeout: int = 8,
+        general_news: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """
         获取新闻和情绪数据
@@ -894,38 +1068,25 @@ class MarketDataCollector:
         1. 使用结构化API (Finnhub) - 无需深度阅读
         2. 只获取标题和摘要 - 不读取全文
         3. 多来源聚合 - Finnhub + 市场特定来源
+        
+        general_news: 非美股市场的通用新闻；批量采集时由调用方统一获取后传入（[] 表示跳过）
         """
         news_list = []
         sentiment = {}
         
         # 1) Finnhub 新闻 (最可靠)
-        if self._finnhub_client:
-            try:
-                end_date = datetime.now().strftime('%Y-%m-%d')
-                start_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-                
-                raw_news = []
-                
-                if market == 'USStock':
+        if market == 'USStock':
+            if self._finnhub_client:
+                try:
+                    end_date = datetime.now().strftime('%Y-%m-%d')
+                    start_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
                     raw_news = self._finnhub_client.company_news(symbol, _from=start_date, to=end_date)
-                else:
-                    # 通用新闻
-                    raw_news = self._finnhub_client.general_news('general', min_id=0)
-                
-                if raw_news:
-                    for item in raw_news[:10]:  # 最多10条
-                        if not item.get('headline'):
-                            continue
-                        news_list.append({
-                            "datetime": datetime.fromtimestamp(item.get('datetime', 0)).strftime('%Y-%m-%d %H:%M'),
-                            "headline": item.get('headline', ''),
-                            "summary": item.get('summary', '')[:300] if item.get('summary') else '',  # 截断摘要
-                            "source": item.get('source', 'Finnhub'),
-                            "url": item.get('url', ''),
-                            "sentiment": item.get('sentiment', 'neutral'),  # Finnhub有时提供情绪
-                        })
-            except Exception as e:
-                logger.debug(f"Finnhub news fetch failed: {e}")
+                    news_list.extend(self._format_finnhub_news(raw_news))
+                except Exception as e:
+                    logger.debug(f"Finnhub news fetch failed: {e}")
+        else:
+            # 通用新闻
+            news_list.extend(general_news if general_news is not None else self._get_general_news())
         
         # 2) Finnhub 情绪分数 (如果可用)
         if self._finnhub_client and market == 'USStock':
@@ -956,13 +1117,43 @@ class MarketDataCollector:
             except Exception as e:
                 logger.debug(f"akshare news fetch failed: {e}")
         
-        # 按时间排序
-        news_list.sort(key=lambda x: x.get('datetime', ''), reverse=True)
-        
         return {
-            "news": news_list[:15],  # 最多15条
+            "news": self._merge_news(news_list, []),
             "sentiment": sentiment,
         }
+    
+    def _get_general_news(self) -> List[Dict[str, Any]]:
+        """Finnhub 通用市场新闻（与具体标的无关）"""
+        if not self._finnhub_client:
+            return []
+        try:
+            return self._format_finnhub_news(self._finnhub_client.general_news('general', min_id=0))
+        except Exception as e:
+            logger.debug(f"Finnhub news fetch failed: {e}")
+            return []
+    
+    @staticmethod
+    def _format_finnhub_news(raw_news: Any) -> List[Dict[str, Any]]:
+        news_list = []
+        for item in (raw_news or [])[:10]:  # 最多10条
+            if not item.get('headline'):
+                continue
+            news_list.append({
+                "datetime": datetime.fromtimestamp(item.get('datetime', 0)).strftime('%Y-%m-%d %H:%M'),
+                "headline": item.get('headline', ''),
+                "summary": item.get('summary', '')[:300] if item.get('summary') else '',  # 截断摘要
+                "source": item.get('source', 'Finnhub'),
+                "url": item.get('url', ''),
+                "sentiment": item.get('sentiment', 'neutral'),  # Finnhub有时提供情绪
+            })
+        return news_list
+    
+    @staticmethod
+    def _merge_news(news_list: List[Dict[str, Any]], extra: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # 按时间排序
+        merged = list(news_list) + list(extra)
+        merged.sort(key=lambda x: x.get('datetime', ''), reverse=True)
+        return merged[:15]  # 最多15条
 
 
 # 全局实例
@@ -0,0 +1,338 @@
+"""
+Market data hub.
+
+Strategy loops subscribe by (market_category, symbol, timeframe). The hub polls every
+instrument once per tick (ticker) and once per bar boundary (klines), then fans the results
+out to the subscribed loops through in-process queues, so N strategies on one symbol cost
+one upstream request per tick instead of N.
+
+Per-subscription metrics (queue latency, drops, upstream fetch time) are exposed via `stats()`.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.data_sources.base import TIMEFRAME_SECONDS
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# price_fetcher(market_category, symbol) -> Optional[float]
+PriceFetcher = Callable[[str, str], Optional[float]]
+# kline_fetcher(market_category, symbol, timeframe, limit) -> List[kline dict]
+KlineFetcher = Callable[[str, str, str, int], List[Dict[str, Any]]]
+
+
+def market_data_hub_enabled() -> bool:
+    return os.getenv("MARKET_DATA_HUB_ENABLED", "true").lower() == "true"
+
+
+class MarketUpdate:
+    """Result of draining a subscription queue: latest price and (if a bar closed) fresh klines."""
+
+    __slots__ = ("price", "price_ts", "klines", "klines_ts")
+
+    def __init__(self):
+        self.price: Optional[float] = None
+        self.price_ts: float = 0.0
+        self.klines: Optional[List[Dict[str, Any]]] = None
+        self.klines_ts: float = 0.0
+
+
+class MarketDataSubscription:
+    """One strategy loop's view of a hub feed."""
+
+    def __init__(self, sub_id: int, market_category: str, symbol: str, timeframe: str,
+                 history_limit: int, owner: Any = None, queue_size: int = 32):
+        self.id = sub_id
+        self.market_category = market_category
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.history_limit = int(history_limit)
+        self.owner = owner
+        self.created_at = time.time()
+        self._queue: "queue.Queue[Tuple[str, Any, float]]" = queue.Queue(maxsize=max(2, int(queue_size)))
+        self._lock = threading.Lock()
+        self._last_price: Optional[float] = None
+        self._last_price_ts = 0.0
+        # metrics
+        self.delivered = 0
+        self.consumed = 0
+        self.dropped = 0
+        self.last_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self._latency_sum_ms = 0.0
+
+    @property
+    def price_key(self) -> Tuple[str, str]:
+        return (self.market_category, (self.symbol or "").strip().upper())
+
+    @property
+    def kline_key(self) -> Tuple[str, str, str]:
+        return (self.market_category, (self.symbol or "").strip().upper(), self.timeframe)
+
+    def _publish(self, kind: str, payload: Any, ts: float) -> None:
+        """Called by the hub. Never blocks: on overflow the oldest event is dropped."""
+        item = (kind, payload, ts)
+        with self._lock:
+            self.delivered += 1
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def poll(self, timeout: Optional[float] = None) -> MarketUpdate:
+        """
+        Drain pending events and return the latest price / klines.
+        With `timeout`, waits up to that long for the first event.
+        """
+        update = MarketUpdate()
+        block = timeout is not None and timeout > 0
+        while True:
+            try:
+                kind, payload, ts = self._queue.get(block=block, timeout=timeout if block else None)
+            except queue.Empty:
+                break
+            block = False
+            self._record_latency(ts)
+            if kind == "price":
+                update.price, update.price_ts = payload, ts
+            elif kind == "klines":
+                update.klines, update.klines_ts = payload, ts
+        if update.price is not None:
+            self._last_price, self._last_price_ts = update.price, update.price_ts
+        return update
+
+    def latest_price(self, max_age_sec: float) -> Optional[float]:
+        """Last price seen by this subscription if it is not older than max_age_sec."""
+        if self._last_price is None or time.time() - self._last_price_ts > max_age_sec:
+            return None
+        return self._last_price
+
+    def _record_latency(self, ts: float) -> None:
+        latency_ms = max(0.0, (time.time() - ts) * 1000.0)
+        self.consumed += 1
+        self.last_latency_ms = latency_ms
+        self._latency_sum_ms += latency_ms
+        if latency_ms > self.max_latency_ms:
+            self.max_latency_ms = latency_ms
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "owner": self.owner,
+            "market_category": self.market_category,
+            "symbol": self.symbol,
+            "timeframe": self.timeframe,
+            "delivered": self.delivered,
+            "consumed": self.consumed,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "last_latency_ms": round(self.last_latency_ms, 2),
+            "avg_latency_ms": round(self._latency_sum_ms / self.consumed, 2) if self.consumed else 0.0,
+            "max_latency_ms": round(self.max_latency_ms, 2),
+            "last_price": self._last_price,
+            "last_price_age_sec": round(time.time() - self._last_price_ts, 2) if self._last_price_ts else None,
+        }
+
+
+class _Feed:
+    """Upstream poll state shared by all subscriptions with the same key."""
+
+    def __init__(self):
+        self.subs: Dict[int, MarketDataSubscription] = {}
+        self.next_due = 0.0
+        self.fetches = 0
+        self.errors = 0
+        self.last_fetch_ms = 0.0
+
+
+class MarketDataHub:
+    def __init__(
+        self,
+        price_fetcher: PriceFetcher,
+        kline_fetcher: KlineFetcher,
+        tick_interval_sec: Optional[float] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self._price_fetcher = price_fetcher
+        self._kline_fetcher = kline_fetcher
+        if tick_interval_sec is None:
+            try:
+                tick_interval_sec = float(os.getenv("STRATEGY_TICK_INTERVAL_SEC", "10"))
+            except Exception:
+                tick_interval_sec = 10.0
+        self.tick_interval_sec = max(1.0, float(tick_interval_sec))
+        # Wait a moment after a bar boundary so the exchange has the new candle.
+        try:
+            self.kline_delay_sec = float(os.getenv("MARKET_DATA_HUB_KLINE_DELAY_SEC", "2"))
+        except Exception:
+            self.kline_delay_sec = 2.0
+        if max_workers is None:
+            try:
+                max_workers = int(os.getenv("MARKET_DATA_HUB_WORKERS", "8"))
+            except Exception:
+                max_workers = 8
+        self.max_workers = max(1, int(max_workers))
+
+        self._price_feeds: Dict[Tuple[str, str], _Feed] = {}
+        self._kline_feeds: Dict[Tuple[str, str, str], _Feed] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+
+    def subscribe(self, market_category: str, symbol: str, timeframe: str,
+                  history_limit: int = 500, owner: Any = None) -> MarketDataSubscription:
+        sub = MarketDataSubscription(next(self._ids), market_category, symbol, timeframe, history_limit, owner)
+        tf_sec = TIMEFRAME_SECONDS.get(timeframe, 3600)
+        with self._lock:
+            pf = self._price_feeds.setdefault(sub.price_key, _Feed())
+            pf.subs[sub.id] = sub
+            kf = self._kline_feeds.get(sub.kline_key)
+            if kf is None:
+                kf = self._kline_feeds[sub.kline_key] = _Feed()
+                # Subscribers load their initial history themselves; the hub starts at the next bar.
+                kf.next_due = (int(time.time()) // tf_sec + 1) * tf_sec + self.kline_delay_sec
+            kf.subs[sub.id] = sub
+        self.start()
+        logger.info(f"MarketDataHub: subscription {sub.id} {market_category}:{symbol}:{timeframe} (owner={owner})")
+        return sub
+
+    def unsubscribe(self, sub: Optional[MarketDataSubscription]) -> None:
+        if sub is None:
+            return
+        with self._lock:
+            for feeds, key in ((self._price_feeds, sub.price_key), (self._kline_feeds, sub.kline_key)):
+                feed = feeds.get(key)
+                if feed is None:
+                    continue
+                feed.subs.pop(sub.id, None)
+                if not feed.subs:
+                    del feeds[key]
+        logger.info(f"MarketDataHub: subscription {sub.id} closed")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subs = {}
+            for feed in self._price_feeds.values():
+                subs.update(feed.subs)
+            price_feeds = [
+                {"market_category": k[0], "symbol": k[1], "subscribers": len(f.subs), "fetches": f.fetches,
+                 "errors": f.errors, "last_fetch_ms": round(f.last_fetch_ms, 2)}
+                for k, f in self._price_feeds.items()
+            ]
+            kline_feeds = [
+                {"market_category": k[0], "symbol": k[1], "timeframe": k[2], "subscribers": len(f.subs),
+                 "fetches": f.fetches, "errors": f.errors, "last_fetch_ms": round(f.last_fetch_ms, 2),
+                 "next_due": int(f.next_due)}
+                for k, f in self._kline_feeds.items()
+            ]
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "tick_interval_sec": self.tick_interval_sec,
+            "price_feeds": price_feeds,
+            "kline_feeds": kline_feeds,
+            "subscriptions": [s.stats() for s in sorted(subs.values(), key=lambda s: s.id)],
+        }
+
+    # ------------------------------------------------------------------
+    # Poll loop
+    # ------------------------------------------------------------------
+
+    def start(self) -> bool:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return True
+            self._stop_event.clear()
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="MarketDataHub")
+            self._thread = threading.Thread(target=self._run_loop, name="MarketDataHub", daemon=True)
+            self._thread.start()
+            logger.info(f"MarketDataHub started (tick={self.tick_interval_sec}s, workers={self.max_workers})")
+            return True
+
+    def stop(self, timeout_sec: float = 5.0) -> None:
+        with self._lock:
+            self._stop_event.set()
+            th = self._thread
+            pool = self._pool
+        if th and th.is_alive():
+            th.join(timeout=timeout_sec)
+        if pool:
+            pool.shutdown(wait=False)
+        logger.info("MarketDataHub stopped")
+
+    def _run_loop(self) -> None:
+        while not self._stop_event.is_set():
+            started = time.time()
+            try:
+                self._tick()
+            except Exception as e:
+                logger.warning(f"MarketDataHub tick error: {e}")
+            self._stop_event.wait(max(0.0, self.tick_interval_sec - (time.time() - started)))
+
+    def _tick(self) -> None:
+        now = time.time()
+        jobs = []
+        with self._lock:
+            for key, feed in self._price_feeds.items():
+                if feed.subs:
+                    jobs.append(("price", key, feed, list(feed.subs.values())))
+            for key, feed in self._kline_feeds.items():
+                if feed.subs and now >= feed.next_due:
+                    tf_sec = TIMEFRAME_SECONDS.get(key[2], 3600)
+                    feed.next_due = (int(now) // tf_sec + 1) * tf_sec + self.kline_delay_sec
+                    jobs.append(("klines", key, feed, list(feed.subs.values())))
+        if not jobs:
+            return
+
+        pool = self._pool
+        futures = {pool.submit(self._fetch, kind, key, subs): (kind, key, feed, subs) for kind, key, feed, subs in jobs}
+        for fut in as_completed(futures):
+            kind, key, feed, subs = futures[fut]
+            try:
+                payload, elapsed_ms = fut.result()
+            except Exception as e:
+                feed.errors += 1
+                logger.warning(f"MarketDataHub {kind} fetch failed for {key}: {e}")
+                continue
+            feed.fetches += 1
+            feed.last_fetch_ms = elapsed_ms
+            if not payload:
+                feed.errors += 1
+                continue
+            ts = time.time()
+            for sub in subs:
+                if kind == "klines":
+                    sub._publish(kind, payload[-sub.history_limit:], ts)
+                else:
+                    sub._publish(kind, payload, ts)
+
+    def _fetch(self, kind: str, key: Tuple, subs: List[MarketDataSubscription]) -> Tuple[Any, float]:
+        t0 = time.time()
+        # All subscribers share one request; use the original symbol spelling of the first one.
+        sub = subs[0]
+        if kind == "price":
+            payload = self._price_fetcher(sub.market_category, sub.symbol)
+        else:
+            limit = max(s.history_limit for s in subs)
+            payload = self._kline_fetcher(sub.market_category, sub.symbol, sub.timeframe, limit)
+        return payload, (time.time() - t0) * 1000.0
@@ -0,0 +1,502 @@
+"""
+Background delivery of signal notifications.
+
+`SignalNotifier.notify_signal` used to send every channel inline (SMTP handshakes, webhook retries,
+Discord rate-limit sleeps) on the strategy / pending-order thread. It now only renders the messages
+and calls `submit`, which appends the job to an in-memory per-channel queue and returns.
+
+- one queue + NOTIFY_WORKERS_PER_CHANNEL delivery threads per channel, so a slow SMTP server never
+  holds up Telegram or webhooks;
+- durability: every job is written to a per-process journal (NOTIFY_QUEUE_DIR, JSON lines, flushed
+  every NOTIFY_JOURNAL_FLUSH_MS) and acknowledged after delivery; journals of dead processes (and of
+  the previous run of this one) are replayed on start;
+- Telegram messages to the same chat and Discord messages to the same webhook that are queued
+  together (or arrive within NOTIFY_BATCH_LINGER_MS) are sent as one message;
+- failed deliveries are retried with exponential backoff up to NOTIFY_MAX_ATTEMPTS;
+- per-channel metrics: queue depth, delivered/failed/retried, batch sizes, enqueue-to-delivery latency.
+
+HTTP and SMTP connection reuse lives in signal_notifier (pooled keep-alive sessions, per-thread SMTP).
+"""
+from __future__ import annotations
+
+import atexit
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Telegram sendMessage text limit (leave room for the separator)
+_TELEGRAM_MAX_CHARS = 3900
+# Discord webhook: at most 10 embeds per message
+_DISCORD_MAX_EMBEDS = 10
+_BATCH_SEPARATOR = "\n\n"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _default_root() -> str:
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.getenv("NOTIFY_QUEUE_DIR") or os.path.join(base_dir, "data", "notify_queue")
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # os.kill(pid, 0) terminates the process on Windows; never replay other processes' journals there.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except Exception:
+        return True
+    return True
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    i = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return round(sorted_values[i], 1)
+
+
+class _Journal:
+    """Append-only JSON-lines log of queued ("add") and finished ("ack") jobs for one process."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.path = os.path.join(root, f"notify-{os.getpid()}.jsonl")
+        self._lock = threading.Lock()
+        self._buf: List[Any] = []  # records are encoded by flush(), off the caller's thread
+        self._fh = None
+        self.enabled = True
+        self.replayed = 0
+
+    def open(self) -> List[Dict[str, Any]]:
+        """Open this process' journal; returns the unfinished jobs of earlier runs / dead processes."""
+        pending: List[Dict[str, Any]] = []
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            for name in sorted(os.listdir(self.root)):
+                if not (name.startswith("notify-") and name.endswith(".jsonl")):
+                    continue
+                try:
+                    pid = int(name[len("notify-"):-len(".jsonl")])
+                except ValueError:
+                    continue
+                # Our own pid: a previous run of this process (pid reuse in containers).
+                if pid != os.getpid() and _pid_alive(pid):
+                    continue
+                src = os.path.join(self.root, name)
+                claimed = f"{src}.replay-{os.getpid()}"
+                try:
+                    os.replace(src, claimed)  # claim it; another starting process may race us
+                except OSError:
+                    continue
+                pending.extend(self._read_pending(claimed))
+                os.remove(claimed)
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            self._fh = os.fdopen(fd, "a", encoding="utf-8")
+        except Exception as e:
+            self.enabled = False
+            logger.warning(f"notification journal disabled ({self.root}): {e}")
+        self.replayed = len(pending)
+        return pending
+
+    @staticmethod
+    def _read_pending(path: str) -> List[Dict[str, Any]]:
+        jobs: Dict[str, Dict[str, Any]] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except Exception:
+                    continue  # torn last line
+                if rec.get("op") == "add":
+                    jobs[rec["id"]] = rec
+                elif rec.get("op") == "ack":
+                    jobs.pop(rec.get("id"), None)
+        return list(jobs.values())
+
+    def add(self, job: Dict[str, Any]) -> None:
+        if self.enabled:
+            with self._lock:
+                self._buf.append(job)
+
+    def ack(self, job_id: str) -> None:
+        if self.enabled:
+            with self._lock:
+                self._buf.append('{"op":"ack","id":"%s"}' % job_id)
+
+    @staticmethod
+    def _encode(record: Any) -> str:
+        if isinstance(record, str):
+            return record
+        return json.dumps({"op": "add", **record}, ensure_ascii=False, separators=(",", ":"), default=str)
+
+    def flush(self, compact: bool = False) -> None:
+        """Write buffered records; with compact=True (nothing outstanding) truncate the file."""
+        if not self.enabled or self._fh is None:
+            return
+        with self._lock:
+            lines, self._buf = self._buf, []
+            try:
+                if compact and not lines:
+                    if self._fh.tell() > 0:
+                        self._fh.truncate(0)
+                    return
+                if lines:
+                    self._fh.write("\n".join(self._encode(r) for r in lines) + "\n")
+                    self._fh.flush()
+            except Exception as e:
+                logger.warning(f"notification journal write failed: {e}")
+
+
+class _ChannelQueue:
+    """Ready deque + retry heap for one channel, with batch-aware take()."""
+
+    def __init__(self, name: str, workers: int, batch_key: Optional[Callable[[Dict[str, Any]], Hashable]]):
+        self.name = name
+        self.workers = workers
+        self.batch_key = batch_key
+        self.cond = threading.Condition()
+        self.ready: Deque[Dict[str, Any]] = deque()
+        self.delayed: List[Tuple[float, int, Dict[str, Any]]] = []
+        self.busy_keys: set = set()
+        self.in_flight = 0
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+        self.batched_jobs = 0
+        self.latency_ms: Deque[float] = deque(maxlen=1000)
+        self.send_ms: Deque[float] = deque(maxlen=1000)
+        self.last_error = ""
+
+    def key_of(self, job: Dict[str, Any]) -> Optional[Hashable]:
+        return self.batch_key(job["job"]) if self.batch_key else None
+
+    def _release_delayed(self, now: float) -> None:
+        while self.delayed and self.delayed[0][0] <= now:
+            self.ready.append(heapq.heappop(self.delayed)[2])
+
+    def _pop_ready(self) -> Optional[Dict[str, Any]]:
+        """First ready job whose batch key is not being delivered by another worker (keeps per-chat order)."""
+        for i, job in enumerate(self.ready):
+            if self.key_of(job) not in self.busy_keys:
+                del self.ready[i]
+                return job
+        return None
+
+    def _gather(self, key: Hashable, fits: Callable[[List[Dict[str, Any]], Dict[str, Any]], bool],
+                batch: List[Dict[str, Any]]) -> None:
+        keep: Deque[Dict[str, Any]] = deque()
+        while self.ready:
+            job = self.ready.popleft()
+            if self.key_of(job) == key and fits(batch, job):
+                batch.append(job)
+            else:
+                keep.append(job)
+        self.ready = keep
+
+    def take(self, stop: threading.Event, linger_sec: float,
+             fits: Callable[[List[Dict[str, Any]], Dict[str, Any]], bool]) -> List[Dict[str, Any]]:
+        with self.cond:
+            job = None
+            while job is None and not stop.is_set():
+                now = time.time()
+                self._release_delayed(now)
+                job = self._pop_ready()
+                if job is None:
+                    timeout = 1.0
+                    if self.delayed:
+                        timeout = min(timeout, max(0.01, self.delayed[0][0] - now))
+                    self.cond.wait(timeout)
+            if job is None:
+                return []
+            batch = [job]
+            key = self.key_of(job)
+            if key is not None:
+                self.busy_keys.add(key)
+                deadline = job["enqueued_at"] + linger_sec
+                while True:
+                    self._gather(key, fits, batch)
+                    remaining = deadline - time.time()
+                    if remaining <= 0 or stop.is_set() or not fits(batch, job):
+                        break
+                    self.cond.wait(remaining)
+            self.in_flight += len(batch)
+            return batch
+
+    def done(self, batch: List[Dict[str, Any]]) -> None:
+        with self.cond:
+            self.in_flight -= len(batch)
+            key = self.key_of(batch[0])
+            if key is not None:
+                self.busy_keys.discard(key)
+            self.cond.notify_all()
+
+    def depth(self) -> int:
+        return len(self.ready) + len(self.delayed) + self.in_flight
+
+
+def _telegram_key(job: Dict[str, Any]) -> Hashable:
+    return (job.get("token_override") or "", job.get("chat_id") or "", job.get("parse_mode") or "")
+
+
+def _discord_key(job: Dict[str, Any]) -> Hashable:
+    return job.get("url") or ""
+
+
+def _telegram_fits(batch: List[Dict[str, Any]], job: Dict[str, Any]) -> bool:
+    size = sum(len(j["job"].get("text") or "") + len(_BATCH_SEPARATOR) for j in batch)
+    return size + len(job["job"].get("text") or "") <= _TELEGRAM_MAX_CHARS
+
+
+def _discord_fits(batch: List[Dict[str, Any]], job: Dict[str, Any]) -> bool:
+    return len(batch) < _DISCORD_MAX_EMBEDS
+
+
+_BATCHING: Dict[str, Tuple[Callable[[Dict[str, Any]], Hashable], Callable[..., bool]]] = {
+    "telegram": (_telegram_key, _telegram_fits),
+    "discord": (_discord_key, _discord_fits),
+}
+
+
+class NotificationDispatcher:
+    """Per-channel queues and delivery workers for SignalNotifier jobs."""
+
+    def __init__(self, notifier: Any = None, root: Optional[str] = None):
+        from app.services.signal_notifier import CHANNELS, SignalNotifier
+
+        self.notifier = notifier or SignalNotifier()
+        self.workers_per_channel = max(1, _env_int("NOTIFY_WORKERS_PER_CHANNEL", 2))
+        self.max_attempts = max(1, _env_int("NOTIFY_MAX_ATTEMPTS", 3))
+        self.retry_base_sec = max(0.1, _env_float("NOTIFY_RETRY_BASE_SEC", 5.0))
+        self.linger_sec = max(0.0, _env_float("NOTIFY_BATCH_LINGER_MS", 250.0) / 1000.0)
+        self.flush_sec = max(0.01, _env_float("NOTIFY_JOURNAL_FLUSH_MS", 100.0) / 1000.0)
+        self.journal = _Journal(root or _default_root())
+        self._queues: Dict[str, _ChannelQueue] = {}
+        for channel in CHANNELS:
+            key_fn = _BATCHING.get(channel, (None, None))[0]
+            self._queues[channel] = _ChannelQueue(channel, self.workers_per_channel, key_fn)
+        self._seq = itertools.count()
+        # job ids: unique per run + counter (uuid4 per job costs an urandom syscall on the caller's thread)
+        self._run_id = uuid.uuid4().hex[:12]
+        self._ids = itertools.count(1)
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._started = False
+
+    # ---------- lifecycle ----------
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+            self._stop_event.clear()
+            for job in self.journal.open():
+                job.pop("op", None)
+                queue = self._queues.get(job.get("channel"))
+                if queue is not None:
+                    self._enqueue(queue, job)
+            if self.journal.replayed:
+                logger.info(f"Replayed {self.journal.replayed} queued notifications from journal")
+            for channel, queue in self._queues.items():
+                for i in range(queue.workers):
+                    t = threading.Thread(target=self._worker, args=(queue,), name=f"notify-{channel}-{i}", daemon=True)
+                    t.start()
+                    self._threads.append(t)
+            t = threading.Thread(target=self._journal_loop, name="notify-journal", daemon=True)
+            t.start()
+            self._threads.append(t)
+            atexit.register(self.journal.flush)
+            logger.info(f"Notification dispatcher started ({self.workers_per_channel} workers per channel)")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        for queue in self._queues.values():
+            with queue.cond:
+                queue.cond.notify_all()
+        self.journal.flush()
+        self._started = False
+
+    # ---------- producer side ----------
+
+    def submit(self, channel: str, job: Dict[str, Any], meta: Optional[Dict[str, Any]] = None) -> str:
+        """Queue a `SignalNotifier.deliver` job; returns the job id. Never blocks on I/O."""
+        if not self._started:
+            self.start()
+        queue = self._queues[channel]
+        item = {
+            "id": f"{self._run_id}-{next(self._ids)}",
+            "channel": channel,
+            "job": job,
+            "meta": meta or {},
+            "enqueued_at": time.time(),
+            "attempts": 0,
+        }
+        self.journal.add(item)
+        self._enqueue(queue, item)
+        return item["id"]
+
+    def _enqueue(self, queue: _ChannelQueue, item: Dict[str, Any]) -> None:
+        with queue.cond:
+            queue.enqueued += 1
+            queue.ready.append(item)
+            queue.cond.notify()
+
+    # ---------- workers ----------
+
+    def _worker(self, queue: _ChannelQueue) -> None:
+        fits = _BATCHING.get(queue.name, (None, lambda batch, job: False))[1]
+        while not self._stop_event.is_set():
+            batch = queue.take(self._stop_event, self.linger_sec, fits)
+            if not batch:
+                continue
+            t0 = time.time()
+            try:
+                ok, err = self._deliver(queue.name, batch)
+            except Exception as e:
+                ok, err = False, str(e)
+            finished = time.time()
+            self._finish(queue, batch, ok, err, t0, finished)
+
+    def _deliver(self, channel: str, batch: List[Dict[str, Any]]) -> Tuple[bool, str]:
+        jobs = [item["job"] for item in batch]
+        if len(jobs) == 1:
+            return self.notifier.deliver(channel, jobs[0])
+        if channel == "telegram":
+            first = jobs[0]
+            return self.notifier._notify_telegram(
+                chat_id=first.get("chat_id") or "",
+                text=_BATCH_SEPARATOR.join(str(j.get("text") or "") for j in jobs),
+                token_override=first.get("token_override") or "",
+                parse_mode=first.get("parse_mode") or "",
+            )
+        if channel == "discord":
+            return self.notifier._notify_discord_batch(
+                url=jobs[0].get("url") or "",
+                payloads=[j.get("payload") or {} for j in jobs],
+                fallback_text=_BATCH_SEPARATOR.join(str(j.get("fallback_text") or "") for j in jobs),
+            )
+        raise ValueError(f"channel {channel} does not batch")
+
+    def _finish(self, queue: _ChannelQueue, batch: List[Dict[str, Any]], ok: bool, err: str,
+                started: float, finished: float) -> None:
+        retry: List[Dict[str, Any]] = []
+        with queue.cond:
+            queue.send_ms.append((finished - started) * 1000.0)
+            if len(batch) > 1:
+                queue.batches += 1
+                queue.batched_jobs += len(batch)
+            for item in batch:
+                item["attempts"] = int(item.get("attempts") or 0) + 1
+                if ok:
+                    queue.delivered += 1
+                    queue.latency_ms.append((finished - float(item["enqueued_at"])) * 1000.0)
+                elif item["attempts"] < self.max_attempts:
+                    queue.retried += 1
+                    retry.append(item)
+                else:
+                    queue.failed += 1
+            if not ok:
+                queue.last_error = str(err or "")[:300]
+            not_before = finished + self.retry_base_sec * (2 ** (batch[0]["attempts"] - 1))
+            for item in retry:
+                heapq.heappush(queue.delayed, (not_before, next(self._seq), item))
+        queue.done(batch)
+
+        retry_ids = {item["id"] for item in retry}
+        for item in batch:
+            if item["id"] not in retry_ids:
+                self.journal.ack(item["id"])
+        if not ok:
+            meta = batch[0].get("meta") or {}
+            # Never log targets: webhook URLs and bot tokens are secrets.
+            logger.info(
+                f"notify failed: channel={queue.name} strategy_id={meta.get('strategy_id')} symbol={meta.get('symbol')} "
+                f"signal={meta.get('signal')} batch={len(batch)} attempt={batch[0]['attempts']} "
+                f"retry={'yes' if retry else 'no'} err={err}"
+            )
+
+    def _journal_loop(self) -> None:
+        while not self._stop_event.wait(self.flush_sec):
+            idle = all(q.depth() == 0 for q in self._queues.values())
+            self.journal.flush(compact=idle)
+
+    # ---------- metrics ----------
+
+    def stats(self) -> Dict[str, Any]:
+        channels = {}
+        for name, queue in self._queues.items():
+            with queue.cond:
+                latency = sorted(queue.latency_ms)
+                send = sorted(queue.send_ms)
+                channels[name] = {
+                    "workers": queue.workers,
+                    "queued": len(queue.ready),
+                    "retry_wait": len(queue.delayed),
+                    "in_flight": queue.in_flight,
+                    "enqueued": queue.enqueued,
+                    "delivered": queue.delivered,
+                    "failed": queue.failed,
+                    "retried": queue.retried,
+                    "batches": queue.batches,
+                    "avg_batch_size": round(queue.batched_jobs / queue.batches, 2) if queue.batches else None,
+                    "latency_ms": {
+                        "p50": _percentile(latency, 0.5),
+                        "p95": _percentile(latency, 0.95),
+                        "max": round(latency[-1], 1) if latency else 0.0,
+                    },
+                    "send_ms_p50": _percentile(send, 0.5),
+                    "last_error": queue.last_error,
+                }
+        return {
+            "running": self._started and not self._stop_event.is_set(),
+            "journal": {
+                "enabled": self.journal.enabled,
+                "path": self.journal.path,
+                "replayed": self.journal.replayed,
+            },
+            "channels": channels,
+        }
+
+
+_dispatcher: Optional[NotificationDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_notification_dispatcher() -> NotificationDispatcher:
+    """Process-wide NotificationDispatcher singleton (workers start on first use)."""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = NotificationDispatcher()
+    return _dispatcher
@@ -4,20 +4,38 @@ Pending order worker.
 This worker polls `pending_orders` periodically and dispatches orders based on `execution_mode`:
 - signal: send notifications (no real trading).
 - live: not implemented (paper mode only).
+
+Dispatch model:
+- a batch of rows is claimed atomically (`SELECT ... FOR UPDATE SKIP LOCKED` + `UPDATE ... RETURNING`),
+  so several worker processes can share the table without double-processing;
+- claimed orders go into per-exchange-account lanes and run on a bounded thread pool
+  (PENDING_ORDER_WORKERS): different accounts execute concurrently, orders of one account
+  run strictly one after another in claim order (priority DESC, id ASC);
+- across processes, a strategy with an order still in flight is not claimed again until it finishes.
+
+Wakeup: `TradingExecutor._enqueue_pending_order` sends `NOTIFY pending_orders` on insert; the worker
+blocks on a LISTEN connection (plus an internal wake socket for finished orders) and only falls back
+to polling every PENDING_ORDER_FALLBACK_POLL_SEC, or every `poll_interval_sec` without LISTEN.
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
 import os
+import select
+import socket
 import threading
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 from app.services.signal_notifier import SignalNotifier
 from app.services.exchange_execution import load_strategy_configs, resolve_exchange_config, safe_exchange_config_for_log
 from app.services.live_trading.execution import place_order_from_signal
-from app.services.live_trading.factory import create_client
+from app.services.live_trading.client_registry import get_client
+from app.services.live_trading.fill_stream import get_fill_stream_manager
 from app.services.live_trading.records import apply_fill_to_local_position, record_trade
 from app.services.live_trading.base import LiveTradingError
 from app.services.live_trading.binance import BinanceFuturesClient
@@ -36,7 +54,7 @@ from app.services.live_trading.bitfinex import BitfinexClient
 from app.services.live_trading.bitfinex import BitfinexDerivativesClient
 from app.services.live_trading.symbols import to_okx_swap_inst_id
 from app.services.live_trading.symbols import to_gate_currency_pair
-from app.utils.db import get_db_connection
+from app.utils.db import get_db_connection, open_listen_connection
 from app.utils.logger import get_logger
 
 # Lazy import IBKR to avoid ImportError if ib_insync not installed
@@ -47,6 +65,9 @@ MT5Client = None
 
 logger = get_logger(__name__)
 
+# NOTIFY channel used by TradingExecutor._enqueue_pending_order.
+PENDING_ORDERS_CHANNEL = "pending_orders"
+
 
 class PendingOrderWorker:
     def __init__(self, poll_interval_sec: float = 1.0, batch_size: int = 50):
@@ -57,6 +78,30 @@ class PendingOrderWorker:
         self._lock = threading.Lock()
         self._notifier = SignalNotifier()
 
+        # Concurrent dispatch: one lane (FIFO) per exchange account, lanes drained by a bounded pool.
+        try:
+            self.max_workers = max(1, int(os.getenv("PENDING_ORDER_WORKERS", "4")))
+        except Exception:
+            self.max_workers = 4
+        # Claimed-but-unfinished orders held by this process (keeps claims well below the stale threshold).
+        self.max_inflight = max(self.max_workers, min(self.batch_size, self.max_workers * 4))
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lanes: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._lanes_lock = threading.Lock()
+        self._inflight = 0
+        self._account_keys: Dict[int, Tuple[str, float]] = {}
+
+        # LISTEN/NOTIFY wakeup; polling is only a fallback (missed notifications, LISTEN unavailable).
+        self._listen_enabled = os.getenv("PENDING_ORDER_LISTEN", "true").lower() == "true"
+        try:
+            self._fallback_poll_sec = float(os.getenv("PENDING_ORDER_FALLBACK_POLL_SEC", "5"))
+        except Exception:
+            self._fallback_poll_sec = 5.0
+        self._listen_conn = None
+        self._listen_retry_ts = 0.0
+        self._wake_r = self._wake_w = None
+        self._open_wake_pipe()
+
         # Reclaim stuck orders (e.g. if the worker crashed after claiming an order).
         try:
             self._stale_processing_sec = int(os.getenv("PENDING_ORDER_STALE_SEC", "90"))
@@ -74,50 +119,212 @@ class PendingOrderWorker:
             if self._thread and self._thread.is_alive():
                 return True
             self._stop_event.clear()
+            if self._wake_r is None:
+                self._open_wake_pipe()
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="PendingOrderDispatch")
             self._thread = threading.Thread(target=self._run_loop, name="PendingOrderWorker", daemon=True)
             self._thread.start()
-            logger.info("PendingOrderWorker started")
+            logger.info(f"PendingOrderWorker started (workers={self.max_workers}, max_inflight={self.max_inflight})")
             return True
 
     def stop(self, timeout_sec: float = 5.0) -> None:
         with self._lock:
             self._stop_event.set()
             th = self._thread
+        self._wake()
         if th and th.is_alive():
             th.join(timeout=timeout_sec)
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            # Orders already claimed finish; lanes stop picking new ones once the pool is gone.
+            pool.shutdown(wait=True)
+        if not (th and th.is_alive()):
+            with self._lock:
+                self._close_wake_pipe()
         logger.info("PendingOrderWorker stopped")
 
     def _run_loop(self) -> None:
-        while not self._stop_event.is_set():
-            try:
-                self._tick()
-            except Exception as e:
-                logger.warning(f"PendingOrderWorker tick error: {e}")
-            time.sleep(self.poll_interval_sec)
-
-    def _tick(self) -> None:
-        # logger.info(f"[PendingOrderWorker] _tick start. last_sync={self._last_position_sync_ts}")
-        orders = self._fetch_pending_orders(limit=self.batch_size)
-        # logger.info(f"[PendingOrderWorker] orders fetched: {len(orders)}")
-        if not orders:
-            self._maybe_sync_positions()
-            return
-
+        try:
+            while not self._stop_event.is_set():
+                claimed = 0
+                try:
+                    claimed = self._tick()
+                except Exception as e:
+                    logger.warning(f"PendingOrderWorker tick error: {e}")
+                if claimed:
+                    # More rows may be waiting behind a full batch; claim again right away.
+                    continue
+                self._wait_for_work()
+        finally:
+            self._close_listener()
+
+    def _tick(self) -> int:
+        with self._lanes_lock:
+            free = self.max_inflight - self._inflight
+        orders = self._claim_pending_orders(limit=min(self.batch_size, free)) if free > 0 else []
         for o in orders:
-            oid = o.get("id")
-            if not oid:
+            if not o.get("id"):
                 continue
+            self._submit(o)
 
-            # Mark processing (best-effort)
-            if not self._mark_processing(order_id=int(oid)):
-                continue
+        self._maybe_sync_positions()
+        return len(orders)
+
+    def _open_wake_pipe(self) -> None:
+        # socketpair (not os.pipe) so select() also works on Windows.
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+
+    def _close_wake_pipe(self) -> None:
+        socks, self._wake_r, self._wake_w = (self._wake_r, self._wake_w), None, None
+        for sock in socks:
+            if sock is not None:
+                try:
+                    sock.close()
+                except Exception:
+                    pass
+
+    def _wake(self) -> None:
+        sock = self._wake_w
+        if sock is None:
+            return
+        try:
+            sock.send(b"\0")
+        except (BlockingIOError, OSError):
+            # Buffer full means a wakeup is already pending (or the pipe was closed by stop()).
+            pass
 
+    def _ensure_listener(self):
+        if not self._listen_enabled:
+            return None
+        conn = self._listen_conn
+        if conn is not None and not conn.closed:
+            return conn
+        now = time.time()
+        if now < self._listen_retry_ts:
+            return None
+        try:
+            self._listen_conn = open_listen_connection(PENDING_ORDERS_CHANNEL)
+            logger.info(f"PendingOrderWorker listening on '{PENDING_ORDERS_CHANNEL}' (fallback poll {self._fallback_poll_sec}s)")
+            return self._listen_conn
+        except Exception as e:
+            self._listen_conn = None
+            self._listen_retry_ts = now + 30.0
+            logger.warning(f"PendingOrderWorker LISTEN unavailable, polling every {self.poll_interval_sec}s: {e}")
+            return None
+
+    def _close_listener(self) -> None:
+        conn, self._listen_conn = self._listen_conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _wait_for_work(self) -> None:
+        """Block until a NOTIFY, a finished order (capacity / next order of a strategy), stop, or timeout."""
+        conn = self._ensure_listener()
+        timeout = self._fallback_poll_sec if conn is not None else self.poll_interval_sec
+        if self._position_sync_enabled and self._position_sync_interval_sec > 0:
+            due = float(self._last_position_sync_ts or 0.0) + float(self._position_sync_interval_sec) - time.time()
+            timeout = min(timeout, max(0.05, due))
+        wake_r = self._wake_r
+        if wake_r is None:
+            return
+        fds = [wake_r] + ([conn] if conn is not None else [])
+        try:
+            ready, _, _ = select.select(fds, [], [], max(0.0, timeout))
+        except Exception as e:
+            logger.debug(f"PendingOrderWorker wait failed: {e}")
+            self._close_listener()
+            self._stop_event.wait(self.poll_interval_sec)
+            return
+        if wake_r in ready:
+            try:
+                while wake_r.recv(4096):
+                    pass
+            except (BlockingIOError, OSError):
+                pass
+        if conn is not None and conn in ready:
+            try:
+                conn.poll()
+                del conn.notifies[:]
+            except Exception as e:
+                logger.warning(f"PendingOrderWorker LISTEN connection lost: {e}")
+                self._close_listener()
+
+    def _submit(self, order_row: Dict[str, Any]) -> None:
+        """Queue a claimed order on its account lane; start a drain task if the lane is idle."""
+        key = self._account_key(order_row)
+        with self._lanes_lock:
+            self._inflight += 1
+            lane = self._lanes.get(key)
+            if lane is not None:
+                lane.append(order_row)
+                return
+            self._lanes[key] = deque([order_row])
+        pool = self._pool
+        if pool is None:
+            # Not started via start() (e.g. manual tick): run inline.
+            self._drain_lane(key)
+            return
+        try:
+            pool.submit(self._drain_lane, key)
+        except RuntimeError:
+            # Pool shut down: orders stay "processing" and are requeued by the stale check.
+            with self._lanes_lock:
+                self._inflight -= len(self._lanes.pop(key, ()) or ())
+
+    def _drain_lane(self, key: str) -> None:
+        while True:
+            with self._lanes_lock:
+                lane = self._lanes.get(key)
+                if not lane:
+                    self._lanes.pop(key, None)
+                    return
+                o = lane.popleft()
+            oid = int(o.get("id"))
             try:
                 self._dispatch_one(o)
             except Exception as e:
-                self._mark_failed(order_id=int(oid), error=str(e))
+                self._mark_failed(order_id=oid, error=str(e))
+            finally:
+                with self._lanes_lock:
+                    self._inflight -= 1
+                # Frees capacity, and the strategy's next order becomes claimable.
+                self._wake()
+
+    def _account_key(self, order_row: Dict[str, Any]) -> str:
+        """
+        Ordering key for an order: the exchange account its strategy trades on.
 
-        self._maybe_sync_positions()
+        Strategies sharing a credential (or the same inline API key) share a lane; signal-only
+        strategies get their own lane. Cached briefly to avoid a DB read per order.
+        """
+        sid = int(order_row.get("strategy_id") or 0)
+        if sid <= 0:
+            return f"order:{order_row.get('id')}"
+        now = time.time()
+        cached = self._account_keys.get(sid)
+        if cached and now - cached[1] < 60:
+            return cached[0]
+        key = f"strategy:{sid}"
+        try:
+            cfg = load_strategy_configs(sid).get("exchange_config") or {}
+            credential_id = cfg.get("credential_id") or cfg.get("credentials_id")
+            api_key = str(cfg.get("api_key") or cfg.get("apiKey") or "")
+            exchange_id = str(cfg.get("exchange_id") or "").strip().lower()
+            if credential_id:
+                key = f"credential:{int(credential_id)}"
+            elif api_key:
+                key = f"{exchange_id}:{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]}"
+        except Exception:
+            pass
+        self._account_keys[sid] = (key, now)
+        return key
 
     def _maybe_sync_positions(self) -> None:
         if not self._position_sync_enabled:
@@ -223,7 +430,7 @@ class PendingOrderWorker:
                     except ImportError:
                         pass
 
-                client = create_client(exchange_config, market_type=market_type)
+                client = get_client(exchange_config, market_type=market_type)
                 
                 # Build an "exchange snapshot" per symbol+side
                 exch_size: Dict[str, Dict[str, float]] = {}  # {symbol: {long: size, short: size}}
@@ -555,7 +762,17 @@ class PendingOrderWorker:
             except Exception as e:
                 logger.error(f"position sync: strategy_id={sid} failed: {e}", exc_info=True)
 
-    def _fetch_pending_orders(self, limit: int = 50) -> List[Dict[str, Any]]:
+    def _claim_pending_orders(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Atomically claim up to `limit` pending orders (status -> processing, attempts + 1).
+
+        `FOR UPDATE SKIP LOCKED` lets concurrent workers claim disjoint rows. A strategy is skipped while
+        another worker holds its rows (advisory xact lock, taken only on the picked rows) or one of its
+        orders is still processing, so per-strategy order is preserved across processes. Picked rows
+        whose strategy lock is held elsewhere stay pending for the next claim.
+        """
+        if limit <= 0:
+            return []
         try:
             # Best-effort: requeue stale "processing" rows to avoid deadlocks after crashes.
             try:
@@ -587,48 +804,49 @@ class PendingOrderWorker:
                 cur = db.cursor()
                 cur.execute(
                     """
-                    SELECT *
-                    FROM pending_orders
-                    WHERE status = 'pending'
-                      AND (attempts < max_attempts)
-                    ORDER BY priority DESC, id ASC
-                    LIMIT %s
-                    """,
-                    (int(limit),),
-                )
-                rows = cur.fetchall() or []
-                cur.close()
-            return rows
-        except Exception as e:
-            logger.warning(f"fetch_pending_orders failed: {e}")
-            return []
-
-    def _mark_processing(self, order_id: int) -> bool:
-        try:
-            with get_db_connection() as db:
-                cur = db.cursor()
-                # Only claim if still pending to avoid double-processing.
-                cur.execute(
-                    """
-                    UPDATE pending_orders
+                    WITH picked AS (
+                        SELECT p.id, p.strategy_id
+                        FROM pending_orders p
+                        WHERE p.status = 'pending'
+                          AND (p.attempts < p.max_attempts)
+                          AND NOT EXISTS (
+                              SELECT 1 FROM pending_orders q
+                              WHERE q.status = 'processing'
+                                AND q.strategy_id = p.strategy_id
+                                AND q.updated_at > NOW() - INTERVAL '%s seconds'
+                          )
+                        ORDER BY p.priority DESC, p.id ASC
+                        LIMIT %s
+                        FOR UPDATE OF p SKIP LOCKED
+                    ),
+                    -- Advisory locks only for the rows actually picked (a row-locking CTE is never
+                    -- inlined), so the transaction does not hold strategies it did not claim.
+                    claimable AS (
+                        SELECT id
+                        FROM picked
+                        WHERE pg_try_advisory_xact_lock(hashtext('pending_orders'), COALESCE(strategy_id, -id))
+                    )
+                    UPDATE pending_orders o
                     SET status = 'processing',
-                        attempts = COALESCE(attempts, 0) + 1,
+                        attempts = COALESCE(o.attempts, 0) + 1,
                         processed_at = NOW(),
                         updated_at = NOW()
-                    WHERE id = %s AND status = 'pending'
+                    FROM claimable
+                    WHERE o.id = claimable.id
+                    RETURNING o.*
                     """,
-                    (int(order_id),),
+                    # Orders stuck in "processing" longer than the stale window no longer block their strategy.
+                    (int(stale_sec if stale_sec > 0 else 3600), int(limit)),
                 )
-                claimed = getattr(cur, "rowcount", None)
+                rows = cur.fetchall() or []
                 db.commit()
                 cur.close()
-            # Only treat as success if we actually changed a row.
-            if claimed is None:
-                return True
-            return int(claimed) > 0
+            # RETURNING order is unspecified; dispatch in queue order.
+            rows.sort(key=lambda r: (-int(r.get("priority") or 0), int(r.get("id") or 0)))
+            return rows
         except Exception as e:
-            logger.warning(f"mark_processing failed: id={order_id}, err={e}")
-            return False
+            logger.warning(f"claim_pending_orders failed: {e}")
+            return []
 
     def _dispatch_one(self, order_row: Dict[str, Any]) -> None:
         order_id = int(order_row["id"])
@@ -689,7 +907,9 @@ class PendingOrderWorker:
             fail_channels = [c for c, r in results.items() if not (r or {}).get("ok")]
 
             if ok_channels:
-                note = f"notified_ok={','.join(ok_channels)}"
+                # Async dispatch: "ok" means accepted by the notification queue (delivery is tracked there).
+                queued = any((results.get(c) or {}).get("queued") for c in ok_channels)
+                note = f"{'queued' if queued else 'notified_ok'}={','.join(ok_channels)}"
                 if fail_channels:
                     note += f";fail={','.join(fail_channels)}"
                 self._mark_sent(order_id=order_id, note=note[:200])
@@ -877,7 +1097,9 @@ class PendingOrderWorker:
 
         client = None
         try:
-            client = create_client(exchange_config, market_type=market_type)
+            client = get_client(exchange_config, market_type=market_type)
+            # Open (non-blocking) the account's user data stream so fills can be awaited without polling.
+            get_fill_stream_manager().ensure(client)
         except Exception as e:
             self._mark_failed(order_id=order_id, error=f"create_client_failed:{e}")
             _console_print(f"[worker] create_client_failed: strategy_id={strategy_id} pending_id={order_id} err={e}")
@@ -1417,13 +1639,13 @@ class PendingOrderWorker:
 
                 # Wait for fills
                 if isinstance(client, BinanceFuturesClient):
-                    q = client.wait_for_fill(symbol=str(symbol), order_id=limit_order_id, client_order_id=limit_client_oid, max_wait_sec=maker_wait_sec)
+                    q = get_fill_stream_manager().wait_for_fill(client, symbol=str(symbol), order_id=limit_order_id, client_order_id=limit_client_oid, max_wait_sec=maker_wait_sec)
                     phases["limit_query"] = q
                     _apply_fill(float(q.get("filled") or 0.0), float(q.get("avg_price") or 0.0))
                     fee_v, fee_c = _fetch_fee_best_effort(order_id0=limit_order_id, client_order_id0=limit_client_oid)
                     _apply_fee(float(fee_v or 0.0), str(fee_c or ""))
                 elif isinstance(client, BinanceSpotClient):
-                    q = client.wait_for_fill(symbol=str(symbol), order_id=limit_order_id, client_order_id=limit_client_oid, max_wait_sec=maker_wait_sec)
+                    q = get_fill_stream_manager().wait_for_fill(client, symbol=str(symbol), order_id=limit_order_id, client_order_id=limit_client_oid, max_wait_sec=maker_wait_sec)
                     phases["limit_query"] = q
                     _apply_fill(float(q.get("filled") or 0.0), float(q.get("avg_price") or 0.0))
                     fee_v, fee_c = _fetch_fee_best_effort(order_id0=limit_order_id, client_order_id0=limit_client_oid)
@@ -1741,13 +1963,13 @@ class PendingOrderWorker:
 
                 # Query fills (short wait)
                 if isinstance(client, BinanceFuturesClient):
-                    q2 = client.wait_for_fill(symbol=str(symbol), order_id=market_order_id, client_order_id=market_client_oid, max_wait_sec=3.0)
+                    q2 = get_fill_stream_manager().wait_for_fill(client, symbol=str(symbol), order_id=market_order_id, client_order_id=market_client_oid, max_wait_sec=3.0)
                     phases["market_query"] = q2
                     _apply_fill(float(q2.get("filled") or 0.0), float(q2.get("avg_price") or 0.0))
                     fee_v, fee_c = _fetch_fee_best_effort(order_id0=market_order_id, client_order_id0=market_client_oid)
                     _apply_fee(float(fee_v or 0.0), str(fee_c or ""))
                 elif isinstance(client, BinanceSpotClient):
-                    q2 = client.wait_for_fill(symbol=str(symbol), order_id=market_order_id, client_order_id=market_client_oid, max_wait_sec=3.0)
+                    q2 = get_fill_stream_manager().wait_for_fill(client, symbol=str(symbol), order_id=market_order_id, client_order_id=market_client_oid, max_wait_sec=3.0)
                     phases["market_query"] = q2
                     _apply_fill(float(q2.get("filled") or 0.0), float(q2.get("avg_price") or 0.0))
                     fee_v, fee_c = _fetch_fee_best_effort(order_id0=market_order_id, client_order_id0=market_client_oid)
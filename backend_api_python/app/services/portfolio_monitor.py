@@ -6,15 +6,20 @@ from __future__ import annotations
 
 import hashlib
 import json
+import os
 import threading
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any, Dict, List, Optional
 
+import numpy as np
+
 from app.utils.db import get_db_connection
 from app.utils.logger import get_logger
 from app.services.fast_analysis import get_fast_analysis_service
 from app.services.signal_notifier import SignalNotifier
+from app.services.alert_index import get_alert_index
 from app.services.kline import KlineService
 
 logger = get_logger(__name__)
@@ -970,167 +975,301 @@ def run_single_monitor(monitor_id: int, override_language: str = None, user_id:
         return {'success': False, 'error': str(e)}
 
 
+# Alert sweep: alerts are indexed by (market, symbol); each distinct price is fetched once
+# (batch ticker endpoints per market, markets in parallel) and the crossed alerts of a symbol are
+# evaluated in one vectorized pass.
+ALERT_PRICE_WORKERS = int(os.getenv('ALERT_PRICE_WORKERS', '8'))
+
+_ALERT_TYPE_CODES = {'price_above': 0, 'price_below': 1, 'pnl_above': 2, 'pnl_below': 3}
+
+_alert_stats_lock = threading.Lock()
+_alert_stats: Dict[str, Any] = {
+    'sweeps': 0,
+    'total_triggered': 0,
+    'last_sweep_at': 0,
+    'last_sweep_sec': 0.0,
+    'last_price_fetch_sec': 0.0,
+    'last_alerts': 0,
+    'last_candidates': 0,
+    'last_symbols': 0,
+    'last_triggered': 0,
+    'alerts_per_sec': 0.0,
+}
+
+
+def get_alert_sweep_stats() -> Dict[str, Any]:
+    """Metrics of the most recent position-alert sweep (duration, throughput)."""
+    with _alert_stats_lock:
+        return dict(_alert_stats)
+
+
+def _fetch_alert_prices(kline_service: KlineService, keys: List[tuple]) -> Dict[tuple, float]:
+    """Current price for each distinct (market, symbol): one batch request per market, markets in parallel."""
+    by_market: Dict[str, List[str]] = {}
+    for market, symbol in keys:
+        by_market.setdefault(market, []).append(symbol)
+
+    def fetch_market(market: str) -> Dict[tuple, float]:
+        prices = kline_service.get_realtime_prices(market, by_market[market], max_workers=ALERT_PRICE_WORKERS)
+        return {(market, sym): float((data or {}).get('price') or 0) for sym, data in prices.items()}
+
+    prices: Dict[tuple, float] = {}
+    if not by_market:
+        return prices
+    with ThreadPoolExecutor(max_workers=max(1, min(ALERT_PRICE_WORKERS, len(by_market)))) as executor:
+        futures = {executor.submit(fetch_market, market): market for market in by_market}
+        for future in as_completed(futures):
+            try:
+                prices.update(future.result())
+            except Exception as e:
+                logger.warning(f"Alert price fetch failed for market {futures[future]}: {e}")
+    return prices
+
+
+def _evaluate_alert_group(alerts: List[Dict[str, Any]], current_price: float) -> List[tuple]:
+    """
+    Evaluate all alerts of one symbol against its price in a single vectorized pass.
+
+    Returns:
+        [(alert, pnl_percent or None), ...] for triggered alerts
+    """
+    types = np.array([_ALERT_TYPE_CODES.get(a.get('alert_type'), -1) for a in alerts])
+    thresholds = np.array([float(a.get('threshold') or 0) for a in alerts])
+    entry = np.array([float(a.get('entry_price') or 0) for a in alerts])
+    quantity = np.array([float(a.get('quantity') or 0) for a in alerts])
+    direction = np.array([1.0 if (a.get('side') or 'long') == 'long' else -1.0 for a in alerts])
+
+    has_position = (entry > 0) & (quantity > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pnl_percent = np.where(has_position, direction * (current_price - entry) / entry * 100, np.nan)
+
+    triggered = (
+        ((types == 0) & (current_price >= thresholds))
+        | ((types == 1) & (current_price <= thresholds))
+        | ((types == 2) & has_position & (pnl_percent >= thresholds))
+        | ((types == 3) & has_position & (pnl_percent <= thresholds))
+    )
+    return [
+        (alerts[i], float(pnl_percent[i]) if types[i] >= 2 else None)
+        for i in np.flatnonzero(triggered)
+    ]
+
+
+def _claim_alert_fire(alert: Dict[str, Any]) -> bool:
+    """
+    Atomically mark an alert as triggered in the DB.
+
+    Every process keeps its own alert index, so several workers can see the same crossing (and an
+    index can be stale after an edit made through another worker). Only the process whose UPDATE
+    still matches an active, armed, unchanged alert may notify.
+    """
+    with get_db_connection() as db:
+        cur = db.cursor()
+        cur.execute(
+            """
+            UPDATE qd_position_alerts
+            SET is_triggered = 1, last_triggered_at = NOW(), trigger_count = trigger_count + 1, updated_at = NOW()
+            WHERE id = ? AND is_active = 1 AND alert_type = ? AND threshold = ?
+              AND (is_triggered = 0
+                   OR (repeat_interval > 0 AND last_triggered_at <= NOW() - repeat_interval * INTERVAL '1 second'))
+            """,
+            (alert.get('id'), alert.get('alert_type'), alert.get('threshold'))
+        )
+        claimed = cur.rowcount == 1
+        db.commit()
+        cur.close()
+    return claimed
+
+
+def _fire_position_alert(alert: Dict[str, Any], current_price: float, pnl_percent: Optional[float],
+                         notifier: SignalNotifier) -> bool:
+    """
+    Claim a triggered alert and send its notifications.
+
+    Returns False (nothing sent) when another process already fired it or the alert was
+    deleted / deactivated / edited since the index loaded it.
+    """
+    alert_id = alert.get('id')
+    if not _claim_alert_fire(alert):
+        logger.info(f"Alert #{alert_id} not claimed (fired elsewhere or changed); refreshing index entry")
+        return False
+
+    alert_user_id = int(alert.get('user_id') or 1)
+    alert_type = alert.get('alert_type')
+    threshold = float(alert.get('threshold') or 0)
+    symbol = alert.get('symbol')
+    notification_config = alert['_notification_config']
+
+    # Get language from notification_config (saved when alert was created)
+    alert_language = notification_config.get('language', 'en-US')
+    if alert_type in ('price_above', 'price_below'):
+        alert_message = _get_alert_message(
+            alert_type, alert_language,
+            symbol=symbol, current_price=current_price, threshold=threshold
+        )
+    else:
+        alert_message = _get_alert_message(
+            alert_type, alert_language,
+            symbol=symbol, pnl_percent=pnl_percent, threshold=threshold
+        )
+
+    logger.info(f"Alert #{alert_id} triggered: {alert_message}")
+
+    # Send notification
+    channels = notification_config.get('channels', ['browser'])
+    targets = notification_config.get('targets', {})
+    alert_title = _get_alert_title(alert_language)
+
+    for channel in channels:
+        try:
+            ch = str(channel).strip().lower()
+            if ch == 'browser':
+                with get_db_connection() as db:
+                    cur = db.cursor()
+                    cur.execute(
+                        """
+                        INSERT INTO qd_strategy_notifications
+                        (user_id, strategy_id, symbol, signal_type, channels, title, message, payload_json, created_at)
+                        VALUES (?, NULL, ?, ?, ?, ?, ?, ?, NOW())
+                        """,
+                        (alert_user_id, symbol, 'price_alert', 'browser', alert_title, alert_message,
+                         json.dumps({'alert_id': alert_id, 'alert_type': alert_type}, ensure_ascii=False))
+                    )
+                    db.commit()
+                    cur.close()
+            elif ch == 'telegram':
+                chat_id = targets.get('telegram', '')
+                token_override = targets.get('telegram_bot_token', '')
+                if chat_id:
+                    notifier._notify_telegram(chat_id=chat_id, text=alert_message, token_override=token_override, parse_mode="HTML")
+            elif ch == 'email':
+                to_email = targets.get('email', '')
+                if to_email:
+                    notifier._notify_email(to_email=to_email, subject=alert_title, body_text=alert_message)
+        except Exception as e:
+            logger.warning(f"Failed to send alert notification: {e}")
+    return True
+
+
+_ALERT_ROWS_SQL = """
+    SELECT a.id, a.user_id, a.position_id, a.market, a.symbol, a.alert_type, a.threshold,
+           a.notification_config, a.is_active, a.is_triggered, a.last_triggered_at, a.repeat_interval,
+           p.entry_price, p.quantity, p.side, p.name as position_name
+    FROM qd_position_alerts a
+    LEFT JOIN qd_manual_positions p ON a.position_id = p.id
+"""
+
+
+def _load_alert_rows(where: str = "a.is_active = 1", params: tuple = ()) -> List[Dict[str, Any]]:
+    with get_db_connection() as db:
+        cur = db.cursor()
+        cur.execute(f"{_ALERT_ROWS_SQL} WHERE {where}", params)
+        rows = cur.fetchall() or []
+        cur.close()
+    return rows
+
+
+def refresh_alert_index(alert_id: int = None, position_id: int = None):
+    """
+    Re-read alerts changed through the API into the in-memory alert index.
+
+    Called after alerts (alert_id) or positions (position_id, affects pnl alerts) are created,
+    updated or deleted. No-op until the monitor has built the index in this process; other
+    processes pick up changes on the next full resync (ALERT_INDEX_RESYNC_SEC); until then their stale
+    entries cannot fire, because the DB claim in _fire_position_alert no longer matches.
+    """
+    index = get_alert_index()
+    if not index.loaded:
+        return
+    try:
+        if alert_id is not None:
+            ids = {int(alert_id)}
+            rows = _load_alert_rows("a.id = ?", (int(alert_id),))
+        elif position_id is not None:
+            ids = set(index.alert_ids_for_position(int(position_id)))
+            rows = _load_alert_rows("a.position_id = ?", (int(position_id),))
+        else:
+            return
+        for row in rows:
+            ids.discard(int(row['id']))
+            index.upsert(row)
+        for stale_id in ids:
+            index.remove(stale_id)
+    except Exception as e:
+        logger.warning(f"refresh_alert_index failed: {e}")
+
+
 def _check_position_alerts():
-    """Check all active alerts and trigger notifications if conditions are met."""
-    from datetime import datetime, timezone
+    """
+    Check active alerts against current prices and trigger notifications.
+
+    Alerts live in a per-symbol price index (app.services.alert_index): only alerts whose trigger
+    price was crossed since the previous sweep (plus new / re-armed ones) are evaluated.
+    """
+    sweep_start = time.perf_counter()
     try:
         kline_service = KlineService()
         notifier = SignalNotifier()
-        now = datetime.now(timezone.utc)
+        index = get_alert_index()
         
-        with get_db_connection() as db:
-            cur = db.cursor()
-            # Get active alerts for all users that haven't been triggered (or can repeat)
-            cur.execute(
-                """
-                SELECT a.id, a.user_id, a.position_id, a.market, a.symbol, a.alert_type, a.threshold,
-                       a.notification_config, a.is_triggered, a.last_triggered_at, a.repeat_interval,
-                       p.entry_price, p.quantity, p.side, p.name as position_name
-                FROM qd_position_alerts a
-                LEFT JOIN qd_manual_positions p ON a.position_id = p.id
-                WHERE a.is_active = 1
-                """
-            )
-            alerts = cur.fetchall() or []
-            cur.close()
+        if index.needs_resync():
+            index.rebuild(_load_alert_rows())
         
-        for alert in alerts:
+        keys = index.keys()
+        
+        # One price per distinct symbol
+        fetch_start = time.perf_counter()
+        prices = _fetch_alert_prices(kline_service, keys)
+        fetch_sec = time.perf_counter() - fetch_start
+        
+        candidates = 0
+        triggered_count = 0
+        for key in keys:
+            current_price = prices.get(key, 0)
+            if current_price <= 0:
+                continue
+            group = index.on_price(key, current_price)
+            if not group:
+                continue
+            candidates += len(group)
             try:
-                alert_id = alert.get('id')
-                alert_user_id = int(alert.get('user_id') or 1)
-                alert_type = alert.get('alert_type')
-                threshold = float(alert.get('threshold') or 0)
-                market = alert.get('market')
-                symbol = alert.get('symbol')
-                is_triggered = bool(alert.get('is_triggered'))
-                last_triggered_at = alert.get('last_triggered_at')  # datetime or None
-                repeat_interval = int(alert.get('repeat_interval') or 0)
-                notification_config = _safe_json_loads(alert.get('notification_config'), {})
-                
-                # Check if we can trigger (not triggered yet, or repeat interval passed)
-                can_trigger = not is_triggered
-                if is_triggered and repeat_interval > 0 and last_triggered_at:
-                    # Convert last_triggered_at to timezone-aware if needed
-                    if last_triggered_at.tzinfo is None:
-                        last_triggered_at = last_triggered_at.replace(tzinfo=timezone.utc)
-                    elapsed_seconds = (now - last_triggered_at).total_seconds()
-                    if elapsed_seconds >= repeat_interval:
-                        can_trigger = True
-                
-                if not can_trigger:
-                    continue
-                
-                # Get current price (use realtime price API)
-                current_price = 0
-                try:
-                    price_data = kline_service.get_realtime_price(market, symbol)
-                    current_price = float(price_data.get('price') or 0)
-                except Exception:
-                    continue
-                
-                if current_price <= 0:
-                    continue
-                
-                triggered = False
-                alert_message = ""
-                
-                # Get language from notification_config (saved when alert was created)
-                alert_language = notification_config.get('language', 'en-US')
-                
-                if alert_type == 'price_above':
-                    if current_price >= threshold:
-                        triggered = True
-                        alert_message = _get_alert_message(
-                            'price_above', alert_language,
-                            symbol=symbol, current_price=current_price, threshold=threshold
-                        )
-                
-                elif alert_type == 'price_below':
-                    if current_price <= threshold:
-                        triggered = True
-                        alert_message = _get_alert_message(
-                            'price_below', alert_language,
-                            symbol=symbol, current_price=current_price, threshold=threshold
-                        )
-                
-                elif alert_type in ('pnl_above', 'pnl_below'):
-                    entry_price = float(alert.get('entry_price') or 0)
-                    quantity = float(alert.get('quantity') or 0)
-                    side = alert.get('side') or 'long'
-                    
-                    if entry_price > 0 and quantity > 0:
-                        if side == 'long':
-                            pnl = (current_price - entry_price) * quantity
-                        else:
-                            pnl = (entry_price - current_price) * quantity
-                        pnl_percent = pnl / (entry_price * quantity) * 100
-                        
-                        if alert_type == 'pnl_above' and pnl_percent >= threshold:
-                            triggered = True
-                            alert_message = _get_alert_message(
-                                'pnl_above', alert_language,
-                                symbol=symbol, pnl_percent=pnl_percent, threshold=threshold
-                            )
-                        elif alert_type == 'pnl_below' and pnl_percent <= threshold:
-                            triggered = True
-                            alert_message = _get_alert_message(
-                                'pnl_below', alert_language,
-                                symbol=symbol, pnl_percent=pnl_percent, threshold=threshold
-                            )
-                
-                if triggered:
-                    logger.info(f"Alert #{alert_id} triggered: {alert_message}")
-                    
-                    # Update alert status
-                    with get_db_connection() as db:
-                        cur = db.cursor()
-                        cur.execute(
-                            """
-                            UPDATE qd_position_alerts
-                            SET is_triggered = 1, last_triggered_at = NOW(), trigger_count = trigger_count + 1, updated_at = NOW()
-                            WHERE id = ?
-                            """,
-                            (alert_id,)
-                        )
-                        db.commit()
-                        cur.close()
-                    
-                    # Send notification
-                    channels = notification_config.get('channels', ['browser'])
-                    targets = notification_config.get('targets', {})
-                    alert_title = _get_alert_title(alert_language)
-                    
-                    for channel in channels:
-                        try:
-                            ch = str(channel).strip().lower()
-                            if ch == 'browser':
-                                with get_db_connection() as db:
-                                    cur = db.cursor()
-                                    cur.execute(
-                                        """
-                                        INSERT INTO qd_strategy_notifications
-                                        (user_id, strategy_id, symbol, signal_type, channels, title, message, payload_json, created_at)
-                                        VALUES (?, NULL, ?, ?, ?, ?, ?, ?, NOW())
-                                        """,
-                                        (alert_user_id, symbol, 'price_alert', 'browser', alert_title, alert_message,
-                                         json.dumps({'alert_id': alert_id, 'alert_type': alert_type}, ensure_ascii=False))
-                                    )
-                                    db.commit()
-                                    cur.close()
-                            elif ch == 'telegram':
-                                chat_id = targets.get('telegram', '')
-                                token_override = targets.get('telegram_bot_token', '')
-                                if chat_id:
-                                    notifier._notify_telegram(chat_id=chat_id, text=alert_message, token_override=token_override, parse_mode="HTML")
-                            elif ch == 'email':
-                                to_email = targets.get('email', '')
-                                if to_email:
-                                    notifier._notify_email(to_email=to_email, subject=alert_title, body_text=alert_message)
-                        except Exception as e:
-                            logger.warning(f"Failed to send alert notification: {e}")
-                            
+                fired = _evaluate_alert_group(group, current_price)
             except Exception as e:
-                logger.warning(f"Error processing alert: {e}")
+                logger.warning(f"Error evaluating alerts for {key[0]}:{key[1]}: {e}")
+                continue
+            for alert, pnl_percent in fired:
+                try:
+                    if _fire_position_alert(alert, current_price, pnl_percent, notifier):
+                        index.mark_fired(int(alert['id']))
+                        triggered_count += 1
+                    else:
+                        # Re-read the row: drops deleted / inactive / fired one-shot alerts,
+                        # puts repeating ones into the cooldown set by the other process.
+                        refresh_alert_index(alert_id=int(alert['id']))
+                except Exception as e:
+                    index.retry(int(alert['id']))
+                    logger.warning(f"Error processing alert: {e}")
+        
+        sweep_sec = time.perf_counter() - sweep_start
+        index_stats = index.stats()
+        with _alert_stats_lock:
+            _alert_stats.update({
+                'sweeps': _alert_stats['sweeps'] + 1,
+                'total_triggered': _alert_stats['total_triggered'] + triggered_count,
+                'last_sweep_at': _now_ts(),
+                'last_sweep_sec': round(sweep_sec, 4),
+                'last_price_fetch_sec': round(fetch_sec, 4),
+                'last_alerts': index_stats['alerts'],
+                'last_candidates': candidates,
+                'last_symbols': len(keys),
+                'last_triggered': triggered_count,
+                'alerts_per_sec': round(index_stats['alerts'] / sweep_sec, 1) if sweep_sec > 0 else 0.0,
+                'index': index_stats,
+            })
+        if keys:
+            logger.debug(f"Alert sweep: {index_stats['alerts']} alerts / {len(keys)} symbols, "
+                         f"{candidates} evaluated in {sweep_sec:.2f}s (prices {fetch_sec:.2f}s), "
+                         f"triggered {triggered_count}")
                 
     except Exception as e:
         logger.error(f"_check_position_alerts failed: {e}")
@@ -1216,8 +1355,173 @@ def notify_strategy_signal_for_positions(market: str, symbol: str, signal_type:
         logger.error(f"notify_strategy_signal_for_positions failed: {e}")
 
 
+# AI monitor scheduler: due monitors are claimed atomically in the DB (FOR UPDATE SKIP LOCKED +
+# next_run_at lease, safe across app instances) and run on a bounded worker pool. Each user has at
+# most MONITOR_MAX_PER_USER monitors in flight and claims are ordered round-robin across users.
+# A monitor whose run dies mid-way becomes due again after MONITOR_LEASE_SEC.
+MONITOR_WORKERS = max(1, int(os.getenv('MONITOR_WORKERS', '4')))
+MONITOR_MAX_PER_USER = max(1, int(os.getenv('MONITOR_MAX_PER_USER', '1')))
+MONITOR_LEASE_SEC = max(60, int(os.getenv('MONITOR_LEASE_SEC', '900')))
+
+_monitor_pool: Optional[ThreadPoolExecutor] = None
+_monitor_lock = threading.Lock()
+_running_by_user: Dict[int, int] = {}
+_monitor_stats: Dict[str, Any] = {
+    'claimed': 0,
+    'completed': 0,
+    'failed': 0,
+    'total_run_sec': 0.0,
+    'last_claim_lag_sec': 0.0,
+    'max_claim_lag_sec': 0.0,
+}
+
+
+def get_monitor_scheduler_stats() -> Dict[str, Any]:
+    """AI monitor scheduler metrics (pool usage, throughput, how far behind next_run_at)."""
+    with _monitor_lock:
+        stats = dict(_monitor_stats)
+        in_flight = sum(_running_by_user.values())
+        users = len(_running_by_user)
+    done = stats['completed'] + stats['failed']
+    stats.update({
+        'workers': MONITOR_WORKERS,
+        'max_per_user': MONITOR_MAX_PER_USER,
+        'in_flight': in_flight,
+        'users_in_flight': users,
+        'avg_run_sec': round(stats.pop('total_run_sec') / done, 2) if done else 0.0,
+    })
+    return stats
+
+
+def _claim_due_monitors(limit: int, busy_user_ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    Atomically claim up to `limit` due monitors (round-robin across users).
+
+    Claimed rows get next_run_at and lease_until pushed MONITOR_LEASE_SEC ahead so no other instance
+    picks them up; run_single_monitor sets the real next_run_at and _run_claimed_monitor clears the
+    lease when it finishes. Monitors still leased (in flight on any instance) count against the
+    user's MONITOR_MAX_PER_USER slots.
+    """
+    with get_db_connection() as db:
+        cur = db.cursor()
+        cur.execute(
+            """
+            WITH leased AS (
+                SELECT user_id, COUNT(*) AS running
+                FROM qd_position_monitors
+                WHERE lease_until > NOW()
+                GROUP BY user_id
+            ),
+            ranked AS (
+                SELECT id, user_id, next_run_at,
+                       ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY next_run_at ASC) AS user_rank
+                FROM qd_position_monitors
+                WHERE is_active = 1 AND next_run_at <= NOW() AND NOT (user_id = ANY(?))
+            ),
+            picked AS (
+                SELECT m.id, m.next_run_at AS due_at
+                FROM qd_position_monitors m
+                JOIN ranked r ON r.id = m.id
+                LEFT JOIN leased l ON l.user_id = r.user_id
+                WHERE r.user_rank <= ? - COALESCE(l.running, 0) AND m.is_active = 1 AND m.next_run_at <= NOW()
+                ORDER BY r.user_rank ASC, r.next_run_at ASC
+                LIMIT ?
+                FOR UPDATE OF m SKIP LOCKED
+            )
+            UPDATE qd_position_monitors
+            SET next_run_at = NOW() + (? * INTERVAL '1 second'),
+                lease_until = NOW() + (? * INTERVAL '1 second')
+            FROM picked
+            WHERE qd_position_monitors.id = picked.id
+            RETURNING qd_position_monitors.id, qd_position_monitors.user_id,
+                      EXTRACT(EPOCH FROM (NOW() - picked.due_at)) AS lag_sec
+            """,
+            (list(busy_user_ids), MONITOR_MAX_PER_USER, int(limit), MONITOR_LEASE_SEC, MONITOR_LEASE_SEC)
+        )
+        rows = cur.fetchall() or []
+        db.commit()
+        cur.close()
+    return rows
+
+
+def _release_monitor_lease(monitor_id: int):
+    try:
+        with get_db_connection() as db:
+            cur = db.cursor()
+            cur.execute("UPDATE qd_position_monitors SET lease_until = NULL WHERE id = ?", (monitor_id,))
+            db.commit()
+            cur.close()
+    except Exception as e:
+        # the lease expires on its own after MONITOR_LEASE_SEC
+        logger.warning(f"Failed to release lease of monitor #{monitor_id}: {e}")
+
+
+def _ensure_monitor_lease_column():
+    """Add qd_position_monitors.lease_until on databases created before it existed."""
+    try:
+        with get_db_connection() as db:
+            cur = db.cursor()
+            cur.execute("ALTER TABLE qd_position_monitors ADD COLUMN IF NOT EXISTS lease_until TIMESTAMP")
+            db.commit()
+            cur.close()
+    except Exception as e:
+        logger.error(f"Failed to ensure qd_position_monitors.lease_until: {e}")
+
+
+def _run_claimed_monitor(monitor_id: int, monitor_user_id: int):
+    started = time.perf_counter()
+    ok = False
+    try:
+        logger.info(f"Running due monitor #{monitor_id} for user #{monitor_user_id}")
+        result = run_single_monitor(monitor_id, user_id=monitor_user_id)
+        ok = bool(result.get('success'))
+    except Exception as e:
+        logger.error(f"Monitor #{monitor_id} execution failed: {e}")
+    finally:
+        _release_monitor_lease(monitor_id)
+        with _monitor_lock:
+            remaining = _running_by_user.get(monitor_user_id, 1) - 1
+            if remaining > 0:
+                _running_by_user[monitor_user_id] = remaining
+            else:
+                _running_by_user.pop(monitor_user_id, None)
+            _monitor_stats['completed' if ok else 'failed'] += 1
+            _monitor_stats['total_run_sec'] += time.perf_counter() - started
+
+
+def _dispatch_due_monitors():
+    """Claim as many due monitors as there are free workers and hand them to the pool."""
+    if _monitor_pool is None:
+        return
+    with _monitor_lock:
+        free = MONITOR_WORKERS - sum(_running_by_user.values())
+        busy_users = [uid for uid, n in _running_by_user.items() if n >= MONITOR_MAX_PER_USER]
+    if free <= 0:
+        return
+
+    rows = _claim_due_monitors(free, busy_users)
+    for row in rows:
+        monitor_id = row.get('id')
+        monitor_user_id = int(row.get('user_id') or 1)
+        lag = float(row.get('lag_sec') or 0)
+        with _monitor_lock:
+            _running_by_user[monitor_user_id] = _running_by_user.get(monitor_user_id, 0) + 1
+            _monitor_stats['claimed'] += 1
+            _monitor_stats['last_claim_lag_sec'] = round(lag, 1)
+            _monitor_stats['max_claim_lag_sec'] = round(max(_monitor_stats['max_claim_lag_sec'], lag), 1)
+        try:
+            _monitor_pool.submit(_run_claimed_monitor, monitor_id, monitor_user_id)
+        except RuntimeError:
+            # pool shut down: the lease expires and another instance / restart picks it up
+            with _monitor_lock:
+                _running_by_user[monitor_user_id] -= 1
+                if _running_by_user[monitor_user_id] <= 0:
+                    _running_by_user.pop(monitor_user_id, None)
+            break
+
+
 def _monitor_loop():
-    """Background loop that checks and runs due monitors."""
+    """Background loop: position alerts, then dispatch due AI monitors to the worker pool."""
     logger.info("Portfolio monitor background loop started")
     
     while not _stop_event.is_set():
@@ -1225,31 +1529,8 @@ def _monitor_loop():
             # 1. Check position alerts (price/pnl alerts) for all users
             _check_position_alerts()
             
-            # 2. Find AI monitors that are due for all users
-            with get_db_connection() as db:
-                cur = db.cursor()
-                cur.execute(
-                    """
-                    SELECT id, user_id FROM qd_position_monitors
-                    WHERE is_active = 1 AND next_run_at <= NOW()
-                    ORDER BY next_run_at ASC
-                    LIMIT 10
-                    """
-                )
-                rows = cur.fetchall() or []
-                cur.close()
-            
-            for row in rows:
-                if _stop_event.is_set():
-                    break
-                monitor_id = row.get('id')
-                monitor_user_id = int(row.get('user_id') or 1)
-                if monitor_id:
-                    logger.info(f"Running due monitor #{monitor_id} for user #{monitor_user_id}")
-                    try:
-                        run_single_monitor(monitor_id, user_id=monitor_user_id)
-                    except Exception as e:
-                        logger.error(f"Monitor #{monitor_id} execution failed: {e}")
+            # 2. Claim due AI monitors for all users and run them concurrently
+            _dispatch_due_monitors()
         except Exception as e:
             logger.error(f"Monitor loop error: {e}")
         
@@ -1261,24 +1542,31 @@ def _monitor_loop():
 
 def start_monitor_service():
     """Start the background monitor service."""
-    global _monitor_thread
+    global _monitor_thread, _monitor_pool
     
     if _monitor_thread and _monitor_thread.is_alive():
         logger.info("Portfolio monitor service already running")
         return
     
     _stop_event.clear()
+    _ensure_monitor_lease_column()
+    if _monitor_pool is None:
+        _monitor_pool = ThreadPoolExecutor(max_workers=MONITOR_WORKERS, thread_name_prefix="PortfolioMonitorWorker")
     _monitor_thread = threading.Thread(target=_monitor_loop, daemon=True, name="PortfolioMonitor")
     _monitor_thread.start()
-    logger.info("Portfolio monitor service started")
+    logger.info(f"Portfolio monitor service started ({MONITOR_WORKERS} monitor workers)")
 
 
 def stop_monitor_service():
     """Stop the background monitor service."""
-    global _monitor_thread
+    global _monitor_thread, _monitor_pool
     
     _stop_event.set()
     if _monitor_thread:
         _monitor_thread.join(timeout=5)
         _monitor_thread = None
+    if _monitor_pool is not None:
+        # running monitors finish in the background; unfinished claims are retried after the lease
+        _monitor_pool.shutdown(wait=False)
+        _monitor_pool = None
     logger.info("Portfolio monitor service stopped")
@@ -13,6 +13,10 @@ notification_config = {
     "webhook": "https://example.com/webhook"
   }
 }
+
+By default `notify_signal` only validates the targets and hands the deliveries to the background
+dispatcher (app/services/notification_dispatcher.py); set NOTIFY_ASYNC_ENABLED=false to deliver
+synchronously on the caller's thread.
 """
 
 from __future__ import annotations
@@ -23,6 +27,7 @@ import hashlib
 import json
 import os
 import smtplib
+import threading
 import time
 import traceback
 from datetime import datetime, timezone
@@ -31,11 +36,51 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 
+from app.services.live_trading.http_pool import HttpSessionPool
 from app.utils.db import get_db_connection
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+CHANNELS = ("browser", "webhook", "discord", "telegram", "email", "phone")
+
+_http: Optional[HttpSessionPool] = None
+_http_lock = threading.Lock()
+
+# One SMTP connection per delivery thread, reused across messages.
+_smtp_local = threading.local()
+
+
+def _notify_http() -> HttpSessionPool:
+    """Keep-alive sessions for notification endpoints (separate from the live-trading pool)."""
+    global _http
+    if _http is None:
+        with _http_lock:
+            if _http is None:
+                try:
+                    maxsize = int(os.getenv("NOTIFY_HTTP_POOL_MAXSIZE") or "4")
+                except Exception:
+                    maxsize = 4
+                _http = HttpSessionPool(pool_maxsize=maxsize, http2=False)
+    return _http
+
+
+def _smtp_close() -> None:
+    server = getattr(_smtp_local, "server", None)
+    _smtp_local.server = None
+    if server is not None:
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+
+def notify_async_enabled() -> bool:
+    return (os.getenv("NOTIFY_ASYNC_ENABLED") or "true").strip().lower() == "true"
+
 
 def _as_list(value: Any) -> List[str]:
     if value is None:
@@ -162,76 +207,37 @@ class SignalNotifier:
             extra=extra,
         )
         rendered = self._render_messages(payload)
-        title = rendered.get("title") or ""
-        message_plain = rendered.get("plain") or ""
+
+        jobs = self._channel_jobs(
+            cfg=cfg,
+            targets=targets,
+            channels=channels,
+            strategy_id=strategy_id,
+            symbol=symbol,
+            signal_type=signal_type,
+            payload=payload,
+            rendered=rendered,
+        )
+
+        dispatcher = None
+        if notify_async_enabled():
+            from app.services.notification_dispatcher import get_notification_dispatcher
+            dispatcher = get_notification_dispatcher()
 
         results: Dict[str, Dict[str, Any]] = {}
-        for ch in channels:
-            c = (ch or "").strip().lower()
-            if not c:
+        for c, job in jobs:
+            err = self._precheck(c, job)
+            if err:
+                ok = False
+            elif dispatcher is not None:
+                dispatcher.submit(c, job, meta={"strategy_id": strategy_id, "symbol": symbol, "signal": signal_type})
+                results[c] = {"ok": True, "error": "", "queued": True}
                 continue
-            try:
-                if c == "browser":
-                    ok, err = self._notify_browser(
-                        strategy_id=strategy_id,
-                        symbol=symbol,
-                        signal_type=signal_type,
-                        channels=channels,
-                        title=title,
-                        message=message_plain,
-                        payload=payload,
-                    )
-                elif c == "webhook":
-                    url = (targets.get("webhook") or "").strip()
-                    ok, err = self._notify_webhook(
-                        url=url,
-                        payload=payload,
-                        headers_override=(targets.get("webhook_headers") or targets.get("webhookHeaders") or None),
-                        token_override=(targets.get("webhook_token") or targets.get("webhookToken") or None),
-                        signing_secret_override=(
-                            targets.get("webhook_signing_secret")
-                            or targets.get("webhookSigningSecret")
-                            or None
-                        ),
-                    )
-                elif c == "discord":
-                    url = (targets.get("discord") or "").strip()
-                    ok, err = self._notify_discord(url=url, payload=payload, fallback_text=message_plain)
-                elif c == "telegram":
-                    chat_id = (targets.get("telegram") or "").strip()
-                    # User's token takes priority, then falls back to env TELEGRAM_BOT_TOKEN.
-                    token_override = ""
-                    try:
-                        token_override = str(
-                            targets.get("telegram_bot_token")
-                            or targets.get("telegram_token")
-                            or cfg.get("telegram_bot_token")
-                            or cfg.get("telegram_token")
-                            or ""
-                        ).strip()
-                    except Exception:
-                        token_override = ""
-                    ok, err = self._notify_telegram(
-                        chat_id=chat_id,
-                        text=rendered.get("telegram_html") or message_plain,
-                        token_override=token_override,
-                        parse_mode="HTML",
-                    )
-                elif c == "email":
-                    to_email = (targets.get("email") or "").strip()
-                    ok, err = self._notify_email(
-                        to_email=to_email,
-                        subject=title,
-                        body_text=message_plain,
-                        body_html=rendered.get("email_html") or "",
-                    )
-                elif c == "phone":
-                    to_phone = (targets.get("phone") or "").strip()
-                    ok, err = self._notify_phone(to_phone=to_phone, body=message_plain)
-                else:
-                    ok, err = False, f"unsupported_channel:{c}"
-            except Exception as e:
-                ok, err = False, str(e)
+            else:
+                try:
+                    ok, err = self.deliver(c, job)
+                except Exception as e:
+                    ok, err = False, str(e)
 
             results[c] = {"ok": bool(ok), "error": (err or "")}
             if not ok and c in ("webhook", "discord"):
@@ -242,6 +248,129 @@ class SignalNotifier:
 
         return results
 
+    def _channel_jobs(
+        self,
+        *,
+        cfg: Dict[str, Any],
+        targets: Dict[str, Any],
+        channels: List[str],
+        strategy_id: int,
+        symbol: str,
+        signal_type: str,
+        payload: Dict[str, Any],
+        rendered: Dict[str, str],
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """(channel, kwargs for deliver) per requested channel. Kwargs are JSON-serializable (queue journal)."""
+        title = rendered.get("title") or ""
+        message_plain = rendered.get("plain") or ""
+
+        jobs: List[Tuple[str, Dict[str, Any]]] = []
+        for ch in channels:
+            c = (ch or "").strip().lower()
+            if not c:
+                continue
+            if c == "browser":
+                job = {
+                    "strategy_id": strategy_id,
+                    "symbol": symbol,
+                    "signal_type": signal_type,
+                    "channels": channels,
+                    "title": title,
+                    "message": message_plain,
+                    "payload": payload,
+                }
+            elif c == "webhook":
+                job = {
+                    "url": (targets.get("webhook") or "").strip(),
+                    "payload": payload,
+                    "headers_override": (targets.get("webhook_headers") or targets.get("webhookHeaders") or None),
+                    "token_override": (targets.get("webhook_token") or targets.get("webhookToken") or None),
+                    "signing_secret_override": (
+                        targets.get("webhook_signing_secret")
+                        or targets.get("webhookSigningSecret")
+                        or None
+                    ),
+                }
+            elif c == "discord":
+                job = {"url": (targets.get("discord") or "").strip(), "payload": payload, "fallback_text": message_plain}
+            elif c == "telegram":
+                # User's token takes priority, then falls back to env TELEGRAM_BOT_TOKEN.
+                token_override = ""
+                try:
+                    token_override = str(
+                        targets.get("telegram_bot_token")
+                        or targets.get("telegram_token")
+                        or cfg.get("telegram_bot_token")
+                        or cfg.get("telegram_token")
+                        or ""
+                    ).strip()
+                except Exception:
+                    token_override = ""
+                job = {
+                    "chat_id": (targets.get("telegram") or "").strip(),
+                    "text": rendered.get("telegram_html") or message_plain,
+                    "token_override": token_override,
+                    "parse_mode": "HTML",
+                }
+            elif c == "email":
+                job = {
+                    "to_email": (targets.get("email") or "").strip(),
+                    "subject": title,
+                    "body_text": message_plain,
+                    "body_html": rendered.get("email_html") or "",
+                }
+            elif c == "phone":
+                job = {"to_phone": (targets.get("phone") or "").strip(), "body": message_plain}
+            else:
+                job = {}
+            jobs.append((c, job))
+        return jobs
+
+    def _precheck(self, channel: str, job: Dict[str, Any]) -> str:
+        """Configuration errors that make a delivery pointless (reported synchronously, never queued)."""
+        if channel not in CHANNELS:
+            return f"unsupported_channel:{channel}"
+        if channel in ("webhook", "discord"):
+            url = str(job.get("url") or "")
+            if not url:
+                return "missing_webhook_url" if channel == "webhook" else "missing_discord_webhook_url"
+            if not (url.startswith("http://") or url.startswith("https://")):
+                return "invalid_webhook_url" if channel == "webhook" else "invalid_discord_webhook_url"
+        elif channel == "telegram":
+            if not job.get("token_override"):
+                return "missing_telegram_bot_token (请在个人中心配置 Telegram Bot Token)"
+            if not job.get("chat_id"):
+                return "missing_telegram_chat_id"
+        elif channel == "email":
+            if not job.get("to_email"):
+                return "missing_email_target"
+            if not self.smtp_host:
+                return "missing_SMTP_HOST"
+            if not self.smtp_from:
+                return "missing_SMTP_FROM"
+        elif channel == "phone":
+            if not job.get("to_phone"):
+                return "missing_phone_target"
+            if not (self.twilio_sid and self.twilio_token and self.twilio_from):
+                return "missing_TWILIO_config"
+        return ""
+
+    def deliver(self, channel: str, job: Dict[str, Any]) -> Tuple[bool, str]:
+        """Deliver one job produced by `_channel_jobs` (used inline and by the dispatcher workers)."""
+        if channel == "browser":
+            return self._notify_browser(**job)
+        if channel == "webhook":
+            return self._notify_webhook(**job)
+        if channel == "discord":
+            return self._notify_discord(**job)
+        if channel == "telegram":
+            return self._notify_telegram(**job)
+        if channel == "email":
+            return self._notify_email(**job)
+        if channel == "phone":
+            return self._notify_phone(**job)
+        return False, f"unsupported_channel:{channel}"
+
     def _build_payload(
         self,
         *,
@@ -550,12 +679,12 @@ class SignalNotifier:
                 headers["X-QD-Signature"] = sig
                 # Send raw bytes so signature matches what we sign.
                 def _post_once(timeout: float) -> requests.Response:
-                    return requests.post(url, data=body, headers=headers, timeout=timeout)
+                    return _notify_http().request("POST", url, data=body, headers=headers, timeout=timeout)
             except Exception as e:
                 return False, f"webhook_signing_failed:{e}"
         else:
             def _post_once(timeout: float) -> requests.Response:
-                return requests.post(url, json=payload, headers=headers, timeout=timeout)
+                return _notify_http().request("POST", url, json=payload, headers=headers, timeout=timeout)
 
         # Post with minimal retry on 429/5xx
         try:
@@ -577,11 +706,9 @@ class SignalNotifier:
             return False, str(e)
 
     def _notify_discord(self, *, url: str, payload: Dict[str, Any], fallback_text: str) -> Tuple[bool, str]:
-        if not url:
-            return False, "missing_discord_webhook_url"
-        if not (str(url).startswith("http://") or str(url).startswith("https://")):
-            return False, "invalid_discord_webhook_url"
+        return self._notify_discord_batch(url=url, payloads=[payload], fallback_text=fallback_text)
 
+    def _discord_embed(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         strategy = (payload or {}).get("strategy") or {}
         instrument = (payload or {}).get("instrument") or {}
         sig = (payload or {}).get("signal") or {}
@@ -610,16 +737,26 @@ class SignalNotifier:
             embed["timestamp"] = str(payload.get("timestamp_iso") or "")
         if trace.get("pending_order_id"):
             embed["footer"] = {"text": f"pending_order_id={int(trace.get('pending_order_id'))}"}
+        return embed
+
+    def _notify_discord_batch(self, *, url: str, payloads: List[Dict[str, Any]], fallback_text: str) -> Tuple[bool, str]:
+        """One webhook message carrying an embed per signal (Discord accepts up to 10 embeds)."""
+        if not url:
+            return False, "missing_discord_webhook_url"
+        if not (str(url).startswith("http://") or str(url).startswith("https://")):
+            return False, "invalid_discord_webhook_url"
+
+        embeds = [self._discord_embed(p) for p in (payloads or [])[:10]]
         headers = {
             "Content-Type": "application/json",
             "User-Agent": "QuantDinger/1.0 (+https://www.quantdinger.com)",
         }
 
         def _post(payload_json: Dict[str, Any]) -> requests.Response:
-            return requests.post(url, json=payload_json, headers=headers, timeout=self.timeout_sec)
+            return _notify_http().request("POST", url, json=payload_json, headers=headers, timeout=self.timeout_sec)
 
         try:
-            resp = _post({"content": "", "embeds": [embed]})
+            resp = _post({"content": "", "embeds": embeds})
             if 200 <= resp.status_code < 300:
                 return True, ""
 
@@ -634,7 +771,7 @@ class SignalNotifier:
                         time.sleep(1.0)
                     except Exception:
                         pass
-                resp_retry = _post({"content": "", "embeds": [embed]})
+                resp_retry = _post({"content": "", "embeds": embeds})
                 if 200 <= resp_retry.status_code < 300:
                     return True, ""
                 resp = resp_retry
@@ -675,7 +812,8 @@ class SignalNotifier:
             }
             if (parse_mode or "").strip():
                 data["parse_mode"] = str(parse_mode).strip()
-            resp = requests.post(
+            resp = _notify_http().request(
+                "POST",
                 url,
                 data=data,
                 timeout=self.timeout_sec,
@@ -704,28 +842,71 @@ class SignalNotifier:
             msg.add_alternative(str(body_html or ""), subtype="html")
 
         try:
-            # Heuristic: if port is 465 and SMTP_USE_SSL is not explicitly set, assume SSL.
-            use_ssl = bool(self.smtp_use_ssl) or int(self.smtp_port or 0) == 465
-            if use_ssl:
-                with smtplib.SMTP_SSL(self.smtp_host, self.smtp_port, timeout=self.timeout_sec) as server:
-                    server.ehlo()
-                    if self.smtp_user and self.smtp_password:
-                        server.login(self.smtp_user, self.smtp_password)
-                    server.send_message(msg)
-            else:
-                with smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=self.timeout_sec) as server:
-                    server.ehlo()
-                    if self.smtp_use_tls:
-                        server.starttls()
-                        server.ehlo()
-                    if self.smtp_user and self.smtp_password:
-                        server.login(self.smtp_user, self.smtp_password)
-                    server.send_message(msg)
+            self._smtp_send(msg)
             return True, ""
         except Exception as e:
             logger.error('email.error', traceback=traceback.format_exc())
             return False, str(e)
 
+    def _smtp_connect(self) -> smtplib.SMTP:
+        # Heuristic: if port is 465 and SMTP_USE_SSL is not explicitly set, assume SSL.
+        use_ssl = bool(self.smtp_use_ssl) or int(self.smtp_port or 0) == 465
+        if use_ssl:
+            server = smtplib.SMTP_SSL(self.smtp_host, self.smtp_port, timeout=self.timeout_sec)
+            server.ehlo()
+        else:
+            server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=self.timeout_sec)
+            server.ehlo()
+            if self.smtp_use_tls:
+                server.starttls()
+                server.ehlo()
+        try:
+            if self.smtp_user and self.smtp_password:
+                server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def _smtp_send(self, msg: EmailMessage) -> None:
+        """
+        Send on this thread's SMTP session, logging in once and reusing it for later messages.
+
+        Sessions idle for longer than NOTIFY_SMTP_IDLE_SEC are probed with NOOP first; a dropped
+        session is reopened and the message sent once more.
+        """
+        key = (self.smtp_host, self.smtp_port, self.smtp_user, self.smtp_password, self.smtp_use_ssl, self.smtp_use_tls)
+        try:
+            idle_sec = float(os.getenv("NOTIFY_SMTP_IDLE_SEC") or "30")
+        except Exception:
+            idle_sec = 30.0
+        server = getattr(_smtp_local, "server", None)
+        if server is not None and getattr(_smtp_local, "key", None) != key:
+            _smtp_close()
+            server = None
+        if server is not None and time.time() - float(getattr(_smtp_local, "used_at", 0.0)) > idle_sec:
+            try:
+                if server.noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected("noop failed")
+            except Exception:
+                _smtp_close()
+                server = None
+
+        for attempt in (0, 1):
+            reused = server is not None
+            if server is None:
+                server = self._smtp_connect()
+                _smtp_local.server, _smtp_local.key = server, key
+            try:
+                server.send_message(msg)
+                _smtp_local.used_at = time.time()
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError, OSError):
+                _smtp_close()
+                server = None
+                if attempt or not reused:
+                    raise
+
     def _notify_phone(self, *, to_phone: str, body: str) -> Tuple[bool, str]:
         # Optional provider: Twilio via REST (no extra dependency).
         if not to_phone:
@@ -735,7 +916,9 @@ class SignalNotifier:
         url = f"https://api.twilio.com/2010-04-01/Accounts/{self.twilio_sid}/Messages.json"
         data = {"To": to_phone, "From": self.twilio_from, "Body": str(body or "")[:1500]}
         try:
-            resp = requests.post(url, data=data, auth=(self.twilio_sid, self.twilio_token), timeout=self.timeout_sec)
+            resp = _notify_http().request(
+                "POST", url, data=data, auth=(self.twilio_sid, self.twilio_token), timeout=self.timeout_sec
+            )
             if 200 <= resp.status_code < 300:
                 return True, ""
             return False, f"http_{resp.status_code}:{(resp.text or '')[:300]}"
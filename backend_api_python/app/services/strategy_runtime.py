@@ -0,0 +1,171 @@
+"""
+Asyncio strategy runtime.
+
+Alternative to one OS thread per strategy (`STRATEGY_RUNTIME=async`):
+- a single event-loop thread schedules every running strategy as a coroutine;
+- each strategy is a step generator (`TradingExecutor._strategy_steps`) that yields how long to
+  wait; waiting is `asyncio.sleep`, so idle strategies cost no thread;
+- the blocking part of a step (price/kline reads, DB, indicator CPU work) runs in one bounded
+  ThreadPoolExecutor shared by all strategies.
+
+Thread count is 1 + pool size regardless of how many strategies are running.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+RUNTIME_THREAD = "thread"
+RUNTIME_ASYNC = "async"
+
+_STEPS_DONE = object()
+
+
+def strategy_runtime_mode() -> str:
+    mode = os.getenv("STRATEGY_RUNTIME", RUNTIME_THREAD).strip().lower()
+    return mode if mode in (RUNTIME_THREAD, RUNTIME_ASYNC) else RUNTIME_THREAD
+
+
+def _next_step(steps: Iterator[float]) -> Any:
+    try:
+        return next(steps)
+    except StopIteration:
+        return _STEPS_DONE
+
+
+class StrategyTask:
+    """Handle stored in `TradingExecutor.running_strategies` (thread-compatible `is_alive()`)."""
+
+    def __init__(self, strategy_id: int, runtime: "StrategyRuntime"):
+        self.strategy_id = strategy_id
+        self.started_at = time.time()
+        self.steps = 0
+        self.busy_sec = 0.0
+        self._runtime = runtime
+        self._future = None
+        self._task: Optional[asyncio.Task] = None
+        self._cancelled = False
+
+    def is_alive(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def cancel(self) -> None:
+        """Wake the strategy and close its generator (its `finally` cleanup runs in the pool)."""
+        # _drive checks the flag right after publishing _task, so a cancel issued before the
+        # coroutine started on the loop is not lost.
+        self._cancelled = True
+        task = self._task
+        if task is not None:
+            self._runtime.loop.call_soon_threadsafe(task.cancel)
+
+
+class StrategyRuntime:
+    def __init__(self, max_workers: Optional[int] = None):
+        if max_workers is None:
+            try:
+                max_workers = int(os.getenv("STRATEGY_RUNTIME_WORKERS", "0"))
+            except Exception:
+                max_workers = 0
+        if max_workers <= 0:
+            max_workers = min(32, (os.cpu_count() or 1) * 4)
+        self.max_workers = int(max_workers)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._tasks: Dict[int, StrategyTask] = {}
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="StrategyWorker")
+            self._thread = threading.Thread(target=self._run_loop, name="StrategyRuntime", daemon=True)
+            self._thread.start()
+        self._ready.wait(timeout=5)
+        logger.info(f"StrategyRuntime started (workers={self.max_workers})")
+
+    def _run_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.set_default_executor(self._pool)
+        self.loop = loop
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def spawn(self, strategy_id: int, steps_factory: Callable[[], Iterator[float]]) -> StrategyTask:
+        """Schedule a strategy step generator on the event loop."""
+        self.start()
+        handle = StrategyTask(strategy_id, self)
+        handle._future = asyncio.run_coroutine_threadsafe(self._drive(handle, steps_factory), self.loop)
+        with self._lock:
+            self._tasks[strategy_id] = handle
+        return handle
+
+    async def _drive(self, handle: StrategyTask, steps_factory: Callable[[], Iterator[float]]) -> None:
+        handle._task = asyncio.current_task()
+        if handle._cancelled:
+            with self._lock:
+                if self._tasks.get(handle.strategy_id) is handle:
+                    del self._tasks[handle.strategy_id]
+            return
+        loop = asyncio.get_running_loop()
+        steps = steps_factory()
+        step = None
+        try:
+            while True:
+                t0 = time.time()
+                step = loop.run_in_executor(self._pool, _next_step, steps)
+                # shield: a cancel must not abandon a step that is still running in the pool
+                delay = await asyncio.shield(step)
+                handle.busy_sec += time.time() - t0
+                handle.steps += 1
+                if delay is _STEPS_DONE:
+                    break
+                if delay and delay > 0:
+                    await asyncio.sleep(float(delay))
+        except asyncio.CancelledError:
+            pass
+        except RuntimeError as e:
+            if "shutdown" in str(e):
+                # Interpreter exit: the pool no longer accepts work, nothing left to clean up.
+                return
+            logger.error(f"StrategyRuntime: strategy {handle.strategy_id} task failed: {e}")
+        except Exception as e:
+            logger.error(f"StrategyRuntime: strategy {handle.strategy_id} task failed: {e}")
+        try:
+            if step is not None and not step.done():
+                await asyncio.wait([step])
+            # Closing the generator raises GeneratorExit at its `yield` and runs its cleanup.
+            await loop.run_in_executor(self._pool, steps.close)
+        except Exception as e:
+            logger.warning(f"StrategyRuntime: strategy {handle.strategy_id} cleanup failed: {e}")
+        finally:
+            with self._lock:
+                if self._tasks.get(handle.strategy_id) is handle:
+                    del self._tasks[handle.strategy_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tasks = list(self._tasks.values())
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "workers": self.max_workers,
+            "tasks": len(tasks),
+            "threads": threading.active_count(),
+            "busy_sec": round(sum(t.busy_sec for t in tasks), 3),
+        }
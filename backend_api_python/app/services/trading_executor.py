@@ -9,7 +9,7 @@ try:
     import resource  # Linux/Unix only
 except Exception:
     resource = None
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from datetime import datetime
 import json
 from decimal import Decimal, ROUND_DOWN, ROUND_UP
@@ -20,8 +20,22 @@ import ccxt
 from app.utils.logger import get_logger
 from app.utils.db import get_db_connection
 from app.data_sources import DataSourceFactory
+from app.data_sources.base import TIMEFRAME_SECONDS
+from app.data_sources.kline_store import get_kline_store, kline_store_enabled
 from app.services.kline import KlineService
-from app.services.indicator_params import IndicatorParamsParser, IndicatorCaller
+from app.services.market_data_hub import MarketDataHub, market_data_hub_enabled
+from app.services.strategy_runtime import RUNTIME_ASYNC, StrategyRuntime, StrategyTask, strategy_runtime_mode
+from app.services.indicator_params import IndicatorCaller
+from app.services.indicator_code_cache import get_indicator_code_cache
+from app.services.incremental_indicator import (
+    STREAMING_HELPERS,
+    BarRingBuffer,
+    IncrementalIndicator,
+    bars_from_frame,
+    epoch_seconds,
+    incremental_indicator_enabled,
+)
+from app.utils.sandbox_pool import get_sandbox_pool, sandbox_pool_enabled, picklable_env, frame_with_columns
 
 logger = get_logger(__name__)
 
@@ -31,7 +45,7 @@ class TradingExecutor:
     
     def __init__(self):
         # 不再使用全局连接，改为每次使用时从连接池获取
-        self.running_strategies = {}  # {strategy_id: thread}
+        self.running_strategies = {}  # {strategy_id: thread | StrategyTask}
         self.lock = threading.Lock()
         # Local-only lightweight in-memory price cache (symbol -> (price, expiry_ts)).
         # This replaces the old Redis-based PriceCache for local deployments.
@@ -45,9 +59,23 @@ class TradingExecutor:
         self._signal_dedup = {}  # type: Dict[int, Dict[str, float]]
         self._signal_dedup_lock = threading.Lock()
         self.kline_service = KlineService()   # K线服务（带缓存）
+        # 行情中心：同一 (market_category, symbol, timeframe) 只拉取一次，再分发给所有订阅的策略线程
+        self.market_data_hub = MarketDataHub(
+            price_fetcher=lambda market_category, symbol: self._fetch_current_price(
+                None, symbol, market_category=market_category
+            ),
+            kline_fetcher=lambda market_category, symbol, timeframe, limit: self._fetch_latest_kline(
+                symbol, timeframe, limit=limit, market_category=market_category
+            ),
+        )
         
         # 单实例线程上限，避免无限制创建线程导致 can't start new thread/OOM
         self.max_threads = int(os.getenv('STRATEGY_MAX_THREADS', '64'))
+
+        # 运行时模式：thread（每策略一个线程）/ async（单事件循环 + 有界线程池，线程数不随策略数增长）
+        self.runtime_mode = strategy_runtime_mode()
+        self.strategy_runtime = StrategyRuntime() if self.runtime_mode == RUNTIME_ASYNC else None
+        self.max_tasks = int(os.getenv('STRATEGY_ASYNC_MAX_TASKS', '5000'))
         
         # 确保数据库字段存在
         self._ensure_db_columns()
@@ -409,6 +437,21 @@ class TradingExecutor:
                 for sid in stale_ids:
                     del self.running_strategies[sid]
 
+                if self.strategy_runtime is not None:
+                    if strategy_id in self.running_strategies:
+                        logger.warning(f"Strategy {strategy_id} is already running")
+                        return False
+                    if len(self.running_strategies) >= self.max_tasks:
+                        logger.error(f"Task limit reached ({self.max_tasks}); refuse to start strategy {strategy_id}.")
+                        return False
+                    # max_sleep_sec=None: the coroutine sleeps a whole tick; stop_strategy cancels it directly.
+                    self.running_strategies[strategy_id] = self.strategy_runtime.spawn(
+                        strategy_id, lambda: self._strategy_steps(strategy_id, max_sleep_sec=None)
+                    )
+                    logger.info(f"Strategy {strategy_id} started (async runtime)")
+                    self._console_print(f"[strategy:{strategy_id}] started")
+                    return True
+
                 if len(self.running_strategies) >= self.max_threads:
                     logger.error(
                         f"Thread limit reached ({self.max_threads}); refuse to start strategy {strategy_id}. "
@@ -470,8 +513,10 @@ class TradingExecutor:
                     db.commit()
                     cursor.close()
                 
-                # 从运行列表中移除（线程会在下次循环检查状态时退出）
-                del self.running_strategies[strategy_id]
+                # 从运行列表中移除（线程会在下次循环检查状态时退出；异步任务直接唤醒并结束）
+                handle = self.running_strategies.pop(strategy_id)
+                if isinstance(handle, StrategyTask):
+                    handle.cancel()
                 
                 logger.info(f"Strategy {strategy_id} stopped")
                 self._console_print(f"[strategy:{strategy_id}] stopped (requested)")
@@ -484,13 +529,28 @@ class TradingExecutor:
     
     def _run_strategy_loop(self, strategy_id: int):
         """
-        策略运行循环
+        策略运行循环（线程模式：每个策略一个线程）
         
         Args:
             strategy_id: 策略ID
         """
+        for delay in self._strategy_steps(strategy_id, max_sleep_sec=1.0):
+            if delay > 0:
+                time.sleep(delay)
+
+    def _strategy_steps(self, strategy_id: int, max_sleep_sec: Optional[float] = 1.0) -> Iterator[float]:
+        """
+        策略主循环的生成器形式：每次 yield 需要等待的秒数，由调用方负责等待。
+        线程模式用 time.sleep 驱动，异步模式（StrategyRuntime）用 asyncio.sleep 驱动，
+        阻塞工作（行情/数据库/指标计算）在有界线程池中执行。
+        
+        Args:
+            strategy_id: 策略ID
+            max_sleep_sec: 单次等待上限（线程模式为1秒，以便及时响应停止；None 表示不限制）
+        """
         logger.info(f"Strategy {strategy_id} loop starting")
         self._console_print(f"[strategy:{strategy_id}] loop initializing")
+        market_sub = None  # MarketDataHub subscription (if enabled)
         
         try:
             # 加载策略配置
@@ -623,7 +683,9 @@ class TradingExecutor:
                 return
             logger.info(rf'Strategy {strategy_id} history kline number: {len(klines)}')
             
-            # 转换为DataFrame
+            # 转换为DataFrame（之后每根新K线只追加到环形缓冲区，不再整体重建）
+            bar_buffer = BarRingBuffer(max(history_limit, len(klines)))
+            bar_buffer.extend(klines)
             df = self._klines_to_dataframe(klines)
             if len(df) == 0:
                 logger.error(f"Strategy {strategy_id} K-lines are empty after normalization")
@@ -671,6 +733,18 @@ class TradingExecutor:
                 logger.error(f"Strategy {strategy_id} indicator execution failed")
                 return
             
+            # 增量模式：指标脚本定义了 on_bar(bar, state) 时，已收盘K线只喂一次，之后每根新K线 O(1) 更新
+            incremental = None
+            if indicator_result.get('on_bar') and incremental_indicator_enabled():
+                try:
+                    incremental = IncrementalIndicator(indicator_result['on_bar'])
+                    incremental.set_context(initial_position, initial_avg_entry_price, initial_highest)
+                    incremental.commit(bars_from_frame(df.iloc[:-1]))
+                    logger.info(f"Strategy {strategy_id} incremental indicator mode enabled (warm-up bars={len(df) - 1})")
+                except Exception as e:
+                    logger.warning(f"Strategy {strategy_id} on_bar warm-up failed, using full recompute: {e}")
+                    incremental = None
+
             # 提取信号和触发价格
             pending_signals = indicator_result.get('pending_signals', [])  # 待触发的信号列表
             last_kline_time = indicator_result.get('last_kline_time', 0)  # 最后一根K线的时间
@@ -683,7 +757,7 @@ class TradingExecutor:
             # Main loop: unified tick cadence (default: 10s)
             # ============================================
             # One tick = fetch current price once + evaluate triggers once + (if needed) refresh K-lines / recalc indicator.
-            # Note: `pending_orders` scanning stays at 1s (see PendingOrderWorker) to reduce live dispatch latency.
+            # Note: `pending_orders` dispatch is event-driven (NOTIFY on enqueue -> PendingOrderWorker LISTEN).
             try:
                 # Global-only (no per-strategy override)
                 tick_interval_sec = int(os.getenv('STRATEGY_TICK_INTERVAL_SEC', '10'))
@@ -699,6 +773,14 @@ class TradingExecutor:
             from app.data_sources.base import TIMEFRAME_SECONDS
             timeframe_seconds = TIMEFRAME_SECONDS.get(timeframe, 3600)
             kline_update_interval = timeframe_seconds  # 每个K线周期更新一次
+
+            # 订阅行情中心：价格/收盘K线由 hub 统一拉取后推送；hub 缺数据时回退为直接拉取
+            if market_data_hub_enabled():
+                market_sub = self.market_data_hub.subscribe(
+                    market_category, symbol, timeframe, history_limit=history_limit, owner=strategy_id
+                )
+                # hub 正常时按K线推送刷新，直接拉取仅作为兜底（放宽到2个周期，避免与推送重复）
+                kline_update_interval = timeframe_seconds * 2
             
             while True:
                 try:
@@ -713,7 +795,7 @@ class TradingExecutor:
                     if last_tick_time > 0:
                         sleep_sec = (last_tick_time + tick_interval_sec) - current_time
                         if sleep_sec > 0:
-                            time.sleep(min(sleep_sec, 1.0))
+                            yield sleep_sec if max_sleep_sec is None else min(sleep_sec, max_sleep_sec)
                             continue
                     last_tick_time = current_time
 
@@ -725,7 +807,14 @@ class TradingExecutor:
                     # ============================================
                     # 1. Fetch current price once per tick
                     # ============================================
-                    current_price = self._fetch_current_price(exchange, symbol, market_type=market_type, market_category=market_category)
+                    hub_klines = None
+                    current_price = None
+                    if market_sub is not None:
+                        update = market_sub.poll()
+                        hub_klines = update.klines
+                        current_price = market_sub.latest_price(max_age_sec=tick_interval_sec * 2)
+                    if current_price is None:
+                        current_price = self._fetch_current_price(exchange, symbol, market_type=market_type, market_category=market_category)
                     if current_price is None:
                         logger.warning(f"Strategy {strategy_id} failed to fetch current price for {market_category}:{symbol}")
                         continue
@@ -733,10 +822,11 @@ class TradingExecutor:
                     # ============================================
                     # 2. 检查是否需要更新K线（每个K线周期更新一次，从API拉取）
                     # ============================================
-                    if current_time - last_kline_update_time >= kline_update_interval:
-                        klines = self._fetch_latest_kline(symbol, timeframe, limit=history_limit, market_category=market_category)
+                    if hub_klines or current_time - last_kline_update_time >= kline_update_interval:
+                        klines = hub_klines or self._fetch_latest_kline(symbol, timeframe, limit=history_limit, market_category=market_category)
                         if klines and len(klines) >= 2:
-                            df = self._klines_to_dataframe(klines)
+                            bar_buffer.extend(klines)
+                            df = bar_buffer.frame()
                             if len(df) > 0:
                                 current_pos_list = self._get_current_positions(strategy_id, symbol)
                                 initial_highest = 0.0
@@ -754,14 +844,24 @@ class TradingExecutor:
                                     initial_position_count = 1
                                     initial_last_add_price = initial_avg_entry_price
 
-                                indicator_result = self._execute_indicator_with_prices(
-                                    indicator_code, df, trading_config,
-                                    initial_highest_price=initial_highest,
-                                    initial_position=initial_position,
-                                    initial_avg_entry_price=initial_avg_entry_price,
-                                    initial_position_count=initial_position_count,
-                                    initial_last_add_price=initial_last_add_price
-                                )
+                                indicator_result = None
+                                if incremental is not None:
+                                    indicator_result = self._evaluate_incremental(
+                                        strategy_id, incremental, df, trading_config,
+                                        initial_position, initial_avg_entry_price, initial_highest,
+                                        commit_closed=True
+                                    )
+                                    if indicator_result is None:
+                                        incremental = None
+                                if indicator_result is None:
+                                    indicator_result = self._execute_indicator_with_prices(
+                                        indicator_code, df, trading_config,
+                                        initial_highest_price=initial_highest,
+                                        initial_position=initial_position,
+                                        initial_avg_entry_price=initial_avg_entry_price,
+                                        initial_position_count=initial_position_count,
+                                        initial_last_add_price=initial_last_add_price
+                                    )
                                 if indicator_result:
                                     pending_signals = indicator_result.get('pending_signals', [])
                                     last_kline_time = indicator_result.get('last_kline_time', 0)
@@ -785,7 +885,8 @@ class TradingExecutor:
                         # ============================================
                         if 'df' in locals() and df is not None and len(df) > 0:
                             try:
-                                realtime_df = df.copy()
+                                # 增量模式只需要最后一根（形成中的）K线
+                                realtime_df = df.iloc[-1:].copy() if incremental is not None else df.copy()
                                 realtime_df = self._update_dataframe_with_current_price(realtime_df, current_price, timeframe)
 
                                 current_pos_list = self._get_current_positions(strategy_id, symbol)
@@ -804,14 +905,25 @@ class TradingExecutor:
                                     initial_position_count = 1
                                     initial_last_add_price = initial_avg_entry_price
 
-                                indicator_result = self._execute_indicator_with_prices(
-                                    indicator_code, realtime_df, trading_config,
-                                    initial_highest_price=initial_highest,
-                                    initial_position=initial_position,
-                                    initial_avg_entry_price=initial_avg_entry_price,
-                                    initial_position_count=initial_position_count,
-                                    initial_last_add_price=initial_last_add_price
-                                )
+                                indicator_result = None
+                                if incremental is not None:
+                                    indicator_result = self._evaluate_incremental(
+                                        strategy_id, incremental, realtime_df, trading_config,
+                                        initial_position, initial_avg_entry_price, initial_highest,
+                                        commit_closed=False
+                                    )
+                                    if indicator_result is None:
+                                        incremental = None
+                                        realtime_df = self._update_dataframe_with_current_price(df.copy(), current_price, timeframe)
+                                if indicator_result is None:
+                                    indicator_result = self._execute_indicator_with_prices(
+                                        indicator_code, realtime_df, trading_config,
+                                        initial_highest_price=initial_highest,
+                                        initial_position=initial_position,
+                                        initial_avg_entry_price=initial_avg_entry_price,
+                                        initial_position_count=initial_position_count,
+                                        initial_last_add_price=initial_last_add_price
+                                    )
                                 if indicator_result:
                                     pending_signals = indicator_result.get('pending_signals', [])
                                     new_hp = indicator_result.get('new_highest_price', 0)
@@ -1018,7 +1130,7 @@ class TradingExecutor:
                     logger.error(f"Strategy {strategy_id} loop error: {str(e)}")
                     logger.error(traceback.format_exc())
                     self._console_print(f"[strategy:{strategy_id}] loop error: {e}")
-                    time.sleep(5)
+                    yield 5
                     
         except Exception as e:
             logger.error(f"Strategy {strategy_id} crashed: {str(e)}")
@@ -1026,6 +1138,7 @@ class TradingExecutor:
             self._console_print(f"[strategy:{strategy_id}] fatal error: {e}")
         finally:
             # 清理
+            self.market_data_hub.unsubscribe(market_sub)
             with self.lock:
                 if strategy_id in self.running_strategies:
                     del self.running_strategies[strategy_id]
@@ -1122,6 +1235,24 @@ class TradingExecutor:
             market_category: 市场类型 (Crypto, USStock, Forex, Futures, AShare, HShare)
         """
         try:
+            # 加密货币 7x24 连续交易：优先走本地K线存储，只增量拉取尾部
+            if market_category == 'Crypto' and kline_store_enabled() and timeframe in TIMEFRAME_SECONDS:
+                try:
+                    now = int(time.time())
+                    klines = get_kline_store().get_range(
+                        market_category, symbol, timeframe,
+                        start_ts=now - limit * TIMEFRAME_SECONDS[timeframe],
+                        end_ts=now - 1,
+                        fetch=lambda n, bt: DataSourceFactory.get_kline(
+                            market=market_category, symbol=symbol, timeframe=timeframe, limit=n, before_time=bt
+                        ),
+                        now=now
+                    )
+                    if klines:
+                        return klines[-limit:]
+                except Exception as e:
+                    logger.warning(f"Kline store read failed for {market_category}:{symbol}, using KlineService: {e}")
+
             # 使用 KlineService 获取K线数据（自动处理缓存）
             return self.kline_service.get_kline(
                 market=market_category,
@@ -1544,217 +1675,273 @@ class TradingExecutor:
             # 提取最后一根K线的时间
             last_kline_time = int(df.index[-1].timestamp()) if hasattr(df.index[-1], 'timestamp') else int(time.time())
             
-            # 提取待触发的信号
-            pending_signals = []
-            
-            # Supported indicator signal formats:
-            # - Preferred (simple): df['buy'], df['sell'] as boolean
-            # - Internal (4-way): df['open_long'], df['close_long'], df['open_short'], df['close_short'] as boolean
-            if all(col in executed_df.columns for col in ['buy', 'sell']) and not all(col in executed_df.columns for col in ['open_long', 'close_long', 'open_short', 'close_short']):
-                # Normalize buy/sell into 4-way columns for execution.
-                td = trading_config.get('trade_direction', trading_config.get('tradeDirection', 'both'))
-                td = str(td or 'both').lower()
-                if td not in ['long', 'short', 'both']:
-                    td = 'both'
-
-                buy = executed_df['buy'].fillna(False).astype(bool)
-                sell = executed_df['sell'].fillna(False).astype(bool)
-
-                executed_df = executed_df.copy()
-                if td == 'long':
-                    executed_df['open_long'] = buy
-                    executed_df['close_long'] = sell
-                    executed_df['open_short'] = False
-                    executed_df['close_short'] = False
-                elif td == 'short':
-                    executed_df['open_long'] = False
-                    executed_df['close_long'] = False
-                    executed_df['open_short'] = sell
-                    executed_df['close_short'] = buy
-                else:
-                    executed_df['open_long'] = buy
-                    executed_df['close_short'] = buy
-                    executed_df['open_short'] = sell
-                    executed_df['close_long'] = sell
-
-            # Check for 4-way columns after normalization
-            if all(col in executed_df.columns for col in ['open_long', 'close_long', 'open_short', 'close_short']):
-                # 优化点3: 防“信号闪烁” (Repainting)
-                signal_mode = trading_config.get('signal_mode', 'confirmed') # 'confirmed' or 'aggressive'
-                exit_signal_mode = trading_config.get('exit_signal_mode', 'aggressive') # 'confirmed' or 'aggressive'
-                
-                entry_check_set = set()
-                exit_check_set = set()
-                
-                if len(executed_df) > 1:
-                    # 始终检查上一根已完成K线
-                    entry_check_set.add(len(executed_df) - 2)
-                    exit_check_set.add(len(executed_df) - 2)
-                
-                if signal_mode == 'aggressive' and len(executed_df) > 0:
-                    entry_check_set.add(len(executed_df) - 1)
+            on_bar = exec_env.get('on_bar')
+            return {
+                'pending_signals': self._extract_pending_signals(executed_df, trading_config, last_kline_time),
+                'last_kline_time': last_kline_time,
+                'new_highest_price': new_highest_price,
+                # Optional incremental hook defined by the indicator script
+                'on_bar': on_bar if callable(on_bar) else None,
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to execute indicator and extract prices: {str(e)}")
+            logger.error(traceback.format_exc())
+            return None
+
+    def _extract_pending_signals(
+        self, executed_df: pd.DataFrame, trading_config: Dict[str, Any], last_kline_time: int
+    ) -> List[Dict[str, Any]]:
+        """
+        从指标输出的最后两根K线中提取待触发的信号（全量重算和增量模式共用）
+        """
+        # 提取待触发的信号
+        pending_signals = []
+        
+        # Supported indicator signal formats:
+        # - Preferred (simple): df['buy'], df['sell'] as boolean
+        # - Internal (4-way): df['open_long'], df['close_long'], df['open_short'], df['close_short'] as boolean
+        if all(col in executed_df.columns for col in ['buy', 'sell']) and not all(col in executed_df.columns for col in ['open_long', 'close_long', 'open_short', 'close_short']):
+            # Normalize buy/sell into 4-way columns for execution.
+            td = trading_config.get('trade_direction', trading_config.get('tradeDirection', 'both'))
+            td = str(td or 'both').lower()
+            if td not in ['long', 'short', 'both']:
+                td = 'both'
+
+            buy = executed_df['buy'].fillna(False).astype(bool)
+            sell = executed_df['sell'].fillna(False).astype(bool)
+
+            executed_df = executed_df.copy()
+            if td == 'long':
+                executed_df['open_long'] = buy
+                executed_df['close_long'] = sell
+                executed_df['open_short'] = False
+                executed_df['close_short'] = False
+            elif td == 'short':
+                executed_df['open_long'] = False
+                executed_df['close_long'] = False
+                executed_df['open_short'] = sell
+                executed_df['close_short'] = buy
+            else:
+                executed_df['open_long'] = buy
+                executed_df['close_short'] = buy
+                executed_df['open_short'] = sell
+                executed_df['close_long'] = sell
+
+        # Check for 4-way columns after normalization
+        if all(col in executed_df.columns for col in ['open_long', 'close_long', 'open_short', 'close_short']):
+            # 优化点3: 防“信号闪烁” (Repainting)
+            signal_mode = trading_config.get('signal_mode', 'confirmed') # 'confirmed' or 'aggressive'
+            exit_signal_mode = trading_config.get('exit_signal_mode', 'aggressive') # 'confirmed' or 'aggressive'
+            
+            entry_check_set = set()
+            exit_check_set = set()
+            
+            if len(executed_df) > 1:
+                # 始终检查上一根已完成K线
+                entry_check_set.add(len(executed_df) - 2)
+                exit_check_set.add(len(executed_df) - 2)
+            
+            if signal_mode == 'aggressive' and len(executed_df) > 0:
+                entry_check_set.add(len(executed_df) - 1)
+            
+            if exit_signal_mode == 'aggressive' and len(executed_df) > 0:
+                exit_check_set.add(len(executed_df) - 1)
+            
+            # 统一遍历索引（保持确定性排序）
+            check_indices = sorted(entry_check_set.union(exit_check_set), reverse=True)
+            
+            for idx in check_indices:
+                # 获取该K线的收盘价（作为默认触发价）
+                close_price = float(executed_df['close'].iloc[idx])
+                # 该信号的时间戳
+                signal_timestamp = int(executed_df.index[idx].timestamp()) if hasattr(executed_df.index[idx], 'timestamp') else last_kline_time
                 
-                if exit_signal_mode == 'aggressive' and len(executed_df) > 0:
-                    exit_check_set.add(len(executed_df) - 1)
+                # 开多信号（仅在 entry_check_set 中检查）
+                if idx in entry_check_set and executed_df['open_long'].iloc[idx]:
+                    trigger_price = close_price
+                    position_size = 0.08
+                    if 'position_size' in executed_df.columns:
+                        pos_size = executed_df['position_size'].iloc[idx]
+                        if pos_size > 0:
+                            position_size = float(pos_size)
+                    
+                    if not any(s['type'] == 'open_long' and s.get('timestamp') == signal_timestamp for s in pending_signals):
+                        pending_signals.append({
+                            'type': 'open_long',
+                            'trigger_price': trigger_price,
+                            'position_size': position_size,
+                            'timestamp': signal_timestamp
+                        })
                 
-                # 统一遍历索引（保持确定性排序）
-                check_indices = sorted(entry_check_set.union(exit_check_set), reverse=True)
+                # 平多信号
+                if idx in exit_check_set and executed_df['close_long'].iloc[idx]:
+                    trigger_price = close_price
+                    if not any(s['type'] == 'close_long' and s.get('timestamp') == signal_timestamp for s in pending_signals):
+                        pending_signals.append({
+                            'type': 'close_long',
+                            'trigger_price': trigger_price,
+                            'position_size': 0,
+                            'timestamp': signal_timestamp
+                        })
                 
-                for idx in check_indices:
-                    # 获取该K线的收盘价（作为默认触发价）
-                    close_price = float(executed_df['close'].iloc[idx])
-                    # 该信号的时间戳
-                    signal_timestamp = int(executed_df.index[idx].timestamp()) if hasattr(executed_df.index[idx], 'timestamp') else last_kline_time
+                # 开空信号
+                if idx in entry_check_set and executed_df['open_short'].iloc[idx]:
+                    trigger_price = close_price
+                    position_size = 0.08
+                    if 'position_size' in executed_df.columns:
+                        pos_size = executed_df['position_size'].iloc[idx]
+                        if pos_size > 0:
+                            position_size = float(pos_size)
                     
-                    # 开多信号（仅在 entry_check_set 中检查）
-                    if idx in entry_check_set and executed_df['open_long'].iloc[idx]:
-                        trigger_price = close_price
-                        position_size = 0.08
-                        if 'position_size' in executed_df.columns:
-                            pos_size = executed_df['position_size'].iloc[idx]
-                            if pos_size > 0:
-                                position_size = float(pos_size)
+                    if not any(s['type'] == 'open_short' and s.get('timestamp') == signal_timestamp for s in pending_signals):
+                        pending_signals.append({
+                            'type': 'open_short',
+                            'trigger_price': trigger_price,
+                            'position_size': position_size,
+                            'timestamp': signal_timestamp
+                        })
+                
+                # 平空信号
+                if idx in exit_check_set and executed_df['close_short'].iloc[idx]:
+                    trigger_price = close_price
+                    if not any(s['type'] == 'close_short' and s.get('timestamp') == signal_timestamp for s in pending_signals):
+                        pending_signals.append({
+                            'type': 'close_short',
+                            'trigger_price': trigger_price,
+                            'position_size': 0,
+                            'timestamp': signal_timestamp
+                        })
                         
-                        if not any(s['type'] == 'open_long' and s.get('timestamp') == signal_timestamp for s in pending_signals):
-                            pending_signals.append({
-                                'type': 'open_long',
-                                'trigger_price': trigger_price,
-                                'position_size': position_size,
-                                'timestamp': signal_timestamp
-                            })
-                    
-                    # 平多信号
-                    if idx in exit_check_set and executed_df['close_long'].iloc[idx]:
-                        trigger_price = close_price
-                        if not any(s['type'] == 'close_long' and s.get('timestamp') == signal_timestamp for s in pending_signals):
-                            pending_signals.append({
-                                'type': 'close_long',
-                                'trigger_price': trigger_price,
-                                'position_size': 0,
-                                'timestamp': signal_timestamp
-                            })
-                    
-                    # 开空信号
-                    if idx in entry_check_set and executed_df['open_short'].iloc[idx]:
-                        trigger_price = close_price
-                        position_size = 0.08
-                        if 'position_size' in executed_df.columns:
-                            pos_size = executed_df['position_size'].iloc[idx]
-                            if pos_size > 0:
-                                position_size = float(pos_size)
+                # 加多信号
+                if idx in entry_check_set and 'add_long' in executed_df.columns and executed_df['add_long'].iloc[idx]:
+                    trigger_price = close_price
+                    position_size = 0.06
+                    if 'position_size' in executed_df.columns:
+                        pos_size = executed_df['position_size'].iloc[idx]
+                        if pos_size > 0:
+                            position_size = float(pos_size)
+
+                    if not any(s['type'] == 'add_long' and s.get('timestamp') == signal_timestamp for s in pending_signals):
+                        pending_signals.append({
+                            'type': 'add_long',
+                            'trigger_price': trigger_price,
+                            'position_size': position_size,
+                            'timestamp': signal_timestamp
+                        })
                         
-                        if not any(s['type'] == 'open_short' and s.get('timestamp') == signal_timestamp for s in pending_signals):
-                            pending_signals.append({
-                                'type': 'open_short',
-                                'trigger_price': trigger_price,
-                                'position_size': position_size,
-                                'timestamp': signal_timestamp
-                            })
-                    
-                    # 平空信号
-                    if idx in exit_check_set and executed_df['close_short'].iloc[idx]:
-                        trigger_price = close_price
-                        if not any(s['type'] == 'close_short' and s.get('timestamp') == signal_timestamp for s in pending_signals):
-                            pending_signals.append({
-                                'type': 'close_short',
-                                'trigger_price': trigger_price,
-                                'position_size': 0,
-                                'timestamp': signal_timestamp
-                            })
-                            
-                    # 加多信号
-                    if idx in entry_check_set and 'add_long' in executed_df.columns and executed_df['add_long'].iloc[idx]:
-                        trigger_price = close_price
-                        position_size = 0.06
-                        if 'position_size' in executed_df.columns:
-                            pos_size = executed_df['position_size'].iloc[idx]
-                            if pos_size > 0:
-                                position_size = float(pos_size)
-
-                        if not any(s['type'] == 'add_long' and s.get('timestamp') == signal_timestamp for s in pending_signals):
-                            pending_signals.append({
-                                'type': 'add_long',
-                                'trigger_price': trigger_price,
-                                'position_size': position_size,
-                                'timestamp': signal_timestamp
-                            })
-                            
-                    # 加空信号
-                    if idx in entry_check_set and 'add_short' in executed_df.columns and executed_df['add_short'].iloc[idx]:
-                        trigger_price = close_price
-                        position_size = 0.06
-                        if 'position_size' in executed_df.columns:
-                            pos_size = executed_df['position_size'].iloc[idx]
-                            if pos_size > 0:
-                                position_size = float(pos_size)
-
-                        if not any(s['type'] == 'add_short' and s.get('timestamp') == signal_timestamp for s in pending_signals):
-                            pending_signals.append({
-                                'type': 'add_short',
-                                'trigger_price': trigger_price,
-                                'position_size': position_size,
-                                'timestamp': signal_timestamp
-                            })
-
-                    # Reduce / scale-out signals (optional)
-                    # These are used by position management rules (trend/adverse reduce) and should be treated as exits.
-                    if idx in exit_check_set and 'reduce_long' in executed_df.columns and executed_df['reduce_long'].iloc[idx]:
-                        trigger_price = close_price
-                        reduce_pct = 0.1
-                        if 'reduce_size' in executed_df.columns:
-                            try:
-                                reduce_pct = float(executed_df['reduce_size'].iloc[idx] or 0)
-                            except Exception:
-                                reduce_pct = 0.1
-                        elif 'position_size' in executed_df.columns:
-                            try:
-                                reduce_pct = float(executed_df['position_size'].iloc[idx] or 0)
-                            except Exception:
-                                reduce_pct = 0.1
-                        if reduce_pct <= 0:
+                # 加空信号
+                if idx in entry_check_set and 'add_short' in executed_df.columns and executed_df['add_short'].iloc[idx]:
+                    trigger_price = close_price
+                    position_size = 0.06
+                    if 'position_size' in executed_df.columns:
+                        pos_size = executed_df['position_size'].iloc[idx]
+                        if pos_size > 0:
+                            position_size = float(pos_size)
+
+                    if not any(s['type'] == 'add_short' and s.get('timestamp') == signal_timestamp for s in pending_signals):
+                        pending_signals.append({
+                            'type': 'add_short',
+                            'trigger_price': trigger_price,
+                            'position_size': position_size,
+                            'timestamp': signal_timestamp
+                        })
+
+                # Reduce / scale-out signals (optional)
+                # These are used by position management rules (trend/adverse reduce) and should be treated as exits.
+                if idx in exit_check_set and 'reduce_long' in executed_df.columns and executed_df['reduce_long'].iloc[idx]:
+                    trigger_price = close_price
+                    reduce_pct = 0.1
+                    if 'reduce_size' in executed_df.columns:
+                        try:
+                            reduce_pct = float(executed_df['reduce_size'].iloc[idx] or 0)
+                        except Exception:
                             reduce_pct = 0.1
-                        if not any(s['type'] == 'reduce_long' and s.get('timestamp') == signal_timestamp for s in pending_signals):
-                            pending_signals.append({
-                                'type': 'reduce_long',
-                                'trigger_price': trigger_price,
-                                'position_size': reduce_pct,
-                                'timestamp': signal_timestamp
-                            })
-
-                    if idx in exit_check_set and 'reduce_short' in executed_df.columns and executed_df['reduce_short'].iloc[idx]:
-                        trigger_price = close_price
+                    elif 'position_size' in executed_df.columns:
+                        try:
+                            reduce_pct = float(executed_df['position_size'].iloc[idx] or 0)
+                        except Exception:
+                            reduce_pct = 0.1
+                    if reduce_pct <= 0:
                         reduce_pct = 0.1
-                        if 'reduce_size' in executed_df.columns:
-                            try:
-                                reduce_pct = float(executed_df['reduce_size'].iloc[idx] or 0)
-                            except Exception:
-                                reduce_pct = 0.1
-                        elif 'position_size' in executed_df.columns:
-                            try:
-                                reduce_pct = float(executed_df['position_size'].iloc[idx] or 0)
-                            except Exception:
-                                reduce_pct = 0.1
-                        if reduce_pct <= 0:
+                    if not any(s['type'] == 'reduce_long' and s.get('timestamp') == signal_timestamp for s in pending_signals):
+                        pending_signals.append({
+                            'type': 'reduce_long',
+                            'trigger_price': trigger_price,
+                            'position_size': reduce_pct,
+                            'timestamp': signal_timestamp
+                        })
+
+                if idx in exit_check_set and 'reduce_short' in executed_df.columns and executed_df['reduce_short'].iloc[idx]:
+                    trigger_price = close_price
+                    reduce_pct = 0.1
+                    if 'reduce_size' in executed_df.columns:
+                        try:
+                            reduce_pct = float(executed_df['reduce_size'].iloc[idx] or 0)
+                        except Exception:
                             reduce_pct = 0.1
-                        if not any(s['type'] == 'reduce_short' and s.get('timestamp') == signal_timestamp for s in pending_signals):
-                            pending_signals.append({
-                                'type': 'reduce_short',
-                                'trigger_price': trigger_price,
-                                'position_size': reduce_pct,
-                                'timestamp': signal_timestamp
-                            })
-            
+                    elif 'position_size' in executed_df.columns:
+                        try:
+                            reduce_pct = float(executed_df['position_size'].iloc[idx] or 0)
+                        except Exception:
+                            reduce_pct = 0.1
+                    if reduce_pct <= 0:
+                        reduce_pct = 0.1
+                    if not any(s['type'] == 'reduce_short' and s.get('timestamp') == signal_timestamp for s in pending_signals):
+                        pending_signals.append({
+                            'type': 'reduce_short',
+                            'trigger_price': trigger_price,
+                            'position_size': reduce_pct,
+                            'timestamp': signal_timestamp
+                        })
+        
+        return pending_signals
+    
+    def _evaluate_incremental(
+        self,
+        strategy_id: int,
+        incremental: IncrementalIndicator,
+        df: pd.DataFrame,
+        trading_config: Dict[str, Any],
+        position: int,
+        avg_entry_price: float,
+        highest_price: float,
+        commit_closed: bool
+    ) -> Optional[Dict[str, Any]]:
+        """
+        增量模式下计算信号：只处理比已提交K线更新的行。
+
+        Args:
+            commit_closed: True 时除最后一根外的新K线视为已收盘并提交到状态；
+                           False（实时tick）时所有新行都只在状态副本上试算。
+
+        Returns:
+            与 _execute_indicator_with_prices 相同结构的结果；失败返回 None（调用方回退到全量重算）。
+        """
+        try:
+            if df is None or len(df) == 0:
+                return None
+            incremental.set_context(position, avg_entry_price, highest_price)
+            fresh = df
+            if incremental.committed_time is not None:
+                ts = epoch_seconds(df.index)
+                fresh = df.iloc[int(np.searchsorted(ts, incremental.committed_time, side='right')):]
+            bars = bars_from_frame(fresh)
+            if commit_closed and len(bars) > 1:
+                incremental.commit(bars[:-1])
+                bars = bars[-1:]
+            frame, state = incremental.signal_frame(bars)
+            last_kline_time = int(df.index[-1].timestamp())
+            new_highest_price = float(state.get('highest_price', 0) or 0)
             return {
-                'pending_signals': pending_signals,
+                'pending_signals': self._extract_pending_signals(frame, trading_config, last_kline_time),
                 'last_kline_time': last_kline_time,
-                'new_highest_price': new_highest_price
+                'new_highest_price': new_highest_price if new_highest_price != float(highest_price) else 0.0,
             }
-            
         except Exception as e:
-            logger.error(f"Failed to execute indicator and extract prices: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.warning(f"Strategy {strategy_id} incremental indicator failed, falling back to full recompute: {e}")
             return None
-    
+
     def _execute_indicator_df(
         self, indicator_code: str, df: pd.DataFrame, trading_config: Dict[str, Any], 
         initial_highest_price: float = 0.0,
@@ -1794,15 +1981,16 @@ class TradingExecutor:
             # === 指标参数支持 ===
             # 从 trading_config 获取用户设置的指标参数
             user_indicator_params = tc.get('indicator_params', {})
-            # 解析指标代码中声明的参数
-            declared_params = IndicatorParamsParser.parse_params(indicator_code)
+            # 编译结果和参数声明按源码哈希缓存（实盘每根K线都会执行）
+            indicator_id = tc.get('indicator_id')
+            code_cache = get_indicator_code_cache()
+            compiled = code_cache.get(indicator_code, indicator_id)
             # 合并参数（用户值优先，否则使用默认值）
-            merged_params = IndicatorParamsParser.merge_params(declared_params, user_indicator_params)
+            merged_params = code_cache.merged_params(compiled, user_indicator_params)
             
             # === 指标调用器支持 ===
-            # 获取用户ID和指标ID（用于 call_indicator 权限检查）
+            # 获取用户ID（用于 call_indicator 权限检查）
             user_id = tc.get('user_id', 1)
-            indicator_id = tc.get('indicator_id')
             indicator_caller = IndicatorCaller(user_id, indicator_id)
             
             local_vars = {
@@ -1830,30 +2018,25 @@ class TradingExecutor:
                 'initial_position_count': int(initial_position_count),
                 'initial_last_add_price': float(initial_last_add_price)
             }
+            # Streaming helpers for the optional incremental `on_bar(bar, state)` hook
+            local_vars.update(STREAMING_HELPERS)
+            
+            if sandbox_pool_enabled():
+                # Isolated worker process; the script namespace stays in the sandbox, so the
+                # incremental `on_bar` hook is unavailable and the loop recomputes every tick.
+                columns, scalars = get_sandbox_pool().run_indicator(
+                    indicator_code, df,
+                    env=picklable_env(local_vars),
+                    caller=(user_id, indicator_id)
+                )
+                executed_df = frame_with_columns(df, columns)
+                exec_env = dict(local_vars)
+                exec_env.update(scalars)
+                return executed_df, exec_env
+
+            exec_env = code_cache.prepare_env(local_vars, import_error="不允许导入模块: {name}")
             
-            import builtins
-            def safe_import(name, *args, **kwargs):
-                allowed_modules = ['numpy', 'pandas', 'math', 'json', 'time']
-                if name in allowed_modules or name.split('.')[0] in allowed_modules:
-                    return builtins.__import__(name, *args, **kwargs)
-                raise ImportError(f"不允许导入模块: {name}")
-            
-            safe_builtins = {k: getattr(builtins, k) for k in dir(builtins) 
-                           if not k.startswith('_') and k not in [
-                               'eval', 'exec', 'compile', 'open', 'input',
-                               'help', 'exit', 'quit', '__import__',
-                               'copyright', 'credits', 'license'
-                           ]}
-            safe_builtins['__import__'] = safe_import
-            
-            exec_env = local_vars.copy()
-            exec_env['__builtins__'] = safe_builtins
-            
-            pre_import_code = "import numpy as np\nimport pandas as pd\n"
-            exec(pre_import_code, exec_env)
-            
-            # 这里的 safe_exec_code 假设已存在
-            exec(indicator_code, exec_env)
+            exec(compiled.code_obj, exec_env)
             
             executed_df = exec_env.get('df', df)
 
@@ -2565,6 +2748,17 @@ class TradingExecutor:
                     ),
                 )
                 pending_id = cur.lastrowid
+                try:
+                    # Wake PendingOrderWorker (LISTEN pending_orders); delivered on commit.
+                    # Savepoint: a failed NOTIFY must not abort the INSERT (the worker still polls).
+                    cur.execute("SAVEPOINT pending_order_notify")
+                    cur.execute("SELECT pg_notify('pending_orders', %s)", (str(pending_id or ''),))
+                except Exception as e:
+                    logger.debug(f"enqueue_pending_order notify failed: {e}")
+                    try:
+                        cur.execute("ROLLBACK TO SAVEPOINT pending_order_notify")
+                    except Exception:
+                        pass
                 db.commit()
                 cur.close()
             return int(pending_id) if pending_id is not None else None
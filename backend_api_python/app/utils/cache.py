@@ -3,47 +3,194 @@ Cache utilities.
 Local-first behavior: use in-memory cache by default.
 Redis is only used when explicitly enabled via environment variables.
 """
+import os
+import sys
 import time
 import threading
-from typing import Optional, Any
-import json
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 
+from app.utils import cache_codec
 from app.utils.logger import get_logger
 from app.config import CacheConfig
 
 logger = get_logger(__name__)
 
 
-class MemoryCache:
-    """内存缓存（Redis 不可用时的备选方案）"""
-    
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(float(os.getenv(name, str(default))))
+    except Exception:
+        return default
+
+
+def _approx_size(value: Any, max_nodes: int = 2000) -> int:
+    """粗略估算对象占用字节数（bytes/str 精确，容器按采样节点外推）"""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value) + 64
+    total = 0
+    nodes = 0
+    stack = [value]
+    while stack and nodes < max_nodes:
+        obj = stack.pop()
+        nodes += 1
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set)):
+            stack.extend(obj)
+    if stack:
+        # 采样未走完：按已访问节点的平均大小外推剩余待访问部分
+        total += int(total / max(1, nodes) * len(stack))
+    return total
+
+
+class _Shard:
+    __slots__ = ('lock', 'items', 'bytes', 'hits', 'misses', 'evictions', 'expirations')
+
     def __init__(self):
-        self._cache = {}
-        self._lock = threading.Lock()
-    
-    def get(self, key: str) -> Optional[str]:
-        with self._lock:
-            if key in self._cache:
-                data, expiry = self._cache[key]
-                if expiry > time.time():
-                    return data
-                else:
-                    del self._cache[key]
-            return None
-    
-    def setex(self, key: str, ttl: int, value: str):
-        with self._lock:
-            expiry = time.time() + ttl
-            self._cache[key] = (value, expiry)
-    
+        self.lock = threading.Lock()
+        self.items: 'OrderedDict[str, Tuple[Any, float, int]]' = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+class MemoryCache:
+    """
+    进程内 LRU 缓存（Redis 不可用时的备选方案，也供路由级缓存使用）
+
+    - 条数上限（MEMORY_CACHE_MAX_ENTRIES）与字节上限（MEMORY_CACHE_MAX_MB），超限按 LRU 淘汰；
+    - 按 key 哈希分片加锁，降低并发读写的锁竞争；
+    - 后台线程每 MEMORY_CACHE_SWEEP_SEC 秒清理过期条目（读取时也会惰性清理）；
+    - stats() 返回命中/未命中/淘汰/过期统计。
+    """
+
+    _registry: 'weakref.WeakSet[MemoryCache]' = weakref.WeakSet()
+    _sweeper: Optional[threading.Thread] = None
+    _sweeper_lock = threading.Lock()
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        shards: Optional[int] = None,
+        name: str = 'default',
+    ):
+        self.name = name
+        self.max_entries = max(1, max_entries if max_entries is not None else _env_int('MEMORY_CACHE_MAX_ENTRIES', 10000))
+        self.max_bytes = max(1, max_bytes if max_bytes is not None else _env_int('MEMORY_CACHE_MAX_MB', 256) * 1024 * 1024)
+        n = max(1, shards if shards is not None else _env_int('MEMORY_CACHE_SHARDS', 16))
+        self._shards = [_Shard() for _ in range(n)]
+        self._shard_max_entries = max(1, self.max_entries // n)
+        self._shard_max_bytes = max(1, self.max_bytes // n)
+        MemoryCache._registry.add(self)
+        MemoryCache._ensure_sweeper()
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def get(self, key: str) -> Optional[Any]:
+        shard = self._shard(key)
+        with shard.lock:
+            item = shard.items.get(key)
+            if item is None:
+                shard.misses += 1
+                return None
+            value, expiry, size = item
+            if expiry <= time.time():
+                del shard.items[key]
+                shard.bytes -= size
+                shard.expirations += 1
+                shard.misses += 1
+                return None
+            shard.items.move_to_end(key)
+            shard.hits += 1
+            return value
+
+    def setex(self, key: str, ttl: int, value: Any):
+        size = _approx_size(value) + len(key)
+        expiry = time.time() + ttl
+        shard = self._shard(key)
+        with shard.lock:
+            old = shard.items.pop(key, None)
+            if old is not None:
+                shard.bytes -= old[2]
+            shard.items[key] = (value, expiry, size)
+            shard.bytes += size
+            while shard.items and (len(shard.items) > self._shard_max_entries or shard.bytes > self._shard_max_bytes):
+                _, (_, _, evicted_size) = shard.items.popitem(last=False)
+                shard.bytes -= evicted_size
+                shard.evictions += 1
+
     def delete(self, key: str):
-        with self._lock:
-            if key in self._cache:
-                del self._cache[key]
-    
+        shard = self._shard(key)
+        with shard.lock:
+            item = shard.items.pop(key, None)
+            if item is not None:
+                shard.bytes -= item[2]
+
     def clear(self):
-        with self._lock:
-            self._cache.clear()
+        for shard in self._shards:
+            with shard.lock:
+                shard.items.clear()
+                shard.bytes = 0
+
+    def sweep(self) -> int:
+        """清理所有过期条目，返回清理数量"""
+        now = time.time()
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                expired = [k for k, (_, expiry, _) in shard.items.items() if expiry <= now]
+                for k in expired:
+                    shard.bytes -= shard.items.pop(k)[2]
+                shard.expirations += len(expired)
+                removed += len(expired)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        totals = {'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        for shard in self._shards:
+            with shard.lock:
+                totals['entries'] += len(shard.items)
+                totals['bytes'] += shard.bytes
+                totals['hits'] += shard.hits
+                totals['misses'] += shard.misses
+                totals['evictions'] += shard.evictions
+                totals['expirations'] += shard.expirations
+        lookups = totals['hits'] + totals['misses']
+        totals.update({
+            'name': self.name,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'shards': len(self._shards),
+            'hit_rate': round(totals['hits'] / lookups, 4) if lookups else 0.0,
+        })
+        return totals
+
+    @classmethod
+    def _ensure_sweeper(cls):
+        with cls._sweeper_lock:
+            if cls._sweeper is not None and cls._sweeper.is_alive():
+                return
+            cls._sweeper = threading.Thread(target=cls._sweep_loop, name='memory-cache-sweeper', daemon=True)
+            cls._sweeper.start()
+
+    @classmethod
+    def _sweep_loop(cls):
+        interval = max(1, _env_int('MEMORY_CACHE_SWEEP_SEC', 30))
+        while True:
+            time.sleep(interval)
+            for cache in list(cls._registry):
+                try:
+                    cache.sweep()
+                except Exception as e:
+                    logger.debug(f"Memory cache sweep failed: {e}")
 
 
 class CacheManager:
@@ -70,7 +217,7 @@ class CacheManager:
 
         # Local-first: do NOT touch Redis unless explicitly enabled.
         if not CacheConfig.ENABLED:
-            self._client = MemoryCache()
+            self._client = MemoryCache(name='cache_manager')
             self._use_redis = False
             return
 
@@ -84,7 +231,8 @@ class CacheManager:
                 port=RedisConfig.PORT,
                 db=RedisConfig.DB,
                 password=RedisConfig.PASSWORD,
-                decode_responses=True,
+                # 值为 cache_codec 编码后的二进制（带编码头）
+                decode_responses=False,
                 socket_connect_timeout=RedisConfig.CONNECT_TIMEOUT,
                 socket_timeout=RedisConfig.SOCKET_TIMEOUT
             )
@@ -94,7 +242,7 @@ class CacheManager:
         except Exception as e:
             # Fall back silently (keep startup logs clean in local mode).
             logger.info(f"Redis is enabled but unavailable; using in-memory cache instead: {e}")
-            self._client = MemoryCache()
+            self._client = MemoryCache(name='cache_manager')
             self._use_redis = False
     
     def get(self, key: str) -> Optional[Any]:
@@ -102,7 +250,7 @@ class CacheManager:
         try:
             data = self._client.get(key)
             if data:
-                return json.loads(data)
+                return cache_codec.decode(data)
             return None
         except Exception as e:
             logger.error(f"Cache read failed: {e}")
@@ -111,7 +259,7 @@ class CacheManager:
     def set(self, key: str, value: Any, ttl: int = 300):
         """设置缓存"""
         try:
-            self._client.setex(key, ttl, json.dumps(value))
+            self._client.setex(key, ttl, cache_codec.encode(value))
         except Exception as e:
             logger.error(f"Cache write failed: {e}")
     
@@ -122,6 +270,12 @@ class CacheManager:
         except Exception as e:
             logger.error(f"Cache delete failed: {e}")
     
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计（仅内存缓存提供详细统计）"""
+        if self._use_redis:
+            return {'backend': 'redis'}
+        return dict(self._client.stats(), backend='memory')
+
     @property
     def is_redis(self) -> bool:
         return self._use_redis
@@ -0,0 +1,175 @@
+"""
+Cache value codecs.
+
+CacheManager used to `json.dumps` every value, including 300-1500 bar kline lists. Values are now
+encoded to bytes with a small header that records how they were written:
+
+    b"\\x00QD" + codec(1 byte) + compression(1 byte) + payload
+
+- codec `k`: kline lists (dicts with exactly time/open/high/low/close/volume, int time and float
+  prices) stored columnar as little-endian int64/float64 NumPy buffers;
+- codec `m`: msgpack for other values (CACHE_CODEC=msgpack, when msgpack is installed);
+- codec `j`: JSON for everything else;
+- compression: lz4 / zstd when installed (CACHE_COMPRESSION=auto|lz4|zstd|zlib|none), applied
+  only above CACHE_COMPRESS_MIN_BYTES.
+
+Values without the header (written by older versions) are decoded as plain JSON.
+"""
+import json
+import os
+import struct
+import zlib
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    import msgpack
+except Exception:
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except Exception:
+    lz4_frame = None
+
+try:
+    import zstandard
+except Exception:
+    zstandard = None
+
+
+MAGIC = b'\x00QD'
+KLINE_KEYS = ('time', 'open', 'high', 'low', 'close', 'volume')
+_PRICE_KEYS = KLINE_KEYS[1:]
+_KLINE_DTYPE = np.dtype([('time', '<i8')] + [(k, '<f8') for k in _PRICE_KEYS])
+
+
+# ---------------------------------------------------------------------------
+# Compression
+# ---------------------------------------------------------------------------
+
+def _zstd_compress(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=1).compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+_COMPRESSORS: Dict[str, Tuple[bytes, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    'none': (b'n', lambda b: b, lambda b: b),
+    'zlib': (b'z', lambda b: zlib.compress(b, 1), zlib.decompress),
+}
+if lz4_frame is not None:
+    _COMPRESSORS['lz4'] = (b'l', lz4_frame.compress, lz4_frame.decompress)
+if zstandard is not None:
+    _COMPRESSORS['zstd'] = (b's', _zstd_compress, _zstd_decompress)
+_DECOMPRESSORS = {tag: dec for tag, _, dec in _COMPRESSORS.values()}
+
+
+def _pick_compression() -> str:
+    name = os.getenv('CACHE_COMPRESSION', 'auto').strip().lower()
+    if name == 'auto':
+        for candidate in ('lz4', 'zstd'):
+            if candidate in _COMPRESSORS:
+                return candidate
+        return 'none'
+    return name if name in _COMPRESSORS else 'none'
+
+
+# ---------------------------------------------------------------------------
+# Codecs
+# ---------------------------------------------------------------------------
+
+def is_kline_list(value: Any) -> bool:
+    """True for lists produced by BaseDataSource.format_kline (exact keys and types)."""
+    if not isinstance(value, list) or not value:
+        return False
+    for row in value:
+        if type(row) is not dict or len(row) != 6 or type(row.get('time')) is not int:
+            return False
+        for k in _PRICE_KEYS:
+            if type(row.get(k)) is not float:
+                return False
+    return True
+
+
+def _encode_klines(value: List[Dict[str, Any]]) -> bytes:
+    arr = np.empty(len(value), dtype=_KLINE_DTYPE)
+    for k in KLINE_KEYS:
+        arr[k] = [row[k] for row in value]
+    # column-major: each field is one contiguous buffer
+    return struct.pack('<I', len(value)) + b''.join(np.ascontiguousarray(arr[k]).tobytes() for k in KLINE_KEYS)
+
+
+def _decode_klines(payload: bytes) -> List[Dict[str, Any]]:
+    (n,) = struct.unpack_from('<I', payload, 0)
+    offset = 4
+    columns = []
+    for k in KLINE_KEYS:
+        dtype = _KLINE_DTYPE[k]
+        columns.append(np.frombuffer(payload, dtype=dtype, count=n, offset=offset).tolist())
+        offset += n * dtype.itemsize
+    return [
+        {'time': t, 'open': o, 'high': h, 'low': lo, 'close': c, 'volume': v}
+        for t, o, h, lo, c, v in zip(*columns)
+    ]
+
+
+def _encode_json(value: Any) -> bytes:
+    return json.dumps(value).encode('utf-8')
+
+
+def _decode_json(payload: bytes) -> Any:
+    return json.loads(payload)
+
+
+def _encode_msgpack(value: Any) -> bytes:
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def _decode_msgpack(payload: bytes) -> Any:
+    return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+
+_DECODERS: Dict[bytes, Callable[[bytes], Any]] = {
+    b'k': _decode_klines,
+    b'j': _decode_json,
+}
+if msgpack is not None:
+    _DECODERS[b'm'] = _decode_msgpack
+
+
+def encode(value: Any) -> bytes:
+    """Python value -> header + (compressed) payload."""
+    if is_kline_list(value):
+        codec, payload = b'k', _encode_klines(value)
+    elif msgpack is not None and os.getenv('CACHE_CODEC', 'json').strip().lower() == 'msgpack':
+        try:
+            codec, payload = b'm', _encode_msgpack(value)
+        except Exception:
+            codec, payload = b'j', _encode_json(value)
+    else:
+        codec, payload = b'j', _encode_json(value)
+
+    comp_tag = b'n'
+    min_bytes = int(os.getenv('CACHE_COMPRESS_MIN_BYTES', '1024') or 1024)
+    if len(payload) >= min_bytes:
+        comp_tag, compress, _ = _COMPRESSORS[_pick_compression()]
+        payload = compress(payload)
+    return MAGIC + codec + comp_tag + payload
+
+
+def decode(data: Any) -> Any:
+    """Inverse of encode(); header-less str/bytes are legacy JSON values."""
+    if isinstance(data, str):
+        return json.loads(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data)
+        if not data.startswith(MAGIC):
+            return _decode_json(data)
+        codec, comp_tag = data[3:4], data[4:5]
+        payload = _DECOMPRESSORS[comp_tag](data[5:])
+        return _DECODERS[codec](payload)
+    raise TypeError(f"Unsupported cached value type: {type(data)}")
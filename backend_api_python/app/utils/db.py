@@ -21,6 +21,8 @@ from app.utils.db_postgres import (
     get_pg_connection as get_db_connection,
     get_pg_connection_sync as get_db_connection_sync,
     is_postgres_available,
+    open_listen_connection,
+    get_sql_stats,
     close_pool as close_db,
 )
 
@@ -60,6 +62,8 @@ __all__ = [
     'close_db_connection',
     'init_database',
     'close_db',
+    'open_listen_connection',
+    'get_sql_stats',
     'get_db_type',
     'is_postgres',
 ]
@@ -3,9 +3,13 @@ PostgreSQL Database Connection Utility
 
 Supports multi-user mode with connection pooling and SQLite compatibility layer.
 """
+import hashlib
 import os
+import re
 import threading
-from typing import Optional, Any, List, Dict
+import weakref
+from functools import lru_cache
+from typing import Optional, Any, List, Dict, Tuple
 from contextlib import contextmanager
 from app.utils.logger import get_logger
 
@@ -115,6 +119,111 @@ def _get_connection_pool():
         return _connection_pool
 
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+# ---------------------------------------------------------------------------
+# SQL translation cache / prepared statements
+# ---------------------------------------------------------------------------
+# Hot queries (token version check per request, strategy status per tick, pending-order polls)
+# run thousands of times per minute with the same SQL text: the SQLite -> PostgreSQL rewrite is
+# memoized, and with DB_PREPARED_STATEMENTS=true the most frequent ones are PREPAREd once per
+# connection and run via EXECUTE (skips re-parsing/planning on the server).
+# Not compatible with pgbouncer in transaction pooling mode.
+
+_SQL_CACHE_SIZE = _env_int('DB_SQL_CACHE_SIZE', 1024)
+_PREPARE_ENABLED = os.getenv('DB_PREPARED_STATEMENTS', 'false').strip().lower() in ('1', 'true', 'yes', 'on')
+_PREPARE_THRESHOLD = _env_int('DB_PREPARE_THRESHOLD', 100)   # executions before a query is prepared
+_PREPARE_MAX = _env_int('DB_PREPARE_MAX', 32)                 # prepared statements per process (top-N)
+_PREPARABLE_TYPES = (str, int, float, bool, type(None))
+_PREPARABLE_VERBS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+_stats_lock = threading.Lock()
+_query_counts: Dict[str, int] = {}
+_hot_queries: Dict[str, str] = {}        # pg query -> statement name
+_unpreparable: set = set()
+_prepared_by_conn: "weakref.WeakKeyDictionary[Any, set]" = weakref.WeakKeyDictionary()
+_prepared_stats = {'prepared': 0, 'executes': 0, 'prepare_errors': 0}
+
+
+@lru_cache(maxsize=_SQL_CACHE_SIZE)
+def _translate_sql(query: str) -> Tuple[str, bool]:
+    """
+    SQLite-style SQL -> (PostgreSQL SQL, is_insert), memoized per query text.
+
+    - ? placeholders -> %s
+    - INSERT OR IGNORE -> INSERT
+    - INSERT without RETURNING gets `RETURNING id` (for lastrowid)
+    """
+    query = query.replace('?', '%s')
+    query = query.replace('INSERT OR IGNORE', 'INSERT')
+    is_insert = query.strip().upper().startswith('INSERT')
+    if is_insert and 'RETURNING' not in query.upper():
+        query = query.rstrip(';').rstrip() + ' RETURNING id'
+    return query, is_insert
+
+
+def _statement_name(query: str) -> str:
+    return 'qd_' + hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+
+
+def _to_numbered_params(query: str) -> Optional[str]:
+    """%s -> $1..$n for PREPARE; None when the query has other % sequences or several statements."""
+    if ';' in query.rstrip().rstrip(';') or re.search(r'%(?!s)', query):
+        return None
+    counter = iter(range(1, query.count('%s') + 1))
+    return re.sub(r'%s', lambda _: f'${next(counter)}', query.rstrip().rstrip(';'))
+
+
+def _hot_statement(query: str, args: Tuple) -> Optional[str]:
+    """Statement name if `query` is (now) one of the top-N prepared queries, else None."""
+    if query in _unpreparable or not all(isinstance(a, _PREPARABLE_TYPES) for a in args):
+        return None
+    with _stats_lock:
+        name = _hot_queries.get(query)
+        if name is not None:
+            return name
+        count = _query_counts.get(query, 0) + 1
+        if count < _PREPARE_THRESHOLD:
+            if len(_query_counts) < _SQL_CACHE_SIZE:
+                _query_counts[query] = count
+            return None
+        _query_counts.pop(query, None)
+        if len(_hot_queries) >= _PREPARE_MAX:
+            return None
+        if query.count('%s') != len(args) or not query.lstrip().upper().startswith(_PREPARABLE_VERBS) \
+                or _to_numbered_params(query) is None:
+            _unpreparable.add(query)
+            return None
+        name = _hot_queries[query] = _statement_name(query)
+        return name
+
+
+def get_sql_stats() -> Dict[str, Any]:
+    """Translation cache and prepared-statement counters (for diagnostics)."""
+    info = _translate_sql.cache_info()
+    with _stats_lock:
+        return {
+            'translate_cache': {
+                'hits': info.hits,
+                'misses': info.misses,
+                'size': info.currsize,
+                'max_size': info.maxsize,
+            },
+            'prepared_statements': {
+                'enabled': _PREPARE_ENABLED,
+                'threshold': _PREPARE_THRESHOLD,
+                'max': _PREPARE_MAX,
+                'hot_queries': len(_hot_queries),
+                **_prepared_stats,
+            },
+        }
+
+
 class PostgresCursor:
     """PostgreSQL cursor wrapper with SQLite placeholder compatibility"""
     
@@ -127,27 +236,56 @@ class PostgresCursor:
         Convert SQLite-style ? placeholders to PostgreSQL %s
         Also handle some SQL syntax differences
         """
-        # Replace ? -> %s
-        query = query.replace('?', '%s')
-        
-        # SQLite: INSERT OR IGNORE -> PostgreSQL: INSERT ... ON CONFLICT DO NOTHING
-        query = query.replace('INSERT OR IGNORE', 'INSERT')
-        
-        return query
+        return _translate_sql(query)[0]
+    
+    def _execute_prepared(self, name: str, query: str, args: Tuple) -> bool:
+        """Run `query` as EXECUTE of a per-connection prepared statement; False if it can't be prepared."""
+        conn = self._cursor.connection
+        with _stats_lock:
+            prepared = _prepared_by_conn.setdefault(conn, set())
+        if name not in prepared:
+            # PREPARE inside a savepoint so a failure does not abort the caller's transaction
+            try:
+                self._cursor.execute('SAVEPOINT qd_prepare')
+                self._cursor.execute(f'PREPARE {name} AS {_to_numbered_params(query)}')
+                self._cursor.execute('RELEASE SAVEPOINT qd_prepare')
+            except Exception as e:
+                try:
+                    self._cursor.execute('ROLLBACK TO SAVEPOINT qd_prepare')
+                except Exception:
+                    pass
+                logger.debug(f"PREPARE failed, running unprepared: {e}")
+                with _stats_lock:
+                    _prepared_stats['prepare_errors'] += 1
+                    _unpreparable.add(query)
+                    _hot_queries.pop(query, None)
+                return False
+            prepared.add(name)
+            with _stats_lock:
+                _prepared_stats['prepared'] += 1
+        placeholders = ', '.join(['%s'] * len(args))
+        try:
+            self._cursor.execute(f'EXECUTE {name} ({placeholders})' if args else f'EXECUTE {name}', args)
+        except Exception as e:
+            if getattr(e, 'pgcode', None) == '26000':  # invalid_sql_statement_name: session was reset
+                prepared.discard(name)
+            raise
+        with _stats_lock:
+            _prepared_stats['executes'] += 1
+        return True
     
     def execute(self, query: str, args: Any = None):
         """Execute SQL statement"""
-        query = self._convert_placeholders(query)
-        
-        # Check if this is an INSERT and add RETURNING id if not present
-        is_insert = query.strip().upper().startswith('INSERT')
-        if is_insert and 'RETURNING' not in query.upper():
-            query = query.rstrip(';').rstrip() + ' RETURNING id'
+        query, is_insert = _translate_sql(query)
         
         if args:
             if not isinstance(args, (tuple, list)):
                 args = (args,)
-            result = self._cursor.execute(query, args)
+            name = _hot_statement(query, tuple(args)) if _PREPARE_ENABLED else None
+            if name and self._execute_prepared(name, query, tuple(args)):
+                result = None
+            else:
+                result = self._cursor.execute(query, args)
         else:
             result = self._cursor.execute(query)
         
@@ -253,6 +391,34 @@ def get_pg_connection_sync() -> PostgresConnection:
     return PostgresConnection(conn)
 
 
+def open_listen_connection(*channels: str):
+    """
+    Open a dedicated autocommit connection that LISTENs on `channels` (not taken from the pool).
+
+    The caller waits with `select.select([conn], [], [], timeout)`, then calls `conn.poll()` and drains
+    `conn.notifies`. Caller must close it.
+    """
+    if not HAS_PSYCOPG2:
+        raise RuntimeError("psycopg2 is not installed. Cannot use PostgreSQL.")
+    params = _parse_database_url(_get_database_url())
+    if not params:
+        raise RuntimeError("DATABASE_URL environment variable is not set or invalid.")
+    conn = psycopg2.connect(
+        host=params.get('host', 'localhost'),
+        port=params.get('port', 5432),
+        user=params.get('user', 'quantdinger'),
+        password=params.get('password', ''),
+        dbname=params.get('dbname', 'quantdinger'),
+        connect_timeout=10,
+    )
+    conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    cur = conn.cursor()
+    for channel in channels:
+        cur.execute(f'LISTEN "{channel}"')
+    cur.close()
+    return conn
+
+
 def execute_sql(sql: str, params: tuple = None) -> List[Dict[str, Any]]:
     """
     Execute SQL and return results (convenience function)
@@ -0,0 +1,447 @@
+"""
+进程隔离的指标代码沙箱池
+
+`safe_exec_code` 的超时依赖 signal.alarm，只在主线程生效；策略线程和 Flask 工作线程里
+失控的指标脚本会一直占着线程。沙箱池把指标代码放到预先启动的子进程中执行：
+
+- OHLCV 通过 `multiprocessing.shared_memory` 传给子进程，不做逐行 pickle；
+- 子进程复用 IndicatorCodeCache，按源码 SHA-256 缓存 compile() 后的字节码；
+- 墙钟超时由父进程强制（超时直接 kill 并补充新进程），CPU 时间用 RLIMIT_CPU，
+  内存用 RLIMIT_AS（仅 Linux/Unix，作用于子进程本身，不影响 API 进程）；
+- 每个子进程执行 N 次后自动回收重建，避免脚本残留状态/内存碎片累积。
+
+返回值只包含指标写入 df 的数值/布尔列（信号列、position_size 等）以及少量标量。
+"""
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import traceback
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource  # Linux/Unix only
+except Exception:
+    resource = None
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+OHLCV_ROWS = ('time', 'open', 'high', 'low', 'close', 'volume')
+# Scalars read back from the script's namespace (e.g. trailing-stop state in live strategies).
+RESULT_SCALARS = ('highest_price',)
+DEFAULT_ALLOWED_MODULES = ('numpy', 'pandas', 'math', 'json', 'time')
+
+
+class SandboxError(Exception):
+    """指标沙箱执行失败（超时、超出资源限制、子进程异常退出）"""
+    pass
+
+
+def sandbox_pool_enabled() -> bool:
+    return os.getenv('SANDBOX_POOL_ENABLED', 'false').lower() == 'true'
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def picklable_env(local_vars: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only plain values (numbers, strings, dicts of them...) that can be sent to a worker."""
+    out = {}
+    for key, value in (local_vars or {}).items():
+        if key.startswith('__') or callable(value) or isinstance(value, (pd.Series, pd.DataFrame, type(np))):
+            continue
+        try:
+            pickle.dumps(value)
+        except Exception:
+            continue
+        out[key] = value
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Worker process side
+# ---------------------------------------------------------------------------
+
+def _current_vm_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        return 0
+
+
+def _apply_limits(memory_mb: int, cpu_sec: int) -> None:
+    """Per-job limits: address-space budget on top of the current footprint, CPU seconds from now."""
+    if resource is None:
+        return
+    try:
+        if memory_mb > 0:
+            vm = _current_vm_bytes()
+            if vm > 0:
+                limit = vm + memory_mb * 1024 * 1024
+                resource.setrlimit(resource.RLIMIT_AS, (limit, resource.RLIM_INFINITY))
+        if cpu_sec > 0:
+            used = resource.getrusage(resource.RUSAGE_SELF)
+            limit = int(used.ru_utime + used.ru_stime) + int(cpu_sec) + 1
+            # Exceeding the soft limit raises SIGXCPU, which terminates the worker.
+            resource.setrlimit(resource.RLIMIT_CPU, (limit, resource.RLIM_INFINITY))
+    except (ValueError, OSError):
+        pass
+
+
+def _release_memory_limit() -> None:
+    if resource is None:
+        return
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (resource.RLIM_INFINITY, resource.RLIM_INFINITY))
+    except (ValueError, OSError):
+        pass
+
+
+def _build_frame(job: Dict[str, Any]) -> pd.DataFrame:
+    shm = shared_memory.SharedMemory(name=job['shm_name'])
+    try:
+        matrix = np.ndarray(job['shape'], dtype=np.float64, buffer=shm.buf)
+        index = pd.to_datetime(matrix[0].astype(np.int64), unit='s', utc=bool(job.get('utc')))
+        index.name = 'time'
+        df = pd.DataFrame(
+            {col: matrix[row].copy() for row, col in enumerate(OHLCV_ROWS) if row > 0},
+            index=index
+        )
+        del matrix
+    finally:
+        shm.close()
+    return df
+
+
+def _run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    df = _build_frame(job)
+    n = len(df)
+
+    # Per-worker compile cache (same SHA-256 keyed cache as the API process)
+    from app.services.indicator_code_cache import get_indicator_code_cache
+    code_cache = get_indicator_code_cache()
+    compiled = code_cache.get(job['code'])
+
+    exec_env = dict(job.get('env') or {})
+    exec_env.update({
+        'df': df,
+        'open': df['open'],
+        'high': df['high'],
+        'low': df['low'],
+        'close': df['close'],
+        'volume': df['volume'],
+        'signals': pd.Series(0, index=df.index, dtype='float64'),
+        'np': np,
+        'pd': pd,
+    })
+    if job.get('helpers'):
+        from app.services.backtest import BacktestService
+        exec_env.update(BacktestService._get_indicator_functions(None))
+    from app.services.incremental_indicator import STREAMING_HELPERS
+    exec_env.update(STREAMING_HELPERS)
+    caller = job.get('caller')
+    if caller:
+        from app.services.indicator_params import IndicatorCaller
+        exec_env['call_indicator'] = IndicatorCaller(caller[0], caller[1]).call_indicator
+    exec_env = code_cache.prepare_env(exec_env, allowed_modules=job.get('allowed_modules') or DEFAULT_ALLOWED_MODULES)
+    exec(compiled.code_obj, exec_env)
+
+    executed_df = exec_env.get('df', df)
+    if not isinstance(executed_df, pd.DataFrame):
+        raise ValueError("Indicator script replaced df with a non-DataFrame value")
+
+    output_obj = exec_env.get('output')
+    has_output_signals = isinstance(output_obj, dict) and isinstance(output_obj.get('signals'), list) and len(output_obj.get('signals')) > 0
+    if has_output_signals and not all(col in executed_df.columns for col in ['buy', 'sell']):
+        raise ValueError(
+            "Invalid indicator script: output['signals'] is provided, but df['buy'] and df['sell'] are missing. "
+            "Please set df['buy'] and df['sell'] as boolean columns (len == len(df))."
+        )
+
+    columns = {}
+    if len(executed_df) == n:
+        for col in executed_df.columns:
+            if col in OHLCV_ROWS or not isinstance(col, str):
+                continue
+            values = executed_df[col].to_numpy()
+            if values.dtype == object:
+                try:
+                    values = values.astype(bool) if all(isinstance(v, (bool, np.bool_)) or v is None for v in values) else None
+                except Exception:
+                    values = None
+            if values is not None and values.dtype.kind in 'biuf':
+                columns[col] = values
+    scalars = {k: exec_env[k] for k in RESULT_SCALARS if k in exec_env and isinstance(exec_env[k], (int, float))}
+    return {'columns': columns, 'scalars': scalars}
+
+
+def sandbox_worker_main(conn, memory_mb: int, cpu_sec: int, max_runs: int) -> None:
+    """Entry point of a sandbox process: serve jobs from `conn` until max_runs is reached."""
+    import logging
+    logging.disable(logging.WARNING)
+    runs = 0
+    while runs < max_runs:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        runs += 1
+        _apply_limits(memory_mb, cpu_sec)
+        try:
+            result = {'ok': True, **_run_job(job)}
+        except MemoryError:
+            result = {'ok': False, 'error': f"Indicator exceeded the sandbox memory limit ({memory_mb}MB)"}
+        except Exception as e:
+            result = {'ok': False, 'error': f"{type(e).__name__}: {e}", 'traceback': traceback.format_exc()}
+        finally:
+            _release_memory_limit()
+        result['recycle'] = runs >= max_runs
+        try:
+            conn.send(result)
+        except Exception:
+            return
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+
+class _Worker:
+    def __init__(self, ctx, memory_mb: int, cpu_sec: int, max_runs: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=sandbox_worker_main,
+            args=(child_conn, memory_mb, cpu_sec, max_runs),
+            name="IndicatorSandbox",
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.runs = 0
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def kill(self) -> None:
+        try:
+            self.process.kill()
+            self.process.join(timeout=2)
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class SandboxPool:
+    """
+    预启动的指标沙箱进程池（线程安全）
+
+    用法：
+        columns, scalars = get_sandbox_pool().run_indicator(code, df, env={...}, timeout=60)
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_runs: Optional[int] = None,
+        memory_mb: Optional[int] = None,
+        cpu_sec: Optional[int] = None
+    ):
+        self.size = max(1, size if size is not None else _env_int('SANDBOX_POOL_SIZE', 2))
+        self.max_runs = max(1, max_runs if max_runs is not None else _env_int('SANDBOX_MAX_RUNS', 200))
+        self.memory_mb = memory_mb if memory_mb is not None else _env_int('SANDBOX_MEMORY_MB', 1024)
+        self.cpu_sec = cpu_sec if cpu_sec is not None else _env_int('SANDBOX_CPU_SEC', 60)
+        # spawn: safe in a multi-threaded API process (no forked locks)
+        self._ctx = multiprocessing.get_context('spawn')
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._missing = 0  # workers that could not be respawned yet
+        self.stats = {'runs': 0, 'errors': 0, 'timeouts': 0, 'crashes': 0, 'recycled': 0, 'spawn_failures': 0}
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._ctx, self.memory_mb, self.cpu_sec, self.max_runs)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._idle.put(self._spawn())
+            self._started = True
+            logger.info(f"Indicator sandbox pool started (size={self.size}, max_runs={self.max_runs}, "
+                        f"memory={self.memory_mb}MB, cpu={self.cpu_sec}s)")
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _respawn(self) -> bool:
+        """Start a replacement worker; on failure remember the slot so it is retried later."""
+        try:
+            worker = self._spawn()
+        except Exception as e:
+            logger.error(f"Indicator sandbox worker spawn failed: {e}")
+            with self._lock:
+                self._missing += 1
+                self.stats['spawn_failures'] += 1
+            return False
+        self._idle.put(worker)
+        return True
+
+    def _replenish(self) -> None:
+        with self._lock:
+            missing, self._missing = self._missing, 0
+        for _ in range(missing):
+            self._respawn()
+
+    def _acquire(self) -> _Worker:
+        while True:
+            self._replenish()
+            try:
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                with self._lock:
+                    no_workers = self._missing >= self.size
+                if no_workers:
+                    raise SandboxError("Indicator sandbox pool has no live workers (process spawn failed)")
+
+    def _release(self, worker: _Worker, replace: bool) -> None:
+        if replace or not worker.alive():
+            worker.kill()
+            self._respawn()
+        else:
+            self._idle.put(worker)
+
+    def run_indicator(
+        self,
+        code: str,
+        df: pd.DataFrame,
+        env: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        helpers: bool = False,
+        caller: Optional[Tuple[Any, Any]] = None,
+        allowed_modules: Optional[List[str]] = None
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """
+        Run an indicator script in a sandbox process.
+
+        Args:
+            code: indicator source
+            df: OHLCV DataFrame with a DatetimeIndex
+            env: extra picklable variables for the script namespace (params, leverage, ...)
+            timeout: wall-clock limit in seconds, default SANDBOX_TIMEOUT_SEC (the worker is killed when exceeded)
+            helpers: expose SMA/EMA/RSI/... helper functions (backtest environment)
+            caller: (user_id, indicator_id) to enable call_indicator()
+            allowed_modules: modules the script may import
+
+        Returns:
+            (columns, scalars): df columns written by the script and selected scalar variables
+
+        Raises:
+            SandboxError: timeout, resource limit or script error
+        """
+        if timeout is None:
+            timeout = float(_env_int('SANDBOX_TIMEOUT_SEC', 30))
+        self.start()
+        worker = self._acquire()
+        try:
+            shm, shape = self._share(df)
+        except Exception:
+            self._release(worker, False)
+            raise
+        job = {
+            'shm_name': shm.name,
+            'shape': shape,
+            'utc': isinstance(df.index, pd.DatetimeIndex) and df.index.tz is not None,
+            'code': code,
+            'env': env or {},
+            'helpers': bool(helpers),
+            'caller': caller,
+            'allowed_modules': list(allowed_modules or DEFAULT_ALLOWED_MODULES),
+        }
+        replace = False
+        try:
+            self._count('runs')
+            worker.conn.send(job)
+            if not worker.conn.poll(timeout):
+                replace = True
+                self._count('timeouts')
+                raise SandboxError(f"Indicator execution timed out ({timeout}s)")
+            try:
+                result = worker.conn.recv()
+            except (EOFError, OSError):
+                replace = True
+                self._count('crashes')
+                raise SandboxError("Indicator sandbox process exited unexpectedly (CPU/memory limit exceeded?)")
+            if result.get('recycle'):
+                replace = True
+                self._count('recycled')
+            if not result.get('ok'):
+                self._count('errors')
+                raise SandboxError(result.get('error') or 'Indicator execution failed')
+            return result.get('columns') or {}, result.get('scalars') or {}
+        except (BrokenPipeError, EOFError, OSError) as e:
+            replace = True
+            self._count('crashes')
+            raise SandboxError(f"Indicator sandbox communication failed: {e}")
+        finally:
+            self._release(worker, replace)
+            shm.close()
+            shm.unlink()
+
+    @staticmethod
+    def _share(df: pd.DataFrame):
+        n = len(df)
+        shape = (len(OHLCV_ROWS), n)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, n * len(OHLCV_ROWS) * 8))
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        index = df.index
+        if isinstance(index, pd.DatetimeIndex):
+            if index.tz is not None:
+                index = index.tz_convert('UTC').tz_localize(None)
+            matrix[0] = index.values.astype('datetime64[s]').astype(np.int64)
+        else:
+            matrix[0] = np.arange(n)
+        for row, col in enumerate(OHLCV_ROWS[1:], start=1):
+            matrix[row] = df[col].to_numpy(dtype=np.float64) if col in df.columns else 0.0
+        del matrix
+        return shm, shape
+
+
+def frame_with_columns(df: pd.DataFrame, columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Copy of df with the columns returned by the sandbox attached."""
+    out = df.copy()
+    for col, values in columns.items():
+        out[col] = values
+    return out
+
+
+_pool: Optional[SandboxPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Process-wide SandboxPool singleton."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool()
+        return _pool
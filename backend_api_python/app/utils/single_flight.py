@@ -0,0 +1,68 @@
+"""
+Single-flight 请求合并
+
+同一时刻对同一个 key 的并发调用只执行一次 fn，其余调用方等待并共享结果（或异常）。
+调用结束后 key 即释放，不做结果缓存（缓存仍由 CacheManager 负责）。
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """线程安全的 single-flight 执行器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0   # 实际发往上游的次数
+        self.collapsed = 0    # 被合并（未发往上游）的调用次数
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.collapsed += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.executions + self.collapsed
+            return {
+                'calls': total,
+                'upstream': self.executions,
+                'collapsed': self.collapsed,
+                'collapse_rate': round(self.collapsed / total, 4) if total else 0.0,
+                'in_flight': len(self._calls),
+            }
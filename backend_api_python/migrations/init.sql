@@ -480,6 +480,7 @@ CREATE TABLE IF NOT EXISTS qd_position_monitors (
     is_active INTEGER DEFAULT 1,
     last_run_at TIMESTAMP,
     next_run_at TIMESTAMP,
+    lease_until TIMESTAMP,               -- set while a worker runs the monitor (per-user concurrency cap)
     last_result TEXT DEFAULT '',
     run_count INTEGER DEFAULT 0,
     created_at TIMESTAMP DEFAULT NOW(),
@@ -487,6 +488,7 @@ CREATE TABLE IF NOT EXISTS qd_position_monitors (
 );
 
 CREATE INDEX IF NOT EXISTS idx_position_monitors_user_id ON qd_position_monitors(user_id);
+ALTER TABLE qd_position_monitors ADD COLUMN IF NOT EXISTS lease_until TIMESTAMP;
 
 -- =============================================================================
 -- 17. Market Symbols (Seed Data)
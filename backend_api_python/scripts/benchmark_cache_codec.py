@@ -0,0 +1,115 @@
+"""
+Benchmark CacheManager value encodings for kline payloads (legacy JSON vs cache_codec).
+
+Goal:
+- Generate deterministic random-walk klines shaped like `BaseDataSource.format_kline` output
+- For each timeframe / bar count, compare legacy `json.dumps`/`json.loads` with `cache_codec`
+  under every available compression
+- Verify round trips are identical and print bytes and encode/decode timings
+
+Usage:
+    python scripts/benchmark_cache_codec.py [--repeat 200] [--seed 7]
+
+Notes:
+- This is a local-only helper. It does NOT fetch market data or touch Redis.
+- lz4 / zstd columns only appear when `lz4` / `zstandard` are installed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def _ensure_backend_on_syspath() -> None:
+    """
+    Ensure `backend_api_python/` is on sys.path so `import app...` works
+    no matter where the script is executed from.
+    """
+    backend_root = Path(__file__).resolve().parents[1]
+    p = str(backend_root)
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+
+_ensure_backend_on_syspath()
+
+import numpy as np  # noqa: E402
+
+from app.utils import cache_codec  # noqa: E402
+
+
+# Typical KlineService payload sizes per timeframe.
+CASES: Dict[str, Tuple[int, int]] = {
+    "1m": (60, 1500),
+    "5m": (300, 1000),
+    "1H": (3600, 500),
+    "1D": (86400, 300),
+}
+
+
+def make_klines(bars: int, step_sec: int, seed: int) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    close = 30000.0 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.001, bars)) * close
+    start = 1_700_000_000 - bars * step_sec
+    return [
+        {
+            "time": int(start + i * step_sec),
+            "open": round(float(open_[i]), 4),
+            "high": round(float(max(open_[i], close[i]) + spread[i]), 4),
+            "low": round(float(min(open_[i], close[i]) - spread[i]), 4),
+            "close": round(float(close[i]), 4),
+            "volume": round(float(rng.uniform(1, 500)), 2),
+        }
+        for i in range(bars)
+    ]
+
+
+def _timeit(fn: Callable[[], Any], repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e6  # microseconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    compressions = [c for c in ("none", "lz4", "zstd", "zlib") if c in cache_codec._COMPRESSORS]
+    header = f"{'tf':>4} {'bars':>5} {'codec':>14} {'bytes':>9} {'ratio':>6} {'enc_us':>9} {'dec_us':>9} {'dec_x':>6}"
+    print(header)
+    print("-" * len(header))
+    for tf, (step, bars) in CASES.items():
+        klines = make_klines(bars, step, args.seed)
+
+        legacy = json.dumps(klines)
+        legacy_bytes = len(legacy.encode("utf-8"))
+        legacy_enc = _timeit(lambda: json.dumps(klines), args.repeat)
+        legacy_dec = _timeit(lambda: json.loads(legacy), args.repeat)
+        print(f"{tf:>4} {bars:>5} {'json(legacy)':>14} {legacy_bytes:>9} {1.0:>6.2f} {legacy_enc:>9.1f} {legacy_dec:>9.1f} {1.0:>6.1f}")
+
+        for comp in compressions:
+            os.environ["CACHE_COMPRESSION"] = comp
+            blob = cache_codec.encode(klines)
+            if cache_codec.decode(blob) != klines:
+                raise SystemExit(f"round trip mismatch: tf={tf} compression={comp}")
+            enc = _timeit(lambda: cache_codec.encode(klines), args.repeat)
+            dec = _timeit(lambda: cache_codec.decode(blob), args.repeat)
+            print(
+                f"{tf:>4} {bars:>5} {'kline+' + comp:>14} {len(blob):>9} {legacy_bytes / len(blob):>6.2f} "
+                f"{enc:>9.1f} {dec:>9.1f} {legacy_dec / dec:>6.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
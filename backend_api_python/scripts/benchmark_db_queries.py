@@ -0,0 +1,144 @@
+"""
+Benchmark per-query overhead of the PostgresCursor wrapper (SQL translation cache / prepared statements).
+
+Goal:
+- Measure the Python-side cost of `PostgresCursor.execute` for the hot queries (token version check,
+  strategy status, pending-order poll) with the legacy per-call rewrite vs the memoized translation,
+  using a fake DB-API cursor (no database needed)
+- With --live (and a reachable DATABASE_URL), time the same queries end-to-end against PostgreSQL
+  with plain execution vs server-side prepared statements
+
+Usage:
+    python scripts/benchmark_db_queries.py [--repeat 20000]
+    python scripts/benchmark_db_queries.py --live [--repeat 2000]
+
+Notes:
+- --live only runs read-only SELECTs and needs the schema from migrations/init.sql.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Tuple
+
+
+def _ensure_backend_on_syspath() -> None:
+    """
+    Ensure `backend_api_python/` is on sys.path so `import app...` works
+    no matter where the script is executed from.
+    """
+    backend_root = Path(__file__).resolve().parents[1]
+    p = str(backend_root)
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+
+_ensure_backend_on_syspath()
+
+from app.utils import db_postgres  # noqa: E402
+
+
+HOT_QUERIES: List[Tuple[str, str, Tuple[Any, ...]]] = [
+    ("token_version", "SELECT token_version FROM qd_users WHERE id = ?", (1,)),
+    ("strategy_status", "SELECT status FROM qd_strategies_trading WHERE id = %s", (1,)),
+    (
+        "pending_poll",
+        "SELECT id, strategy_id, symbol, signal_type, amount, status FROM pending_orders "
+        "WHERE status = ? AND (next_retry_at IS NULL OR next_retry_at <= NOW()) ORDER BY id ASC LIMIT ?",
+        ("pending", 50),
+    ),
+]
+
+
+class _FakeCursor:
+    """Minimal DB-API cursor: accepts execute() and returns nothing."""
+
+    connection = None
+    rowcount = 0
+
+    def execute(self, query: str, args: Any = None) -> None:
+        return None
+
+    def fetchone(self) -> None:
+        return None
+
+
+class _LegacyCursor(db_postgres.PostgresCursor):
+    """PostgresCursor.execute as it was before the translation cache (rewrite on every call)."""
+
+    def execute(self, query: str, args: Any = None):
+        query = query.replace('?', '%s')
+        query = query.replace('INSERT OR IGNORE', 'INSERT')
+        is_insert = query.strip().upper().startswith('INSERT')
+        if is_insert and 'RETURNING' not in query.upper():
+            query = query.rstrip(';').rstrip() + ' RETURNING id'
+        if args:
+            if not isinstance(args, (tuple, list)):
+                args = (args,)
+            return self._cursor.execute(query, args)
+        return self._cursor.execute(query)
+
+
+def _timeit(fn: Callable[[], Any], repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e6  # microseconds
+
+
+def bench_wrapper(repeat: int) -> None:
+    db_postgres._PREPARE_ENABLED = False
+    legacy = _LegacyCursor(_FakeCursor())
+    cached = db_postgres.PostgresCursor(_FakeCursor())
+    header = f"{'query':>16} {'legacy_us':>10} {'cached_us':>10} {'speedup':>8}"
+    print("Wrapper overhead (fake cursor, no DB)")
+    print(header)
+    print("-" * len(header))
+    for name, sql, params in HOT_QUERIES:
+        before = _timeit(lambda: legacy.execute(sql, params), repeat)
+        after = _timeit(lambda: cached.execute(sql, params), repeat)
+        print(f"{name:>16} {before:>10.2f} {after:>10.2f} {before / after:>7.1f}x")
+
+
+def bench_live(repeat: int) -> None:
+    if not db_postgres.is_postgres_available():
+        raise SystemExit("PostgreSQL not reachable (check DATABASE_URL)")
+    header = f"{'query':>16} {'plain_us':>10} {'prepared_us':>12} {'speedup':>8}"
+    print("\nEnd-to-end latency (PostgreSQL)")
+    print(header)
+    print("-" * len(header))
+    db_postgres._PREPARE_THRESHOLD = 1
+    with db_postgres.get_pg_connection() as conn:
+        for name, sql, params in HOT_QUERIES:
+            def run() -> None:
+                cur = conn.cursor()
+                cur.execute(sql, params)
+                cur.fetchall()
+                cur.close()
+
+            db_postgres._PREPARE_ENABLED = False
+            plain = _timeit(run, repeat)
+            db_postgres._PREPARE_ENABLED = True
+            run()  # PREPARE once
+            prepared = _timeit(run, repeat)
+            print(f"{name:>16} {plain:>10.1f} {prepared:>12.1f} {plain / prepared:>7.2f}x")
+        conn.rollback()
+    print(db_postgres.get_sql_stats())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20000)
+    parser.add_argument("--live", action="store_true", help="also benchmark against DATABASE_URL")
+    args = parser.parse_args()
+
+    bench_wrapper(args.repeat)
+    if args.live:
+        bench_live(max(1, args.repeat // 10))
+
+
+if __name__ == "__main__":
+    main()
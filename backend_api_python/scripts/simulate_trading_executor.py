@@ -6,6 +6,8 @@ Goal:
 - Inject deterministic K-lines and a deterministic tick-price sequence
 - Run TradingExecutor for a short period
 - Verify orders are enqueued into SQLite table `pending_orders`
+- Run PendingOrderWorker alongside and report enqueue -> dispatch latency
+  (compare `PENDING_ORDER_LISTEN=true` (NOTIFY wakeup) with `PENDING_ORDER_LISTEN=false` (1s polling))
 
 Notes:
 - This is a local-only test helper. It does NOT talk to real exchanges.
@@ -35,6 +37,7 @@ def _ensure_backend_on_syspath() -> None:
 
 _ensure_backend_on_syspath()
 
+from app.services.pending_order_worker import PendingOrderWorker  # noqa: E402
 from app.services.trading_executor import TradingExecutor  # noqa: E402
 from app.utils.db import get_db_connection  # noqa: E402
 
@@ -348,11 +351,16 @@ def main() -> None:
     feed = _SimPriceFeed(prices)
 
     # Monkeypatch market data methods (no network).
-    ex._fetch_latest_kline = lambda _symbol, _tf, limit=500: klines  # type: ignore[assignment]
-    ex._fetch_current_price = lambda _exchange, _symbol, market_type=None: feed.next()  # type: ignore[assignment]
+    ex._fetch_latest_kline = lambda _symbol, _tf, limit=500, market_category=None: klines  # type: ignore[assignment]
+    ex._fetch_current_price = lambda _exchange, _symbol, market_type=None, market_category=None: feed.next()  # type: ignore[assignment]
+
+    # Dispatcher for the orders enqueued below (signal mode: notification only).
+    worker = PendingOrderWorker()
+    worker.start()
 
     ok = ex.start_strategy(strategy_id)
     if not ok:
+        worker.stop()
         raise SystemExit("Failed to start strategy thread")
 
     # Let it run a few ticks.
@@ -367,13 +375,14 @@ def main() -> None:
 
     # Wait for thread to exit.
     time.sleep(2)
+    worker.stop()
 
     # Print pending orders.
     with get_db_connection() as db:
         cur = db.cursor()
         cur.execute(
             """
-            SELECT id, strategy_id, symbol, signal_type, amount, price, status, created_at
+            SELECT id, strategy_id, symbol, signal_type, amount, price, status, created_at, processed_at
             FROM pending_orders
             WHERE strategy_id = ?
             ORDER BY id ASC
@@ -387,6 +396,21 @@ def main() -> None:
     for r in rows:
         print(r)
 
+    # Enqueue -> claim latency (created_at -> processed_at).
+    lat_ms = [
+        (r["processed_at"] - r["created_at"]).total_seconds() * 1000.0
+        for r in rows
+        if r.get("processed_at") and r.get("created_at")
+    ]
+    listen = os.getenv("PENDING_ORDER_LISTEN", "true").lower() == "true"
+    if lat_ms:
+        print(
+            f"dispatch latency (listen={listen}): n={len(lat_ms)} "
+            f"avg={sum(lat_ms) / len(lat_ms):.1f}ms max={max(lat_ms):.1f}ms"
+        )
+    else:
+        print(f"dispatch latency (listen={listen}): no dispatched orders")
+
 
 if __name__ == "__main__":
     main()